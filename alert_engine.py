@@ -0,0 +1,503 @@
+"""
+Moteur d'alertes incrémental des capteurs IoT.
+
+Les règles sont construites à partir des seuils des préférences utilisateur
+(user_preferences['thresholds']), complétés par DEFAULT_THRESHOLDS:
+    {'heartRate': {'min': 60, 'max': 100}, 'systolicBP': {'min': 90, 'max': 140}, ...}
+
+Chaque entrée accepte aussi:
+- 'hysteresis': marge à franchir pour sortir d'un état anormal (évite les
+  alertes qui clignotent autour d'un seuil), par défaut DEFAULT_HYSTERESIS
+- 'maxDelta' et 'deltaWindow' (secondes): alerte de variation rapide quand la
+  valeur varie de plus de maxDelta à l'intérieur de la fenêtre
+- 'severity': 'error' (statut 'high' / 'low') ou 'warning' (statut 'warning')
+
+Le score d'alerte précoce (vitals_analytics.py) crée une alerte 'earlyWarning'
+dès qu'il atteint early_warning_score: avertissement en risque moyen, erreur en
+risque élevé.
+
+Chaque mesure est évaluée en temps constant (amorti) par règle: état courant de
+la règle, minimum / maximum glissants pour les variations et index de la
+dernière alerte par capteur pour l'anti-doublon. Les alertes d'un appareil sont
+indexées par identifiant et rangées par ordre chronologique dans un journal en
+ajout seul, partagé par les instantanés; les alertes plus anciennes que la
+rétention sont retirées en tête du journal.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from timeseries_store import SENSOR_CHANNELS
+
+# Clé de seuil des préférences -> (type de capteur, canal)
+THRESHOLD_KEYS = {
+    'heartRate': ('heartRate', 'value'),
+    'systolicBP': ('bloodPressure', 'systolic'),
+    'diastolicBP': ('bloodPressure', 'diastolic'),
+    'temperature': ('temperature', 'value'),
+    'oxygenSaturation': ('oxygenSaturation', 'value'),
+    'respiratoryRate': ('respiratoryRate', 'value'),
+}
+
+# Seuils appliqués quand les préférences ne les définissent pas
+DEFAULT_THRESHOLDS = {
+    'heartRate': {'min': 60, 'max': 100},
+    'systolicBP': {'min': 90, 'max': 140},
+    'diastolicBP': {'min': 60, 'max': 90},
+    'temperature': {'min': 36.0, 'max': 37.5},
+    'oxygenSaturation': {'min': 95},
+    'respiratoryRate': {'min': 12, 'max': 20, 'severity': 'warning'},
+}
+
+DEFAULT_HYSTERESIS = {
+    'heartRate': 2,
+    'systolicBP': 3,
+    'diastolicBP': 2,
+    'temperature': 0.1,
+    'oxygenSaturation': 1,
+    'respiratoryRate': 1,
+}
+
+DEFAULT_DELTA_WINDOW = 60  # secondes
+ALERT_DEDUPE_SECONDS = 5 * 60
+ALERT_RETENTION_SECONDS = 24 * 3600
+ALERT_COMPACT_MIN = 256  # Alertes expirées à partir desquelles le journal est compacté
+
+# En cas d'états différents entre les canaux (tension artérielle), le plus grave l'emporte
+STATUS_PRIORITY = {'normal': 0, 'warning': 1, 'low': 2, 'high': 3}
+
+
+class AlertRule:
+    """Règle de seuil (avec hystérésis) et, optionnellement, de variation rapide sur un canal"""
+
+    __slots__ = ('key', 'sensor_type', 'channel', 'index', 'minimum', 'maximum',
+                 'hysteresis', 'severity', 'max_delta', 'delta_window_ms')
+
+    def __init__(self, key, sensor_type, channel, minimum=None, maximum=None, hysteresis=0.0,
+                 severity='error', max_delta=None, delta_window=DEFAULT_DELTA_WINDOW):
+        self.key = key
+        self.sensor_type = sensor_type
+        self.channel = channel
+        self.index = SENSOR_CHANNELS[sensor_type].index(channel)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.hysteresis = hysteresis
+        self.severity = severity
+        self.max_delta = max_delta
+        self.delta_window_ms = int(delta_window * 1000)
+
+    def classify(self, value):
+        """État d'une valeur sans tenir compte de l'état précédent ('high', 'low' ou None)"""
+        if self.maximum is not None and value > self.maximum:
+            return 'high'
+        if self.minimum is not None and value < self.minimum:
+            return 'low'
+        return None
+
+    def next_state(self, state, value):
+        """État après une mesure: un état anormal n'est quitté qu'au-delà de la marge d'hystérésis"""
+        entered = self.classify(value)
+        if entered is not None:
+            return entered
+        if state == 'high' and self.maximum is not None and value > self.maximum - self.hysteresis:
+            return 'high'
+        if state == 'low' and self.minimum is not None and value < self.minimum + self.hysteresis:
+            return 'low'
+        return None
+
+    def status(self, state):
+        if state is None:
+            return 'normal'
+        return 'warning' if self.severity == 'warning' else state
+
+
+def _optional_float(entry, name):
+    value = entry.get(name)
+    return None if value is None else float(value)
+
+
+def build_rules(thresholds=None):
+    """
+    Construit les règles par type de capteur
+
+    Args:
+        thresholds: Seuils des préférences utilisateur (complétés par DEFAULT_THRESHOLDS)
+
+    Returns:
+        Dictionnaire {type de capteur: tuple de règles}
+
+    Raises:
+        ValueError: Seuil inconnu ou invalide
+    """
+    merged = {key: dict(entry) for key, entry in DEFAULT_THRESHOLDS.items()}
+    for key, entry in (thresholds or {}).items():
+        if key not in THRESHOLD_KEYS:
+            raise ValueError(f"Seuil inconnu: {key}")
+        if not isinstance(entry, dict):
+            raise ValueError(f"Seuil invalide pour {key}")
+        merged[key].update(entry)
+
+    rules = {}
+    for key, entry in merged.items():
+        sensor_type, channel = THRESHOLD_KEYS[key]
+        minimum = _optional_float(entry, 'min')
+        maximum = _optional_float(entry, 'max')
+        if minimum is not None and maximum is not None and minimum > maximum:
+            raise ValueError(f"Seuil invalide pour {key}: min > max")
+        severity = entry.get('severity', 'error')
+        if severity not in ('error', 'warning'):
+            raise ValueError(f"Sévérité invalide pour {key}: {severity}")
+
+        rule = AlertRule(
+            key, sensor_type, channel,
+            minimum=minimum,
+            maximum=maximum,
+            hysteresis=float(entry.get('hysteresis', DEFAULT_HYSTERESIS.get(key, 0))),
+            severity=severity,
+            max_delta=_optional_float(entry, 'maxDelta'),
+            delta_window=float(entry.get('deltaWindow', DEFAULT_DELTA_WINDOW))
+        )
+        rules.setdefault(sensor_type, []).append(rule)
+
+    return {sensor_type: tuple(sensor_rules) for sensor_type, sensor_rules in rules.items()}
+
+
+def _channel_value(value, rule):
+    return value[rule.channel] if isinstance(value, dict) else value
+
+
+def _display(value):
+    if isinstance(value, dict):
+        return f"{value['systolic']:g}/{value['diastolic']:g}"
+    return f"{round(value, 1):g}"
+
+
+class AlertView:
+    """
+    Vue immuable des alertes d'un appareil à un instant donné (utilisée par les instantanés)
+
+    Partage le journal des alertes avec DeviceAlerts: seules les positions start:end
+    appartiennent à la vue, les ajouts ultérieurs en fin de journal ne la modifient pas.
+    """
+
+    __slots__ = ('timestamps', 'alerts', 'start', 'end', 'read_ids')
+
+    def __init__(self, timestamps, alerts, start, end, read_ids):
+        self.timestamps = timestamps
+        self.alerts = alerts
+        self.start = start
+        self.end = end
+        self.read_ids = read_ids
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __iter__(self):
+        return iter(self.since(None))
+
+    def since(self, since_ms):
+        """Alertes rangées après since_ms (toutes si None), dans l'ordre, avec leur état de lecture"""
+        first = self.start
+        if since_ms is not None:
+            first = bisect_right(self.timestamps, since_ms, first, self.end)
+        read_ids = self.read_ids
+        return [
+            {**alert, 'read': True} if alert['id'] in read_ids else alert
+            for alert in self.alerts[first:self.end]
+        ]
+
+
+class DeviceAlerts:
+    """
+    Alertes et état des règles d'un appareil
+
+    Comme le reste de DeviceState, à modifier sous le verrou de l'appareil.
+
+    Les alertes sont rangées dans un journal en ajout seul, partagé par les vues des
+    instantanés (view): publier un instantané ne recopie aucune alerte. Une alerte
+    n'est jamais modifiée après son ajout; l'état de lecture est tenu à part
+    (ensemble immuable des identifiants lus, remplacé à chaque lecture).
+    """
+
+    def __init__(self, retention_seconds=ALERT_RETENTION_SECONDS):
+        self.retention_ms = int(retention_seconds * 1000)
+        self.by_id = {}
+        self.read_ids = frozenset()
+        self.unread = 0
+        self.version = 0  # Incrémentée à chaque ajout, expiration ou lecture d'alerte
+        self.states = {}  # Clé de règle -> 'high' / 'low'
+        self.windows = {}  # Clé de règle -> (minimums glissants, maximums glissants)
+        self.last_fired = {}  # (capteur, type de règle) -> horodatage de la dernière alerte
+        self.created = 0  # Alertes créées (identifiants déterministes: mêmes mesures, mêmes identifiants)
+        self._timestamps = []  # Horodatages de rangement, croissants
+        self._alerts = []  # Alertes, dans le même ordre
+        self._start = 0  # Première alerte non expirée
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __iter__(self):
+        return iter(self.view())
+
+    def add(self, alert, timestamp_ms):
+        """
+        Ajoute une alerte
+
+        Une alerte plus ancienne que la précédente (mesure arrivée en retard) est rangée
+        à l'horodatage de la précédente: les alertes restent triées, ce qui permet la
+        recherche dichotomique des instantanés (DeviceSnapshot.alerts_since). Son champ
+        'timestamp' n'est pas modifié.
+        """
+        if self._timestamps:
+            timestamp_ms = max(timestamp_ms, self._timestamps[-1])
+        self._timestamps.append(timestamp_ms)
+        self._alerts.append(alert)
+        self.by_id[alert['id']] = alert
+        if alert['read']:
+            self.read_ids = self.read_ids | {alert['id']}
+        else:
+            self.unread += 1
+        self.version += 1
+        self.expire(timestamp_ms)
+
+    def expire(self, now_ms):
+        """Supprime les alertes plus anciennes que la rétention"""
+        end = bisect_left(self._timestamps, now_ms - self.retention_ms, self._start)
+        removed = end - self._start
+        if not removed:
+            return 0
+
+        expired_read = set()
+        for alert in self._alerts[self._start:end]:
+            del self.by_id[alert['id']]
+            if alert['id'] in self.read_ids:
+                expired_read.add(alert['id'])
+            else:
+                self.unread -= 1
+        if expired_read:
+            self.read_ids = self.read_ids - expired_read
+        self._start = end
+
+        # Compactage amorti: les vues existantes gardent l'ancien journal
+        if self._start >= ALERT_COMPACT_MIN and 2 * self._start >= len(self._alerts):
+            self._timestamps = self._timestamps[self._start:]
+            self._alerts = self._alerts[self._start:]
+            self._start = 0
+        self.version += 1
+        return removed
+
+    def view(self):
+        """Vue immuable des alertes conservées, en temps constant"""
+        return AlertView(self._timestamps, self._alerts, self._start, len(self._alerts), self.read_ids)
+
+    def get(self, alert_id):
+        """Alerte avec son état de lecture (None si elle n'existe pas)"""
+        alert = self.by_id.get(alert_id)
+        if alert is not None and alert_id in self.read_ids:
+            alert = {**alert, 'read': True}
+        return alert
+
+    def mark_read(self, alert_id):
+        """Marque une alerte comme lue (None si elle n'existe pas)"""
+        if alert_id in self.by_id and alert_id not in self.read_ids:
+            self.read_ids = self.read_ids | {alert_id}
+            self.unread -= 1
+            self.version += 1
+        return self.get(alert_id)
+
+
+class AlertEngine:
+    """
+    Évalue les mesures contre les règles et crée les alertes
+
+    Args:
+        thresholds: Seuils des préférences utilisateur
+        dedupe_seconds: Délai minimal entre deux alertes d'un même capteur et type de règle
+        early_warning_score: Score d'alerte précoce déclenchant une alerte (None: désactivé)
+    """
+
+    def __init__(self, thresholds=None, dedupe_seconds=ALERT_DEDUPE_SECONDS, early_warning_score=None):
+        self.dedupe_ms = int(dedupe_seconds * 1000)
+        self.rules = build_rules(thresholds)
+        self.early_warning_score = early_warning_score
+
+    def configure(self, thresholds=None, rules=None):
+        """
+        Remplace les règles (les états en cours des appareils sont conservés)
+
+        Args:
+            thresholds: Seuils à compiler avec build_rules
+            rules: Règles déjà compilées (prioritaires sur thresholds)
+        """
+        self.rules = rules if rules is not None else build_rules(thresholds)
+
+    def status(self, sensor_type, value):
+        """Statut d'une valeur isolée ('normal', 'low', 'high' ou 'warning'), sans hystérésis"""
+        status = 'normal'
+        for rule in self.rules.get(sensor_type, ()):
+            candidate = rule.status(rule.classify(_channel_value(value, rule)))
+            if STATUS_PRIORITY[candidate] > STATUS_PRIORITY[status]:
+                status = candidate
+        return status
+
+    def evaluate(self, alerts, device_id, sensor_type, value, timestamp_ms):
+        """
+        Évalue une mesure et met à jour l'état des règles de l'appareil
+
+        Args:
+            alerts: DeviceAlerts de l'appareil
+            device_id: Identifiant de l'appareil
+            sensor_type: Type de capteur
+            value: Valeur mesurée ({'systolic', 'diastolic'} pour la tension artérielle)
+            timestamp_ms: Horodatage de la mesure (epoch en ms)
+
+        Returns:
+            Tuple (statut, alertes créées)
+        """
+        status = 'normal'
+        fastest = None
+        for rule in self.rules.get(sensor_type, ()):
+            channel_value = _channel_value(value, rule)
+
+            state = rule.next_state(alerts.states.get(rule.key), channel_value)
+            if state is None:
+                alerts.states.pop(rule.key, None)
+            else:
+                alerts.states[rule.key] = state
+            candidate = rule.status(state)
+            if STATUS_PRIORITY[candidate] > STATUS_PRIORITY[status]:
+                status = candidate
+
+            if rule.max_delta is not None:
+                delta = self._window_delta(alerts, rule, channel_value, timestamp_ms)
+                if abs(delta) > rule.max_delta and (fastest is None or abs(delta) > abs(fastest[1])):
+                    fastest = (rule, delta)
+
+        created = []
+        if status != 'normal':
+            alert = self._fire(
+                alerts, device_id, sensor_type, 'threshold', status,
+                'warning' if status == 'warning' else 'error',
+                f"Valeur {status} détectée pour {sensor_type}: {_display(value)}",
+                timestamp_ms
+            )
+            if alert is not None:
+                created.append(alert)
+
+        if fastest is not None:
+            rule, delta = fastest
+            alert = self._fire(
+                alerts, device_id, sensor_type, 'rate', 'rate', 'warning',
+                f"Variation rapide détectée pour {sensor_type}: {round(delta, 1):+g} "
+                f"en moins de {rule.delta_window_ms / 1000:g} s",
+                timestamp_ms
+            )
+            if alert is not None:
+                created.append(alert)
+
+        return status, created
+
+    def evaluate_many(self, alerts, device_id, sensor_type, timestamps_ms, values):
+        """
+        Évalue un lot de mesures dans l'ordre chronologique
+
+        Args:
+            values: Tableau (n, canaux) dans l'ordre de SENSOR_CHANNELS
+
+        Returns:
+            Tuple (statut après la dernière mesure, alertes créées)
+        """
+        rules = self.rules.get(sensor_type, ())
+        start = 0
+        if not any(rule.max_delta is not None or rule.key in alerts.states for rule in rules):
+            # État normal et aucune règle de variation: seules les mesures hors seuils changent l'état
+            inside = np.ones(len(timestamps_ms), dtype=bool)
+            for rule in rules:
+                column = values[:, rule.index]
+                if rule.maximum is not None:
+                    inside &= column <= rule.maximum
+                if rule.minimum is not None:
+                    inside &= column >= rule.minimum
+            if inside.all():
+                return 'normal', []
+            start = int(np.argmin(inside))
+
+        channels = SENSOR_CHANNELS[sensor_type]
+        status = 'normal'
+        created = []
+        for timestamp_ms, row in zip(timestamps_ms[start:].tolist(), values[start:].tolist()):
+            value = dict(zip(channels, row)) if len(channels) > 1 else row[0]
+            status, new_alerts = self.evaluate(alerts, device_id, sensor_type, value, timestamp_ms)
+            created.extend(new_alerts)
+        return status, created
+
+    def evaluate_early_warning(self, alerts, device_id, early_warning, timestamp_ms):
+        """
+        Crée une alerte si le score d'alerte précoce atteint le seuil configuré
+
+        Args:
+            early_warning: {'score', 'risk', 'components'} (VitalsAnalytics.early_warning())
+
+        Returns:
+            Liste des alertes créées
+        """
+        if self.early_warning_score is None or early_warning['score'] < self.early_warning_score:
+            return []
+        contributors = ', '.join(
+            f"{sensor_type} +{points}" for sensor_type, points in early_warning['components'].items() if points
+        )
+        alert = self._fire(
+            alerts, device_id, 'earlyWarning', 'score', 'earlyWarning',
+            'error' if early_warning['risk'] == 'high' else 'warning',
+            f"Score d'alerte précoce {early_warning['score']} (risque {early_warning['risk']}): {contributors}",
+            timestamp_ms
+        )
+        return [alert] if alert is not None else []
+
+    def _window_delta(self, alerts, rule, value, timestamp_ms):
+        """Plus grande variation (signée) vers la valeur courante dans la fenêtre glissante"""
+        window = alerts.windows.get(rule.key)
+        if window is None:
+            window = alerts.windows[rule.key] = (deque(), deque())
+        minimums, maximums = window
+
+        while minimums and minimums[-1][1] >= value:
+            minimums.pop()
+        minimums.append((timestamp_ms, value))
+        while maximums and maximums[-1][1] <= value:
+            maximums.pop()
+        maximums.append((timestamp_ms, value))
+
+        start = timestamp_ms - rule.delta_window_ms
+        while minimums[0][0] < start:
+            minimums.popleft()
+        while maximums[0][0] < start:
+            maximums.popleft()
+
+        rise = value - minimums[0][1]
+        fall = maximums[0][1] - value
+        return rise if rise >= fall else -fall
+
+    def _fire(self, alerts, device_id, sensor_type, kind, alert_type, severity, message, timestamp_ms):
+        """Crée l'alerte sauf si le même capteur a déjà alerté pendant le délai anti-doublon"""
+        last_fired = alerts.last_fired.get((sensor_type, kind))
+        if last_fired is not None and timestamp_ms - last_fired < self.dedupe_ms:
+            return None
+        alerts.last_fired[(sensor_type, kind)] = timestamp_ms
+
+        alerts.created += 1
+        alert = {
+            'id': f"{sensor_type}_{timestamp_ms}_{alerts.created}",
+            'deviceId': device_id,
+            'sensor': sensor_type,
+            'type': alert_type,
+            'message': message,
+            'timestamp': datetime.fromtimestamp(timestamp_ms / 1000).isoformat(),
+            'severity': severity,
+            'read': False
+        }
+        alerts.add(alert, timestamp_ms)
+        return alert
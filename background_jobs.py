@@ -0,0 +1,124 @@
+"""
+Tâches de fond suivies par identifiant.
+
+Les opérations longues (calibration des capteurs, ...) ne bloquent plus le
+thread de la requête: l'endpoint crée une tâche, répond immédiatement
+(202 Accepted) avec son identifiant, et le client consulte son état.
+
+États d'une tâche: 'pending' -> 'running' -> 'completed' ou 'failed'.
+Les tâches terminées sont oubliées après retention_seconds.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class JobRegistry:
+    """
+    Exécute des tâches dans un pool de threads et conserve leur état
+
+    Args:
+        max_workers: Nombre de tâches exécutées simultanément
+        retention_seconds: Durée de conservation des tâches terminées
+        name: Préfixe des noms de threads
+    """
+
+    def __init__(self, max_workers=4, retention_seconds=3600, name='job'):
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._jobs = {}  # id -> (état, instant de fin monotone ou None)
+        self._finished = OrderedDict()  # id -> instant de fin monotone, dans l'ordre de fin
+        self._active = {}  # clé d'unicité -> id de la tâche en cours
+        self._lock = threading.Lock()
+
+    def submit(self, job_type, fn, *args, key=None, **details):
+        """
+        Crée une tâche exécutant fn(*args)
+
+        Args:
+            job_type: Type de la tâche (ex: 'calibration')
+            key: Clé d'unicité: tant qu'une tâche de même clé est en cours, elle est retournée
+            details: Champs ajoutés à l'état de la tâche
+
+        Returns:
+            Copie de l'état de la tâche
+        """
+        with self._lock:
+            self._expire()
+            if key is not None and key in self._active:
+                return dict(self._jobs[self._active[key]][0])
+
+            job = {
+                'id': uuid.uuid4().hex,
+                'type': job_type,
+                'status': 'pending',
+                'createdAt': datetime.now().isoformat(),
+                **details
+            }
+            self._jobs[job['id']] = (job, None)
+            if key is not None:
+                self._active[key] = job['id']
+            snapshot = dict(job)
+
+        self._executor.submit(self._run, job['id'], key, fn, args)
+        return snapshot
+
+    def get(self, job_id):
+        """Copie de l'état d'une tâche (None si inconnue ou expirée)"""
+        with self._lock:
+            self._expire()
+            entry = self._jobs.get(job_id)
+            return dict(entry[0]) if entry else None
+
+    def counts(self):
+        """Nombre de tâches conservées par état"""
+        with self._lock:
+            self._expire()
+            counts = dict.fromkeys(('pending', 'running', 'completed', 'failed'), 0)
+            for job, _ in self._jobs.values():
+                counts[job['status']] += 1
+            return counts
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job_id, key, fn, args):
+        with self._lock:
+            job = self._jobs[job_id][0]
+            job['status'] = 'running'
+            job['startedAt'] = datetime.now().isoformat()
+
+        try:
+            result = fn(*args)
+            update = {'status': 'completed', 'result': result}
+        except Exception as e:
+            update = {'status': 'failed', 'error': str(e)}
+
+        with self._lock:
+            job.update(update)
+            job['finishedAt'] = datetime.now().isoformat()
+            if job_id in self._jobs:
+                finished = time.monotonic()
+                self._jobs[job_id] = (job, finished)
+                self._finished[job_id] = finished
+            if key is not None and self._active.get(key) == job_id:
+                del self._active[key]
+
+    def _expire(self):
+        """
+        Oublie les tâches terminées depuis plus de retention_seconds (les plus anciennes d'abord)
+
+        Seules les tâches terminées sont parcourues, dans l'ordre de fin: une tâche
+        longue encore en cours ne retient pas l'expiration des suivantes.
+        """
+        cutoff = time.monotonic() - self.retention_seconds
+        while self._finished:
+            job_id, finished = next(iter(self._finished.items()))
+            if finished > cutoff:
+                break
+            del self._finished[job_id]
+            del self._jobs[job_id]
@@ -0,0 +1,172 @@
+"""
+Ordonnanceur de micro-batching pour l'inférence du modèle.
+
+Les requêtes concurrentes sont placées dans une file, regroupées en un seul tenseur
+d'images (N, 224, 224, C) et une seule matrice clinique (N, 10) jusqu'à une taille
+ou un délai d'attente maximal, évaluées en un seul appel au modèle, puis les
+résultats sont renvoyés à chaque appelant via un Future.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Regroupe dynamiquement les échantillons soumis par des threads concurrents.
+
+    Args:
+        predict_fn: Fonction (images, clinical) -> tableau (N, ...) de prédictions,
+            ou Future résolu avec ce tableau
+        max_batch_size: Nombre maximal d'échantillons par appel au modèle
+        max_wait_ms: Délai maximal d'attente pour compléter un batch (en millisecondes)
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=10):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches_processed = 0
+        self.samples_processed = 0
+
+    def submit(self, image, clinical):
+        """
+        Soumet un échantillon (sans dimension de batch) et retourne un Future
+        résolu avec la ligne de prédiction correspondante.
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((image, clinical, future))
+        return future
+
+    def submit_many(self, images, clinical_rows):
+        """Soumet plusieurs échantillons et retourne la liste des Futures"""
+        return [self.submit(image, clinical) for image, clinical in zip(images, clinical_rows)]
+
+    def queue_depth(self):
+        """Nombre d'échantillons en attente de traitement"""
+        return self._queue.qsize()
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._thread.start()
+
+    def _collect_batch(self):
+        """Bloque jusqu'au premier échantillon puis complète le batch jusqu'à la limite"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+
+            # Les images de formes différentes (ex: niveaux de gris vs RGB) ne peuvent
+            # pas être empilées ensemble: un appel au modèle par forme
+            groups = {}
+            for item in batch:
+                key = (np.shape(item[0]), np.shape(item[1]))
+                groups.setdefault(key, []).append(item)
+
+            for items in groups.values():
+                self._dispatch(items)
+
+    def _dispatch(self, items):
+        futures = [item[2] for item in items]
+        try:
+            images = np.stack([item[0] for item in items])
+            clinical = np.stack([item[1] for item in items])
+            outcome = self.predict_fn(images, clinical)
+        except Exception as e:
+            self._fail(futures, e)
+            return
+
+        self.batches_processed += 1
+        self.samples_processed += len(items)
+
+        if isinstance(outcome, Future):
+            outcome.add_done_callback(lambda done: self._resolve_from(done, futures))
+        else:
+            self._resolve(futures, outcome)
+
+    def _resolve_from(self, done, futures):
+        error = done.exception()
+        if error is not None:
+            self._fail(futures, error)
+        else:
+            self._resolve(futures, done.result())
+
+    @staticmethod
+    def _resolve(futures, predictions):
+        """
+        Distribue les lignes de prédiction aux Futures
+
+        Ne lève jamais: une sortie inattendue du modèle fait échouer les Futures du batch
+        au lieu d'arrêter le thread du batcher (ou d'être perdue dans un callback de Future).
+        """
+        try:
+            predictions = np.asarray(predictions)
+            if predictions.ndim == 0 or len(predictions) != len(futures):
+                count = 'une valeur scalaire' if predictions.ndim == 0 else f"{len(predictions)} prédictions"
+                raise ValueError(f"Le modèle a retourné {count} pour {len(futures)} échantillons")
+            for future, prediction in zip(futures, predictions):
+                future.set_result(prediction)
+        except Exception as e:
+            MicroBatcher._fail(futures, e)
+
+    @staticmethod
+    def _fail(futures, error):
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
+
+
+def when_all(futures, build):
+    """
+    Future résolu avec build() une fois tous les futures terminés, sans bloquer de thread
+
+    build est appelé dans le thread qui résout le dernier future; une exception
+    levée par build est transmise au Future retourné.
+    """
+    combined = Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] > 0:
+                return
+        try:
+            combined.set_result(build())
+        except Exception as e:
+            combined.set_exception(e)
+
+    if not futures:
+        remaining[0] = 1
+        done(None)
+    for future in futures:
+        future.add_done_callback(done)
+    return combined
@@ -0,0 +1,168 @@
+"""
+Benchmark de montée en charge du serveur HTTP.
+
+Démarre le backend via serve.py (ou cible un serveur existant avec --url), puis
+envoie pendant --duration secondes, pour chaque niveau de concurrence, des
+requêtes depuis N clients simultanés. Le mélange de requêtes combine lectures
+IoT, calibrations (longues côté capteur) et analyses ECG (calcul).
+
+Rapporte, par niveau, le débit en requêtes/s et la latence p50/p99.
+
+Utilisation:
+    python benchmarks/bench_concurrency.py --server threaded --clients 1,2,4,8,16,32 --duration 5
+"""
+
+import argparse
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+import numpy as np
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PATIENT_DATA = {
+    "age": 58, "sex": 1, "cp": 0, "trestbps": 150, "chol": 260, "fbs": 0,
+    "restecg": 1, "thalach": 120, "exang": 1, "oldpeak": 2.4, "slope": 1, "ca": 1, "thal": 2
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(url, process, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError("Le serveur s'est arrêté au démarrage")
+        try:
+            urllib.request.urlopen(f"{url}/api/iot/sensors/status", timeout=1).read()
+            return
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    raise RuntimeError("Le serveur n'a pas démarré à temps")
+
+
+def ecg_image_bytes(seed):
+    """Image ECG synthétique (PNG) différente à chaque seed, pour ne pas toucher le cache"""
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 255, size=(480, 640, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def multipart(image_bytes, patient_data):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"patientData\"\r\n\r\n"
+        f"{json.dumps(patient_data)}\r\n"
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"ecgImage\"; filename=\"ecg.png\"\r\n"
+        f"Content-Type: image/png\r\n\r\n"
+    ).encode('utf-8') + image_bytes + f"\r\n--{boundary}--\r\n".encode('utf-8')
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def make_request(url, kind, index, images):
+    if kind == 'current':
+        return urllib.request.Request(f"{url}/api/iot/sensors/current")
+    if kind == 'calibrate':
+        return urllib.request.Request(f"{url}/api/iot/sensors/temperature/calibrate", data=b'', method='POST')
+    body, content_type = multipart(images[index % len(images)], PATIENT_DATA)
+    return urllib.request.Request(f"{url}/api/analyze", data=body, headers={'Content-Type': content_type})
+
+
+def run_level(url, clients, duration, mix, images):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(client_index):
+        local_latencies = []
+        local_errors = 0
+        count = 0
+        while time.perf_counter() < deadline:
+            kind = mix[(client_index + count) % len(mix)]
+            request = make_request(url, kind, client_index * 100003 + count, images)
+            count += 1
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=60) as response:
+                    response.read()
+                local_latencies.append(time.perf_counter() - start)
+            except (urllib.error.URLError, OSError):
+                local_errors += 1
+
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 2) if len(latencies) else None,
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 2) if len(latencies) else None,
+    }
+
+
+def run(levels, duration, mix, server, threads, url=None):
+    process = None
+    if url is None:
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, 'serve.py'), '--server', server,
+             '--host', '127.0.0.1', '--port', str(port), '--threads', str(threads)],
+            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+    try:
+        wait_until_ready(url, process)
+        images = [ecg_image_bytes(seed) for seed in range(64)]
+        results = [run_level(url, clients, duration, mix, images) for clients in levels]
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    return {"server": server if process is not None else url, "mix": mix, "levels": results}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark de montée en charge du serveur HTTP")
+    parser.add_argument('--clients', default='1,2,4,8,16,32', help="Niveaux de concurrence, séparés par des virgules")
+    parser.add_argument('--duration', type=float, default=5.0, help="Durée de chaque niveau en secondes")
+    parser.add_argument('--mix', default='current,current,calibrate,analyze',
+                        help="Requêtes envoyées à tour de rôle (current, calibrate, analyze)")
+    parser.add_argument('--server', choices=['auto', 'asgi', 'waitress', 'threaded'], default='auto')
+    parser.add_argument('--threads', type=int, default=32, help="Threads du serveur")
+    parser.add_argument('--url', default=None, help="Serveur existant (ex: http://localhost:5000)")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.clients.split(',')]
+    result = run(levels, args.duration, args.mix.split(','), args.server, args.threads, args.url)
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,118 @@
+"""
+Benchmark de l'ingestion des mesures IoT (POST /api/iot/sensors/data).
+
+Simule des milliers d'appareils qui envoient des lots de mesures via le client de
+test Flask (sans réseau) et rapporte le débit soutenu en mesures/s et la latence
+p50/p99 par requête.
+
+Utilisation:
+    python benchmarks/bench_ingest.py --devices 2000 --batch 10 --format binary --duration 10
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import model_integration  # noqa: E402
+import sensor_ingestion  # noqa: E402
+
+# Valeurs de base d'une mesure (sensor_ingestion.FIELDS)
+BASELINE = np.array([72, 120, 80, 36.6, 98, 16], dtype=np.float32)
+NOISE = np.array([3, 3, 2, 0.1, 0.5, 1], dtype=np.float32)
+
+
+def make_payload(fmt, device_id, first_seq, batch, rng, start_ms):
+    """Construit le corps et le Content-Type d'une requête de lot de mesures"""
+    sequences = np.arange(first_seq, first_seq + batch)
+    # Horodatages croissants par appareil: une mesure toutes les 10 ms depuis start_ms
+    timestamps = start_ms + sequences * 10
+    values = BASELINE + rng.standard_normal((batch, len(BASELINE))).astype(np.float32) * NOISE
+
+    if fmt == 'binary':
+        return sensor_ingestion.encode_binary(device_id, sequences, timestamps, values), 'application/octet-stream'
+
+    readings = [
+        {
+            "deviceId": device_id,
+            "seq": int(seq),
+            "timestamp": int(timestamp),
+            "sensors": dict(zip(sensor_ingestion.FIELDS, (round(float(v), 1) for v in row)))
+        }
+        for seq, timestamp, row in zip(sequences, timestamps, values)
+    ]
+    return json.dumps(readings), 'application/json'
+
+
+def run(devices, batch, fmt, threads, duration, seed):
+    client = model_integration.app.test_client()
+    latencies = []
+    readings = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    start_ms = sensor_ingestion.now_ms() - int(duration * 1000)
+
+    def worker(worker_index):
+        rng = np.random.default_rng(seed + worker_index)
+        own_devices = [f"bench-{i}" for i in range(worker_index, devices, threads)]
+        sequences = {device_id: 0 for device_id in own_devices}
+        local_latencies = []
+        local_readings = 0
+
+        while time.perf_counter() < deadline:
+            for device_id in own_devices:
+                if time.perf_counter() >= deadline:
+                    break
+                body, content_type = make_payload(fmt, device_id, sequences[device_id], batch, rng, start_ms)
+                sequences[device_id] += batch
+
+                start = time.perf_counter()
+                response = client.post('/api/iot/sensors/data', data=body, content_type=content_type)
+                local_latencies.append(time.perf_counter() - start)
+                if response.status_code == 200:
+                    local_readings += response.get_json()['accepted']
+
+        with lock:
+            latencies.extend(local_latencies)
+            readings[0] += local_readings
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "format": fmt,
+        "devices": devices,
+        "batch": batch,
+        "threads": threads,
+        "requests": len(latencies),
+        "readings": readings[0],
+        "readings_per_sec": round(readings[0] / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3) if len(latencies) else None,
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 3) if len(latencies) else None,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark de l'ingestion des mesures IoT")
+    parser.add_argument('--devices', type=int, default=2000, help="Nombre d'appareils simulés")
+    parser.add_argument('--batch', type=int, default=10, help="Mesures par requête")
+    parser.add_argument('--format', choices=['json', 'binary'], default='binary')
+    parser.add_argument('--threads', type=int, default=4, help="Clients concurrents")
+    parser.add_argument('--duration', type=float, default=10.0, help="Durée en secondes")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    result = run(args.devices, args.batch, args.format, args.threads, args.duration, args.seed)
+    print(json.dumps(result, indent=2))
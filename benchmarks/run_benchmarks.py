@@ -0,0 +1,837 @@
+"""
+Suite de benchmarks reproductible du backend Flask.
+
+Scénarios (sélectionnables avec --scenarios):
+- analyze: POST /api/analyze sur un corpus d'images ECG synthétiques de tailles
+  et formats variés (PNG, JPEG, niveaux de gris, TIFF multi-pages), hors cache
+  (données cliniques différentes à chaque requête) et depuis le cache, ainsi que
+  POST /api/analyze/waveform sur un signal 12 dérivations de 10 s (échantillons
+  float32, sans image). Enfin, des analyses urgentes pendant qu'une rafale
+  d'analyses ordinaires soumises en tâches (/api/analyze/jobs) sature la file.
+- iot: lectures IoT (valeurs courantes, alertes, historique réduit, statut, liste
+  des appareils) pendant que la boucle de monitoring met à jour des centaines
+  d'appareils.
+- sessions: sauvegarde, lecture, historique et suppression de sessions pour des
+  bases de taille croissante.
+- alerts: ingestion de mesures franchissant les seuils en continu (chemin
+  anti-doublon), lecture et acquittement, sur des appareils ayant un grand
+  nombre d'alertes récentes.
+
+Chaque cas est exécuté via le client de test Flask (sans réseau) et/ou via un
+serveur HTTP local démarré dans le processus (--transport client,http). Un cas
+envoie un nombre fixe de requêtes (précédées de requêtes de préchauffage) depuis
+--concurrency clients; la suite rapporte le débit, la latence p50/p95/p99 et le
+pic de mémoire résidente (RSS) relevé pendant le cas.
+
+Les résultats sont enregistrés en JSON (--output). Avec --baseline, ils sont
+comparés à une référence enregistrée (--save-baseline): un débit en baisse ou
+une latence / mémoire en hausse de plus de --tolerance est signalé comme
+régression et le code de sortie vaut 1.
+
+Utilisation:
+    python benchmarks/run_benchmarks.py --quick --save-baseline
+    python benchmarks/run_benchmarks.py --quick --baseline benchmarks/results/baseline.json
+    python benchmarks/run_benchmarks.py --scenarios sessions,alerts --transport client,http
+"""
+
+import argparse
+import contextlib
+import http.client
+import io
+import itertools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+import numpy as np
+from PIL import Image
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import model_integration  # noqa: E402
+import sensor_ingestion  # noqa: E402
+from bench_concurrency import PATIENT_DATA, free_port, multipart  # noqa: E402
+from session_store import SessionStore  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+DEFAULT_OUTPUT = os.path.join(RESULTS_DIR, 'latest.json')
+DEFAULT_BASELINE = os.path.join(RESULTS_DIR, 'baseline.json')
+
+SCENARIOS = ('analyze', 'iot', 'sessions', 'alerts')
+
+# Corpus d'images: (cas, format, (largeur, hauteur), mode, pages)
+ANALYZE_CORPUS = (
+    ('png_640x480', 'PNG', (640, 480), 'RGB', 1),
+    ('jpeg_1280x960', 'JPEG', (1280, 960), 'RGB', 1),
+    ('png_gray_1700x2200', 'PNG', (1700, 2200), 'L', 1),
+    ('jpeg_2480x3508', 'JPEG', (2480, 3508), 'RGB', 1),  # A4 scanné à 300 dpi
+    ('tiff_3pages_1280x960', 'TIFF', (1280, 960), 'RGB', 3),
+)
+
+SESSION_STORE_SIZES = (1000, 10000, 100000)
+ALERT_BACKLOGS = (1000, 10000, 50000)
+IOT_DEVICES = 200
+IOT_HISTORY_SECONDS = 3600
+IOT_MONITORING_INTERVAL = 1.0  # Bornée par HISTORY_SAMPLE_RATE_HZ
+
+# Valeurs normales d'une mesure (sensor_ingestion.FIELDS)
+BASELINE_READING = np.array([72, 120, 80, 36.6, 98, 16], dtype=np.float32)
+READING_NOISE = np.array([3, 3, 2, 0.1, 0.5, 1], dtype=np.float32)
+# Mesures alternativement basses et hautes: chaque mesure franchit un seuil
+ALERT_READINGS = np.array([
+    [50, 85, 55, 35.5, 90, 10],
+    [130, 160, 100, 38.5, 99, 26],
+], dtype=np.float32)
+
+# En deçà de ces écarts absolus, une différence avec la référence n'est pas une régression
+MIN_LATENCY_DELTA_MS = 0.5
+MIN_MEMORY_DELTA_MB = 16.0
+
+
+# ============================================================================
+# MESURE
+# ============================================================================
+
+def current_rss_mb():
+    """Mémoire résidente actuelle du processus (en Mo), ou None si indisponible"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class RSSSampler:
+    """Relève le pic de mémoire résidente pendant un bloc (toutes les interval secondes)"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.start_mb = None
+        self.peak_mb = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = current_rss_mb()
+        if rss is not None and (self.peak_mb is None or rss > self.peak_mb):
+            self.peak_mb = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self.start_mb = current_rss_mb()
+        self.peak_mb = self.start_mb
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        return False
+
+
+def percentile_ms(latencies, q):
+    return round(float(np.percentile(latencies, q)) * 1000, 3) if len(latencies) else None
+
+
+def run_case(scenario, case, transport, send, requests, concurrency, warmup=10, params=None):
+    """
+    Exécute un cas: warmup requêtes non mesurées, puis requests requêtes réparties entre concurrency clients
+
+    Args:
+        send: Fonction (index de la requête) -> code de statut HTTP
+    """
+    for index in range(warmup):
+        send(-1 - index)
+
+    counter = itertools.count()
+    counter_lock = threading.Lock()
+    latencies = np.zeros(requests)
+    errors = [0]
+
+    def client():
+        while True:
+            with counter_lock:
+                index = next(counter)
+            if index >= requests:
+                return
+            start = time.perf_counter()
+            try:
+                status = send(index)
+            except (OSError, http.client.HTTPException):
+                status = None
+            latencies[index] = time.perf_counter() - start
+            if status is None or status >= 400:
+                errors[0] += 1
+
+    with RSSSampler() as rss:
+        start = time.perf_counter()
+        threads = [threading.Thread(target=client) for _ in range(max(1, concurrency))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+    return {
+        "scenario": scenario,
+        "case": case,
+        "transport": transport.name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors[0],
+        "throughput_rps": round(requests / elapsed, 1) if elapsed > 0 else None,
+        "mean_ms": round(float(latencies.mean()) * 1000, 3) if requests else None,
+        "p50_ms": percentile_ms(latencies, 50),
+        "p95_ms": percentile_ms(latencies, 95),
+        "p99_ms": percentile_ms(latencies, 99),
+        "peak_rss_mb": round(rss.peak_mb, 1) if rss.peak_mb is not None else None,
+        "rss_growth_mb": round(rss.peak_mb - rss.start_mb, 1) if rss.peak_mb is not None else None,
+        "params": params or {},
+    }
+
+
+# ============================================================================
+# TRANSPORTS
+# ============================================================================
+
+class ClientTransport:
+    """Requêtes via le client de test Flask (un client par thread)"""
+
+    name = 'client'
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def request(self, method, path, body=None, content_type=None, headers=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, data=body, content_type=content_type, headers=headers)
+        response.get_data()
+        response.close()
+        return response.status_code
+
+
+class _KeepAliveHandler(WSGIRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class HTTPTransport:
+    """
+    Requêtes HTTP réelles vers un serveur Werkzeug multi-thread démarré dans le
+    processus (connexions persistantes, une par thread client)
+    """
+
+    name = 'http'
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        self.port = free_port()
+        self._server = make_server('127.0.0.1', self.port, self.app, threaded=True, request_handler=_KeepAliveHandler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name='bench-http-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        return False
+
+    def _connection(self, reset=False):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or reset:
+            if connection is not None:
+                connection.close()
+            connection = self._local.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def request(self, method, path, body=None, content_type=None, headers=None):
+        headers = dict(headers or {}, **({'Content-Type': content_type} if content_type else {}))
+        for attempt in range(2):
+            connection = self._connection(reset=attempt > 0)
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                return response.status
+            except (ConnectionError, http.client.RemoteDisconnected, http.client.CannotSendRequest):
+                # Connexion persistante fermée par le serveur: une nouvelle tentative
+                if attempt:
+                    raise
+
+
+TRANSPORTS = {'client': ClientTransport, 'http': HTTPTransport}
+
+
+# ============================================================================
+# DONNÉES SYNTHÉTIQUES
+# ============================================================================
+
+def synthetic_ecg(size, mode, seed):
+    """Tracé ECG synthétique sur papier millimétré (rythme et bruit différents selon seed)"""
+    width, height = size
+    rng = np.random.default_rng(seed)
+    pixels = np.full((height, width, 3), 255, dtype=np.uint8)
+
+    # Quadrillage: petits carreaux (1 mm) et grands carreaux (5 mm)
+    small = max(4, width // 250)
+    pixels[::small, :] = (250, 220, 220)
+    pixels[:, ::small] = (250, 220, 220)
+    pixels[::small * 5, :] = (240, 170, 170)
+    pixels[:, ::small * 5] = (240, 170, 170)
+
+    # Trois dérivations, complexes QRS gaussiens
+    x = np.arange(width)
+    period = width / rng.uniform(5, 9)
+    phase = np.mod(x + rng.uniform(0, period), period) / period
+    beat = (
+        0.15 * np.exp(-((phase - 0.2) / 0.04) ** 2)      # onde P
+        + 1.0 * np.exp(-((phase - 0.4) / 0.012) ** 2)    # QRS
+        - 0.2 * np.exp(-((phase - 0.43) / 0.01) ** 2)
+        + 0.3 * np.exp(-((phase - 0.65) / 0.06) ** 2)    # onde T
+    )
+    thickness = max(1, width // 600)
+    for lead in range(3):
+        baseline = height * (lead + 1) / 4
+        amplitude = height / 10
+        y = baseline - amplitude * (beat + rng.normal(0, 0.01, width))
+        for offset in range(thickness):
+            pixels[np.clip(y.astype(int) + offset, 0, height - 1), x] = 0
+
+    image = Image.fromarray(pixels)
+    return image.convert(mode) if mode != 'RGB' else image
+
+
+def encode_image(fmt, size, mode, pages, seed):
+    frames = [synthetic_ecg(size, mode, seed * 100 + page) for page in range(pages)]
+    buffer = io.BytesIO()
+    if fmt == 'TIFF':
+        frames[0].save(buffer, format='TIFF', save_all=True, append_images=frames[1:], compression='tiff_lzw')
+    elif fmt == 'JPEG':
+        frames[0].save(buffer, format='JPEG', quality=90)
+    else:
+        frames[0].save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def normal_readings(rng, count):
+    return BASELINE_READING + rng.standard_normal((count, len(BASELINE_READING))).astype(np.float32) * READING_NOISE
+
+
+def session_payload(session_id, index, rng, saved_at):
+    """Session de monitoring représentative (environ 1 Ko de JSON)"""
+    return {
+        "id": session_id,
+        "patientId": f"patient-{index % 500}",
+        "deviceId": f"device-{index % 50}",
+        "startTime": saved_at,
+        "duration": 1800,
+        "readings": {
+            "heartRate": np.round(rng.normal(72, 4, 20)).tolist(),
+            "temperature": np.round(rng.normal(36.6, 0.1, 20), 1).tolist(),
+            "oxygenSaturation": np.round(rng.normal(98, 0.5, 20)).tolist(),
+        },
+        "alerts": [],
+        "notes": "Session générée par le benchmark",
+        "savedAt": saved_at,
+    }
+
+
+# ============================================================================
+# SCÉNARIOS
+# ============================================================================
+
+def bench_analyze(transport, options, rng):
+    # Les résultats d'une exécution précédente (autre transport) ne doivent pas être servis depuis le cache
+    model_integration.prediction_cache.clear()
+    results = []
+    for case, fmt, size, mode, pages in ANALYZE_CORPUS:
+        image_bytes = encode_image(fmt, size, mode, pages, options.seed)
+        params = {"format": fmt, "size": list(size), "mode": mode, "pages": pages, "bytes": len(image_bytes)}
+
+        def send(index, image_bytes=image_bytes):
+            # Données cliniques différentes à chaque requête: le cache de prédictions n'est pas utilisé
+            patient = dict(PATIENT_DATA, age=20 + index % 60, chol=150 + index // 60)
+            body, content_type = multipart(image_bytes, patient)
+            return transport.request('POST', '/api/analyze', body, content_type)
+
+        requests = max(10, options.requests // (4 if size[0] * size[1] * pages > 3_000_000 else 1))
+        results.append(run_case('analyze', case, transport, send, requests, options.concurrency, params=params))
+
+    # Signal numérique 12 dérivations, 10 s à 500 Hz, envoyé tel quel (sans rendu ni décodage d'image)
+    t = np.arange(5000, dtype=np.float32) / 500
+    signal = np.sin(2 * np.pi * 1.2 * t)[:, np.newaxis] * np.linspace(0.5, 1.5, 12, dtype=np.float32)
+    signal_bytes = signal.astype(np.float32).tobytes()
+
+    def send_waveform(index):
+        patient = dict(PATIENT_DATA, age=20 + index % 60, chol=150 + index // 60)
+        path = f"/api/analyze/waveform?sampleRate=500&leads=12&patientData={quote(json.dumps(patient))}"
+        return transport.request('POST', path, signal_bytes, 'application/octet-stream')
+
+    results.append(run_case(
+        'analyze', 'waveform_12x10s_float32', transport, send_waveform, options.requests, options.concurrency,
+        params={"leads": 12, "seconds": 10, "bytes": len(signal_bytes)}
+    ))
+
+    # Même requête répétée: réponse servie par le cache de prédictions
+    image_bytes = encode_image('PNG', (640, 480), 'RGB', 1, options.seed)
+    body, content_type = multipart(image_bytes, PATIENT_DATA)
+    results.append(run_case(
+        'analyze', 'png_640x480_cached', transport,
+        lambda index: transport.request('POST', '/api/analyze', body, content_type),
+        options.requests, options.concurrency, params={"bytes": len(image_bytes)}
+    ))
+
+    results.append(bench_urgent_under_overload(transport, options, image_bytes))
+    return results
+
+
+def bench_urgent_under_overload(transport, options, image_bytes, flood_clients=16):
+    """
+    Analyses urgentes (PATIENT_DATA: oldpeak > 2, cp == 0) mesurées pendant qu'une rafale
+    d'analyses ordinaires, soumises en tâches par flood_clients clients, sature la file
+    """
+    routine = dict(PATIENT_DATA, cp=2, oldpeak=0.5)
+    stop = threading.Event()
+    shed = [0]
+
+    def flood(worker):
+        for index in itertools.count():
+            if stop.is_set():
+                return
+            body, content_type = multipart(image_bytes, dict(routine, chol=1000 + worker * 1_000_000 + index))
+            status = transport.request('POST', '/api/analyze/jobs', body, content_type,
+                                       headers={'X-Client-ID': f"bench-flood-{worker}"})
+            if status in (429, 503):
+                shed[0] += 1
+                time.sleep(0.01)
+
+    def send(index):
+        patient = dict(PATIENT_DATA, age=20 + index % 60, chol=100_000 + index)
+        body, content_type = multipart(image_bytes, patient)
+        return transport.request('POST', '/api/analyze', body, content_type, headers={'X-Client-ID': 'bench-urgent'})
+
+    threads = [threading.Thread(target=flood, args=(worker,), daemon=True) for worker in range(flood_clients)]
+    for thread in threads:
+        thread.start()
+    try:
+        # La file se remplit avant la mesure
+        time.sleep(1.0)
+        result = run_case('analyze', 'urgent_under_overload', transport, send, options.requests,
+                          options.concurrency, params={"flood_clients": flood_clients})
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    result["params"]["shed"] = shed[0]
+
+    # Les analyses ordinaires encore en attente ne doivent pas ralentir les cas suivants
+    queue = model_integration.analysis_jobs
+    for job_id in queue.pending_ids():
+        queue.cancel(job_id)
+    while queue.stats()['running'] or queue.stats()['awaiting']:
+        time.sleep(0.05)
+    return result
+
+
+def bench_iot(transport, options, rng):
+    devices = [f"bench-iot-{transport.name}-{index}" for index in range(options.devices)]
+
+    # Une heure d'historique à 1 Hz par appareil
+    end_ms = sensor_ingestion.now_ms() - 5000
+    timestamps = end_ms - np.arange(IOT_HISTORY_SECONDS)[::-1] * 1000
+    for device_id in devices:
+        model_integration.ingest_readings(
+            device_id, np.full(len(timestamps), -1, dtype=np.int64), timestamps,
+            normal_readings(rng, len(timestamps)).astype(np.float64)
+        )
+
+    # Tous les capteurs mis à jour à la même période, plus courte qu'en production
+    preferences = model_integration.user_preferences
+    saved = {key: preferences.get(key) for key in ('displaySettings', 'sensorIntervals')}
+    preferences['displaySettings'] = dict(preferences['displaySettings'],
+                                          updateInterval=options.monitoring_interval * 1000)
+    preferences['sensorIntervals'] = {
+        sensor_type: options.monitoring_interval for sensor_type in model_integration.INGESTION_COLUMNS
+    }
+    for device_id in devices:
+        model_integration.start_iot_monitoring(device_id)
+
+    paths = {
+        'current': '/api/iot/sensors/current?deviceId={device}',
+        'alerts': '/api/iot/alerts?deviceId={device}',
+        'history': '/api/iot/sensors/heartRate/history?deviceId={device}&hours=1&maxPoints=300',
+        'status': '/api/iot/sensors/status?deviceId={device}',
+        'devices': '/api/iot/devices',
+    }
+    params = {"devices": len(devices), "monitoring_interval": options.monitoring_interval}
+    results = []
+    try:
+        for case, template in paths.items():
+            def send(index, template=template):
+                return transport.request('GET', template.format(device=devices[index % len(devices)]))
+
+            results.append(run_case('iot', case, transport, send, options.requests, options.concurrency, params=params))
+    finally:
+        for device_id in devices:
+            model_integration.stop_iot_monitoring(device_id)
+        preferences.update(saved)
+        model_integration.schedule_monitoring()
+    return results
+
+
+def bench_sessions(transport, options, rng):
+    directory = tempfile.mkdtemp(prefix='bench-sessions-')
+    original_store = model_integration.session_store
+    store = model_integration.session_store = SessionStore(
+        os.path.join(directory, 'sessions.db'), flush_interval=model_integration.SESSION_FLUSH_INTERVAL
+    )
+
+    results = []
+    try:
+        start = datetime(2026, 1, 1)
+        stored = 0
+        for size in options.session_sizes:
+            # La base grandit d'un palier à l'autre
+            for index in range(stored, size):
+                saved_at = (start + timedelta(seconds=index)).isoformat()
+                store.save(session_payload(f"bench-session-{index}", index, rng, saved_at))
+            store.flush()
+            stored = size
+            params = {"store_size": size}
+
+            new_sessions = [json.dumps(session_payload(f"bench-session-new-{size}-{index}", index, rng, None))
+                            for index in range(options.requests)]
+            cases = (
+                ('save', lambda index: transport.request(
+                    'POST', '/api/sessions/save', new_sessions[index % len(new_sessions)], 'application/json')),
+                ('get', lambda index: transport.request(
+                    'GET', f'/api/sessions/bench-session-{int(rng_index(index, size))}')),
+                ('history', lambda index: transport.request('GET', '/api/sessions/history?limit=20')),
+                # Supprime les sessions créées par le cas save: la base retrouve sa taille
+                ('delete', lambda index: transport.request(
+                    'DELETE', f'/api/sessions/bench-session-new-{size}-{index}')),
+            )
+            for case, send in cases:
+                warmup = 0 if case in ('save', 'delete') else 10
+                results.append(run_case(
+                    'sessions', f"{case}_{size}", transport, send, options.requests, options.concurrency,
+                    warmup=warmup, params=params
+                ))
+    finally:
+        model_integration.session_store = original_store
+        store.close()
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def rng_index(index, size):
+    """Index pseudo-aléatoire déterministe dans [0, size)"""
+    return (index * 2654435761) % size
+
+
+def fill_alert_backlog(device, count, now_ms):
+    """Ajoute count alertes réparties sur les dernières 23 heures"""
+    timestamps = np.linspace(now_ms - 23 * 3600 * 1000, now_ms - 60 * 1000, count).astype(np.int64)
+    sensors = ('heartRate', 'bloodPressure', 'temperature', 'oxygenSaturation')
+    with device.lock:
+        for index, timestamp_ms in enumerate(timestamps.tolist()):
+            sensor = sensors[index % len(sensors)]
+            device.alerts.add({
+                'id': f"backlog_{sensor}_{timestamp_ms}_{index}",
+                'deviceId': device.device_id,
+                'sensor': sensor,
+                'type': 'high',
+                'message': f"Alerte de charge {index}",
+                'timestamp': datetime.fromtimestamp(timestamp_ms / 1000).isoformat(),
+                'severity': 'error',
+                'read': False,
+            }, timestamp_ms)
+        device.publish()
+    return [f"backlog_{sensors[index % len(sensors)]}_{timestamp_ms}_{index}"
+            for index, timestamp_ms in enumerate(timestamps.tolist())]
+
+
+def bench_alerts(transport, options, rng):
+    results = []
+    batch = 50
+    for backlog in options.alert_backlogs:
+        device_id = f"bench-alerts-{transport.name}-{backlog}"
+        device = model_integration.device_registry.get_or_create(device_id)
+        now_ms = sensor_ingestion.now_ms()
+        alert_ids = fill_alert_backlog(device, backlog, now_ms)
+        params = {"backlog": backlog, "batch": batch}
+
+        def ingest(index, device_id=device_id, now_ms=now_ms):
+            # Mesures à 10 Hz, chacune hors seuils: les alertes sont presque toutes dédupliquées
+            first = (index + 100) * batch
+            sequences = np.arange(first, first + batch)
+            body = sensor_ingestion.encode_binary(
+                device_id, sequences, now_ms + sequences * 100, ALERT_READINGS[sequences % 2]
+            )
+            return transport.request(
+                'POST', f'/api/iot/sensors/data?deviceId={device_id}', body, 'application/octet-stream'
+            )
+
+        def read(index, device_id=device_id):
+            return transport.request('GET', f'/api/iot/alerts?deviceId={device_id}')
+
+        def mark_read(index, device_id=device_id, alert_ids=alert_ids):
+            alert_id = alert_ids[rng_index(index + 10, len(alert_ids))]
+            transport.request('PATCH', f'/api/iot/alerts/{alert_id}/read?deviceId={device_id}')
+            # L'acquittement invalide l'instantané: la lecture suivante reconstruit la liste
+            return transport.request('GET', f'/api/iot/alerts?deviceId={device_id}')
+
+        # Les mesures d'un appareil arrivent dans l'ordre: un seul client
+        results.append(run_case('alerts', f"ingest_dedupe_{backlog}", transport, ingest, options.requests, 1,
+                                params=params))
+        results.append(run_case('alerts', f"read_{backlog}", transport, read, options.requests,
+                                options.concurrency, params=params))
+        results.append(run_case('alerts', f"mark_read_then_read_{backlog}", transport, mark_read,
+                                options.requests, options.concurrency, params=params))
+    return results
+
+
+BENCHMARKS = {
+    'analyze': bench_analyze,
+    'iot': bench_iot,
+    'sessions': bench_sessions,
+    'alerts': bench_alerts,
+}
+
+
+# ============================================================================
+# RÉFÉRENCE ET RAPPORT
+# ============================================================================
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment():
+    return {
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "model": model_integration.inference_runtime.description,
+    }
+
+
+def case_key(result):
+    return result["scenario"], result["case"], result["transport"]
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare des résultats à une référence
+
+    Returns:
+        Liste des régressions {scenario, case, transport, metric, baseline, current, change}
+    """
+    reference = {case_key(result): result for result in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = reference.get(case_key(result))
+        if before is None:
+            continue
+
+        checks = [("throughput_rps", -1, 0.0)]
+        checks += [(metric, 1, MIN_LATENCY_DELTA_MS) for metric in ("p50_ms", "p95_ms", "p99_ms")]
+        # Le pic de RSS du processus dépend des cas exécutés avant: seule la croissance pendant le cas compte
+        checks.append(("rss_growth_mb", 1, MIN_MEMORY_DELTA_MB))
+        for metric, direction, min_delta in checks:
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if direction * change > tolerance and abs(new - old) > min_delta:
+                regressions.append({
+                    "scenario": result["scenario"],
+                    "case": result["case"],
+                    "transport": result["transport"],
+                    "metric": metric,
+                    "baseline": old,
+                    "current": new,
+                    "change": round(change, 3),
+                })
+        if result["errors"] > before.get("errors", 0):
+            regressions.append({
+                "scenario": result["scenario"], "case": result["case"], "transport": result["transport"],
+                "metric": "errors", "baseline": before.get("errors", 0), "current": result["errors"], "change": None,
+            })
+    return regressions
+
+
+def format_result(result):
+    return (f"{result['transport']:<6} {result['scenario']:<9} {result['case']:<28} "
+            f"{result['throughput_rps']:>9} req/s  p50 {result['p50_ms']:>8} ms  "
+            f"p95 {result['p95_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  "
+            f"RSS {result['peak_rss_mb']} Mo  erreurs {result['errors']}")
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(data, output, indent=2, ensure_ascii=False)
+        output.write('\n')
+
+
+def run(options, report=print):
+    """Exécute les scénarios demandés et retourne le document de résultats"""
+    results = []
+    started = time.time()
+    for transport_name in options.transports:
+        with TRANSPORTS[transport_name](model_integration.app) as transport:
+            for scenario in options.scenarios:
+                # Graine fixe par scénario: les données ne dépendent pas des scénarios sélectionnés
+                rng = np.random.default_rng([options.seed, SCENARIOS.index(scenario)])
+                for result in BENCHMARKS[scenario](transport, options, rng):
+                    report(format_result(result))
+                    results.append(result)
+
+    return {
+        "created_at": datetime.now().isoformat(),
+        "duration_s": round(time.time() - started, 1),
+        "environment": environment(),
+        "options": {
+            "scenarios": options.scenarios,
+            "transports": options.transports,
+            "requests": options.requests,
+            "concurrency": options.concurrency,
+            "seed": options.seed,
+            "quick": options.quick,
+        },
+        "results": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Suite de benchmarks reproductible du backend")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"Scénarios exécutés, séparés par des virgules ({', '.join(SCENARIOS)})")
+    parser.add_argument('--transport', default='client',
+                        help="Transports, séparés par des virgules: client (client de test Flask), "
+                             "http (serveur HTTP local)")
+    parser.add_argument('--requests', type=int, default=200, help="Requêtes mesurées par cas")
+    parser.add_argument('--concurrency', type=int, default=4, help="Clients simultanés")
+    parser.add_argument('--devices', type=int, default=IOT_DEVICES, help="Appareils surveillés (scénario iot)")
+    parser.add_argument('--monitoring-interval', type=float, default=IOT_MONITORING_INTERVAL,
+                        help="Période de la boucle de monitoring pendant le scénario iot (en secondes)")
+    parser.add_argument('--seed', type=int, default=42, help="Graine des données synthétiques")
+    parser.add_argument('--quick', action='store_true',
+                        help="Exécution courte (moins de requêtes, bases et backlogs plus petits)")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Fichier JSON des résultats")
+    parser.add_argument('--baseline', default=None, help="Référence à laquelle comparer les résultats")
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, default=None, metavar='PATH',
+                        help=f"Enregistre les résultats comme référence (défaut: {DEFAULT_BASELINE})")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="Écart relatif toléré avant de signaler une régression (0.15: 15%%)")
+    parser.add_argument('--verbose', action='store_true', help="Affiche les messages du backend")
+    options = parser.parse_args(argv)
+
+    options.scenarios = [name.strip() for name in options.scenarios.split(',') if name.strip()]
+    options.transports = [name.strip() for name in options.transport.split(',') if name.strip()]
+    for name in options.scenarios:
+        if name not in BENCHMARKS:
+            parser.error(f"Scénario inconnu: {name}")
+    for name in options.transports:
+        if name not in TRANSPORTS:
+            parser.error(f"Transport inconnu: {name}")
+
+    options.session_sizes = SESSION_STORE_SIZES[:2] if options.quick else SESSION_STORE_SIZES
+    options.alert_backlogs = ALERT_BACKLOGS[:2] if options.quick else ALERT_BACKLOGS
+    if options.quick:
+        options.requests = min(options.requests, 50)
+        options.devices = min(options.devices, 50)
+    return options
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    stdout = sys.stdout
+
+    def report(line):
+        print(line, file=stdout, flush=True)
+
+    # Les messages du backend (alertes, démarrages du monitoring) ne sont pas affichés
+    quiet = contextlib.nullcontext() if options.verbose else contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        document = run(options, report)
+
+    write_json(options.output, document)
+    report(f"Résultats enregistrés dans {options.output}")
+
+    if options.save_baseline:
+        write_json(options.save_baseline, document)
+        report(f"Référence enregistrée dans {options.save_baseline}")
+
+    if options.baseline:
+        with open(options.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        different = [name for name in ("requests", "concurrency", "quick")
+                     if baseline.get("options", {}).get(name) != document["options"][name]]
+        if different:
+            report(f"Attention: options différentes de la référence ({', '.join(different)}), "
+                   f"comparaison peu significative")
+        regressions = compare(document["results"], baseline, options.tolerance)
+        document["regressions"] = regressions
+        write_json(options.output, document)
+        if regressions:
+            report(f"{len(regressions)} régression(s) par rapport à {options.baseline}:")
+            for regression in regressions:
+                report(f"  {regression['transport']} {regression['scenario']}/{regression['case']} "
+                       f"{regression['metric']}: {regression['baseline']} -> {regression['current']}")
+            return 1
+        report(f"Aucune régression par rapport à {options.baseline} (tolérance {options.tolerance:.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
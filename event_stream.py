@@ -0,0 +1,255 @@
+"""
+Canal de diffusion en temps réel (Server-Sent Events) des données de monitoring.
+
+Au lieu que chaque tableau de bord interroge périodiquement toutes les données et
+tous les historiques, le backend publie uniquement les changements:
+- 'sensor': nouvelle valeur ou nouveau statut d'un capteur
+- 'alert': nouvelle alerte
+- 'snapshot': état complet (à la connexion, ou pour resynchroniser)
+
+Chaque événement porte un identifiant croissant servant de jeton de reprise: un
+client qui se reconnecte avec Last-Event-ID reçoit les événements manqués tant
+qu'ils sont encore dans le tampon de rejeu, sinon un snapshot complet. Le jeton
+est préfixé par l'époque du bus: un jeton d'un autre processus (autre worker,
+redémarrage) conduit à un snapshot plutôt qu'au rejeu d'événements sans rapport.
+
+Chaque abonné a une file bornée: si un client lent la remplit, ses événements en
+attente sont remplacés par une resynchronisation (snapshot) au lieu de faire
+grossir la mémoire du serveur.
+
+Un flux occupe un thread du serveur pendant toute sa durée: StreamSlots borne le
+nombre de flux ouverts simultanément pour que les autres requêtes gardent des
+threads libres (les flux refusés reçoivent 503 et se reconnectent plus tard).
+"""
+
+import json
+import threading
+import time
+import uuid
+from collections import deque
+
+
+class Event:
+    """Événement publié; le JSON n'est sérialisé qu'une fois pour tous les abonnés"""
+
+    __slots__ = ('id', 'type', 'device_id', 'sensor', 'data')
+
+    def __init__(self, event_id, event_type, device_id, sensor, payload):
+        self.id = event_id
+        self.type = event_type
+        self.device_id = device_id
+        self.sensor = sensor
+        self.data = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+
+
+class Subscription:
+    """
+    Abonnement d'un client
+
+    Args:
+        device_id: Appareil suivi ('*' pour tous)
+        sensors: Ensemble des capteurs suivis (None pour tous)
+        include_alerts: Recevoir les événements d'alerte
+        max_pending: Nombre maximal d'événements en attente avant resynchronisation
+    """
+
+    def __init__(self, device_id, sensors=None, include_alerts=True, max_pending=1000):
+        self.device_id = device_id
+        self.sensors = sensors
+        self.include_alerts = include_alerts
+        self.max_pending = max_pending
+        self.overflowed = False
+        self.dropped = 0
+        self._pending = deque()
+        self._condition = threading.Condition()
+
+    def matches(self, event):
+        if self.device_id != '*' and event.device_id != self.device_id:
+            return False
+        if event.type == 'alert':
+            return self.include_alerts
+        return self.sensors is None or event.sensor in self.sensors
+
+    def push(self, event):
+        with self._condition:
+            if len(self._pending) >= self.max_pending:
+                # Client trop lent: remplacer l'attente par une resynchronisation complète
+                self.dropped += len(self._pending)
+                self._pending.clear()
+                self.overflowed = True
+            self._pending.append(event)
+            self._condition.notify()
+
+    def take(self, timeout):
+        """
+        Attend des événements
+
+        Returns:
+            Tuple (événements, resynchronisation nécessaire)
+        """
+        with self._condition:
+            if not self._pending and not self.overflowed:
+                self._condition.wait(timeout)
+            events = list(self._pending)
+            self._pending.clear()
+            overflowed = self.overflowed
+            self.overflowed = False
+            return events, overflowed
+
+
+class EventBus:
+    """
+    Bus de publication des changements de monitoring
+
+    Args:
+        replay_size: Nombre d'événements récents conservés pour la reprise
+        max_pending: Taille de la file de chaque abonné
+    """
+
+    def __init__(self, replay_size=10000, max_pending=1000):
+        self.max_pending = max_pending
+        self._replay = deque(maxlen=replay_size)
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self.epoch = uuid.uuid4().hex[:8]
+
+    @property
+    def last_event_id(self):
+        return self._last_id
+
+    def token(self, event_id):
+        """Jeton de reprise (champ id des événements SSE) d'un identifiant d'événement"""
+        return f"{self.epoch}-{event_id}"
+
+    def parse_token(self, token):
+        """Identifiant d'événement d'un jeton de reprise; None s'il vient d'un autre bus ou est invalide"""
+        epoch, _, event_id = (token or '').partition('-')
+        if epoch != self.epoch or not event_id.isdigit():
+            return None
+        return int(event_id)
+
+    def publish(self, event_type, device_id, sensor, payload):
+        """Publie un événement vers le tampon de rejeu et les abonnés concernés"""
+        with self._lock:
+            self._last_id += 1
+            event = Event(self._last_id, event_type, device_id, sensor, payload)
+            self._replay.append(event)
+            subscribers = [subscriber for subscriber in self._subscribers if subscriber.matches(event)]
+
+        for subscriber in subscribers:
+            subscriber.push(event)
+        return event
+
+    def subscribe(self, device_id, sensors=None, include_alerts=True, last_event_id=None):
+        """
+        Crée un abonnement
+
+        Returns:
+            Tuple (abonnement, événements à rejouer ou None si un snapshot complet est nécessaire)
+        """
+        subscription = Subscription(device_id, sensors, include_alerts, self.max_pending)
+        with self._lock:
+            self._subscribers.append(subscription)
+            replay = None
+            if last_event_id is not None:
+                oldest = self._replay[0].id if self._replay else self._last_id + 1
+                # Reprise possible si aucun événement n'a été perdu depuis le jeton
+                if last_event_id + 1 >= oldest and last_event_id <= self._last_id:
+                    replay = [event for event in self._replay if event.id > last_event_id and subscription.matches(event)]
+
+        return subscription, replay
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "last_event_id": self._last_id,
+                "replay_buffer": len(self._replay)
+            }
+
+
+class StreamSlots:
+    """
+    Nombre borné de flux ouverts simultanément
+
+    Args:
+        limit: Nombre maximal de flux ouverts
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.rejected = 0
+        self._open = 0
+        self._lock = threading.Lock()
+
+    @property
+    def open(self):
+        return self._open
+
+    def acquire(self):
+        """Réserve une place; False si toutes sont prises"""
+        with self._lock:
+            if self._open >= self.limit:
+                self.rejected += 1
+                return False
+            self._open += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._open = max(0, self._open - 1)
+
+
+def format_sse(event_type, data, event_id=None):
+    """Formate un événement Server-Sent Events"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {data}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def sse_stream(bus, subscription, replay, snapshot_fn, keepalive=15.0):
+    """
+    Générateur du flux SSE d'un abonné
+
+    Args:
+        bus: EventBus de l'abonnement
+        subscription: Abonnement créé par bus.subscribe
+        replay: Événements à rejouer, ou None pour commencer par un snapshot
+        snapshot_fn: Fonction () -> dictionnaire de l'état complet filtré pour l'abonné
+        keepalive: Intervalle des commentaires de maintien de connexion (en secondes)
+    """
+    try:
+        if replay is None:
+            # L'identifiant courant sert de jeton: les événements suivants arrivent par la file
+            event_id = bus.last_event_id
+            yield format_sse('snapshot', json.dumps(snapshot_fn(), ensure_ascii=False), bus.token(event_id))
+        else:
+            for event in replay:
+                yield format_sse(event.type, event.data, bus.token(event.id))
+
+        last_sent = time.monotonic()
+        while True:
+            events, overflowed = subscription.take(keepalive)
+            if overflowed:
+                snapshot_id = bus.last_event_id
+                yield format_sse('snapshot', json.dumps(snapshot_fn(), ensure_ascii=False), bus.token(snapshot_id))
+                events = [event for event in events if event.id > snapshot_id]
+            for event in events:
+                yield format_sse(event.type, event.data, bus.token(event.id))
+
+            if events or overflowed:
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= keepalive:
+                yield ': keepalive\n\n'
+                last_sent = time.monotonic()
+    finally:
+        bus.unsubscribe(subscription)
@@ -0,0 +1,541 @@
+"""
+Export en colonnes de l'historique des capteurs et des sessions, et rejeu.
+
+L'historique en mémoire ne couvre que HISTORY_RETENTION_HOURS: l'archive le
+recopie sur disque, par appareil, par capteur et par jour (UTC):
+
+    <racine>/sensors/<appareil>/<capteur>/<AAAA-MM-JJ>/<premier>_<dernier>.timestamps.npy
+                                                      <premier>_<dernier>.values.npy
+
+Chaque export n'écrit que les points postérieurs au dernier point archivé
+(un nouveau fragment par partition). Les fichiers .npy sont lus par
+projection mémoire (mmap): lire des semaines de mesures ne copie que
+l'intervalle demandé. compact() fusionne les fragments d'une partition,
+éventuellement en un .npz compressé (lu en entier, sans mmap).
+
+Les sessions sont exportées en colonnes (identifiants, dates de sauvegarde,
+JSON concaténé + positions) dans <racine>/sessions/<AAAA-MM-JJ>/, de façon
+incrémentale dans l'ordre de sauvegarde.
+
+replay() fait repasser une série archivée par le moteur d'alertes, au plus
+vite ou à vitesse accélérée, par exemple pour tester de nouveaux seuils sur
+des données réelles.
+
+Utilisation:
+    python history_export.py read sensor_archive default heartRate --since 2024-05-01 --csv
+    python history_export.py replay sensor_archive default --speed 3600
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+from alert_engine import AlertEngine, DeviceAlerts
+from timeseries_store import SENSOR_CHANNELS
+
+DAY_MS = 24 * 3600 * 1000
+REPLAY_TICK_SECONDS = 0.1  # Pas de cadencement d'un rejeu accéléré (temps réel)
+REPLAY_MAX_ALERTS = 1000  # Nombre maximal d'alertes retournées par un rejeu
+
+_TIMESTAMPS_SUFFIX = '.timestamps.npy'
+_VALUES_SUFFIX = '.values.npy'
+_COMPRESSED_SUFFIX = '.npz'
+
+
+def _path_name(identifier):
+    """Nom de fichier sûr pour un identifiant quelconque (réversible avec unquote)"""
+    return quote(str(identifier), safe='').replace('.', '%2E')
+
+
+def _day(timestamp_ms):
+    return datetime.fromtimestamp(timestamp_ms / 1000, timezone.utc).strftime('%Y-%m-%d')
+
+
+def _day_start_ms(day):
+    return int(datetime.strptime(day, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def _chunk_bounds(name):
+    """(premier, dernier) horodatage d'un fragment d'après son nom"""
+    first, _, last = name.split('.', 1)[0].partition('_')
+    return int(first), int(last)
+
+
+def _save_atomic(path, **arrays):
+    """Écrit un .npy (un tableau) ou un .npz compressé, visible seulement une fois complet"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        if path.endswith(_COMPRESSED_SUFFIX):
+            np.savez_compressed(f, **arrays)
+        else:
+            np.save(f, next(iter(arrays.values())))
+    os.replace(tmp_path, path)
+
+
+def parse_time_ms(value):
+    """Horodatage en ms à partir d'un entier (ms epoch) ou d'une date ISO (UTC si sans fuseau)"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)) or str(value).lstrip('-').isdigit():
+        return int(value)
+    moment = datetime.fromisoformat(str(value))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+
+class HistoryArchive:
+    """
+    Archive sur disque de l'historique des capteurs et des sessions
+
+    Args:
+        root: Répertoire de l'archive
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._exported = {}  # (appareil, capteur) -> dernier horodatage archivé
+        self._lock = threading.Lock()  # Exports et compactages d'un même processus
+
+    # ------------------------------------------------------------------
+    # Historique des capteurs
+    # ------------------------------------------------------------------
+
+    def _sensor_dir(self, device_id, sensor_type):
+        return os.path.join(self.root, 'sensors', _path_name(device_id), sensor_type)
+
+    def devices(self):
+        path = os.path.join(self.root, 'sensors')
+        if not os.path.isdir(path):
+            return []
+        return sorted(unquote(name) for name in os.listdir(path))
+
+    def partitions(self, device_id, sensor_type):
+        """Jours archivés d'un capteur, dans l'ordre chronologique"""
+        path = self._sensor_dir(device_id, sensor_type)
+        if not os.path.isdir(path):
+            return []
+        return sorted(name for name in os.listdir(path) if not name.startswith('.'))
+
+    def _chunks(self, device_id, sensor_type, day):
+        """Fragments d'une partition: liste triée de (premier, dernier, chemin sans suffixe, compressé)"""
+        path = os.path.join(self._sensor_dir(device_id, sensor_type), day)
+        chunks = []
+        for name in os.listdir(path):
+            if name.endswith(_TIMESTAMPS_SUFFIX):
+                compressed = False
+                stem = name[:-len(_TIMESTAMPS_SUFFIX)]
+            elif name.endswith(_COMPRESSED_SUFFIX):
+                compressed = True
+                stem = name[:-len(_COMPRESSED_SUFFIX)]
+            else:
+                continue
+            first, last = _chunk_bounds(stem)
+            chunks.append((first, last, os.path.join(path, stem), compressed))
+        chunks.sort()
+        return chunks
+
+    def last_exported(self, device_id, sensor_type):
+        """Horodatage du dernier point archivé d'un capteur (None si aucun)"""
+        key = (device_id, sensor_type)
+        if key not in self._exported:
+            last = None
+            for day in reversed(self.partitions(device_id, sensor_type)):
+                chunks = self._chunks(device_id, sensor_type, day)
+                if chunks:
+                    last = max(chunk[1] for chunk in chunks)
+                    break
+            self._exported[key] = last
+        return self._exported[key]
+
+    def append(self, device_id, sensor_type, timestamps_ms, values):
+        """
+        Archive des points (horodatages croissants, postérieurs au dernier point archivé)
+
+        Returns:
+            Nombre de points écrits
+        """
+        timestamps_ms = np.asarray(timestamps_ms, dtype=np.int64)
+        if not len(timestamps_ms):
+            return 0
+        values = np.asarray(values, dtype=np.float32).reshape(len(timestamps_ms), -1)
+
+        with self._lock:
+            last = self.last_exported(device_id, sensor_type)
+            if last is not None:
+                start = int(np.searchsorted(timestamps_ms, last, side='right'))
+                timestamps_ms, values = timestamps_ms[start:], values[start:]
+            if not len(timestamps_ms):
+                return 0
+
+            # Un fragment par jour couvert
+            days = timestamps_ms // DAY_MS
+            bounds = np.flatnonzero(np.diff(days)) + 1
+            for chunk_timestamps, chunk_values in zip(np.split(timestamps_ms, bounds), np.split(values, bounds)):
+                first, last = int(chunk_timestamps[0]), int(chunk_timestamps[-1])
+                path = os.path.join(self._sensor_dir(device_id, sensor_type), _day(first))
+                os.makedirs(path, exist_ok=True)
+                stem = os.path.join(path, f"{first}_{last}")
+                # Horodatages en dernier: un fragment n'est listé qu'une fois ses valeurs écrites
+                _save_atomic(stem + _VALUES_SUFFIX, values=chunk_values)
+                _save_atomic(stem + _TIMESTAMPS_SUFFIX, timestamps=chunk_timestamps)
+
+            self._exported[(device_id, sensor_type)] = int(timestamps_ms[-1])
+            return len(timestamps_ms)
+
+    def export_device(self, device_id, history):
+        """
+        Archive les nouveaux points de l'historique en mémoire d'un appareil
+
+        Args:
+            history: SensorHistoryStore de l'appareil
+
+        Returns:
+            Nombre de points écrits par capteur
+        """
+        written = {}
+        for sensor_type in SENSOR_CHANNELS:
+            timestamps_ms, values = history.query(sensor_type, since_ms=self.last_exported(device_id, sensor_type))
+            written[sensor_type] = self.append(device_id, sensor_type, timestamps_ms, values)
+        return written
+
+    def iter_chunks(self, device_id, sensor_type, since_ms=None, until_ms=None):
+        """
+        Portions de l'historique archivé dans ]since_ms, until_ms], dans l'ordre chronologique
+
+        Les portions des fragments .npy sont des vues en projection mémoire (non copiées).
+
+        Yields:
+            Tuples (horodatages int64, valeurs float32 (n, canaux))
+        """
+        first_day = None if since_ms is None else _day(since_ms)
+        last_day = None if until_ms is None else _day(until_ms)
+        for day in self.partitions(device_id, sensor_type):
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            for first, last, stem, compressed in self._chunks(device_id, sensor_type, day):
+                if (since_ms is not None and last <= since_ms) or (until_ms is not None and first > until_ms):
+                    continue
+                try:
+                    if compressed:
+                        with np.load(stem + _COMPRESSED_SUFFIX) as data:
+                            timestamps, values = data['timestamps'], data['values']
+                    else:
+                        timestamps = np.load(stem + _TIMESTAMPS_SUFFIX, mmap_mode='r')
+                        values = np.load(stem + _VALUES_SUFFIX, mmap_mode='r')
+                except FileNotFoundError:
+                    if os.path.exists(stem + (_COMPRESSED_SUFFIX if compressed else _TIMESTAMPS_SUFFIX)):
+                        raise
+                    # Fragment remplacé par un compactage concurrent: relire son intervalle
+                    yield from self.iter_chunks(
+                        device_id, sensor_type,
+                        first - 1 if since_ms is None else max(since_ms, first - 1),
+                        last if until_ms is None else min(until_ms, last)
+                    )
+                    continue
+                start = 0 if since_ms is None else int(np.searchsorted(timestamps, since_ms, side='right'))
+                stop = len(timestamps) if until_ms is None else int(np.searchsorted(timestamps, until_ms, side='right'))
+                if start < stop:
+                    yield timestamps[start:stop], values[start:stop]
+
+    def read(self, device_id, sensor_type, since_ms=None, until_ms=None):
+        """
+        Historique archivé d'un capteur dans ]since_ms, until_ms]
+
+        Returns:
+            Tuple (horodatages int64, valeurs float32 (n, canaux)), dans l'ordre chronologique
+        """
+        chunks = list(self.iter_chunks(device_id, sensor_type, since_ms, until_ms))
+        if not chunks:
+            channels = len(SENSOR_CHANNELS[sensor_type])
+            return np.empty(0, dtype=np.int64), np.empty((0, channels), dtype=np.float32)
+        return (
+            np.concatenate([timestamps for timestamps, _ in chunks]),
+            np.concatenate([values for _, values in chunks]),
+        )
+
+    def compact(self, device_id, sensor_type, day, compress=False):
+        """
+        Fusionne les fragments d'une partition en un seul fichier
+
+        Args:
+            compress: Écrire un .npz compressé (plus compact, lu sans projection mémoire)
+
+        Returns:
+            Nombre de fragments fusionnés
+        """
+        with self._lock:
+            chunks = self._chunks(device_id, sensor_type, day)
+            if not chunks or (len(chunks) == 1 and chunks[0][3] == compress):
+                return 0
+
+            start_ms = _day_start_ms(day)
+            timestamps, values = self.read(device_id, sensor_type, start_ms - 1, start_ms + DAY_MS - 1)
+            stem = os.path.join(
+                self._sensor_dir(device_id, sensor_type), day, f"{int(timestamps[0])}_{int(timestamps[-1])}"
+            )
+            if compress:
+                _save_atomic(stem + _COMPRESSED_SUFFIX, timestamps=timestamps, values=values)
+            else:
+                _save_atomic(stem + _VALUES_SUFFIX, values=values)
+                _save_atomic(stem + _TIMESTAMPS_SUFFIX, timestamps=timestamps)
+
+            for _, _, old_stem, old_compressed in chunks:
+                if old_stem == stem and old_compressed == compress:
+                    continue
+                suffixes = (_COMPRESSED_SUFFIX,) if old_compressed else (_TIMESTAMPS_SUFFIX, _VALUES_SUFFIX)
+                for suffix in suffixes:
+                    os.remove(old_stem + suffix)
+            return len(chunks)
+
+    def compact_closed(self, compress=False, now_ms=None):
+        """Compacte les partitions des jours terminés de tous les capteurs archivés"""
+        today = _day(int(time.time() * 1000) if now_ms is None else now_ms)
+        merged = 0
+        for device_id in self.devices():
+            for sensor_type in SENSOR_CHANNELS:
+                for day in self.partitions(device_id, sensor_type):
+                    if day < today:
+                        merged += self.compact(device_id, sensor_type, day, compress)
+        return merged
+
+    # ------------------------------------------------------------------
+    # Sessions
+    # ------------------------------------------------------------------
+
+    def _sessions_cursor_path(self):
+        return os.path.join(self.root, 'sessions', 'cursor.json')
+
+    def export_sessions(self, store, batch_size=5000):
+        """
+        Archive les sessions sauvegardées depuis le dernier export
+
+        Une session sauvegardée à nouveau est archivée une seconde fois; read_sessions()
+        ne garde que sa version la plus récente.
+
+        Args:
+            store: SessionStore
+
+        Returns:
+            Nombre de sessions écrites
+        """
+        with self._lock:
+            cursor = None
+            if os.path.exists(self._sessions_cursor_path()):
+                with open(self._sessions_cursor_path(), encoding='utf-8') as f:
+                    cursor = tuple(json.load(f))
+
+            written = 0
+            while True:
+                rows = store.changes(cursor, batch_size)
+                if not rows:
+                    break
+                # Un fragment par jour de sauvegarde
+                by_day = {}
+                for row in rows:
+                    by_day.setdefault(row[0][:10], []).append(row)
+                for day, day_rows in by_day.items():
+                    self._write_sessions(day, day_rows)
+                written += len(rows)
+                cursor = rows[-1][:2]
+                _write_json_atomic(self._sessions_cursor_path(), list(cursor))
+            return written
+
+    def _write_sessions(self, day, rows):
+        data = [row[2].encode('utf-8') for row in rows]
+        offsets = np.zeros(len(data) + 1, dtype=np.int64)
+        np.cumsum([len(blob) for blob in data], out=offsets[1:])
+        path = os.path.join(self.root, 'sessions', day)
+        os.makedirs(path, exist_ok=True)
+        part = sum(1 for name in os.listdir(path) if name.endswith(_COMPRESSED_SUFFIX))
+        _save_atomic(
+            os.path.join(path, f"part-{part:06d}{_COMPRESSED_SUFFIX}"),
+            saved_at=np.array([row[0] for row in rows]),
+            ids=np.array([row[1] for row in rows]),
+            offsets=offsets,
+            data=np.frombuffer(b''.join(data), dtype=np.uint8)
+        )
+
+    def session_columns(self, since_day=None, until_day=None):
+        """
+        Colonnes des sessions archivées (toutes les versions), jour par jour
+
+        Yields:
+            Dictionnaires {'saved_at', 'ids', 'offsets', 'data'} (data: JSON concaténé en uint8)
+        """
+        path = os.path.join(self.root, 'sessions')
+        if not os.path.isdir(path):
+            return
+        for day in sorted(os.listdir(path)):
+            if not os.path.isdir(os.path.join(path, day)):
+                continue
+            if (since_day and day < since_day) or (until_day and day > until_day):
+                continue
+            for name in sorted(os.listdir(os.path.join(path, day))):
+                if name.endswith(_COMPRESSED_SUFFIX):
+                    with np.load(os.path.join(path, day, name)) as columns:
+                        yield {key: columns[key] for key in ('saved_at', 'ids', 'offsets', 'data')}
+
+    def read_sessions(self, since_day=None, until_day=None):
+        """Sessions archivées (version la plus récente de chacune), par identifiant"""
+        sessions = {}
+        for columns in self.session_columns(since_day, until_day):
+            data = columns['data'].tobytes()
+            offsets = columns['offsets']
+            for index, session_id in enumerate(columns['ids'].tolist()):
+                sessions[session_id] = json.loads(data[offsets[index]:offsets[index + 1]])
+        return sessions
+
+
+def _write_json_atomic(path, value):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(value, f)
+    os.replace(tmp_path, path)
+
+
+def replay(archive, device_id, thresholds=None, speed=None, since_ms=None, until_ms=None,
+           sensors=None, on_alert=None, max_alerts=REPLAY_MAX_ALERTS):
+    """
+    Fait repasser l'historique archivé d'un appareil par le moteur d'alertes
+
+    Args:
+        archive: HistoryArchive
+        thresholds: Seuils des règles (format des préférences; None: seuils par défaut)
+        speed: Facteur d'accélération par rapport au temps réel (None: au plus vite)
+        since_ms, until_ms: Intervalle rejoué
+        sensors: Capteurs rejoués (None: tous)
+        on_alert: Fonction appelée pour chaque alerte créée
+        max_alerts: Nombre maximal d'alertes retournées (toutes sont comptées)
+
+    Returns:
+        Statistiques et alertes du rejeu
+    """
+    engine = AlertEngine(thresholds)
+    alerts = DeviceAlerts()
+    series = {
+        sensor_type: archive.read(device_id, sensor_type, since_ms, until_ms)
+        for sensor_type in (sensors or SENSOR_CHANNELS)
+    }
+    series = {sensor_type: data for sensor_type, data in series.items() if len(data[0])}
+
+    created = []
+    counts = Counter()
+    statuses = {}
+
+    def evaluate(window_since, window_until):
+        for sensor_type, (timestamps, values) in series.items():
+            start = 0 if window_since is None else int(np.searchsorted(timestamps, window_since, side='right'))
+            stop = len(timestamps) if window_until is None else int(np.searchsorted(timestamps, window_until, side='right'))
+            if start >= stop:
+                continue
+            statuses[sensor_type], new_alerts = engine.evaluate_many(
+                alerts, device_id, sensor_type, timestamps[start:stop], values[start:stop]
+            )
+            for alert in new_alerts:
+                counts[(sensor_type, alert['type'])] += 1
+                if len(created) < max_alerts:
+                    created.append(alert)
+                if on_alert is not None:
+                    on_alert(alert)
+
+    points = sum(len(timestamps) for timestamps, _ in series.values())
+    first_ms = min((int(timestamps[0]) for timestamps, _ in series.values()), default=None)
+    last_ms = max((int(timestamps[-1]) for timestamps, _ in series.values()), default=None)
+    started = time.monotonic()
+
+    if speed is None:
+        evaluate(None, None)
+    elif series:
+        # Fenêtres de temps enregistré, cadencées pour suivre speed x le temps réel
+        window_ms = max(1, int(speed * REPLAY_TICK_SECONDS * 1000))
+        window_since = first_ms - 1
+        while window_since < last_ms:
+            window_until = window_since + window_ms
+            evaluate(window_since, window_until)
+            delay = started + (window_until - first_ms) / 1000 / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            window_since = window_until
+
+    elapsed = time.monotonic() - started
+    recorded_seconds = (last_ms - first_ms) / 1000 if series else 0.0
+    return {
+        "deviceId": device_id,
+        "points": points,
+        "from": None if first_ms is None else datetime.fromtimestamp(first_ms / 1000).isoformat(),
+        "to": None if last_ms is None else datetime.fromtimestamp(last_ms / 1000).isoformat(),
+        "recordedSeconds": recorded_seconds,
+        "elapsedSeconds": round(elapsed, 3),
+        "effectiveSpeed": round(recorded_seconds / elapsed, 1) if elapsed > 0 else None,
+        "finalStatus": statuses,
+        "alertCount": sum(counts.values()),
+        "alertsBySensor": {
+            sensor_type: {
+                alert_type: count for (sensor, alert_type), count in counts.items() if sensor == sensor_type
+            }
+            for sensor_type in sorted({sensor for sensor, _ in counts})
+        },
+        "alerts": created,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Lecture et rejeu de l'archive de l'historique des capteurs")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    read_parser = subparsers.add_parser('read', help="Affiche l'historique archivé d'un capteur")
+    read_parser.add_argument('root')
+    read_parser.add_argument('device')
+    read_parser.add_argument('sensor', choices=sorted(SENSOR_CHANNELS))
+    read_parser.add_argument('--since', help="Date ISO (UTC) ou ms epoch")
+    read_parser.add_argument('--until', help="Date ISO (UTC) ou ms epoch")
+    read_parser.add_argument('--csv', action='store_true', help="Toutes les mesures en CSV (sinon un résumé)")
+
+    replay_parser = subparsers.add_parser('replay', help="Rejoue l'historique archivé dans le moteur d'alertes")
+    replay_parser.add_argument('root')
+    replay_parser.add_argument('device')
+    replay_parser.add_argument('--since', help="Date ISO (UTC) ou ms epoch")
+    replay_parser.add_argument('--until', help="Date ISO (UTC) ou ms epoch")
+    replay_parser.add_argument('--speed', type=float, help="Facteur d'accélération (défaut: au plus vite)")
+    replay_parser.add_argument('--thresholds', help="Fichier JSON des seuils (format des préférences)")
+
+    compact_parser = subparsers.add_parser('compact', help="Fusionne les fragments des jours terminés")
+    compact_parser.add_argument('root')
+    compact_parser.add_argument('--compress', action='store_true', help="Fichiers .npz compressés")
+
+    args = parser.parse_args()
+    archive = HistoryArchive(args.root)
+
+    if args.command == 'read':
+        timestamps, values = archive.read(args.device, args.sensor, parse_time_ms(args.since), parse_time_ms(args.until))
+        if args.csv:
+            channels = SENSOR_CHANNELS[args.sensor]
+            print(','.join(('timestamp',) + channels))
+            for timestamp, row in zip(timestamps.tolist(), values.tolist()):
+                print(','.join([str(timestamp)] + [f"{value:g}" for value in row]))
+        else:
+            print(json.dumps({
+                "points": len(timestamps),
+                "partitions": archive.partitions(args.device, args.sensor),
+                "mean": values.mean(axis=0).tolist() if len(values) else None,
+            }, indent=2))
+    elif args.command == 'replay':
+        thresholds = None
+        if args.thresholds:
+            with open(args.thresholds, encoding='utf-8') as f:
+                thresholds = json.load(f)
+        result = replay(archive, args.device, thresholds, args.speed, parse_time_ms(args.since), parse_time_ms(args.until))
+        result.pop('alerts')
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    else:
+        print(json.dumps({"merged": archive.compact_closed(compress=args.compress)}))
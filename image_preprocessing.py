@@ -0,0 +1,183 @@
+"""
+Pipeline de prétraitement des images ECG à mémoire bornée.
+
+- Les JPEG sont décodés directement à taille réduite (draft), les autres formats
+  sont réduits par un facteur entier (reduce) avant toute conversion
+- Le mode de couleur est normalisé (palette, transparence, niveaux de gris, 16 bits)
+- Chaque page est normalisée directement dans le tableau float32 du scan, alloué une
+  fois pour toutes ses pages, sans copie intermédiaire en float64 (le micro-batching
+  copie ensuite chaque page dans le tenseur de son batch)
+- Les scans multi-pages TIFF (et PDF si pypdfium2 est installé) sont ouverts une
+  seule fois puis traités page par page
+
+Les mesures de latence et la taille du tableau produit sont retournées avec chaque
+prétraitement.
+"""
+
+import io
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from PIL import Image
+
+IMAGE_SIZE = (224, 224)  # (largeur, hauteur) attendue par le modèle
+IMAGE_CHANNELS = 3  # 3: RGB, 1: niveaux de gris
+MAX_PAGES = 12  # Nombre maximal de pages analysées par scan
+
+# Modes que Image.reduce() ne prend pas en charge et leur conversion préalable
+_PRE_REDUCE_MODES = {'1': 'L', 'I;16': 'I', 'I;16L': 'I', 'I;16B': 'I', 'I;16N': 'I'}
+
+
+@contextmanager
+def open_scan(image_bytes, max_pages=MAX_PAGES):
+    """
+    Ouvre un scan une seule fois pour compter ses pages et les parcourir
+
+    Yields:
+        Tuple (nombre de pages à traiter, itérateur des pages). Les pages sont des images
+        PIL non encore décodées pour les formats matriciels; une seule est en mémoire à la fois
+    """
+    if image_bytes[:5] == b'%PDF-':
+        pdf = _open_pdf(image_bytes)
+        try:
+            pages = min(len(pdf), max_pages)
+            yield pages, _pdf_pages(pdf, pages)
+        finally:
+            pdf.close()
+        return
+
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        pages = min(getattr(image, 'n_frames', 1), max_pages)
+        yield pages, _image_pages(image, pages)
+
+
+def _image_pages(image, pages):
+    for index in range(pages):
+        if index:
+            image.seek(index)
+        yield image
+
+
+def _pdf_pages(pdf, pages):
+    for index in range(pages):
+        page = pdf[index]
+        try:
+            # Rendu directement à la taille cible plutôt qu'à pleine résolution
+            width, height = page.get_size()
+            scale = max(IMAGE_SIZE[0] / width, IMAGE_SIZE[1] / height)
+            yield page.render(scale=scale).to_pil()
+        finally:
+            page.close()
+
+
+def _open_pdf(pdf_bytes):
+    try:
+        import pypdfium2
+    except ImportError:
+        raise ValueError("La lecture des scans PDF nécessite pypdfium2 (pip install pypdfium2)")
+    return pypdfium2.PdfDocument(pdf_bytes)
+
+
+def _normalize_mode(image, target_mode):
+    """Convertit l'image vers target_mode ('RGB' ou 'L') en aplatissant la transparence sur fond blanc"""
+    if image.mode == target_mode:
+        return image
+
+    if image.mode == 'P':
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    if image.mode in ('RGBA', 'LA', 'PA', 'La', 'RGBa'):
+        # Le papier ECG est blanc: la transparence est remplacée par du blanc
+        background = Image.new(target_mode, image.size, 'white')
+        background.paste(image.convert(target_mode), mask=image.getchannel('A'))
+        return background
+
+    if image.mode in ('I', 'F'):
+        # Images 16 bits / flottantes: remise à l'échelle 8 bits selon la plage réelle
+        values = np.asarray(image, dtype=np.float32)
+        peak = float(values.max()) or 1.0
+        image = Image.fromarray(np.clip(values * (255.0 / peak), 0, 255).astype(np.uint8), 'L')
+
+    return image.convert(target_mode)
+
+
+def decode_into(image, out, size=IMAGE_SIZE, timings=None):
+    """
+    Décode une page à taille réduite et l'écrit normalisée dans out
+
+    Args:
+        image: Image PIL (page courante)
+        out: Vue float32 (hauteur, largeur, canaux) du buffer de destination
+        size: Taille cible (largeur, hauteur)
+        timings: Dictionnaire optionnel où ajouter les durées (en secondes) des étapes 'decode' et 'resize'
+    """
+    start = time.perf_counter()
+    channels = out.shape[-1]
+    target_mode = 'RGB' if channels == 3 else 'L'
+
+    # JPEG: décoder directement à une échelle 1/2, 1/4 ou 1/8 proche de la cible
+    if image.format == 'JPEG':
+        image.draft(target_mode, size)
+    image.load()
+    decoded = time.perf_counter()
+
+    if image.mode in _PRE_REDUCE_MODES:
+        image = image.convert(_PRE_REDUCE_MODES[image.mode])
+
+    # Réduction entière avant la conversion de mode pour travailler sur peu de pixels
+    factor = min(image.width // size[0], image.height // size[1])
+    if factor >= 2 and image.mode != 'P':
+        image = image.reduce(factor)
+
+    image = _normalize_mode(image, target_mode)
+    image = image.resize(size, Image.Resampling.BILINEAR)
+
+    pixels = np.asarray(image)
+    if pixels.ndim == 2:
+        pixels = pixels[..., np.newaxis]
+
+    # Normalisation écrite directement dans le buffer float32 (diffusion L -> RGB si nécessaire)
+    np.multiply(pixels, np.float32(1.0 / 255.0), out=out, casting='unsafe')
+
+    if timings is not None:
+        timings['decode'] = timings.get('decode', 0.0) + decoded - start
+        timings['resize'] = timings.get('resize', 0.0) + time.perf_counter() - decoded
+
+
+def preprocess_pages(image_bytes, channels=IMAGE_CHANNELS, max_pages=MAX_PAGES, out=None):
+    """
+    Prétraite toutes les pages d'un scan ECG
+
+    Args:
+        image_bytes: Bytes de l'image ou du scan multi-pages
+        channels: Nombre de canaux attendus par le modèle
+        max_pages: Nombre maximal de pages traitées
+        out: Buffer float32 (P, hauteur, largeur, canaux) préalloué, optionnel
+
+    Returns:
+        Tuple (tableau (pages, hauteur, largeur, canaux) float32, statistiques). buffer_mb
+        est la taille de ce tableau, propre à la requête (contrairement au RSS du processus)
+    """
+    start = time.perf_counter()
+    timings = {}
+
+    with open_scan(image_bytes, max_pages) as (pages, page_images):
+        if out is None:
+            out = np.empty((pages, IMAGE_SIZE[1], IMAGE_SIZE[0], channels), dtype=np.float32)
+        elif len(out) < pages:
+            raise ValueError(f"Buffer trop petit: {len(out)} pages pour {pages} pages")
+
+        for index, page in enumerate(page_images):
+            decode_into(page, out[index], timings=timings)
+
+    out = out[:pages]
+    stats = {
+        "pages": pages,
+        "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+        "decode_ms": round(timings.get('decode', 0.0) * 1000, 3),
+        "resize_ms": round(timings.get('resize', 0.0) * 1000, 3),
+        "buffer_mb": round(out.nbytes / (1024 * 1024), 3)
+    }
+
+    return out, stats
@@ -0,0 +1,377 @@
+"""
+Métriques de fonctionnement au format texte Prometheus, et profileur par échantillonnage.
+
+- Compteurs, jauges et histogrammes étiquetés, sans dépendance externe; les
+  jauges peuvent être calculées à la lecture (profondeur des files d'attente, ...).
+- instrument_app() mesure chaque requête Flask: nombre de requêtes par endpoint
+  et code de statut, erreurs (5xx), requêtes en cours et histogramme des latences.
+  L'endpoint est la règle de routage (ex: /api/sessions/<session_id>), pas l'URL,
+  pour borner le nombre de séries.
+- SamplingProfiler relève périodiquement la pile de tous les threads et agrège
+  les piles au format « collapsed » (une ligne « f1;f2;f3 nombre » par pile),
+  lu par flamegraph.pl ou speedscope pour produire un flame graph.
+"""
+
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as _StackCounter
+
+from flask import g, request
+
+# Bornes des histogrammes de latence (en secondes)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Étiquettes attendues pour {self.name}: {', '.join(self.labelnames)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Counter(_Metric):
+    """Compteur croissant"""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """
+    Valeur instantanée
+
+    Args:
+        collect: Fonction sans argument appelée à chaque lecture, retournant la valeur
+            (ou un dictionnaire {tuple des étiquettes: valeur}); remplace set()/inc()
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), collect=None):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        if self.collect is not None:
+            collected = self.collect()
+            values = collected if isinstance(collected, dict) else {(): collected}
+            with self._lock:
+                self._values = {tuple(str(part) for part in key): value for key, value in values.items()}
+        return super()._samples()
+
+
+class Histogram(_Metric):
+    """Distribution (nombre d'observations par borne, somme et nombre total)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Nombre par borne (dernière case: au-delà de la plus grande borne), somme
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, **labels):
+        """Gestionnaire de contexte observant la durée du bloc"""
+        return _Timer(self, labels)
+
+    def count(self, **labels):
+        series = self._values.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, (('le', _format_value(bound)),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """Ensemble des métriques exposées par /metrics"""
+
+    def __init__(self, prefix=''):
+        self.prefix = prefix
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrique déjà enregistrée: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self.prefix + name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), collect=None):
+        return self._register(Gauge(self.prefix + name, documentation, labelnames, collect))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self.prefix + name, documentation, labelnames, buckets))
+
+    def get(self, name):
+        return self._metrics.get(self.prefix + name)
+
+    def render(self):
+        """Toutes les métriques au format texte Prometheus (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def instrument_app(app, registry, exclude=('/metrics',)):
+    """
+    Mesure toutes les requêtes de l'application
+
+    Args:
+        exclude: Règles de routage non mesurées (ex: l'endpoint de collecte lui-même)
+
+    Returns:
+        Dictionnaire des métriques créées
+    """
+    requests_total = registry.counter(
+        'http_requests_total', "Requêtes HTTP traitées", ('method', 'endpoint', 'status')
+    )
+    errors_total = registry.counter(
+        'http_request_errors_total', "Requêtes HTTP terminées en erreur serveur (5xx)", ('method', 'endpoint')
+    )
+    in_flight = registry.gauge('http_requests_in_flight', "Requêtes HTTP en cours de traitement")
+    latency = registry.histogram(
+        'http_request_duration_seconds', "Durée de traitement des requêtes HTTP (jusqu'à l'envoi des en-têtes)",
+        ('method', 'endpoint')
+    )
+
+    def endpoint():
+        return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+    @app.before_request
+    def start_request_timer():
+        if endpoint() in exclude:
+            return
+        g.metrics_start = time.perf_counter()
+        in_flight.inc()
+
+    @app.after_request
+    def record_request(response):
+        if 'metrics_start' in g:
+            rule = endpoint()
+            latency.observe(time.perf_counter() - g.metrics_start, method=request.method, endpoint=rule)
+            requests_total.inc(method=request.method, endpoint=rule, status=response.status_code)
+            if response.status_code >= 500:
+                errors_total.inc(method=request.method, endpoint=rule)
+            g.metrics_recorded = True
+        return response
+
+    @app.teardown_request
+    def end_request(error=None):
+        # Appelé après after_request, ou seul si une exception n'a pas été gérée
+        # (pour un flux, à la fermeture du flux)
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return
+        if not g.pop('metrics_recorded', False):
+            rule = endpoint()
+            latency.observe(time.perf_counter() - start, method=request.method, endpoint=rule)
+            requests_total.inc(method=request.method, endpoint=rule, status=500)
+            errors_total.inc(method=request.method, endpoint=rule)
+        in_flight.dec()
+
+    return {
+        'requests_total': requests_total,
+        'errors_total': errors_total,
+        'in_flight': in_flight,
+        'latency': latency,
+    }
+
+
+class SamplingProfiler:
+    """
+    Profileur statistique de tous les threads du processus
+
+    Un thread relève la pile de chaque thread toutes les interval_ms millisecondes;
+    le coût est proportionnel à la fréquence d'échantillonnage, pas au code profilé.
+
+    Args:
+        interval_ms: Période d'échantillonnage
+        max_seconds: Durée maximale d'une capture (arrêt automatique)
+    """
+
+    def __init__(self, interval_ms=10, max_seconds=60):
+        self.interval = interval_ms / 1000.0
+        self.max_seconds = max_seconds
+        self._stacks = _StackCounter()
+        self._samples = 0
+        self._started_at = None
+        self._stopped_at = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms=None, max_seconds=None):
+        """Démarre une nouvelle capture (les échantillons précédents sont effacés); False si déjà en cours"""
+        with self._lock:
+            if self.running:
+                return False
+            if interval_ms is not None:
+                self.interval = max(1, interval_ms) / 1000.0
+            if max_seconds is not None:
+                self.max_seconds = max_seconds
+            self._stacks = _StackCounter()
+            self._samples = 0
+            self._started_at = time.time()
+            self._stopped_at = None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        """Arrête la capture en cours"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                functions = []
+                while frame is not None:
+                    code = frame.f_code
+                    functions.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                functions.append(names.get(thread_id, str(thread_id)))
+                stacks.append(';'.join(reversed(functions)))
+            with self._lock:
+                self._stacks.update(stacks)
+                self._samples += 1
+        self._stopped_at = time.time()
+
+    def collapsed(self):
+        """Piles agrégées au format « collapsed » (entrée de flamegraph.pl / speedscope)"""
+        with self._lock:
+            items = self._stacks.most_common()
+        return ''.join(f"{stack} {count}\n" for stack, count in items)
+
+    def status(self):
+        with self._lock:
+            return {
+                "running": self.running,
+                "interval_ms": round(self.interval * 1000, 3),
+                "max_seconds": self.max_seconds,
+                "samples": self._samples,
+                "distinct_stacks": len(self._stacks),
+                "started_at": self._started_at,
+                "stopped_at": self._stopped_at,
+            }
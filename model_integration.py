@@ -6,48 +6,272 @@ Pour utiliser ce script:
 1. Installez les dépendances: pip install flask flask-cors pillow numpy
 2. Exécutez: python model_integration.py
 
-Note: Cette version du script simule les prédictions du modèle XResNet sans charger réellement le modèle,
-en raison de contraintes d'environnement pour l'installation de TensorFlow.
+Note: Le modèle est chargé par model_runtime.py. Si MODEL_PATH n'existe pas, les prédictions du
+modèle XResNet sont simulées à partir des données cliniques; TensorFlow n'est importé que lorsqu'un
+vrai modèle .keras est chargé.
 """
 
+import atexit
+import operator
 import os
-import io
+import socket
+import uuid
 import json
+import logging
+import math
 import numpy as np
 import threading
 import time
 import random
+from concurrent.futures import Future
 from datetime import datetime, timedelta
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from PIL import Image
+
+import image_preprocessing
+import metrics
+import risk_scoring
+import sensor_ingestion
+import sensor_simulator
+import serialization
+import waveform_preprocessing
+from alert_engine import AlertEngine, build_rules
+from background_jobs import JobRegistry
+from batch_inference import MicroBatcher, when_all
+from event_stream import EventBus, StreamSlots, format_sse, sse_stream
+from history_export import HistoryArchive, parse_time_ms, replay as replay_history
+from prediction_cache import PredictionCache, make_key as make_cache_key
+from qna_search import QnASearchEngine
+from monitoring_state import DEFAULT_DEVICE_ID, ShardedDeviceRegistry
+from periodic_scheduler import PeriodicScheduler
+from priority_jobs import FINISHED, AdmissionError, PriorityJobQueue
+from session_store import SessionStore
+from state_backend import LeaderElection, StateBackendError, open_backend
+from timeseries_store import SENSOR_CHANNELS
+from model_runtime import ModelRuntime
 
 # Configuration
 MODEL_PATH = 'model.keras'  # Chemin vers votre modèle .keras
 PORT = 5000
 DEBUG = True
 
+# Configuration du runtime du modèle
+MODEL_LOAD_MODE = 'lazy'  # 'eager': chargement au démarrage, 'lazy': à la première requête
+MODEL_WORKERS = 0  # Nombre de processus d'inférence (0: dans le processus du serveur)
+
+# Configuration du micro-batching de l'inférence
+BATCH_MAX_SIZE = 32  # Nombre maximal d'échantillons évalués en un seul appel au modèle
+BATCH_MAX_WAIT_MS = 10  # Délai maximal d'attente pour compléter un batch
+ANALYZE_TIMEOUT = 30  # Délai maximal d'attente d'un résultat (en secondes)
+
+# Configuration de la file d'analyses (priorités, admission et délestage)
+ANALYSIS_WORKERS = 8  # Analyses exécutées simultanément (prétraitement et micro-batching), de l'ordre du nombre de cœurs
+ANALYSIS_URGENT_WORKERS = 2  # Parmi elles, réservées aux analyses urgentes
+ANALYSIS_QUEUE_MAX_DEPTH = 512  # Analyses en attente au-delà desquelles toute soumission est refusée (503)
+ANALYSIS_QUEUE_SHED_DEPTH = 128  # Analyses en attente au-delà desquelles seules les urgentes sont acceptées (503)
+ANALYSIS_MAX_PER_CLIENT = 32  # Analyses en attente ou en cours par client, X-Client-ID ou adresse (429 au-delà)
+ANALYSIS_DEADLINE = 60  # Attente maximale par défaut d'une analyse dans la file (en secondes, paramètre deadline)
+ANALYSIS_MAX_WAIT = 30  # Attente maximale d'un résultat par GET /api/analyze/jobs/<id>?wait= (en secondes)
+URGENT_TRIAGE_RULES = [('oldpeak', '>', 2.0), ('cp', '==', 0)]  # Une règle vérifiée suffit à classer une analyse urgente
+
+# Configuration du prétraitement des images ECG
+IMAGE_CHANNELS = 3  # Canaux attendus par le modèle (3: RGB, 1: niveaux de gris)
+MAX_SCAN_PAGES = 12  # Nombre maximal de pages analysées pour un scan multi-pages (TIFF/PDF)
+
+# Configuration de l'analyse des signaux ECG numériques (voir waveform_preprocessing.py)
+WAVEFORM_MODEL_PATH = 'model_waveform.keras'  # Modèle à entrée signal (fenêtres, échantillons, dérivations)
+WAVEFORM_SAMPLE_RATE = 500  # Fréquence d'échantillonnage attendue par le modèle (Hz)
+WAVEFORM_WINDOW_SECONDS = 10  # Durée d'une fenêtre analysée (en secondes)
+WAVEFORM_LEADS = 12  # Nombre de dérivations attendu par le modèle
+WAVEFORM_BAND_HZ = (0.5, 40.0)  # Bande passante du filtre (Hz)
+MAX_WAVEFORM_WINDOWS = 12  # Nombre maximal de fenêtres analysées par enregistrement
+
+# Configuration du cache des prédictions
+PREDICTION_CACHE_MAX_ENTRIES = 1024  # Nombre maximal de résultats gardés en mémoire
+PREDICTION_CACHE_MAX_MB = 64  # Taille maximale du cache en mémoire
+PREDICTION_CACHE_TTL = 24 * 3600  # Durée de vie d'un résultat en cache (en secondes)
+PREDICTION_CACHE_DB = None  # Chemin d'une base SQLite pour persister le cache (ex: 'prediction_cache.db')
+
+# Configuration de l'historique des capteurs
+HISTORY_RETENTION_HOURS = 24  # Durée d'historique conservée par capteur
+HISTORY_SAMPLE_RATE_HZ = 1  # Fréquence maximale d'échantillonnage par capteur (dimensionne les buffers)
+HISTORY_PREVIEW_POINTS = 50  # Nombre de points d'historique inclus dans /api/iot/sensors/current
+HISTORY_MAX_POINTS_LIMIT = 5000  # Budget de points maximal d'une requête d'historique réduite (maxPoints)
+
+# Configuration du monitoring multi-appareils
+DEVICE_SHARDS = 64  # Nombre de partitions (à verrou indépendant) de l'état des appareils
+MONITORING_INTERVAL = 2  # Période de mise à jour par défaut des capteurs (en secondes, préférence displaySettings.updateInterval)
+SENSOR_UPDATE_INTERVALS = {'temperature': 10}  # Périodes propres à certains capteurs (en secondes, préférence sensorIntervals)
+SIMULATION_SEED = None  # Graine de la simulation des capteurs (un entier pour des exécutions reproductibles)
+
+# Configuration de l'analyse en continu des signes vitaux (voir vitals_analytics.py)
+VITALS_EWMA_SHORT_SECONDS = 60  # Constante de temps de la moyenne mobile courte (tendance)
+VITALS_EWMA_LONG_SECONDS = 900  # Constante de temps de la moyenne mobile longue (référence de la tendance)
+VITALS_HRV_WINDOW = 64  # Nombre d'intervalles RR de la variabilité cardiaque (RMSSD, SDNN, pNN50)
+EARLY_WARNING_ALERT_SCORE = 5  # Score d'alerte précoce déclenchant une alerte (None: désactivé)
+
+# Configuration de la calibration des capteurs (exécutée en tâche de fond)
+CALIBRATION_DURATION = 2  # Durée simulée d'une calibration (en secondes)
+CALIBRATION_WORKERS = 4  # Nombre de calibrations exécutées simultanément
+JOB_RETENTION_SECONDS = 3600  # Durée de conservation de l'état d'une tâche terminée
+
+# Configuration du stockage des sessions de monitoring
+SESSION_DB_PATH = 'monitoring_sessions.db'  # Base SQLite des sessions (':memory:' pour ne pas persister)
+SESSION_FLUSH_INTERVAL = 0.05  # Délai maximal de regroupement des écritures (en secondes)
+SESSION_HISTORY_MAX_LIMIT = 1000  # Nombre maximal de sessions par page d'historique
+
+# Configuration de l'archive de l'historique (export en colonnes, voir history_export.py)
+HISTORY_ARCHIVE_DIR = 'sensor_archive'  # Répertoire de l'archive
+HISTORY_EXPORT_INTERVAL = 3600  # Période des exports automatiques (en secondes, None: à la demande), < rétention
+EXPORT_WORKERS = 2  # Nombre d'exports et de rejeux exécutés simultanément
+
+# Configuration de la recherche dans la base de connaissances (voir qna_search.py)
+QNA_PATH = 'CardioAI_QnA_v1.json'  # Fichier questions / réponses, relu quand il change
+QNA_CACHE_ENTRIES = 1024  # Nombre de résultats de recherche gardés en cache
+QNA_RELOAD_INTERVAL = 2  # Délai minimal entre deux vérifications du fichier (en secondes)
+QNA_MAX_LIMIT = 50  # Nombre maximal de résultats par recherche
+
+# Configuration de la sérialisation des réponses
+JSON_ENCODER = 'auto'  # 'auto': orjson s'il est installé, 'orjson' ou 'std'
+RESPONSE_COMPRESSION = True  # Compression gzip/brotli et ETag / If-None-Match
+
+# Configuration de l'observabilité
+METRICS_ENABLED = True  # Mesure des requêtes et endpoint /metrics (format Prometheus)
+PROFILER_ENABLED = False  # Autorise le profileur par échantillonnage (/api/debug/profiler)
+PROFILER_INTERVAL_MS = 10  # Période d'échantillonnage par défaut du profileur
+PROFILER_MAX_SECONDS = 60  # Durée maximale d'une capture du profileur
+LOG_LEVEL = 'INFO'  # Niveau des journaux (logging) quand le serveur est lancé directement ou par serve.py
+
+# Configuration de l'état partagé entre processus (plusieurs workers / machines)
+STATE_BACKEND_URL = 'memory://'  # 'memory://' (un processus), 'sqlite:///state.db' (une machine) ou 'redis://hôte:6379/0'
+STATE_SYNC_INTERVAL = 1  # Période de relecture de l'état partagé et de renouvellement du bail du leader (en secondes)
+LEADER_LEASE_SECONDS = 10  # Durée du bail du leader (monitoring, exports périodiques), > STATE_SYNC_INTERVAL
+DEVICE_LOG_INTERVAL = 0.2  # Période d'application du journal des appareils écrit par les autres processus (en secondes)
+DEVICE_LOG_MAX_ENTRIES = 200000  # Entrées conservées du journal des appareils (un nouveau processus rejoue ce qui reste)
+
+# Configuration du flux temps réel (Server-Sent Events)
+STREAM_REPLAY_SIZE = 10000  # Événements récents conservés pour la reprise après reconnexion
+STREAM_MAX_PENDING = 1000  # Événements en attente par client avant resynchronisation complète
+STREAM_KEEPALIVE = 15  # Intervalle des messages de maintien de connexion (en secondes)
+STREAM_MAX_CLIENTS = 16  # Flux SSE ouverts simultanément (chacun occupe un thread du serveur); au-delà: 503
+STREAM_RETRY_AFTER = 5  # Délai conseillé (Retry-After, en secondes) aux flux refusés
+
+# Journal de l'application (configuré par le lanceur: __main__ ci-dessous ou serve.py)
+logger = logging.getLogger(__name__)
+
 # Initialisation de l'application Flask
 app = Flask(__name__)
 CORS(app)  # Permettre les requêtes cross-origin
 
-# Variable globale pour indiquer si le modèle est "chargé"
+# Métriques (avant la sérialisation: les requêtes sont mesurées après compression et 304)
+metrics_registry = metrics.MetricsRegistry(prefix='cardioai_')
+if METRICS_ENABLED:
+    metrics.instrument_app(app, metrics_registry)
+serialization.init_app(app, json_encoder=JSON_ENCODER, compression=RESPONSE_COMPRESSION)
+
+analyze_stage_seconds = metrics_registry.histogram(
+    'analyze_stage_seconds',
+    "Durée des étapes d'une analyse (decode, resize ou read, filter, window; clinical, score, interpret)", ('stage',)
+)
+inference_batch_size = metrics_registry.histogram(
+    'inference_batch_size', "Nombre d'échantillons par appel au modèle", buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+analysis_jobs_total = metrics_registry.counter(
+    'analysis_jobs_total', "Analyses terminées par priorité et état (completed, failed, expired, cancelled)",
+    ('priority', 'status')
+)
+analysis_rejected_total = metrics_registry.counter(
+    'analysis_rejected_total', "Analyses refusées à la soumission (client_limit, queue_full, deadline)",
+    ('priority', 'reason')
+)
+model_load_seconds = metrics_registry.gauge('model_load_seconds', "Durée du chargement du modèle")
+monitoring_tick_seconds = metrics_registry.histogram(
+    'monitoring_tick_duration_seconds', "Durée d'un pas de mise à jour d'un groupe de capteurs sur tous les appareils",
+    ('sensors',)
+)
+monitoring_tick_drift_seconds = metrics_registry.histogram(
+    'monitoring_tick_drift_seconds', "Retard du démarrage de chaque pas de monitoring sur son échéance", ('sensors',)
+)
+monitoring_last_drift_seconds = metrics_registry.gauge(
+    'monitoring_last_tick_drift_seconds', "Retard du dernier pas de monitoring sur son échéance", ('sensors',)
+)
+monitoring_overruns_total = metrics_registry.counter(
+    'monitoring_overruns_total', "Pas de monitoring terminés après l'échéance suivante", ('sensors',)
+)
+monitoring_skipped_ticks_total = metrics_registry.counter(
+    'monitoring_skipped_ticks_total', "Pas de monitoring sautés à la suite d'un dépassement", ('sensors',)
+)
+alerts_total = metrics_registry.counter('alerts_total', "Alertes créées", ('sensor', 'type', 'severity'))
+ingested_readings_total = metrics_registry.counter(
+    'ingested_readings_total', "Mesures reçues par /api/iot/sensors/data", ('outcome',)
+)
+device_log_skipped_total = metrics_registry.counter(
+    'device_log_skipped_entries_total',
+    "Entrées du journal des appareils non appliquées (trimmed: retirées avant lecture, invalid: refusées)", ('reason',)
+)
+state_sync_errors_total = metrics_registry.counter(
+    'state_sync_errors_total', "Échecs d'accès à l'état partagé (sync, device_log, sessions)", ('operation',)
+)
+analysis_errors_total = metrics_registry.counter(
+    'analysis_errors_total', "Analyses terminées en erreur (500)", ('endpoint',)
+)
+profiler = metrics.SamplingProfiler(interval_ms=PROFILER_INTERVAL_MS, max_seconds=PROFILER_MAX_SECONDS)
+
+# Variable globale pour indiquer si le modèle est chargé
 model_loaded = False
 
-# Variables globales pour le système IoT
-iot_monitoring_active = False
-sensor_data = {
-    'heartRate': {'value': 72, 'unit': 'bpm', 'status': 'normal', 'history': []},
-    'bloodPressure': {'systolic': 120, 'diastolic': 80, 'unit': 'mmHg', 'status': 'normal', 'history': []},
-    'temperature': {'value': 36.5, 'unit': '°C', 'status': 'normal', 'history': []},
-    'oxygenSaturation': {'value': 98, 'unit': '%', 'status': 'normal', 'history': []},
-    'respiratoryRate': {'value': 16, 'unit': 'rpm', 'status': 'normal', 'history': []}
-}
-active_alerts = []
-monitoring_thread = None
+# Runtime d'inférence (chargement du modèle et pool de processus)
+inference_runtime = ModelRuntime(MODEL_PATH, load_mode=MODEL_LOAD_MODE, workers=MODEL_WORKERS)
+waveform_runtime = ModelRuntime(WAVEFORM_MODEL_PATH, load_mode=MODEL_LOAD_MODE, workers=MODEL_WORKERS)
+
+# Cache des résultats d'analyse (image + données patient + version du modèle)
+prediction_cache = PredictionCache(
+    max_entries=PREDICTION_CACHE_MAX_ENTRIES,
+    max_bytes=PREDICTION_CACHE_MAX_MB * 1024 * 1024,
+    ttl=PREDICTION_CACHE_TTL,
+    disk_path=PREDICTION_CACHE_DB
+)
+
+# Colonnes des mesures reçues (sensor_ingestion.FIELDS) par type de capteur
+INGESTION_COLUMNS = {}
+for _field, (_sensor_type, _channel) in sensor_ingestion.FIELD_CHANNELS.items():
+    INGESTION_COLUMNS.setdefault(_sensor_type, []).append(sensor_ingestion.FIELDS.index(_field))
+
+# État du système IoT, par patient / appareil (voir monitoring_state.py)
+device_registry = ShardedDeviceRegistry(
+    shards=DEVICE_SHARDS,
+    retention_seconds=HISTORY_RETENTION_HOURS * 3600,
+    sample_rate_hz=HISTORY_SAMPLE_RATE_HZ,
+    vitals_options={
+        'short_seconds': VITALS_EWMA_SHORT_SECONDS,
+        'long_seconds': VITALS_EWMA_LONG_SECONDS,
+        'hrv_window': VITALS_HRV_WINDOW
+    }
+)
+# Mises à jour périodiques des capteurs activés (une tâche par groupe de capteurs de même période)
+monitoring_scheduler = PeriodicScheduler(name='monitoring', observer=lambda *tick: record_monitoring_tick(*tick))
+monitoring_schedule_lock = threading.Lock()
+
+# Simulation des capteurs des appareils surveillés: un pas vectorisé pour tous les appareils
+simulation_rng = np.random.default_rng(SIMULATION_SEED)
+simulation_scenarios = {}  # deviceId -> (cibles du scénario, échéance time.monotonic() ou None)
+simulation_scenarios_lock = threading.Lock()
+
+# Tâches de calibration (l'endpoint répond immédiatement, le client suit l'état de la tâche)
+calibration_jobs = JobRegistry(max_workers=CALIBRATION_WORKERS, retention_seconds=JOB_RETENTION_SECONDS, name='calibration')
+
+# Archive de l'historique sur disque, exports et rejeux en tâches de fond
+history_archive = HistoryArchive(HISTORY_ARCHIVE_DIR)
+export_jobs = JobRegistry(max_workers=EXPORT_WORKERS, retention_seconds=JOB_RETENTION_SECONDS, name='export')
+history_export_thread = None
+
+# Diffusion des changements (valeurs et alertes) aux clients abonnés
+event_bus = EventBus(replay_size=STREAM_REPLAY_SIZE, max_pending=STREAM_MAX_PENDING)
+stream_slots = StreamSlots(STREAM_MAX_CLIENTS)
 
 # Variables globales pour la gestion des sessions et préférences
-monitoring_sessions = []
+session_store = SessionStore(SESSION_DB_PATH, flush_interval=SESSION_FLUSH_INTERVAL)
+atexit.register(session_store.close)
 user_preferences = {
     'enabledSensors': {
         'heartRate': True,
@@ -64,7 +288,7 @@ user_preferences = {
     'displaySettings': {
         'showCharts': True,
         'chartDuration': 20,
-        'updateInterval': 2000,
+        'updateInterval': MONITORING_INTERVAL * 1000,  # en millisecondes
         'theme': 'light'
     },
     'thresholds': {
@@ -76,21 +300,83 @@ user_preferences = {
     }
 }
 
+# Base de connaissances questions / réponses, indexée au démarrage
+qna_engine = QnASearchEngine(QNA_PATH, cache_entries=QNA_CACHE_ENTRIES, reload_interval=QNA_RELOAD_INTERVAL)
+
+# Alertes évaluées à partir des seuils des préférences (mis à jour à leur sauvegarde)
+alert_engine = AlertEngine(user_preferences['thresholds'], early_warning_score=EARLY_WARNING_ALERT_SCORE)
+
+# État partagé entre processus: préférences, appareils surveillés, journal des appareils et bail du leader.
+# Le backend et l'élection sont créés par prepare_server (dans chaque worker, après un éventuel fork);
+# sans élection (un seul processus), ce processus est toujours leader.
+state_backend = open_backend('memory://')
+leader_election = None
+state_sync_scheduler = PeriodicScheduler(name='state-sync')
+preferences_version = 0  # Version des préférences partagées appliquée localement
+MONITORED_DEVICES_KEY = 'monitoring:devices'
+SESSIONS_VERSION_KEY = 'sessions:version'
+DEVICE_LOG_KEY = 'devices:log'
+DEVICE_LOG_READ_BATCH = 500
+device_log_lock = threading.Lock()
+device_log_position = 0  # Dernière entrée du journal des appareils appliquée par ce processus
+
+# Profondeur des files d'attente et état des composants, relevés à chaque lecture de /metrics
+metrics_registry.gauge('model_loaded', "Modèle chargé (1) ou non (0)", collect=lambda: int(model_loaded))
+metrics_registry.gauge(
+    'inference_queue_depth', "Échantillons en attente du micro-batching",
+    collect=lambda: inference_batcher.queue_depth() + waveform_batcher.queue_depth()
+)
+metrics_registry.gauge(
+    'jobs', "Tâches de fond par file et par état", ('queue', 'status'),
+    collect=lambda: {
+        (name, status): count
+        for name, registry in (('calibration', calibration_jobs), ('export', export_jobs), ('analysis', analysis_jobs))
+        for status, count in registry.counts().items()
+    }
+)
+metrics_registry.gauge(
+    'analysis_queue_depth', "Analyses en attente par priorité", ('priority',),
+    collect=lambda: {(priority,): depth for priority, depth in analysis_jobs.stats()['depth'].items()}
+)
+metrics_registry.gauge(
+    'stream_subscribers', "Clients abonnés au flux temps réel", collect=lambda: event_bus.stats()['subscribers']
+)
+metrics_registry.gauge('streams_open', "Flux SSE ouverts (threads occupés)", collect=lambda: stream_slots.open)
+metrics_registry.gauge(
+    'streams_rejected', "Flux SSE refusés (limite STREAM_MAX_CLIENTS atteinte)", collect=lambda: stream_slots.rejected
+)
+metrics_registry.gauge(
+    'session_pending_writes', "Sessions en attente d'écriture en base", collect=lambda: session_store.pending_writes
+)
+metrics_registry.gauge('devices', "Appareils connus", collect=lambda: len(device_registry))
+metrics_registry.gauge(
+    'devices_monitored', "Appareils dont le monitoring est actif", collect=lambda: len(device_registry.active_devices())
+)
+metrics_registry.gauge(
+    'prediction_cache_entries', "Résultats d'analyse en cache", collect=lambda: prediction_cache.stats()['entries']
+)
+
 def load_model():
-    """Simule le chargement du modèle .keras"""
+    """Charge le modèle .keras via le runtime d'inférence (simulation si le fichier est absent)"""
     global model_loaded
     if not model_loaded:
-        print(f"Simulation du chargement du modèle depuis {MODEL_PATH}...")
+        logger.info("Chargement du modèle depuis %s...", MODEL_PATH)
         # Vérifier si le fichier existe réellement
         if os.path.exists(MODEL_PATH):
-            print(f"Le fichier {MODEL_PATH} existe et a une taille de {os.path.getsize(MODEL_PATH) / (1024*1024):.2f} Mo")
+            logger.info("Le fichier %s existe et a une taille de %.2f Mo",
+                        MODEL_PATH, os.path.getsize(MODEL_PATH) / (1024*1024))
         else:
-            print(f"ATTENTION: Le fichier {MODEL_PATH} n'existe pas!")
+            logger.warning("Le fichier %s n'existe pas! Mode simulation.", MODEL_PATH)
 
+        start = time.perf_counter()
+        inference_runtime.start()
+        waveform_runtime.start()
+        model_load_seconds.set(time.perf_counter() - start)
         model_loaded = True
-        print("Modèle 'chargé' avec succès (simulation)!")
+        logger.info("Modèle chargé avec succès (%s, mode %s, %s worker(s)) en %.2f s", inference_runtime.description,
+                    MODEL_LOAD_MODE, MODEL_WORKERS or 'aucun', model_load_seconds.value())
 
-    return "XResNet Model (Simulation)"
+    return inference_runtime.description
 
 def preprocess_image(image_bytes):
     """
@@ -100,33 +386,13 @@ def preprocess_image(image_bytes):
         image_bytes: Bytes de l'image ECG
 
     Returns:
-        Tableau numpy prétraité prêt pour le modèle
+        Tableau numpy float32 (1, 224, 224, C) de la première page, prêt pour le modèle
     """
-    # Ouvrir l'image depuis les bytes
-    image = Image.open(io.BytesIO(image_bytes))
-
-    # Redimensionner l'image aux dimensions attendues par le modèle
-    # Ajustez ces dimensions selon les spécifications de votre modèle
-    image = image.resize((224, 224))
-
-    # Convertir en tableau numpy et normaliser
-    img_array = np.array(image)
-
-    # Si l'image est en niveaux de gris, ajouter une dimension de canal
-    if len(img_array.shape) == 2:
-        img_array = np.expand_dims(img_array, axis=-1)
-
-    # Si l'image est en RGB et que le modèle attend du grayscale, convertir
-    # if len(img_array.shape) == 3 and img_array.shape[2] == 3:
-    #     img_array = np.mean(img_array, axis=2, keepdims=True)
-
-    # Normaliser les valeurs des pixels
-    img_array = img_array / 255.0
+    # Décodage à taille réduite et écriture directe dans un buffer float32
+    # Ajustez IMAGE_SIZE / IMAGE_CHANNELS selon les spécifications de votre modèle
+    pages, _ = image_preprocessing.preprocess_pages(image_bytes, channels=IMAGE_CHANNELS, max_pages=1)
 
-    # Ajouter la dimension de batch
-    img_array = np.expand_dims(img_array, axis=0)
-
-    return img_array
+    return pages
 
 def preprocess_clinical_data(data):
     """
@@ -183,17 +449,9 @@ def interpret_prediction(prediction):
         confidence = float(prediction[0])
 
     # Déterminer le diagnostic basé sur la probabilité
-    if confidence > 0.5:
-        diagnosis = "Maladie cardiaque détectée"
-        if confidence > 0.85:
-            details = "Signes fortement évocateurs d'une pathologie cardiaque sévère."
-        elif confidence > 0.7:
-            details = "Signes modérément évocateurs d'une pathologie cardiaque."
-        else:
-            details = "Signes légers évocateurs d'une pathologie cardiaque."
-    else:
-        diagnosis = "Normal"
-        details = "Aucune anomalie significative détectée."
+    details_index = int(risk_scoring.diagnosis_bands(confidence))
+    diagnosis = risk_scoring.DIAGNOSES[int(details_index > 0)]
+    details = risk_scoring.DETAILS[details_index]
 
     return {
         "diagnosis": diagnosis,
@@ -202,87 +460,457 @@ def interpret_prediction(prediction):
         "timestamp": datetime.now().isoformat()
     }
 
+def predict_batch(images, clinical_features):
+    """
+    Évalue un batch complet avec le modèle
+
+    Args:
+        images: Tenseur d'images (N, 224, 224, C)
+        clinical_features: Matrice clinique (N, 10)
+
+    Returns:
+        Future résolu avec le tableau numpy (N, 1) des probabilités prédites
+    """
+    # Charger le modèle à la première requête en mode lazy
+    _ = load_model()
+
+    inference_batch_size.observe(len(images))
+    return inference_runtime.submit(images, clinical_features)
+
+def predict_waveform_batch(signals, clinical_features):
+    """
+    Évalue un batch de fenêtres de signal avec le modèle à entrée signal
+
+    Args:
+        signals: Tenseur de fenêtres (N, échantillons, dérivations)
+        clinical_features: Matrice clinique (N, 10)
+
+    Returns:
+        Future résolu avec le tableau numpy (N, 1) des probabilités prédites
+    """
+    _ = load_model()
+
+    inference_batch_size.observe(len(signals))
+    return waveform_runtime.submit(signals, clinical_features)
+
+def build_analysis_result(prediction, features, runtime=inference_runtime):
+    """
+    Construit la réponse d'analyse d'un patient
+
+    Args:
+        prediction: Ligne de prédiction du modèle pour ce patient
+        features: Vecteur de 10 caractéristiques cliniques du patient
+        runtime: Runtime du modèle ayant produit la prédiction
+
+    Returns:
+        Dictionnaire de résultat sérialisable en JSON
+    """
+    # Interpréter les résultats
+    result = interpret_prediction(prediction)
+
+    # Ajouter des informations sur le modèle utilisé
+    result["model_info"] = runtime.description
+    result["risk_factors"] = {
+        "age": int(features[0]),
+        "trestbps": int(features[1]),
+        "chol": int(features[2]),
+        "thalach": int(features[3]),
+        "oldpeak": float(features[4]),
+        "ca": int(features[5])
+    }
+
+    return result
+
+def cached_analysis(image_bytes, patient_data):
+    """
+    Cherche une analyse d'image dans le cache de prédictions
+
+    Returns:
+        Tuple (clé de cache, résultat en cache ou None)
+    """
+    # Invalider le cache si le fichier du modèle a changé
+    prediction_cache.ensure_version(models_version())
+    cache_key = make_cache_key(image_bytes, patient_data, inference_runtime.version)
+
+    cached = prediction_cache.get(cache_key)
+    if cached is not None:
+        cached["cached"] = True
+    return cache_key, cached
+
+def submit_analysis(image_bytes, patient_data, cache_key=None):
+    """
+    Prétraite un patient et soumet chaque page de son scan au micro-batching
+
+    Args:
+        cache_key: Clé de cache déjà calculée par cached_analysis (le cache n'est alors pas relu)
+
+    Returns:
+        Analyse en attente (dictionnaire); contient directement le résultat si
+        l'analyse est déjà dans le cache de prédictions
+    """
+    if cache_key is None:
+        cache_key, cached = cached_analysis(image_bytes, patient_data)
+        if cached is not None:
+            return {"result": cached}
+
+    pages, stats = image_preprocessing.preprocess_pages(image_bytes, channels=IMAGE_CHANNELS, max_pages=MAX_SCAN_PAGES)
+    analyze_stage_seconds.observe(stats['decode_ms'] / 1000, stage='decode')
+    analyze_stage_seconds.observe(stats['resize_ms'] / 1000, stage='resize')
+    with analyze_stage_seconds.time(stage='clinical'):
+        clinical_features = preprocess_clinical_data(patient_data)
+
+    return {
+        "futures": [inference_batcher.submit(page, clinical_features[0]) for page in pages],
+        "features": clinical_features[0],
+        "stats": stats,
+        "cache_key": cache_key
+    }
+
+def models_version():
+    """Version des deux modèles (images et signaux): tout changement vide le cache de prédictions"""
+    return f"{inference_runtime.version}+{waveform_runtime.version}"
+
+def cached_waveform_analysis(data, header, read_options, patient_data):
+    """
+    Cherche une analyse de signal dans le cache de prédictions, avant toute lecture du signal
+
+    La clé porte sur les octets reçus, les paramètres de lecture et de prétraitement: une
+    requête répétée n'est ni décodée, ni filtrée, ni découpée en fenêtres.
+
+    Args:
+        data: Octets du signal reçu (voir waveform_preprocessing.open_buffer)
+        header: Texte de l'en-tête WFDB, ou None
+        read_options: Paramètres de waveform_preprocessing.read_waveform (fmt, sample_rate, ...)
+        patient_data: Données cliniques du patient
+
+    Returns:
+        Tuple (clé de cache, résultat en cache ou None)
+    """
+    prediction_cache.ensure_version(models_version())
+    parameters = {
+        "patientData": patient_data,
+        "header": header,
+        "read": read_options,
+        "preprocessing": [WAVEFORM_SAMPLE_RATE, WAVEFORM_WINDOW_SECONDS, WAVEFORM_LEADS,
+                          list(WAVEFORM_BAND_HZ), MAX_WAVEFORM_WINDOWS],
+    }
+    cache_key = make_cache_key(memoryview(data), parameters, waveform_runtime.version)
+
+    cached = prediction_cache.get(cache_key)
+    if cached is not None:
+        cached["cached"] = True
+    return cache_key, cached
+
+def submit_waveform_analysis(waveform, patient_data, cache_key=None):
+    """
+    Prétraite un signal ECG numérique et soumet chaque fenêtre au micro-batching
+
+    Args:
+        waveform: Signal lu par waveform_preprocessing.read_waveform
+        patient_data: Données cliniques du patient
+        cache_key: Clé calculée par cached_waveform_analysis sur le signal reçu (None: résultat non mis en cache)
+
+    Returns:
+        Analyse en attente (voir submit_analysis)
+    """
+    windows, stats = waveform_preprocessing.preprocess_waveform(
+        waveform,
+        sample_rate=WAVEFORM_SAMPLE_RATE,
+        window_seconds=WAVEFORM_WINDOW_SECONDS,
+        leads=WAVEFORM_LEADS,
+        band=WAVEFORM_BAND_HZ,
+        max_windows=MAX_WAVEFORM_WINDOWS
+    )
+    analyze_stage_seconds.observe(stats['filter_ms'] / 1000, stage='filter')
+    analyze_stage_seconds.observe(stats['window_ms'] / 1000, stage='window')
+
+    with analyze_stage_seconds.time(stage='clinical'):
+        clinical_features = preprocess_clinical_data(patient_data)
+
+    return {
+        "futures": [waveform_batcher.submit(window, clinical_features[0]) for window in windows],
+        "features": clinical_features[0],
+        "stats": stats,
+        "cache_key": cache_key,
+        "runtime": waveform_runtime,
+        "unit": "window"
+    }
+
+def collect_analysis(pending, timeout=ANALYZE_TIMEOUT):
+    """
+    Attend les prédictions d'une analyse soumise et construit le résultat
+
+    Pour un scan multi-pages (ou un signal de plusieurs fenêtres), la page la plus
+    évocatrice (confiance maximale) est retenue.
+    """
+    if "result" in pending:
+        return pending["result"]
+
+    # Attente du micro-batch et inférence
+    with analyze_stage_seconds.time(stage='score'):
+        predictions = [future.result(timeout=timeout) for future in pending["futures"]]
+    return finish_analysis(pending, predictions)
+
+def analysis_future(pending):
+    """
+    Future résolu avec le résultat d'une analyse soumise (voir collect_analysis)
+
+    Aucun thread n'attend le micro-batch: le résultat est construit par le thread
+    qui résout la dernière prédiction.
+    """
+    if "result" in pending:
+        future = Future()
+        future.set_result(pending["result"])
+        return future
+
+    started = time.perf_counter()
+
+    def build():
+        analyze_stage_seconds.observe(time.perf_counter() - started, stage='score')
+        return finish_analysis(pending, [future.result() for future in pending["futures"]])
+
+    return when_all(pending["futures"], build)
+
+def finish_analysis(pending, predictions):
+    """Construit le résultat d'une analyse à partir de ses prédictions et le met en cache"""
+    with analyze_stage_seconds.time(stage='interpret'):
+        page_index = int(np.argmax([float(np.ravel(prediction)[0]) for prediction in predictions]))
+        result = build_analysis_result(
+            predictions[page_index], pending["features"], pending.get("runtime", inference_runtime)
+        )
+    unit = pending.get("unit", "page")
+    result[f"{unit}s_analyzed"] = len(predictions)
+    if len(predictions) > 1:
+        result[unit] = page_index + 1
+    result["preprocessing"] = pending["stats"]
+
+    if pending["cache_key"] is not None:
+        prediction_cache.put(pending["cache_key"], result)
+    result["cached"] = False
+
+    return result
+
+# Ordonnanceur partagé par toutes les requêtes d'analyse
+inference_batcher = MicroBatcher(predict_batch, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS)
+waveform_batcher = MicroBatcher(predict_waveform_batch, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS)
+
+# File des analyses: les urgentes passent devant, les soumissions sont refusées (429 / 503) en surcharge
+analysis_jobs = PriorityJobQueue(
+    workers=ANALYSIS_WORKERS,
+    priorities=('urgent', 'routine'),
+    reserved_workers=ANALYSIS_URGENT_WORKERS,
+    max_depth=ANALYSIS_QUEUE_MAX_DEPTH,
+    shed_depth=ANALYSIS_QUEUE_SHED_DEPTH,
+    max_per_client=ANALYSIS_MAX_PER_CLIENT,
+    deadline=ANALYSIS_DEADLINE,
+    retention_seconds=JOB_RETENTION_SECONDS,
+    name='analysis',
+    observer=lambda job: analysis_jobs_total.inc(priority=job['priority'], status=job['status'])
+)
+
+_TRIAGE_OPERATORS = {'>': operator.gt, '<': operator.lt, '==': operator.eq, '!=': operator.ne}
+
+def triage_priority(patient_data, requested=None):
+    """
+    Priorité d'une analyse: 'urgent' si le client la demande (parcours urgences)
+    ou si une règle de URGENT_TRIAGE_RULES est vérifiée, 'routine' sinon
+
+    Seules les valeurs cliniques fournies sont évaluées (une valeur absente n'est
+    pas remplacée par sa valeur par défaut).
+
+    Raises:
+        ValueError: Données cliniques autres qu'un objet JSON, priorité demandée inconnue
+            ou valeur clinique non numérique
+    """
+    if not isinstance(patient_data, dict):
+        raise ValueError("patientData doit être un objet JSON")
+    if requested not in (None, '', 'urgent', 'routine'):
+        raise ValueError("priority doit valoir 'urgent' ou 'routine'")
+    if requested == 'urgent':
+        return 'urgent'
+    for column, op, threshold in URGENT_TRIAGE_RULES:
+        value = patient_data.get(column)
+        if value in (None, ''):
+            continue
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{column} doit être numérique")
+        if _TRIAGE_OPERATORS[op](value, threshold):
+            return 'urgent'
+    return 'routine'
+
+
+def run_image_analysis(image_bytes, patient_data, cache_key=None):
+    """
+    Analyse d'une image (exécutée par un worker de la file)
+
+    Le worker prétraite l'image et soumet ses pages au micro-batching, puis passe
+    à la tâche suivante: l'analyse se termine à la résolution du Future retourné.
+    """
+    return analysis_future(submit_analysis(image_bytes, patient_data, cache_key))
+
+def run_waveform_analysis(waveform, patient_data, read_ms, cache_key=None):
+    """Analyse d'un signal déjà lu (exécutée par un worker de la file, voir run_image_analysis)"""
+    pending = submit_waveform_analysis(waveform, patient_data, cache_key)
+    if "stats" in pending:
+        pending["stats"]["read_ms"] = read_ms
+    return analysis_future(pending)
+
+def run_batch_analysis(items, results):
+    """
+    Analyse d'un lot de patients (exécutée par un worker de la file, voir run_image_analysis)
+
+    Args:
+        items: Liste de (index, image, données cliniques, clé de cache) des patients à analyser
+        results: Liste des résultats du lot, déjà remplie pour les patients en cache ou invalides
+
+    Returns:
+        Future résolu avec la réponse du lot; une entrée invalide n'empêche pas l'analyse des autres
+    """
+    futures = []
+    for index, image_bytes, patient_data, cache_key in items:
+        try:
+            future = analysis_future(submit_analysis(image_bytes, patient_data, cache_key))
+        except Exception as e:
+            future = Future()
+            future.set_exception(e)
+        futures.append((index, future))
+
+    def build():
+        for index, future in futures:
+            error = future.exception()
+            results[index] = {"index": index, "error": str(error)} if error is not None \
+                else {**future.result(), "index": index}
+        return batch_response(results)
+
+    return when_all([future for _, future in futures], build)
+
+def batch_response(results):
+    return {
+        "status": "success",
+        "results": results,
+        "count": len(results),
+        "timestamp": datetime.now().isoformat()
+    }
+
 # ============================================================================
 # FONCTIONS IoT POUR LE MONITORING DES CAPTEURS
 # ============================================================================
 
-def simulate_sensor_reading(sensor_type, current_value):
-    """Simule la lecture d'un capteur avec des variations réalistes"""
-
-    if sensor_type == 'heartRate':
-        # Variation normale du rythme cardiaque (±5 bpm)
-        variation = random.uniform(-5, 5)
-        new_value = max(50, min(120, current_value + variation))
-        status = 'normal'
-        if new_value < 60:
-            status = 'low'
-        elif new_value > 100:
-            status = 'high'
-        return round(new_value), status
-
-    elif sensor_type == 'bloodPressure':
-        # Variation de la tension artérielle
-        systolic_var = random.uniform(-3, 3)
-        diastolic_var = random.uniform(-2, 2)
-        new_systolic = max(80, min(180, current_value['systolic'] + systolic_var))
-        new_diastolic = max(50, min(110, current_value['diastolic'] + diastolic_var))
-
-        status = 'normal'
-        if new_systolic > 140 or new_diastolic > 90:
-            status = 'high'
-        elif new_systolic < 90 or new_diastolic < 60:
-            status = 'low'
-
-        return {'systolic': round(new_systolic), 'diastolic': round(new_diastolic)}, status
-
-    elif sensor_type == 'temperature':
-        # Variation de température (±0.2°C)
-        variation = random.uniform(-0.2, 0.2)
-        new_value = max(35.0, min(39.0, current_value + variation))
-        status = 'normal'
-        if new_value > 37.5:
-            status = 'high'
-        elif new_value < 36.0:
-            status = 'low'
-        return round(new_value, 1), status
-
-    elif sensor_type == 'oxygenSaturation':
-        # Variation de saturation en oxygène (±1%)
-        variation = random.uniform(-1, 1)
-        new_value = max(85, min(100, current_value + variation))
-        status = 'normal'
-        if new_value < 95:
-            status = 'low'
-        return round(new_value), status
-
-    elif sensor_type == 'respiratoryRate':
-        # Variation du rythme respiratoire (±1 rpm)
-        variation = random.uniform(-1, 1)
-        new_value = max(8, min(30, current_value + variation))
-        status = 'normal'
-        if new_value < 12 or new_value > 20:
-            status = 'warning'
-        return round(new_value), status
-
-    return current_value, 'normal'
-
-def update_sensor_data():
-    """Met à jour les données des capteurs en continu"""
-    global sensor_data, active_alerts
-
-    while iot_monitoring_active:
-        timestamp = datetime.now()
-
-        for sensor_type in sensor_data:
+def format_sensor_value(sensor_type, row):
+    """Valeur affichée d'une ligne de canaux (arrondie comme les mesures)"""
+    if sensor_type == 'bloodPressure':
+        return {'systolic': round(row[0]), 'diastolic': round(row[1])}
+    return round(row[0], 1) if sensor_type == 'temperature' else round(row[0])
+
+def format_history(sensor_type, timestamps_ms, values, minimums=None, maximums=None):
+    """
+    Construit les entrées JSON d'historique à partir des tableaux du buffer circulaire
+
+    Args:
+        sensor_type: Type de capteur
+        timestamps_ms: Horodatages en millisecondes epoch
+        values: Valeurs (n, canaux) (moyennes pour des agrégats)
+        minimums, maximums: Extrêmes (n, canaux) des agrégats, ajoutés aux entrées en 'min' / 'max'
+
+    Returns:
+        Liste de dictionnaires {'timestamp', 'time', 'value'} (et systolic/diastolic pour la tension)
+    """
+    entries = []
+    if minimums is not None:
+        extremes = zip(minimums.tolist(), maximums.tolist())
+    for timestamp_ms, row in zip(timestamps_ms.tolist(), values.tolist()):
+        timestamp = datetime.fromtimestamp(timestamp_ms / 1000)
+        entry = {
+            'timestamp': timestamp.isoformat(),
+            'time': timestamp.strftime('%H:%M:%S')
+        }
+        if sensor_type == 'bloodPressure':
+            systolic, diastolic = round(row[0]), round(row[1])
+            entry['value'] = f"{systolic}/{diastolic}"
+            entry['systolic'] = systolic
+            entry['diastolic'] = diastolic
+        else:
+            entry['value'] = round(row[0], 1) if sensor_type == 'temperature' else round(row[0])
+        if minimums is not None:
+            minimum, maximum = next(extremes)
+            entry['min'] = format_sensor_value(sensor_type, minimum)
+            entry['max'] = format_sensor_value(sensor_type, maximum)
+        entries.append(entry)
+
+    return entries
+
+def sensor_status(sensor_type, value):
+    """
+    Statut d'une valeur de capteur ('normal', 'low', 'high' ou 'warning') selon les seuils configurés
+
+    Args:
+        sensor_type: Type de capteur
+        value: Valeur mesurée ({'systolic', 'diastolic'} pour la tension artérielle)
+    """
+    return alert_engine.status(sensor_type, value)
+
+def simulation_values(device, columns):
+    """Valeurs courantes d'un appareil pour des colonnes de sensor_ingestion.FIELDS (sous le verrou de l'appareil)"""
+    values = []
+    for column in columns:
+        sensor_type, channel = sensor_ingestion.FIELD_CHANNELS[sensor_ingestion.FIELDS[column]]
+        values.append(device.sensor_data[sensor_type][SENSOR_CHANNELS[sensor_type][channel]])
+    return values
+
+def simulation_targets(devices):
+    """Cibles des scénarios d'anomalie actifs (None si aucun)"""
+    with simulation_scenarios_lock:
+        if not simulation_scenarios:
+            return None
+        now = time.time()
+        for device_id, (_, expires) in list(simulation_scenarios.items()):
+            if expires is not None and expires <= now:
+                del simulation_scenarios[device_id]
+
+        targets = np.full((len(devices), len(sensor_ingestion.FIELDS)), np.nan)
+        for index, device in enumerate(devices):
+            scenario = simulation_scenarios.get(device.device_id)
+            if scenario is not None:
+                targets[index] = scenario[0]
+        return targets
+
+def publish_sensor_update(device, sensor_type):
+    """Diffuse la valeur courante d'un capteur aux abonnés du flux temps réel"""
+    event_bus.publish('sensor', device.device_id, sensor_type, {
+        'deviceId': device.device_id,
+        'sensor': sensor_type,
+        **device.sensor_data[sensor_type]
+    })
+
+def update_device_sensors(device, timestamp, readings, sensor_types):
+    """
+    Applique les mesures simulées d'un appareil (sous le verrou de sa partition)
+
+    Args:
+        readings: Mesures indexées par colonne de sensor_ingestion.FIELDS
+        sensor_types: Capteurs mis à jour
+    """
+    timestamp_ms = int(timestamp.timestamp() * 1000)
+
+    with device.lock:
+        sensor_data = device.sensor_data
+        for sensor_type in sensor_types:
+            columns = INGESTION_COLUMNS[sensor_type]
             if sensor_type == 'bloodPressure':
                 current_value = {
                     'systolic': sensor_data[sensor_type].get('systolic', 120),
                     'diastolic': sensor_data[sensor_type].get('diastolic', 80)
                 }
+                new_value = {'systolic': int(readings[columns[0]]), 'diastolic': int(readings[columns[1]])}
             else:
                 current_value = sensor_data[sensor_type]['value']
+                new_value = readings[columns[0]] if sensor_type == 'temperature' else int(readings[columns[0]])
 
-            new_value, status = simulate_sensor_reading(sensor_type, current_value)
+            # Statut et alertes selon les seuils configurés (avec hystérésis)
+            status = check_thresholds_and_create_alerts(device, sensor_type, new_value, timestamp_ms)
+            changed = new_value != current_value or status != sensor_data[sensor_type]['status']
 
             # Mise à jour des données
             if sensor_type == 'bloodPressure':
@@ -294,66 +922,637 @@ def update_sensor_data():
             sensor_data[sensor_type]['status'] = status
             sensor_data[sensor_type]['lastUpdate'] = timestamp.isoformat()
 
-            # Ajouter à l'historique (garder seulement les 50 dernières valeurs)
-            history_entry = {
-                'timestamp': timestamp.isoformat(),
-                'time': timestamp.strftime('%H:%M:%S'),
-                'value': new_value if sensor_type != 'bloodPressure' else f"{new_value['systolic']}/{new_value['diastolic']}"
-            }
+            # Ajouter à l'historique (buffer circulaire couvrant HISTORY_RETENTION_HOURS)
+            # et aux statistiques en continu de l'appareil
+            if sensor_type == 'bloodPressure':
+                channel_values = (new_value['systolic'], new_value['diastolic'])
+            else:
+                channel_values = (new_value,)
+            device.history.append(sensor_type, timestamp_ms, channel_values)
+            device.vitals.update(sensor_type, timestamp_ms, channel_values)
 
-            sensor_data[sensor_type]['history'].append(history_entry)
-            if len(sensor_data[sensor_type]['history']) > 50:
-                sensor_data[sensor_type]['history'].pop(0)
+            # Seuls les changements sont diffusés aux clients du flux temps réel
+            if changed:
+                publish_sensor_update(device, sensor_type)
 
-            # Vérifier les seuils et créer des alertes si nécessaire
-            check_thresholds_and_create_alerts(sensor_type, new_value, status)
+        check_early_warning(device, timestamp_ms)
 
-        time.sleep(2)  # Mise à jour toutes les 2 secondes
+        # Nouvel instantané pour les lecteurs (une seule publication par pas de simulation)
+        device.publish()
 
-def check_thresholds_and_create_alerts(sensor_type, value, status):
-    """Vérifie les seuils et crée des alertes si nécessaire"""
-    global active_alerts
+def update_interval_seconds(value):
+    """
+    Période en secondes d'une préférence updateInterval
 
-    if status in ['high', 'low', 'warning']:
-        alert = {
-            'id': f"{sensor_type}_{datetime.now().timestamp()}",
-            'sensor': sensor_type,
-            'type': status,
-            'message': f"Valeur {status} détectée pour {sensor_type}: {value}",
-            'timestamp': datetime.now().isoformat(),
-            'severity': 'warning' if status == 'warning' else 'error',
-            'read': False
-        }
+    Le format des préférences l'exprime en millisecondes (2000), la page de
+    réglages en secondes (0.5 à 5): les valeurs d'au moins 100 sont des millisecondes.
+
+    Raises:
+        ValueError: Période absente, non numérique, non finie ou négative
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value <= 0:
+        raise ValueError(f"Période de mise à jour invalide: {value!r}")
+    return value / 1000.0 if value >= 100 else float(value)
+
+def sensor_enabled(preferences, sensor_type):
+    """Capteur activé dans enabledSensors (booléen ou {'enabled': booléen}; activé par défaut)"""
+    flag = (preferences.get('enabledSensors') or {}).get(sensor_type, True)
+    if isinstance(flag, dict):
+        flag = flag.get('enabled', True)
+    return bool(flag)
+
+def monitoring_intervals(preferences):
+    """
+    Période de mise à jour (en secondes) de chaque capteur activé
+
+    La période d'un capteur vient de sensorIntervals, sinon de SENSOR_UPDATE_INTERVALS,
+    sinon de displaySettings.updateInterval; elle est bornée par la fréquence
+    d'échantillonnage de l'historique (HISTORY_SAMPLE_RATE_HZ).
+
+    Raises:
+        ValueError: Période invalide
+    """
+    display = preferences.get('displaySettings') or {}
+    default = update_interval_seconds(display.get('updateInterval', MONITORING_INTERVAL * 1000))
+    overrides = preferences.get('sensorIntervals') or {}
+    unknown = set(overrides) - set(INGESTION_COLUMNS)
+    if unknown:
+        raise ValueError(f"Capteur inconnu dans sensorIntervals: {', '.join(sorted(unknown))}")
+
+    intervals = {}
+    for sensor_type in INGESTION_COLUMNS:
+        if not sensor_enabled(preferences, sensor_type):
+            continue
+        interval = overrides.get(sensor_type, SENSOR_UPDATE_INTERVALS.get(sensor_type))
+        interval = default if interval is None else update_interval_seconds(interval)
+        intervals[sensor_type] = max(interval, 1.0 / HISTORY_SAMPLE_RATE_HZ)
+    return intervals
+
+def update_sensor_group(sensor_types):
+    """Avance d'un pas la simulation de quelques capteurs, pour tous les appareils surveillés"""
+    devices = device_registry.active_devices()
+    if not devices or not is_monitoring_leader():
+        return
+
+    # Un seul pas de simulation vectorisé pour tous les appareils, limité aux colonnes des capteurs
+    columns = [column for sensor_type in sensor_types for column in INGESTION_COLUMNS[sensor_type]]
+    values = np.empty((len(devices), len(columns)))
+    for row, device in zip(values, devices):
+        with device.lock:
+            row[:] = simulation_values(device, columns)
+    targets = simulation_targets(devices)
+    readings = sensor_simulator.round_readings(
+        sensor_simulator.random_walk_step(
+            values, simulation_rng, targets[:, columns] if targets is not None else None, columns=columns
+        ),
+        columns
+    )
+
+    # Les mesures simulées passent par le journal des appareils: tous les processus les appliquent
+    record_device_event(
+        'simulate', timestamp=datetime.now().isoformat(), sensors=list(sensor_types), columns=columns,
+        readings={device.device_id: device_readings for device, device_readings in zip(devices, readings.tolist())}
+    )
+
+def apply_simulation(timestamp, sensors, columns, readings):
+    """Applique un pas de simulation (entrée 'simulate' du journal des appareils)"""
+    timestamp = datetime.fromisoformat(timestamp)
+    for device_id, device_readings in readings.items():
+        update_device_sensors(
+            device_registry.get_or_create(device_id), timestamp, dict(zip(columns, device_readings)), sensors
+        )
+
+def record_monitoring_tick(sensor_types, lateness, duration, overrun, skipped):
+    """Mesures d'un pas de monitoring (appelé par l'ordonnanceur après chaque pas)"""
+    sensors = ','.join(sensor_types)
+    monitoring_tick_seconds.observe(duration, sensors=sensors)
+    monitoring_tick_drift_seconds.observe(lateness, sensors=sensors)
+    monitoring_last_drift_seconds.set(lateness, sensors=sensors)
+    if overrun:
+        monitoring_overruns_total.inc(sensors=sensors)
+    if skipped:
+        monitoring_skipped_ticks_total.inc(skipped, sensors=sensors)
+
+def schedule_monitoring():
+    """
+    Planifie les mises à jour des capteurs activés selon les préférences
+
+    Les capteurs de même période sont mis à jour ensemble (une tâche, un
+    instantané publié par appareil et par pas). Les tâches inchangées gardent
+    leur phase. Sans appareil surveillé, ou si ce processus n'est pas le
+    leader, aucune tâche n'est planifiée.
+
+    Returns:
+        Période de chaque groupe de capteurs planifié {tuple des capteurs: secondes}
+    """
+    with monitoring_schedule_lock:
+        groups = {}
+        if device_registry.active_devices() and is_monitoring_leader():
+            for sensor_type, interval in monitoring_intervals(user_preferences).items():
+                groups.setdefault(interval, []).append(sensor_type)
+        wanted = {tuple(sensor_types): interval for interval, sensor_types in groups.items()}
+
+        current = monitoring_scheduler.periods()
+        for sensor_types in current:
+            if wanted.get(sensor_types) != current[sensor_types]:
+                monitoring_scheduler.cancel(sensor_types)
+        for sensor_types, interval in wanted.items():
+            if current.get(sensor_types) != interval:
+                monitoring_scheduler.schedule(
+                    sensor_types, interval, lambda sensor_types=sensor_types: update_sensor_group(sensor_types)
+                )
+        return wanted
+
+def publish_alerts(device, alerts):
+    """Diffuse les alertes créées pour un appareil"""
+    for alert in alerts:
+        event_bus.publish('alert', device.device_id, alert['sensor'], alert)
+        alerts_total.inc(sensor=alert['sensor'], type=alert['type'], severity=alert['severity'])
+        logger.info("Nouvelle alerte [%s]: %s", device.device_id, alert['message'])
+
+def check_thresholds_and_create_alerts(device, sensor_type, value, timestamp_ms):
+    """
+    Vérifie les seuils et crée des alertes si nécessaire (appelé sous le verrou de l'appareil)
+
+    Returns:
+        Statut du capteur après la mesure
+    """
+    status, alerts = alert_engine.evaluate(device.alerts, device.device_id, sensor_type, value, timestamp_ms)
+    publish_alerts(device, alerts)
+    return status
+
+def check_early_warning(device, timestamp_ms):
+    """Évalue le score d'alerte précoce de l'appareil après ses dernières mesures (sous son verrou)"""
+    publish_alerts(device, alert_engine.evaluate_early_warning(
+        device.alerts, device.device_id, device.vitals.early_warning(), timestamp_ms
+    ))
+
+def ingest_readings(device_id, sequences, timestamps_ms, values):
+    """
+    Valide, déduplique et ajoute en bloc les mesures reçues d'un appareil
+
+    Args:
+        device_id: Identifiant de l'appareil
+        sequences: Numéros de séquence int64 (-1: sans numéro)
+        timestamps_ms: Horodatages epoch en millisecondes
+        values: Valeurs (n, len(sensor_ingestion.FIELDS)), NaN pour les valeurs absentes
+
+    Returns:
+        Compteurs {'accepted', 'duplicates', 'rejected', 'late'}
+    """
+    # Validation à la réception (dépend de l'heure): le journal ne contient que des mesures valides
+    valid, values = sensor_ingestion.validate(timestamps_ms, values)
+    counts = record_device_event(
+        'ingest', device=device_id, sequences=sequences[valid], timestamps=timestamps_ms[valid], values=values[valid]
+    )
+    return {**counts, "rejected": int(np.count_nonzero(~valid))}
+
+def apply_readings(device, sequences, timestamps, values):
+    """
+    Déduplique et ajoute en bloc des mesures validées (entrée 'ingest' du journal des appareils)
+
+    Returns:
+        Compteurs {'accepted', 'duplicates', 'late'}
+    """
+    sequences = np.asarray(sequences, dtype=np.int64)
+    timestamps_ms = np.asarray(timestamps, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float32).reshape(len(timestamps_ms), len(sensor_ingestion.FIELDS))
+
+    device = device_registry.get_or_create(device)
+    with device.lock:
+        # Les renvois d'une même mesure (même numéro de séquence) sont ignorés
+        fresh = device.sequences.filter_new(sequences)
+        duplicates = int(np.count_nonzero(~fresh))
+        keep = np.flatnonzero(fresh)
+
+        order = np.argsort(timestamps_ms[keep], kind='stable')
+        sequences = sequences[keep][order]
+        timestamps_ms = timestamps_ms[keep][order]
+        values = values[keep][order]
+        stored = np.zeros(len(timestamps_ms), dtype=bool)
+
+        for sensor_type, columns in INGESTION_COLUMNS.items():
+            present = ~np.isnan(values[:, columns[0]])
+            # L'historique n'accepte que des horodatages croissants
+            last_timestamp = device.history.buffers[sensor_type].last_timestamp
+            if last_timestamp is not None:
+                present &= timestamps_ms >= last_timestamp
+            if not present.any():
+                continue
+
+            sensor_timestamps = timestamps_ms[present]
+            sensor_values = values[present][:, columns]
+            device.history.append_many(sensor_type, sensor_timestamps, sensor_values)
+            device.vitals.update_many(sensor_type, sensor_timestamps, sensor_values)
+            stored |= present
+
+            # Chaque mesure du lot est évaluée par les règles d'alerte, dans l'ordre chronologique
+            status, alerts = alert_engine.evaluate_many(
+                device.alerts, device.device_id, sensor_type, sensor_timestamps, sensor_values
+            )
+
+            # Valeur courante et statut à partir de la mesure la plus récente
+            latest = sensor_values[-1].tolist()
+            if sensor_type == 'bloodPressure':
+                new_value = {'systolic': round(latest[0]), 'diastolic': round(latest[1])}
+                device.sensor_data[sensor_type].update(new_value)
+            else:
+                new_value = round(latest[0], 1) if sensor_type == 'temperature' else round(latest[0])
+                device.sensor_data[sensor_type]['value'] = new_value
+
+            device.sensor_data[sensor_type]['status'] = status
+            device.sensor_data[sensor_type]['lastUpdate'] = datetime.fromtimestamp(
+                int(sensor_timestamps[-1]) / 1000
+            ).isoformat()
+            publish_sensor_update(device, sensor_type)
+            publish_alerts(device, alerts)
+
+        if stored.any():
+            # Seuls les numéros des mesures acceptées sont enregistrés (une mesure en retard peut être renvoyée)
+            device.sequences.record(sequences[stored])
+            check_early_warning(device, int(timestamps_ms[stored][-1]))
+            device.publish()
+
+    return {
+        "accepted": int(np.count_nonzero(stored)),
+        "duplicates": duplicates,
+        "late": int(np.count_nonzero(~stored))
+    }
+
+def apply_alert_read(device, alert):
+    """Marque une alerte comme lue (entrée 'read' du journal); retourne l'alerte, None si inconnue"""
+    device = device_registry.get(device)
+    if device is None:
+        return None
+    with device.lock:
+        alert = device.alerts.mark_read(alert)
+        if alert is not None:
+            device.publish()
+    return alert
+
+def apply_calibration(device, sensor, timestamp):
+    """Date de calibration d'un capteur (entrée 'calibrate' du journal)"""
+    device = device_registry.get(device)
+    if device is not None:
+        with device.lock:
+            device.sensor_data[sensor]['lastCalibration'] = timestamp
+            device.publish()
+
+def apply_scenario(device, scenario, expires_at):
+    """Démarre (ou arrête si scenario est None) un scénario d'anomalie (entrée 'scenario' du journal)"""
+    with simulation_scenarios_lock:
+        if scenario is None:
+            simulation_scenarios.pop(device, None)
+        else:
+            simulation_scenarios[device] = (sensor_simulator.scenario_targets(scenario), expires_at)
+
+# Opérations du journal des appareils: toute modification de l'état d'un appareil (historique,
+# alertes, statistiques, valeurs courantes) en passe par l'une d'elles
+DEVICE_EVENTS = {
+    'ingest': apply_readings,
+    'simulate': apply_simulation,
+    'read': apply_alert_read,
+    'calibrate': apply_calibration,
+    'scenario': apply_scenario,
+}
+
+def record_device_event(op, **fields):
+    """
+    Applique une modification de l'état des appareils dans tous les processus
+
+    Avec un état partagé, l'opération est ajoutée au journal des appareils puis
+    appliquée ici avec toutes les entrées qui la précèdent: chaque processus
+    applique les mêmes opérations dans le même ordre et obtient le même état
+    (historique, alertes et leurs identifiants, statistiques). Sinon elle est
+    appliquée directement.
+
+    Returns:
+        Résultat de l'opération (voir DEVICE_EVENTS)
+
+    Raises:
+        StateBackendError: Journal partagé injoignable (rien n'est appliqué)
+    """
+    if not state_backend.shared:
+        return DEVICE_EVENTS[op](**fields)
+    position = state_backend.append_log(DEVICE_LOG_KEY, {'op': op, **fields}, max_entries=DEVICE_LOG_MAX_ENTRIES)
+    return apply_device_log(until=position)
+
+def apply_device_log(until=None):
+    """
+    Applique les entrées du journal des appareils pas encore appliquées par ce processus
+
+    Args:
+        until: Entrée dont le résultat est retourné (lecture jusqu'à elle au moins)
+
+    Returns:
+        Résultat de l'entrée until (l'exception qu'elle a levée est relancée), None sans until
+    """
+    global device_log_position
+    outcome = None
+    with device_log_lock:
+        while until is None or device_log_position < until:
+            entries, first = state_backend.read_log(DEVICE_LOG_KEY, device_log_position, DEVICE_LOG_READ_BATCH)
+            if first > device_log_position + 1:
+                device_log_skipped_total.inc(first - device_log_position - 1, reason='trimmed')
+                logger.warning("Entrées %d à %d du journal des appareils retirées avant d'être appliquées "
+                               "(DEVICE_LOG_MAX_ENTRIES)", device_log_position + 1, first - 1)
+            if not entries:
+                break
+            for position, entry in entries:
+                try:
+                    result = DEVICE_EVENTS[entry.pop('op')](**entry)
+                except Exception as e:
+                    # Entrée invalide ici comme dans les autres processus: elle est ignorée partout
+                    result = e
+                    device_log_skipped_total.inc(reason='invalid')
+                    if position != until:
+                        logger.warning("Entrée %d du journal des appareils ignorée: %s", position, e)
+                device_log_position = position
+                if position == until:
+                    outcome = result
+    if isinstance(outcome, Exception):
+        raise outcome
+    return outcome
+
+def follow_device_log():
+    """Applique les modifications écrites par les autres processus (tâche périodique de chaque processus)"""
+    try:
+        apply_device_log()
+    except StateBackendError as e:
+        state_sync_errors_total.inc(operation='device_log')
+        logger.warning("Lecture du journal des appareils impossible: %s", e)
+
+def set_monitoring_active(device, active):
+    """Active ou désactive le monitoring d'un appareil dans ce processus; retourne False s'il était déjà dans cet état"""
+    with device.lock:
+        if device.active == active:
+            return False
+        device.active = active
+        device.publish()
+    return True
+
+def start_iot_monitoring(device_id=DEFAULT_DEVICE_ID):
+    """Démarre le monitoring IoT d'un appareil"""
+    device = device_registry.get_or_create(device_id)
+    if device.snapshot.active:
+        return False
+
+    # Commande enregistrée dans l'état partagé avant d'être appliquée: les autres processus la relisent
+    state_backend.add_member(MONITORED_DEVICES_KEY, device_id)
+    if not set_monitoring_active(device, True):
+        return False
+
+    # Un seul thread (du processus leader) met à jour tous les appareils actifs
+    schedule_monitoring()
+
+    logger.info("Monitoring IoT démarré pour %s", device_id)
+    return True
+
+def stop_iot_monitoring(device_id=DEFAULT_DEVICE_ID):
+    """Arrête le monitoring IoT d'un appareil"""
+    device = device_registry.get(device_id)
+    if device is None or not device.snapshot.active:
+        return False
+
+    state_backend.remove_member(MONITORED_DEVICES_KEY, device_id)
+    if not set_monitoring_active(device, False):
+        return False
+
+    # Dernier appareil arrêté: les tâches sont annulées immédiatement
+    if not device_registry.active_devices():
+        schedule_monitoring()
+
+    logger.info("Monitoring IoT arrêté pour %s", device_id)
+    return True
+
+def export_history(device_id=None, include_sessions=True, compact=False, compress=False):
+    """
+    Archive les nouveaux points de l'historique en mémoire (et les nouvelles sessions)
+
+    Args:
+        device_id: Appareil exporté (None: tous les appareils)
+        include_sessions: Exporter aussi les sessions sauvegardées depuis le dernier export
+        compact: Fusionner ensuite les fragments des jours terminés
+        compress: Fragments fusionnés en .npz compressés
+
+    Returns:
+        Nombre de points écrits par appareil, sessions écrites et fragments fusionnés
+    """
+    if device_id is None:
+        devices = device_registry.devices()
+    else:
+        device = device_registry.get(device_id)
+        devices = [] if device is None else [device]
+
+    points = {}
+    for device in devices:
+        written = history_archive.export_device(device.device_id, device.history)
+        points[device.device_id] = sum(written.values())
+
+    return {
+        "points": points,
+        "totalPoints": sum(points.values()),
+        "sessions": history_archive.export_sessions(session_store) if include_sessions else 0,
+        "mergedChunks": history_archive.compact_closed(compress=compress) if compact else 0,
+        "archive": HISTORY_ARCHIVE_DIR
+    }
+
+def run_history_exports():
+    """Exports périodiques: l'archive doit être complétée avant que le buffer circulaire ne soit recouvert"""
+    while True:
+        time.sleep(HISTORY_EXPORT_INTERVAL)
+        # Avec un état partagé, l'historique (identique dans tous les processus) est archivé par le leader seul
+        if state_backend.shared and not is_monitoring_leader():
+            continue
+        export_jobs.submit('history_export', export_history, None, True, key='history_export')
+
+def is_monitoring_leader():
+    """Ce processus exécute-t-il le monitoring simulé (toujours vrai avec un seul processus)"""
+    return leader_election is None or leader_election.is_leader
+
+def apply_preferences(preferences):
+    """
+    Applique des préférences à ce processus (seuils d'alerte, puis valeurs globales)
+
+    Raises:
+        TypeError, ValueError: Seuils invalides (rien n'est modifié)
+    """
+    if 'thresholds' in preferences:
+        alert_engine.configure(preferences['thresholds'])
+    user_preferences.update(preferences)
+
+def sync_shared_state():
+    """
+    Relit l'état partagé et renouvelle le bail du leader (tâche périodique de chaque processus)
 
-        # Éviter les doublons d'alertes récentes
-        recent_alerts = [a for a in active_alerts if a['sensor'] == sensor_type and
-                        datetime.fromisoformat(a['timestamp']) > datetime.now() - timedelta(minutes=5)]
+    Les préférences ne sont relues que lorsque leur version change. Le drapeau
+    de monitoring des appareils suit l'ensemble partagé; seul le leader planifie
+    les mises à jour simulées (schedule_monitoring annule les tâches des autres).
+    """
+    global preferences_version
+    try:
+        version = state_backend.version('preferences')
+        if version != preferences_version:
+            # Version notée avant d'appliquer: des préférences refusées ne sont pas relues à chaque période
+            preferences_version = version
+            preferences = state_backend.get('preferences')
+            if preferences:
+                apply_preferences(preferences)
+
+        monitored = state_backend.members(MONITORED_DEVICES_KEY)
+        for device_id in monitored:
+            set_monitoring_active(device_registry.get_or_create(device_id), True)
+        for device in device_registry.active_devices():
+            if device.device_id not in monitored:
+                set_monitoring_active(device, False)
+    except (StateBackendError, TypeError, ValueError) as e:
+        state_sync_errors_total.inc(operation='sync')
+        logger.warning("Synchronisation de l'état partagé impossible: %s", e)
+
+    if leader_election is not None:
+        leader_election.renew()
+    schedule_monitoring()
+
+def sessions_changed():
+    """Version partagée des sessions (ETag de l'historique identique dans tous les processus)"""
+    try:
+        state_backend.set(SESSIONS_VERSION_KEY, None)
+    except StateBackendError as e:
+        state_sync_errors_total.inc(operation='sessions')
+        logger.warning("Version partagée des sessions non mise à jour: %s", e)
+
+def leader_changed(leader):
+    logger.info("Processus %s: %s du monitoring", leader_election.owner, 'leader' if leader else 'plus leader')
 
-        if not recent_alerts:
-            active_alerts.append(alert)
-            print(f"Nouvelle alerte: {alert['message']}")
+def cached_json_response(fields, etag=None, **serialized):
+    """
+    Réponse JSON dont certains champs sont déjà sérialisés
 
-def start_iot_monitoring():
-    """Démarre le monitoring IoT"""
-    global iot_monitoring_active, monitoring_thread
+    Args:
+        fields: Champs à sérialiser
+        etag: ETag de la version de la ressource (304 si le client l'a déjà)
+        serialized: Champs fournis sous forme de JSON (ex: JSON mis en cache par instantané)
+    """
+    parts = [f"{app.json.dumps(key)}:{value}" for key, value in serialized.items()]
+    parts.extend(f"{app.json.dumps(key)}:{app.json.dumps(value)}" for key, value in fields.items())
+    response = Response('{' + ','.join(parts) + '}', mimetype='application/json')
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    return response
+
+def get_device_scope():
+    """
+    Identifiant de l'appareil (ou du patient) visé par la requête
 
-    if not iot_monitoring_active:
-        iot_monitoring_active = True
-        monitoring_thread = threading.Thread(target=update_sensor_data, daemon=True)
-        monitoring_thread.start()
-        print("Monitoring IoT démarré")
-        return True
-    return False
+    Lu dans les paramètres deviceId / patientId de l'URL ou du corps JSON;
+    l'appareil par défaut est utilisé si aucun n'est précisé.
+    """
+    body = request.get_json(silent=True) if request.is_json else None
+    for source in (request.args, body if isinstance(body, dict) else {}):
+        device_id = source.get('deviceId') or source.get('patientId')
+        if device_id:
+            return str(device_id)
+    return DEFAULT_DEVICE_ID
+
+def resolve_device():
+    """Appareil visé par la requête (l'appareil par défaut est créé à la demande), ou None"""
+    device_id = get_device_scope()
+    if device_id == DEFAULT_DEVICE_ID:
+        return device_registry.get_or_create(device_id)
+    return device_registry.get(device_id)
+
+def submit_analysis_job(job_type, fn, *args, patient_data, batch=None):
+    """
+    Soumet une analyse à la file, avec la priorité, l'échéance et le client de la requête
+
+    Paramètres: priority ('urgent' ou 'routine'; par défaut déduite des données
+    cliniques), deadline (attente maximale dans la file, en secondes). Le client
+    est identifié par l'en-tête X-Client-ID, à défaut par son adresse.
+
+    Args:
+        batch: Données cliniques des patients d'un lot, à la place de patient_data: le lot
+            compte pour un élément par patient et il est urgent si l'un d'eux l'est (les
+            données invalides d'un patient n'empêchent pas le tri des autres)
+
+    Raises:
+        ValueError: Paramètres invalides
+        AdmissionError: Analyse refusée (limite du client, file saturée)
+    """
+    requested = request.values.get('priority')
+    if batch is None:
+        priority = triage_priority(patient_data, requested)
+    else:
+        priority = triage_priority({}, requested)
+        for patient in batch:
+            try:
+                if triage_priority(patient, requested) == 'urgent':
+                    priority = 'urgent'
+                    break
+            except ValueError:
+                continue
+    try:
+        deadline = float(request.values.get('deadline', ANALYSIS_DEADLINE))
+    except ValueError:
+        raise ValueError("deadline doit être un nombre de secondes")
+    client = request.headers.get('X-Client-ID') or request.remote_addr
+    try:
+        return analysis_jobs.submit(job_type, fn, *args, priority=priority, client=client, deadline=deadline,
+                                    cost=1 if batch is None else len(batch))
+    except AdmissionError as e:
+        analysis_rejected_total.inc(priority=priority, reason=e.reason)
+        raise
+
+def retry_later_response(message, status, retry_after, **fields):
+    """Réponse 429 / 503 avec l'en-tête Retry-After"""
+    response = jsonify({"error": message, "retryAfter": retry_after, **fields, "timestamp": datetime.now().isoformat()})
+    response.headers['Retry-After'] = str(retry_after)
+    return response, status
+
+def stream_response(make_events):
+    """
+    Réponse Server-Sent Events occupant une place de stream_slots jusqu'à sa fermeture
 
-def stop_iot_monitoring():
-    """Arrête le monitoring IoT"""
-    global iot_monitoring_active
+    Args:
+        make_events: Fonction () -> générateur des messages SSE, appelée seulement si une place est libre
 
-    if iot_monitoring_active:
-        iot_monitoring_active = False
-        print("Monitoring IoT arrêté")
-        return True
-    return False
+    Returns:
+        Réponse du flux, ou 503 avec Retry-After si STREAM_MAX_CLIENTS flux sont déjà ouverts
+    """
+    if not stream_slots.acquire():
+        return retry_later_response(
+            "Trop de flux ouverts, réessayer plus tard", 503, STREAM_RETRY_AFTER, reason='stream_limit'
+        )
+    try:
+        response = Response(
+            stream_with_context(make_events()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    except Exception:
+        stream_slots.release()
+        raise
+    # Appelé par le serveur à la fin de la réponse, y compris si le client se déconnecte
+    response.call_on_close(stream_slots.release)
+    return response
+
+def analysis_job_response(job):
+    """Attend la fin d'une analyse soumise par un endpoint synchrone et retourne son résultat"""
+    # Attente bornée: une analyse en attente échoit à son échéance, une analyse en cours après ANALYZE_TIMEOUT
+    remaining = (datetime.fromisoformat(job['deadline']) - datetime.now()).total_seconds()
+    job = analysis_jobs.wait(job['id'], timeout=max(remaining, 0) + ANALYZE_TIMEOUT)
+    if job['status'] == 'completed':
+        return jsonify(job['result'])
+    if job['status'] == 'expired':
+        return retry_later_response(
+            "Analyse non commencée avant son échéance (serveur surchargé)", 503,
+            analysis_jobs.retry_after(job['priority']), reason='expired', jobId=job['id']
+        )
+    if job['status'] not in FINISHED:
+        # Le résultat reste disponible via GET /api/analyze/jobs/<id>
+        return jsonify({"error": "Délai d'analyse dépassé", "jobId": job['id']}), 504
+    analysis_errors_total.inc(endpoint=request.endpoint)
+    logger.error("Erreur lors de l'analyse %s: %s", job['id'], job.get('error'))
+    return jsonify({"error": job.get('error', "Analyse annulée")}), 500
 
 @app.route('/api/analyze', methods=['POST'])
 def analyze():
@@ -373,91 +1572,305 @@ def analyze():
 
         patient_data = json.loads(request.form['patientData'])
 
-        # Prétraiter les données (pour la démonstration)
-        _ = preprocess_image(image_bytes)  # Nous n'utilisons pas réellement cette valeur
-        clinical_features = preprocess_clinical_data(patient_data)
+        # Résultat en cache: servi immédiatement, sans passer par la file (ni être refusé en surcharge)
+        cache_key, cached = cached_analysis(image_bytes, patient_data)
+        if cached is not None:
+            return jsonify(cached)
 
-        # Simuler le chargement du modèle
-        _ = load_model()
-
-        # Simuler une prédiction basée sur les données cliniques
-        # Calculer un score de risque basé sur les données cliniques
-        # Extraire les valeurs des caractéristiques
-        features = clinical_features[0]  # Enlever la dimension de batch
-
-        # Colonnes numériques (indices 0-5)
-        age = features[0]
-        trestbps = features[1]  # Tension artérielle au repos
-        chol = features[2]  # Cholestérol
-        thalach = features[3]  # Fréquence cardiaque maximale
-        oldpeak = features[4]  # Dépression ST
-        ca = features[5]  # Nombre de vaisseaux principaux
-
-        # Colonnes catégorielles (indices 6-9)
-        slope = features[6]  # Pente du segment ST
-        restecg = features[7]  # ECG au repos
-        cp = features[8]  # Type de douleur thoracique
-        thal = features[9]  # Thalassémie
-
-        # Calculer un score de risque (similaire à celui du service de simulation)
-        risk_score = (
-            (2 if age > 60 else 0) +
-            (2 if trestbps > 140 else 0) +
-            (2 if chol > 240 else 0) +
-            (2 if thalach < 120 else 0) +
-            (3 if oldpeak > 2 else 0) +
-            (3 if ca > 1 else 0) +
-            (2 if cp == 0 else 0) +
-            (1 if restecg > 0 else 0) +
-            (2 if slope == 0 else 0) +
-            (2 if thal != 3 else 0)
-        )
+        # Prétraiter les données et évaluer chaque page via le micro-batching (regroupé avec
+        # les requêtes concurrentes), dans l'ordre de priorité de la file d'analyses
+        try:
+            job = submit_analysis_job('analysis', run_image_analysis, image_bytes, patient_data, cache_key,
+                                      patient_data=patient_data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except AdmissionError as e:
+            return retry_later_response(str(e), e.status, e.retry_after, reason=e.reason)
 
-        # Normaliser le score en une probabilité entre 0 et 1
-        confidence = min(0.5 + (risk_score / 20), 0.95)
+        return analysis_job_response(job)
 
-        # Créer une prédiction simulée
-        prediction = np.array([[confidence]])
+    except Exception as e:
+        analysis_errors_total.inc(endpoint='analyze')
+        logger.exception("Erreur lors de l'analyse: %s", e)
+        return jsonify({"error": str(e)}), 500
 
-        # Interpréter les résultats
-        result = interpret_prediction(prediction)
+@app.route('/api/analyze/waveform', methods=['POST'])
+def analyze_waveform():
+    """
+    Endpoint pour analyser un signal ECG numérique (échantillons) et des données cliniques
+
+    Le signal est envoyé soit en multipart (fichier 'signal', et 'header' pour un
+    enregistrement WFDB), soit directement comme corps de la requête
+    (application/octet-stream). Les paramètres (patientData, format, sampleRate,
+    leads, dtype, gain, layout) sont lus dans le formulaire ou dans l'URL.
+    """
+    try:
+        options = request.values
+        if 'patientData' not in options:
+            return jsonify({"error": "Aucune donnée clinique fournie"}), 400
+        patient_data = json.loads(options['patientData'])
+
+        if 'signal' in request.files:
+            source = request.files['signal'].stream
+        elif request.mimetype == 'application/octet-stream':
+            source = request.get_data(cache=False)
+        else:
+            return jsonify({"error": "Aucun signal ECG fourni"}), 400
+        header = request.files['header'].read().decode('latin-1') if 'header' in request.files else None
 
-        # Ajouter des informations sur le modèle utilisé
-        result["model_info"] = "XResNet (Simulation basée sur les données cliniques)"
-        result["risk_factors"] = {
-            "age": int(age),
-            "trestbps": int(trestbps),
-            "chol": int(chol),
-            "thalach": int(thalach),
-            "oldpeak": float(oldpeak),
-            "ca": int(ca)
+        fmt = options.get('format')
+        if fmt is not None and fmt not in waveform_preprocessing.FORMATS:
+            return jsonify({
+                "error": f"format doit valoir {', '.join(waveform_preprocessing.FORMATS)}"
+            }), 400
+
+        data = waveform_preprocessing.open_buffer(source)
+        read_options = {
+            "fmt": fmt,
+            "sample_rate": options.get('sampleRate', type=float),
+            "leads": options.get('leads', WAVEFORM_LEADS, type=int),
+            "dtype": options.get('dtype', 'float32'),
+            "gain": options.get('gain', waveform_preprocessing.RAW_GAIN, type=float),
+            "layout": options.get('layout', 'interleaved'),
         }
 
-        return jsonify(result)
+        # Résultat en cache: servi avant la lecture, le filtrage et le découpage du signal
+        cache_key, cached = cached_waveform_analysis(data, header, read_options, patient_data)
+        if cached is not None:
+            return jsonify(cached)
+
+        try:
+            with analyze_stage_seconds.time(stage='read'):
+                start = time.perf_counter()
+                waveform = waveform_preprocessing.read_waveform(
+                    data,
+                    header=header,
+                    max_seconds=MAX_WAVEFORM_WINDOWS * WAVEFORM_WINDOW_SECONDS,
+                    **read_options
+                )
+                read_ms = round((time.perf_counter() - start) * 1000, 3)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        try:
+            job = submit_analysis_job('waveform_analysis', run_waveform_analysis, waveform, patient_data, read_ms,
+                                      cache_key, patient_data=patient_data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except AdmissionError as e:
+            return retry_later_response(str(e), e.status, e.retry_after, reason=e.reason)
+
+        return analysis_job_response(job)
+
+    except Exception as e:
+        analysis_errors_total.inc(endpoint='analyze_waveform')
+        logger.exception("Erreur lors de l'analyse du signal: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """Endpoint pour analyser plusieurs patients (images ECG et données cliniques) en un seul envoi"""
+    try:
+        # Les images sont envoyées sous le même champ, dans le même ordre que les patients
+        image_files = request.files.getlist('ecgImages')
+        if not image_files:
+            return jsonify({"error": "Aucune image ECG fournie"}), 400
+
+        if 'patientData' not in request.form:
+            return jsonify({"error": "Aucune donnée clinique fournie"}), 400
+
+        patients = json.loads(request.form['patientData'])
+        if not isinstance(patients, list) or len(patients) != len(image_files):
+            return jsonify({
+                "error": "patientData doit être une liste de même longueur que ecgImages"
+            }), 400
+
+        # Résultats en cache servis directement; une entrée invalide n'empêche pas l'analyse des autres
+        results = [None] * len(patients)
+        items = []
+        for index, (image_file, patient_data) in enumerate(zip(image_files, patients)):
+            try:
+                image_bytes = image_file.read()
+                cache_key, cached = cached_analysis(image_bytes, patient_data)
+            except Exception as e:
+                results[index] = {"index": index, "error": str(e)}
+                continue
+            if cached is not None:
+                results[index] = {**cached, "index": index}
+            else:
+                items.append((index, image_bytes, patient_data, cache_key))
+
+        if not items:
+            return jsonify(batch_response(results))
+
+        # Le reste du lot passe par la file d'analyses: un élément par patient pour l'admission
+        try:
+            job = submit_analysis_job('batch_analysis', run_batch_analysis, items, results,
+                                      patient_data=None, batch=[item[2] for item in items])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except AdmissionError as e:
+            return retry_later_response(str(e), e.status, e.retry_after, reason=e.reason)
+
+        return analysis_job_response(job)
+
+    except Exception as e:
+        analysis_errors_total.inc(endpoint='analyze_batch')
+        logger.exception("Erreur lors de l'analyse par lot: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/analyze/cache', methods=['GET'])
+def get_prediction_cache_stats():
+    """Récupère les compteurs du cache de prédictions"""
+    try:
+        return jsonify({
+            "status": "success",
+            "cache": prediction_cache.stats(),
+            "timestamp": datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/analyze/cache', methods=['DELETE'])
+def clear_prediction_cache():
+    """Vide le cache de prédictions"""
+    try:
+        prediction_cache.clear()
+        return jsonify({
+            "status": "success",
+            "message": "Cache de prédictions vidé",
+            "timestamp": datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/analyze/jobs', methods=['POST'])
+def submit_analysis_job_endpoint():
+    """
+    Soumet une analyse (mêmes champs que /api/analyze) sans attendre son résultat
+
+    Répond 202 avec l'identifiant de la tâche, suivie via GET /api/analyze/jobs/<id>
+    (?wait=secondes pour attendre la fin) ou /api/analyze/jobs/<id>/events (flux SSE).
+    Paramètres priority et deadline: voir submit_analysis_job. En surcharge: 429
+    (limite du client) ou 503 (file saturée), avec Retry-After.
+    """
+    try:
+        if 'ecgImage' not in request.files:
+            return jsonify({"error": "Aucune image ECG fournie"}), 400
+        image_bytes = request.files['ecgImage'].read()
+
+        if 'patientData' not in request.form:
+            return jsonify({"error": "Aucune donnée clinique fournie"}), 400
+        patient_data = json.loads(request.form['patientData'])
+
+        try:
+            job = submit_analysis_job('analysis', run_image_analysis, image_bytes, patient_data,
+                                      patient_data=patient_data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except AdmissionError as e:
+            return retry_later_response(str(e), e.status, e.retry_after, reason=e.reason)
+
+        return job_accepted_response(job, "Analyse en file d'attente", f"/api/analyze/jobs/{job['id']}")
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/analyze/jobs', methods=['GET'])
+def get_analysis_queue_stats():
+    """État de la file d'analyses: profondeur par priorité, analyses en cours, refus"""
+    try:
+        return jsonify({
+            "status": "success",
+            "queue": analysis_jobs.stats(),
+            "jobs": analysis_jobs.counts(),
+            "timestamp": datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/analyze/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    """État d'une analyse (et son résultat une fois terminée); ?wait=secondes attend sa fin"""
+    try:
+        try:
+            wait = min(max(float(request.args.get('wait', 0)), 0.0), ANALYSIS_MAX_WAIT)
+        except ValueError:
+            return jsonify({"error": "wait doit être un nombre de secondes"}), 400
+
+        job = analysis_jobs.wait(job_id, timeout=wait) if wait else analysis_jobs.get(job_id)
+        if job is None:
+            return jsonify({"error": "Analyse non trouvée"}), 404
+
+        return jsonify({
+            "status": "success",
+            "job": job,
+            "timestamp": datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/analyze/jobs/<job_id>', methods=['DELETE'])
+def cancel_analysis_job(job_id):
+    """Annule une analyse encore en attente"""
+    try:
+        job = analysis_jobs.get(job_id)
+        if job is None:
+            return jsonify({"error": "Analyse non trouvée"}), 404
+        if not analysis_jobs.cancel(job_id):
+            return jsonify({"error": f"Analyse déjà {job['status']}", "job": job}), 409
 
+        return jsonify({
+            "status": "success",
+            "message": "Analyse annulée",
+            "job": analysis_jobs.get(job_id),
+            "timestamp": datetime.now().isoformat()
+        })
     except Exception as e:
-        print(f"Erreur lors de l'analyse: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/analyze/jobs/<job_id>/events', methods=['GET'])
+def stream_analysis_job(job_id):
+    """Flux Server-Sent Events des changements d'état d'une analyse, fermé à sa fin (événement 'job')"""
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Analyse non trouvée"}), 404
+
+    def events(job):
+        yield format_sse('job', app.json.dumps(job))
+        while job is not None and job['status'] not in ('completed', 'failed', 'expired', 'cancelled'):
+            status = job['status']
+            job = analysis_jobs.wait(job_id, timeout=STREAM_KEEPALIVE)
+            if job is None:
+                return
+            if job['status'] != status:
+                yield format_sse('job', app.json.dumps(job))
+            else:
+                yield ': keepalive\n\n'
+
+    return stream_response(lambda: events(job))
+
 # ============================================================================
 # ENDPOINTS IoT POUR LE MONITORING DES CAPTEURS
 # ============================================================================
 
 @app.route('/api/iot/start-monitoring', methods=['POST'])
 def start_monitoring():
-    """Démarre le monitoring IoT"""
+    """Démarre le monitoring IoT d'un appareil"""
     try:
-        success = start_iot_monitoring()
+        device_id = get_device_scope()
+        success = start_iot_monitoring(device_id)
         if success:
             return jsonify({
                 "status": "success",
                 "message": "Monitoring IoT démarré avec succès",
+                "deviceId": device_id,
                 "timestamp": datetime.now().isoformat()
             })
         else:
             return jsonify({
                 "status": "info",
                 "message": "Le monitoring IoT est déjà actif",
+                "deviceId": device_id,
                 "timestamp": datetime.now().isoformat()
             })
     except Exception as e:
@@ -465,82 +1878,271 @@ def start_monitoring():
 
 @app.route('/api/iot/stop-monitoring', methods=['POST'])
 def stop_monitoring():
-    """Arrête le monitoring IoT"""
+    """Arrête le monitoring IoT d'un appareil"""
     try:
-        success = stop_iot_monitoring()
+        device_id = get_device_scope()
+        success = stop_iot_monitoring(device_id)
         if success:
             return jsonify({
                 "status": "success",
                 "message": "Monitoring IoT arrêté avec succès",
+                "deviceId": device_id,
                 "timestamp": datetime.now().isoformat()
             })
         else:
             return jsonify({
                 "status": "info",
                 "message": "Le monitoring IoT n'était pas actif",
+                "deviceId": device_id,
                 "timestamp": datetime.now().isoformat()
             })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/iot/sensors/current', methods=['GET'])
-def get_current_sensor_data():
-    """Récupère les données actuelles de tous les capteurs"""
+@app.route('/api/iot/devices', methods=['GET'])
+def list_devices():
+    """Liste les appareils connus et leur état de monitoring"""
+    try:
+        devices = []
+        for device in device_registry.devices():
+            snapshot = device.snapshot
+            devices.append({
+                "deviceId": snapshot.device_id,
+                "monitoring_active": snapshot.active,
+                "unread_alerts": snapshot.unread_alerts
+            })
+
+        return jsonify({
+            "status": "success",
+            "devices": devices,
+            "count": len(devices),
+            "active_count": sum(1 for device in devices if device["monitoring_active"]),
+            # Tâches de mise à jour planifiées: période, pas exécutés, dépassements
+            "schedule": [
+                {"sensors": list(sensor_types), **stats}
+                for sensor_types, stats in monitoring_scheduler.stats().items()
+            ],
+            # Processus ayant répondu et élection du leader (None: un seul processus)
+            "process": {
+                "backend": state_backend.name,
+                "leader": is_monitoring_leader(),
+                "election": leader_election.status() if leader_election is not None else None
+            },
+            "timestamp": datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/iot/sensors/data', methods=['POST'])
+def receive_sensor_data():
+    """Reçoit les mesures des capteurs IoT réels (JSON, lot JSON, MessagePack ou trame binaire)"""
     try:
+        # Appareil par défaut des mesures sans deviceId (le corps n'est décodé qu'une fois)
+        default_device_id = request.args.get('deviceId') or request.args.get('patientId') or DEFAULT_DEVICE_ID
+        try:
+            batches, errors = sensor_ingestion.parse_request_body(
+                request.get_data(cache=False), request.content_type, default_device_id
+            )
+        except sensor_ingestion.IngestionError as e:
+            return jsonify({"error": str(e)}), 400
+
+        totals = {"accepted": 0, "duplicates": 0, "rejected": len(errors), "late": 0}
+        for device_id, (sequences, timestamps_ms, values) in batches.items():
+            counts = ingest_readings(device_id, sequences, timestamps_ms, values)
+            for key, count in counts.items():
+                totals[key] += count
+        for outcome, count in totals.items():
+            if count:
+                ingested_readings_total.inc(count, outcome=outcome)
+
+        if errors and not (totals["accepted"] or totals["duplicates"]):
+            return jsonify({
+                "error": "Aucune mesure valide",
+                "errors": [{"index": index, "error": message} for index, message in errors[:20]]
+            }), 400
+
         return jsonify({
             "status": "success",
-            "data": sensor_data,
-            "monitoring_active": iot_monitoring_active,
+            "message": "Données reçues",
+            "devices": list(batches),
+            **totals,
+            "errors": [{"index": index, "error": message} for index, message in errors[:20]],
             "timestamp": datetime.now().isoformat()
         })
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/iot/sensors/current', methods=['GET'])
+def get_current_sensor_data():
+    """Récupère les données actuelles de tous les capteurs d'un appareil"""
+    try:
+        device = resolve_device()
+        if device is None:
+            return jsonify({"error": "Appareil non trouvé"}), 404
+
+        # Dernier instantané publié: pas de verrou, JSON sérialisé une fois par version
+        snapshot = device.snapshot
+        # ?fields=value,status: champs retenus pour chaque capteur (sans 'history', l'historique n'est pas lu)
+        fields = serialization.requested_fields()
+
+        def build_data():
+            # L'historique récent est construit à partir du buffer circulaire, arrêté à l'instantané
+            data = {}
+            for sensor_type, current in snapshot.sensor_data.items():
+                entry = serialization.select_fields(current, fields)
+                if fields is None or 'history' in fields:
+                    entry = dict(entry, history=format_history(
+                        sensor_type,
+                        *device.history.last(sensor_type, HISTORY_PREVIEW_POINTS, snapshot.history_until_ms)
+                    ))
+                data[sensor_type] = entry
+            return app.json.dumps(data)
+
+        return cached_json_response(
+            {
+                "status": "success",
+                "deviceId": snapshot.device_id,
+                "monitoring_active": snapshot.active,
+                "version": snapshot.version,
+                "timestamp": datetime.now().isoformat()
+            },
+            etag=serialization.make_etag('current', snapshot.device_id, snapshot.version, fields),
+            data=snapshot.cached_json(('current', fields), build_data),
+            # Statistiques en continu, variabilité cardiaque et score d'alerte précoce
+            analytics=snapshot.cached_json('analytics', lambda: app.json.dumps(snapshot.vitals))
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/iot/stream', methods=['GET'])
+def stream_sensor_data():
+    """
+    Flux Server-Sent Events des changements de capteurs et des nouvelles alertes
+
+    Paramètres: deviceId (ou '*' pour tous les appareils), sensors (liste séparée par
+    des virgules), alerts (true/false), lastEventId (ou l'en-tête Last-Event-ID) pour reprendre.
+    503 avec Retry-After si STREAM_MAX_CLIENTS flux sont déjà ouverts.
+    """
+    try:
+        device_id = get_device_scope()
+        sensors = request.args.get('sensors')
+        sensors = {sensor for sensor in sensors.split(',') if sensor} if sensors else None
+        if sensors and not sensors <= set(SENSOR_CHANNELS):
+            return jsonify({"error": "Type de capteur invalide"}), 400
+        include_alerts = request.args.get('alerts', 'true').lower() != 'false'
+
+        last_event_id = event_bus.parse_token(request.headers.get('Last-Event-ID') or request.args.get('lastEventId'))
+
+        # Un identifiant inconnu ne crée pas d'appareil (et ses buffers d'historique)
+        if device_id != '*':
+            device = resolve_device()
+            if device is None:
+                return jsonify({"error": "Appareil non trouvé"}), 404
+
+        def snapshot():
+            devices = device_registry.devices() if device_id == '*' else [device]
+            state = {}
+            for device in devices:
+                device_snapshot = device.snapshot
+                state[device_snapshot.device_id] = {
+                    "data": {
+                        sensor_type: current for sensor_type, current in device_snapshot.sensor_data.items()
+                        if sensors is None or sensor_type in sensors
+                    },
+                    "monitoring_active": device_snapshot.active
+                }
+            return {"devices": state, "timestamp": datetime.now().isoformat()}
+
+        def events():
+            subscription, replay = event_bus.subscribe(device_id, sensors, include_alerts, last_event_id)
+            return sse_stream(event_bus, subscription, replay, snapshot, STREAM_KEEPALIVE)
+
+        return stream_response(events)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/iot/sensors/<sensor_type>/history', methods=['GET'])
 def get_sensor_history(sensor_type):
-    """Récupère l'historique d'un capteur spécifique"""
+    """
+    Récupère l'historique d'un capteur spécifique
+
+    Paramètres: hours (ou minutes) de la période, maxPoints (budget de points: agrégats
+    min/max/moyenne du niveau le plus fin qui tient dans le budget, sinon LTTB),
+    method ('auto' ou 'lttb')
+    """
     try:
-        hours = request.args.get('hours', 24, type=int)
+        hours = request.args.get('hours', 24, type=float)
+        minutes = request.args.get('minutes', type=float)
+        max_points = request.args.get('maxPoints', type=int)
+        method = request.args.get('method', 'auto')
 
-        if sensor_type not in sensor_data:
+        if sensor_type not in SENSOR_CHANNELS:
             return jsonify({"error": "Type de capteur invalide"}), 400
+        if method not in ('auto', 'lttb'):
+            return jsonify({"error": "Méthode de réduction invalide (auto ou lttb)"}), 400
 
-        # Filtrer l'historique selon la période demandée
-        cutoff_time = datetime.now() - timedelta(hours=hours)
-        history = sensor_data[sensor_type]['history']
+        device = resolve_device()
+        if device is None:
+            return jsonify({"error": "Appareil non trouvé"}), 404
 
-        filtered_history = [
-            entry for entry in history
-            if datetime.fromisoformat(entry['timestamp']) > cutoff_time
-        ]
-
-        return jsonify({
+        period = timedelta(minutes=minutes) if minutes is not None else timedelta(hours=hours)
+        cutoff_ms = int((datetime.now() - period).timestamp() * 1000)
+        response = {
             "status": "success",
+            "deviceId": device.device_id,
             "sensor_type": sensor_type,
-            "history": filtered_history,
-            "period_hours": hours,
-            "timestamp": datetime.now().isoformat()
-        })
+            "period_hours": hours if minutes is None else minutes / 60,
+        }
+
+        if max_points is None:
+            # Tous les points bruts: recherche dichotomique de la période dans le buffer circulaire
+            response["history"] = format_history(sensor_type, *device.history.query(sensor_type, since_ms=cutoff_ms))
+            response["resolution"] = 0
+        else:
+            max_points = min(max(max_points, 3), HISTORY_MAX_POINTS_LIMIT)
+            reduced = device.history.downsample(sensor_type, cutoff_ms, None, max_points, method)
+            response["history"] = format_history(
+                sensor_type, reduced['timestamps'], reduced['values'], reduced['minimums'], reduced['maximums']
+            )
+            response["resolution"] = reduced['resolution']
+            response["method"] = reduced['method']
+            response["maxPoints"] = max_points
+
+        response["timestamp"] = datetime.now().isoformat()
+        return jsonify(response)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/iot/alerts', methods=['GET'])
 def get_active_alerts():
-    """Récupère les alertes actives"""
+    """Récupère les alertes actives d'un appareil"""
     try:
-        # Filtrer les alertes des dernières 24 heures
-        cutoff_time = datetime.now() - timedelta(hours=24)
-        recent_alerts = [
-            alert for alert in active_alerts
-            if datetime.fromisoformat(alert['timestamp']) > cutoff_time
-        ]
-
-        return jsonify({
-            "status": "success",
-            "alerts": recent_alerts,
-            "count": len(recent_alerts),
-            "timestamp": datetime.now().isoformat()
-        })
+        device = resolve_device()
+        if device is None:
+            return jsonify({"error": "Appareil non trouvé"}), 404
+
+        # Alertes des dernières 24 heures, lues dans le dernier instantané publié
+        snapshot = device.snapshot
+        recent_alerts = snapshot.alerts_since(sensor_ingestion.now_ms() - 24 * 3600 * 1000)
+
+        # Le JSON est mis en cache par instantané, première alerte retenue et champs demandés
+        first = len(snapshot.alerts) - len(recent_alerts)
+        fields = serialization.requested_fields()
+        return cached_json_response(
+            {
+                "status": "success",
+                "deviceId": snapshot.device_id,
+                "count": len(recent_alerts),
+                "version": snapshot.version,
+                "timestamp": datetime.now().isoformat()
+            },
+            etag=serialization.make_etag('alerts', snapshot.device_id, snapshot.alerts_version, first, fields),
+            alerts=snapshot.cached_json(
+                ('alerts', first, fields),
+                lambda: app.json.dumps([serialization.select_fields(alert, fields) for alert in recent_alerts])
+            )
+        )
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -548,14 +2150,16 @@ def get_active_alerts():
 def mark_alert_as_read(alert_id):
     """Marque une alerte comme lue"""
     try:
-        for alert in active_alerts:
-            if alert['id'] == alert_id:
-                alert['read'] = True
-                return jsonify({
-                    "status": "success",
-                    "message": "Alerte marquée comme lue",
-                    "timestamp": datetime.now().isoformat()
-                })
+        device = resolve_device()
+        if device is None:
+            return jsonify({"error": "Appareil non trouvé"}), 404
+
+        if record_device_event('read', device=device.device_id, alert=alert_id):
+            return jsonify({
+                "status": "success",
+                "message": "Alerte marquée comme lue",
+                "timestamp": datetime.now().isoformat()
+            })
 
         return jsonify({"error": "Alerte non trouvée"}), 404
     except Exception as e:
@@ -563,41 +2167,212 @@ def mark_alert_as_read(alert_id):
 
 @app.route('/api/iot/sensors/status', methods=['GET'])
 def get_sensor_status():
-    """Récupère le statut de connexion des capteurs"""
+    """Récupère le statut de connexion des capteurs d'un appareil"""
     try:
+        device = resolve_device()
+        if device is None:
+            return jsonify({"error": "Appareil non trouvé"}), 404
+
         sensor_status = {}
-        for sensor_type in sensor_data:
+        snapshot = device.snapshot
+        for sensor_type, current in snapshot.sensor_data.items():
             sensor_status[sensor_type] = {
-                "connected": iot_monitoring_active,
-                "last_update": sensor_data[sensor_type].get('lastUpdate', 'N/A'),
-                "status": sensor_data[sensor_type]['status'],
+                "connected": snapshot.active,
+                "last_update": current.get('lastUpdate', 'N/A'),
+                "status": current['status'],
                 "battery_level": random.randint(80, 100),  # Simulation
                 "signal_strength": random.randint(75, 100)  # Simulation
             }
+        monitoring_active = snapshot.active
 
         return jsonify({
             "status": "success",
+            "deviceId": device.device_id,
             "sensors": sensor_status,
-            "monitoring_active": iot_monitoring_active,
+            "monitoring_active": monitoring_active,
             "timestamp": datetime.now().isoformat()
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def run_calibration(device_id, sensor_type):
+    """Calibration d'un capteur (exécutée dans le pool des tâches de calibration)"""
+    # Simulation du temps de calibration
+    time.sleep(CALIBRATION_DURATION)
+
+    record_device_event('calibrate', device=device_id, sensor=sensor_type, timestamp=datetime.now().isoformat())
+
+    return {
+        "message": f"Capteur {sensor_type} calibré avec succès",
+        "sensor_type": sensor_type,
+        "deviceId": device_id
+    }
+
 @app.route('/api/iot/sensors/<sensor_type>/calibrate', methods=['POST'])
 def calibrate_sensor(sensor_type):
-    """Calibre un capteur spécifique"""
+    """Démarre la calibration d'un capteur en tâche de fond (suivie via /api/iot/calibrations/<id>)"""
     try:
-        if sensor_type not in sensor_data:
+        if sensor_type not in SENSOR_CHANNELS:
             return jsonify({"error": "Type de capteur invalide"}), 400
 
-        # Simulation de calibration
-        time.sleep(2)  # Simulation du temps de calibration
+        device = resolve_device()
+        if device is None:
+            return jsonify({"error": "Appareil non trouvé"}), 404
+
+        # Une seule calibration en cours par capteur et par appareil
+        job = calibration_jobs.submit(
+            'calibration', run_calibration, device.device_id, sensor_type,
+            key=(device.device_id, sensor_type), sensor_type=sensor_type, deviceId=device.device_id
+        )
+        status_url = f"/api/iot/calibrations/{job['id']}"
+
+        response = jsonify({
+            "status": "accepted",
+            "message": f"Calibration du capteur {sensor_type} démarrée",
+            "jobId": job['id'],
+            "job": job,
+            "statusUrl": status_url,
+            "timestamp": datetime.now().isoformat()
+        })
+        response.headers['Location'] = status_url
+        return response, 202
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/iot/simulation/scenario', methods=['POST'])
+def set_simulation_scenario():
+    """
+    Injecte un scénario d'anomalie dans la simulation d'un appareil
+
+    Corps JSON: deviceId, scenario (voir sensor_simulator.SCENARIOS, null pour arrêter),
+    durationSeconds (optionnel, sans limite par défaut)
+    """
+    try:
+        device = resolve_device()
+        if device is None:
+            return jsonify({"error": "Appareil non trouvé"}), 404
+
+        body = request.get_json(silent=True) or {}
+        scenario = body.get('scenario')
+        duration = body.get('durationSeconds')
+
+        if scenario is not None:
+            try:
+                sensor_simulator.scenario_targets(scenario)
+            except ValueError as e:
+                return jsonify({"error": str(e), "scenarios": sorted(sensor_simulator.SCENARIOS)}), 400
+        # Scénario enregistré dans le journal des appareils: le leader courant ou un futur leader le simule
+        expires_at = time.time() + float(duration) if duration else None
+        record_device_event('scenario', device=device.device_id, scenario=scenario, expires_at=expires_at)
 
         return jsonify({
             "status": "success",
-            "message": f"Capteur {sensor_type} calibré avec succès",
-            "sensor_type": sensor_type,
+            "deviceId": device.device_id,
+            "scenario": scenario,
+            "durationSeconds": duration,
+            "timestamp": datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/export/history', methods=['POST'])
+def start_history_export():
+    """
+    Archive l'historique des capteurs et les sessions sur disque, en tâche de fond
+
+    Corps (optionnel): deviceId (un seul appareil), sessions (défaut: true),
+    compact (fusion des jours terminés), compress (fragments fusionnés en .npz)
+    """
+    try:
+        body = request.get_json(silent=True) or {}
+        device_id = body.get('deviceId')
+
+        # Un seul export en cours à la fois (les exports sont incrémentaux)
+        job = export_jobs.submit(
+            'history_export', export_history, device_id, bool(body.get('sessions', True)),
+            bool(body.get('compact', False)), bool(body.get('compress', False)),
+            key='history_export', deviceId=device_id
+        )
+        return job_accepted_response(job, "Export de l'historique démarré")
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/export/replay', methods=['POST'])
+def start_history_replay():
+    """
+    Rejoue l'historique archivé d'un appareil dans le moteur d'alertes, en tâche de fond
+
+    Corps: deviceId, since / until (date ISO UTC ou ms epoch), speed (facteur
+    d'accélération, défaut: au plus vite), sensors, thresholds (défaut: seuils des préférences)
+    """
+    try:
+        body = request.get_json(silent=True) or {}
+        device_id = body.get('deviceId', DEFAULT_DEVICE_ID)
+        sensors = body.get('sensors')
+        thresholds = body.get('thresholds', user_preferences['thresholds'])
+
+        try:
+            since_ms = parse_time_ms(body.get('since'))
+            until_ms = parse_time_ms(body.get('until'))
+            speed = float(body['speed']) if body.get('speed') else None
+            # Les seuils sont validés avant de lancer la tâche
+            AlertEngine(thresholds)
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": f"Paramètres de rejeu invalides: {e}"}), 400
+        if sensors is not None and any(sensor_type not in SENSOR_CHANNELS for sensor_type in sensors):
+            return jsonify({"error": "Type de capteur invalide"}), 400
+        if speed is not None and speed <= 0:
+            return jsonify({"error": "La vitesse de rejeu doit être positive"}), 400
+
+        job = export_jobs.submit(
+            'history_replay', replay_history, history_archive, device_id, thresholds, speed,
+            since_ms, until_ms, sensors, deviceId=device_id, speed=speed
+        )
+        return job_accepted_response(job, "Rejeu de l'historique démarré")
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/export/jobs/<job_id>', methods=['GET'])
+def get_export_job(job_id):
+    """État d'un export ou d'un rejeu"""
+    try:
+        job = export_jobs.get(job_id)
+        if job is None:
+            return jsonify({"error": "Tâche d'export non trouvée"}), 404
+
+        return jsonify({
+            "status": "success",
+            "job": job,
+            "timestamp": datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def job_accepted_response(job, message, status_url=None):
+    """Réponse 202 d'une tâche, suivie via status_url (par défaut /api/export/jobs/<id>)"""
+    status_url = status_url or f"/api/export/jobs/{job['id']}"
+    response = jsonify({
+        "status": "accepted",
+        "message": message,
+        "jobId": job['id'],
+        "job": job,
+        "statusUrl": status_url,
+        "timestamp": datetime.now().isoformat()
+    })
+    response.headers['Location'] = status_url
+    return response, 202
+
+@app.route('/api/iot/calibrations/<job_id>', methods=['GET'])
+def get_calibration_status(job_id):
+    """État d'une tâche de calibration"""
+    try:
+        job = calibration_jobs.get(job_id)
+        if job is None:
+            return jsonify({"error": "Calibration non trouvée"}), 404
+
+        return jsonify({
+            "status": "success",
+            "job": job,
             "timestamp": datetime.now().isoformat()
         })
     except Exception as e:
@@ -619,11 +2394,8 @@ def save_monitoring_session():
         # Ajouter un timestamp de sauvegarde
         session_data['savedAt'] = datetime.now().isoformat()
 
-        # Ajouter à la liste des sessions (garder seulement les 100 dernières)
-        global monitoring_sessions
-        monitoring_sessions.insert(0, session_data)
-        if len(monitoring_sessions) > 100:
-            monitoring_sessions = monitoring_sessions[:100]
+        # Écriture persistante (regroupée avec les autres sauvegardes en cours)
+        session_store.save(session_data)
 
         return jsonify({
             "status": "success",
@@ -637,19 +2409,34 @@ def save_monitoring_session():
 
 @app.route('/api/sessions/history', methods=['GET'])
 def get_session_history():
-    """Récupère l'historique des sessions"""
-    try:
-        limit = request.args.get('limit', 10, type=int)
-
-        # Limiter le nombre de sessions retournées
-        sessions_to_return = monitoring_sessions[:limit]
+    """
+    Récupère l'historique des sessions, de la plus récente à la plus ancienne
 
-        return jsonify({
+    Paramètres: limit (taille de la page), cursor (valeur next_cursor de la page précédente),
+    fields (champs retenus pour chaque session, ex: id,savedAt)
+    """
+    try:
+        limit = min(max(request.args.get('limit', 10, type=int), 0), SESSION_HISTORY_MAX_LIMIT)
+        cursor = request.args.get('cursor')
+        fields = serialization.requested_fields()
+        # Version relue avant les sessions: une écriture concurrente change l'ETag suivant, pas celui-ci
+        version = (session_store.version, state_backend.version(SESSIONS_VERSION_KEY) if state_backend.shared else 0)
+
+        try:
+            sessions, next_cursor = session_store.history(limit, cursor)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        response = jsonify({
             "status": "success",
-            "sessions": sessions_to_return,
-            "total": len(monitoring_sessions),
+            "sessions": [serialization.select_fields(session, fields) for session in sessions],
+            "total": session_store.count(),
+            "next_cursor": next_cursor,
             "timestamp": datetime.now().isoformat()
         })
+        # Inchangé tant qu'aucune session n'est sauvegardée ou supprimée
+        response.set_etag(serialization.make_etag('sessions', version, limit, cursor, fields), weak=True)
+        return response
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -658,7 +2445,7 @@ def get_session_history():
 def get_session(session_id):
     """Récupère une session spécifique"""
     try:
-        session = next((s for s in monitoring_sessions if s['id'] == session_id), None)
+        session = session_store.get(session_id)
 
         if session:
             return jsonify({
@@ -676,11 +2463,7 @@ def get_session(session_id):
 def delete_session(session_id):
     """Supprime une session"""
     try:
-        global monitoring_sessions
-        initial_count = len(monitoring_sessions)
-        monitoring_sessions = [s for s in monitoring_sessions if s['id'] != session_id]
-
-        if len(monitoring_sessions) < initial_count:
+        if session_store.delete(session_id):
             return jsonify({
                 "status": "success",
                 "message": "Session supprimée avec succès",
@@ -692,6 +2475,59 @@ def delete_session(session_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# ============================================================================
+# BASE DE CONNAISSANCES
+# ============================================================================
+
+@app.route('/api/qna/search', methods=['GET'])
+def search_qna():
+    """
+    Recherche dans la base de connaissances questions / réponses
+
+    Paramètres: q (question), tags (tous requis, séparés par des virgules), audience
+    (l'un des publics, séparés par des virgules), limit, fields (champs retenus par résultat)
+    """
+    try:
+        start = time.perf_counter()
+        query = request.args.get('q', '')
+        tags = [tag for tag in request.args.get('tags', '').split(',') if tag.strip()]
+        audiences = [audience for audience in request.args.get('audience', '').split(',') if audience.strip()]
+        limit = min(max(request.args.get('limit', 5, type=int), 1), QNA_MAX_LIMIT)
+
+        found = qna_engine.search(query, tags=tags, audiences=audiences, limit=limit)
+        if found is None:
+            return jsonify({"error": qna_engine.error or "Base de connaissances indisponible"}), 503
+
+        fields = serialization.requested_fields()
+        results = []
+        for entry, score in found["results"]:
+            metadata = entry.get('metadata') or {}
+            questions = entry.get('questions') or []
+            results.append(serialization.select_fields({
+                "id": entry.get('id'),
+                "question": questions[0] if questions else None,
+                "questions": questions,
+                "shortAnswer": entry.get('shortAnswer'),
+                "answer": entry.get('answer'),
+                "score": round(score, 4),
+                "tags": [tag for tag in str(metadata.get('tags') or '').split(';') if tag],
+                "audience": [audience for audience in str(metadata.get('audience') or '').split(';') if audience],
+                "source": metadata.get('source')
+            }, fields))
+
+        return jsonify({
+            "status": "success",
+            "query": query,
+            "results": results,
+            "count": len(results),
+            "total": found["total"],
+            "cached": found["cached"],
+            "took_ms": round((time.perf_counter() - start) * 1000, 3),
+            "timestamp": datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # ============================================================================
 # ENDPOINTS POUR LA GESTION DES PRÉFÉRENCES
 # ============================================================================
@@ -699,15 +2535,33 @@ def delete_session(session_id):
 @app.route('/api/preferences/save', methods=['POST'])
 def save_user_preferences():
     """Sauvegarde les préférences utilisateur"""
+    global user_preferences, preferences_version
     try:
         preferences = request.get_json()
 
         if not preferences:
             return jsonify({"error": "Préférences invalides"}), 400
 
-        # Mettre à jour les préférences globales
-        global user_preferences
+        # Seuils et périodes de mise à jour sont tous deux vérifiés avant d'appliquer quoi que ce soit
+        rules = None
+        if 'thresholds' in preferences:
+            try:
+                rules = build_rules(preferences['thresholds'])
+            except (TypeError, ValueError) as e:
+                return jsonify({"error": f"Seuils invalides: {e}"}), 400
+
+        merged = {**user_preferences, **preferences}
+        try:
+            monitoring_intervals(merged)
+        except (AttributeError, TypeError, ValueError) as e:
+            return jsonify({"error": f"Périodes de mise à jour invalides: {e}"}), 400
+
+        # Appliquer ensemble (état partagé, relu par les autres processus)
+        if rules is not None:
+            alert_engine.configure(rules=rules)
+        preferences_version = state_backend.set('preferences', merged)
         user_preferences.update(preferences)
+        schedule_monitoring()
 
         return jsonify({
             "status": "success",
@@ -731,13 +2585,104 @@ def get_user_preferences():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-if __name__ == '__main__':
+# ============================================================================
+# OBSERVABILITÉ
+# ============================================================================
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Métriques au format texte Prometheus"""
+    if not METRICS_ENABLED:
+        return jsonify({"error": "Métriques désactivées (METRICS_ENABLED)"}), 404
+    return Response(metrics_registry.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/api/debug/profiler', methods=['GET'])
+def get_profiler_status():
+    """État du profileur par échantillonnage"""
+    if not PROFILER_ENABLED:
+        return jsonify({"error": "Profileur désactivé (PROFILER_ENABLED)"}), 403
+    return jsonify({"status": "success", "profiler": profiler.status(), "timestamp": datetime.now().isoformat()})
+
+@app.route('/api/debug/profiler', methods=['POST'])
+def toggle_profiler():
+    """
+    Démarre ou arrête le profileur par échantillonnage
+
+    Corps: action ('start' ou 'stop'), interval_ms et seconds (durée maximale) pour 'start'
+    """
+    if not PROFILER_ENABLED:
+        return jsonify({"error": "Profileur désactivé (PROFILER_ENABLED)"}), 403
+    try:
+        body = request.get_json(silent=True) or {}
+        action = body.get('action')
+
+        if action == 'start':
+            try:
+                interval_ms = float(body.get('interval_ms', PROFILER_INTERVAL_MS))
+                seconds = min(float(body.get('seconds', PROFILER_MAX_SECONDS)), PROFILER_MAX_SECONDS)
+            except (TypeError, ValueError):
+                return jsonify({"error": "interval_ms et seconds doivent être des nombres"}), 400
+            if not profiler.start(interval_ms=interval_ms, max_seconds=seconds):
+                return jsonify({"error": "Une capture est déjà en cours"}), 409
+        elif action == 'stop':
+            profiler.stop()
+        else:
+            return jsonify({"error": "action doit valoir 'start' ou 'stop'"}), 400
+
+        return jsonify({"status": "success", "profiler": profiler.status(), "timestamp": datetime.now().isoformat()})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/debug/profiler/flamegraph', methods=['GET'])
+def get_profiler_flamegraph():
+    """Piles échantillonnées au format « collapsed » (flamegraph.pl, speedscope)"""
+    if not PROFILER_ENABLED:
+        return jsonify({"error": "Profileur désactivé (PROFILER_ENABLED)"}), 403
+    return Response(profiler.collapsed(), mimetype='text/plain')
+
+def configure_logging():
+    """Envoie les journaux sur la sortie d'erreur (niveau LOG_LEVEL), sauf si le journal racine est déjà configuré"""
+    logging.basicConfig(level=LOG_LEVEL, format='%(asctime)s %(levelname)s %(name)s [%(process)d]: %(message)s')
+
+def prepare_server():
+    """Vérifications et initialisations avant de servir les requêtes (appelé par serve.py, dans chaque worker)"""
+    global history_export_thread, state_backend, leader_election
+
     # Vérifier si le modèle existe
     if not os.path.exists(MODEL_PATH):
-        print(f"ATTENTION: Le modèle {MODEL_PATH} n'a pas été trouvé.")
-        print("Placez votre modèle .keras dans le même répertoire que ce script.")
-        print("L'API fonctionnera en mode simulation.")
+        logger.warning("Le modèle %s n'a pas été trouvé. Placez votre modèle .keras dans le même répertoire "
+                       "que ce script; l'API fonctionnera en mode simulation.", MODEL_PATH)
+
+    if qna_engine.error:
+        logger.warning("%s", qna_engine.error)
+
+    # Charger le modèle (et démarrer les workers d'inférence) avant la première requête
+    if MODEL_LOAD_MODE == 'eager':
+        load_model()
+
+    # État partagé: préférences et appareils surveillés relus périodiquement, un seul leader du monitoring,
+    # état des appareils reconstruit par chaque processus à partir du journal des appareils
+    if STATE_BACKEND_URL != 'memory://' and leader_election is None:
+        state_backend = open_backend(STATE_BACKEND_URL)
+        process_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        leader_election = LeaderElection(
+            state_backend, 'monitoring', process_id, ttl=LEADER_LEASE_SECONDS, on_change=leader_changed
+        )
+        atexit.register(leader_election.release)
+        session_store.on_change = sessions_changed
+        state_sync_scheduler.schedule('sync', STATE_SYNC_INTERVAL, sync_shared_state)
+        state_sync_scheduler.schedule('device-log', DEVICE_LOG_INTERVAL, follow_device_log)
+
+    # Exports périodiques de l'historique vers l'archive
+    if HISTORY_EXPORT_INTERVAL and history_export_thread is None:
+        history_export_thread = threading.Thread(target=run_history_exports, name='history-export', daemon=True)
+        history_export_thread.start()
+
+if __name__ == '__main__':
+    # Serveur de développement; en production: python serve.py
+    configure_logging()
+    prepare_server()
 
     # Démarrer le serveur
-    print(f"Démarrage du serveur sur le port {PORT}...")
-    app.run(host='0.0.0.0', port=PORT, debug=DEBUG)
+    logger.info("Démarrage du serveur sur le port %d...", PORT)
+    app.run(host='0.0.0.0', port=PORT, debug=DEBUG, threaded=True)
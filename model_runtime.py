@@ -0,0 +1,257 @@
+"""
+Runtime du modèle de détection de pathologies cardiaques.
+
+Chaque modèle (un par chemin) est chargé une seule fois par processus, au démarrage (mode 'eager') ou à
+la première requête (mode 'lazy'), puis rechargé dès que sa version (voir model_version) change. Les frameworks lourds (TensorFlow/Keras) ne sont
+importés qu'au moment du chargement, jamais à l'import de ce module.
+
+Formats pris en charge selon l'extension de MODEL_PATH:
+- .keras / .h5: modèle Keras (import paresseux de keras ou tensorflow.keras)
+- .npz: modèle de substitution linéaire, utilisable sur une machine sans GPU ni TensorFlow
+- fichier absent: simulation basée sur le score de risque clinique
+
+Avec workers > 0, l'inférence s'exécute dans un pool de processus: chaque worker
+charge son propre modèle, ce qui répartit les prédictions sur plusieurs cœurs
+au lieu de les sérialiser derrière le GIL.
+
+Pour créer un modèle de substitution:
+    python model_runtime.py --make-standin model_standin.npz
+"""
+
+import hashlib
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import numpy as np
+
+import risk_scoring
+
+# Modèles chargés dans le processus courant (processus principal ou worker du pool): chemin -> (version, modèle)
+_process_models = {}
+_process_models_lock = threading.Lock()
+
+
+class SimulatedModel:
+    """Simule le modèle XResNet à partir du score de risque clinique"""
+
+    description = "XResNet (Simulation basée sur les données cliniques)"
+
+    def predict(self, inputs):
+        _, clinical = inputs
+        confidences, _, _ = risk_scoring.score_features(clinical)
+        return confidences.reshape(-1, 1)
+
+
+class StandInModel:
+    """
+    Modèle de substitution léger: régression logistique sur les caractéristiques
+    cliniques et l'intensité moyenne de l'entrée (image ou signal)
+    """
+
+    description = "Modèle de substitution (régression logistique NumPy)"
+
+    def __init__(self, path):
+        with np.load(path) as weights:
+            self.clinical_weights = weights['clinical_weights'].astype(np.float32)
+            self.input_weight = np.float32(weights['input_weight'])
+            self.bias = np.float32(weights['bias'])
+
+    def predict(self, inputs):
+        signal, clinical = inputs
+        signal = np.asarray(signal, dtype=np.float32)
+        intensity = signal.reshape(len(signal), -1).mean(axis=1)
+        logits = np.asarray(clinical, dtype=np.float32) @ self.clinical_weights + intensity * self.input_weight + self.bias
+        return (1.0 / (1.0 + np.exp(-logits))).reshape(-1, 1)
+
+
+class KerasModel:
+    """Enveloppe un modèle Keras chargé paresseusement"""
+
+    description = "XResNet (Keras)"
+
+    def __init__(self, path):
+        try:
+            import keras
+            load = keras.models.load_model
+        except ImportError:
+            from tensorflow import keras
+            load = keras.models.load_model
+        self.model = load(path, compile=False)
+
+    def predict(self, inputs):
+        return np.asarray(self.model.predict(list(inputs), verbose=0))
+
+
+def load_model_file(path):
+    """
+    Charge le modèle correspondant à path
+
+    Returns:
+        Instance exposant predict([images, clinical]) et description
+    """
+    if not path or not os.path.exists(path):
+        return SimulatedModel()
+    if path.endswith('.npz'):
+        return StandInModel(path)
+    return KerasModel(path)
+
+
+def model_version(path):
+    """
+    Étiquette de version du modèle: change dès que le chemin ou le contenu du fichier change
+    """
+    if not path or not os.path.exists(path):
+        return f"simulation:{risk_scoring.__name__}"
+
+    stat = os.stat(path)
+    digest = hashlib.sha256(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def create_standin_model(path, seed=0):
+    """Écrit un petit modèle de substitution .npz pour les tests sur CPU"""
+    rng = np.random.default_rng(seed)
+    np.savez(
+        path,
+        clinical_weights=(rng.normal(0, 0.01, size=len(risk_scoring.FEATURE_COLUMNS))).astype(np.float32),
+        input_weight=np.float32(rng.normal(0, 0.1)),
+        bias=np.float32(0.0)
+    )
+    return path
+
+
+def _get_process_model(path):
+    """
+    Retourne le modèle de path dans le processus courant
+
+    Le modèle est chargé au premier appel, puis rechargé si le fichier a changé depuis: sinon l'ancien
+    modèle continuerait de répondre alors que le cache des prédictions a déjà adopté la nouvelle version.
+    """
+    version = model_version(path)
+    entry = _process_models.get(path)
+    if entry is None or entry[0] != version:
+        with _process_models_lock:
+            entry = _process_models.get(path)
+            if entry is None or entry[0] != version:
+                entry = _process_models[path] = (version, load_model_file(path))
+    return entry[1]
+
+
+def _init_worker(path, eager):
+    """Initialise un worker du pool: charge le modèle immédiatement en mode eager"""
+    if eager:
+        _get_process_model(path)
+
+
+def _predict_in_process(path, images, clinical):
+    return _get_process_model(path).predict([images, clinical])
+
+
+class ModelRuntime:
+    """
+    Point d'entrée unique de l'inférence
+
+    Args:
+        model_path: Chemin du modèle
+        load_mode: 'eager' (chargement au démarrage) ou 'lazy' (à la première requête)
+        workers: Nombre de processus d'inférence (0: dans le processus courant)
+    """
+
+    def __init__(self, model_path, load_mode='lazy', workers=0):
+        if load_mode not in ('eager', 'lazy'):
+            raise ValueError(f"Mode de chargement invalide: {load_mode}")
+
+        self.model_path = model_path
+        self.load_mode = load_mode
+        self.workers = max(0, int(workers))
+        self._pool = None
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    @property
+    def version(self):
+        return model_version(self.model_path)
+
+    @property
+    def description(self):
+        if not self.model_path or not os.path.exists(self.model_path):
+            return SimulatedModel.description
+        if self.model_path.endswith('.npz'):
+            return StandInModel.description
+        return KerasModel.description
+
+    def start(self):
+        """Démarre le runtime; en mode eager, charge le modèle (et les workers) immédiatement"""
+        if self.workers:
+            pool = self._get_pool()
+            if self.load_mode == 'eager':
+                # Forcer le démarrage de tous les workers (et donc le chargement du modèle)
+                for future in [pool.submit(os.getpid) for _ in range(self.workers)]:
+                    future.result()
+                self.loaded = True
+        elif self.load_mode == 'eager':
+            self.load()
+
+    def load(self):
+        """Charge le modèle dans le processus courant"""
+        model = _get_process_model(self.model_path)
+        self.loaded = True
+        return model
+
+    def submit(self, images, clinical):
+        """
+        Soumet un batch au modèle
+
+        Returns:
+            Future résolu avec le tableau (N, 1) des prédictions
+        """
+        if self.workers:
+            future = self._get_pool().submit(_predict_in_process, self.model_path, images, clinical)
+            future.add_done_callback(self._mark_loaded)
+            return future
+
+        future = Future()
+        try:
+            future.set_result(self.predict(images, clinical))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def predict(self, images, clinical):
+        """Prédiction synchrone dans le processus courant"""
+        return self.load().predict([images, clinical])
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _mark_loaded(self, future):
+        if future.exception() is None:
+            self.loaded = True
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    # 'spawn' évite de dupliquer les threads (Flask, micro-batching) du processus parent
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                        initializer=_init_worker,
+                        initargs=(self.model_path, self.load_mode == 'eager')
+                    )
+        return self._pool
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == '--make-standin':
+        create_standin_model(sys.argv[2])
+        print(f"Modèle de substitution écrit dans {sys.argv[2]}")
+    else:
+        print("Utilisation: python model_runtime.py --make-standin <chemin.npz>")
+        sys.exit(1)
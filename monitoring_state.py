@@ -0,0 +1,194 @@
+"""
+État du monitoring IoT par patient / appareil.
+
+Chaque appareil surveillé possède ses propres valeurs courantes, son historique et
+ses alertes. Les états sont répartis dans des partitions protégées chacune par son
+propre verrou (lock striping): deux appareils de partitions différentes ne se
+bloquent jamais mutuellement, ce qui permet de surveiller des milliers d'appareils
+dans un seul processus.
+
+Les lectures ne prennent aucun verrou: après chaque modification, l'écrivain
+publie un instantané immuable (copie de l'état, version croissante) et les
+lecteurs utilisent la dernière référence publiée. Le JSON d'un instantané est
+mis en cache: deux requêtes identiques entre deux mises à jour ne
+re-sérialisent rien.
+
+Chaque appareil tient aussi ses statistiques en continu (vitals_analytics.py),
+résumées dans chaque instantané.
+"""
+
+import threading
+import zlib
+
+from alert_engine import DeviceAlerts
+from sensor_ingestion import SequenceWindow
+from timeseries_store import SensorHistoryStore
+from vitals_analytics import VitalsAnalytics
+
+DEFAULT_DEVICE_ID = 'default'
+
+
+def initial_sensor_data():
+    """Valeurs initiales des capteurs d'un nouvel appareil"""
+    return {
+        'heartRate': {'value': 72, 'unit': 'bpm', 'status': 'normal'},
+        'bloodPressure': {'systolic': 120, 'diastolic': 80, 'unit': 'mmHg', 'status': 'normal'},
+        'temperature': {'value': 36.5, 'unit': '°C', 'status': 'normal'},
+        'oxygenSaturation': {'value': 98, 'unit': '%', 'status': 'normal'},
+        'respiratoryRate': {'value': 16, 'unit': 'rpm', 'status': 'normal'}
+    }
+
+
+class DeviceSnapshot:
+    """
+    Instantané immuable de l'état d'un appareil
+
+    Les dictionnaires d'un instantané sont des copies qui ne doivent pas être modifiées.
+    """
+
+    __slots__ = ('version', 'device_id', 'sensor_data', 'active', 'unread_alerts',
+                 'alerts', 'alerts_version', 'history_until_ms', 'vitals', '_json')
+
+    def __init__(self, version, device_id, sensor_data, active, unread_alerts,
+                 alerts, alerts_version, history_until_ms, vitals=None):
+        self.version = version
+        self.device_id = device_id
+        self.sensor_data = sensor_data
+        self.active = active
+        self.unread_alerts = unread_alerts
+        self.alerts = alerts  # AlertView
+        self.alerts_version = alerts_version
+        self.history_until_ms = history_until_ms
+        self.vitals = vitals
+        self._json = {}
+
+    def alerts_since(self, since_ms):
+        """Alertes créées après since_ms (recherche dichotomique dans le journal partagé)"""
+        return self.alerts.since(since_ms)
+
+    def cached_json(self, key, build):
+        """
+        JSON mis en cache pour cet instantané
+
+        Args:
+            key: Clé de la représentation (ex: 'current')
+            build: Fonction () -> chaîne JSON, appelée seulement à la première demande
+        """
+        value = self._json.get(key)
+        if value is None:
+            # Deux lecteurs simultanés peuvent construire la même valeur: sans conséquence
+            value = self._json[key] = build()
+        return value
+
+
+class DeviceState:
+    """
+    État de monitoring d'un appareil
+
+    Les champs mutables doivent être modifiés sous le verrou de la partition (lock).
+    """
+
+    def __init__(self, device_id, lock, retention_seconds, sample_rate_hz, vitals_options=None):
+        self.device_id = device_id
+        self.lock = lock
+        self.sensor_data = initial_sensor_data()
+        self.history = SensorHistoryStore(retention_seconds=retention_seconds, sample_rate_hz=sample_rate_hz)
+        self.vitals = VitalsAnalytics(**(vitals_options or {}))
+        self.alerts = DeviceAlerts()
+        self.active = False
+        self.sequences = SequenceWindow()
+        self.version = 0
+        self.snapshot = None
+        self.publish()
+
+    def publish(self):
+        """
+        Publie un nouvel instantané (à appeler sous le verrou, après chaque modification)
+
+        Les alertes ne sont pas recopiées: l'instantané reçoit une vue du journal partagé.
+        """
+        previous = self.snapshot
+        if previous is not None and previous.alerts_version == self.alerts.version:
+            alerts = previous.alerts
+        else:
+            alerts = self.alerts.view()
+
+        self.version += 1
+        self.snapshot = DeviceSnapshot(
+            version=self.version,
+            device_id=self.device_id,
+            sensor_data={sensor_type: dict(current) for sensor_type, current in self.sensor_data.items()},
+            active=self.active,
+            unread_alerts=self.alerts.unread,
+            alerts=alerts,
+            alerts_version=self.alerts.version,
+            history_until_ms=self.history.last_timestamp(),
+            vitals=self.vitals.summary()
+        )
+        return self.snapshot
+
+
+class ShardedDeviceRegistry:
+    """
+    Registre des appareils réparti en partitions à verrou indépendant
+
+    Args:
+        shards: Nombre de partitions
+        retention_seconds: Durée d'historique conservée par capteur
+        sample_rate_hz: Fréquence maximale d'échantillonnage par capteur
+        vitals_options: Paramètres de VitalsAnalytics de chaque appareil
+    """
+
+    def __init__(self, shards=64, retention_seconds=24 * 3600, sample_rate_hz=1.0, vitals_options=None):
+        self.retention_seconds = retention_seconds
+        self.sample_rate_hz = sample_rate_hz
+        self.vitals_options = vitals_options
+        self._shards = [({}, threading.RLock()) for _ in range(max(1, shards))]
+
+    def _shard(self, device_id):
+        # crc32 plutôt que hash(): répartition stable d'un processus à l'autre
+        return self._shards[zlib.crc32(device_id.encode('utf-8')) % len(self._shards)]
+
+    def lock_for(self, device_id):
+        """Verrou de la partition d'un appareil"""
+        return self._shard(device_id)[1]
+
+    def get(self, device_id):
+        devices, lock = self._shard(device_id)
+        with lock:
+            return devices.get(device_id)
+
+    def get_or_create(self, device_id):
+        devices, lock = self._shard(device_id)
+        with lock:
+            state = devices.get(device_id)
+            if state is None:
+                state = DeviceState(
+                    device_id, lock, self.retention_seconds, self.sample_rate_hz, self.vitals_options
+                )
+                devices[device_id] = state
+            return state
+
+    def remove(self, device_id):
+        devices, lock = self._shard(device_id)
+        with lock:
+            return devices.pop(device_id, None)
+
+    def devices(self):
+        """Liste (copie) de tous les états d'appareils"""
+        states = []
+        for devices, lock in self._shards:
+            with lock:
+                states.extend(devices.values())
+        return states
+
+    def active_devices(self):
+        """Liste des appareils dont le monitoring est actif"""
+        states = []
+        for devices, lock in self._shards:
+            with lock:
+                states.extend(state for state in devices.values() if state.active)
+        return states
+
+    def __len__(self):
+        return sum(len(devices) for devices, _ in self._shards)
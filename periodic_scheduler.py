@@ -0,0 +1,177 @@
+"""
+Ordonnanceur de tâches périodiques sur l'horloge monotone.
+
+Un seul thread exécute toutes les tâches, rangées dans un tas par échéance:
+- sans dérive: l'échéance suivante est calculée à partir de la précédente
+  (échéance + période), pas à partir de la fin de l'exécution; le temps de
+  traitement et l'imprécision du réveil ne s'accumulent pas
+- dépassements comptés: une exécution qui se termine après l'échéance suivante
+  est un dépassement; les périodes entièrement manquées sont sautées (pas de
+  rafale de rattrapage) et comptées
+- annulation immédiate: cancel() et cancel_all() réveillent le thread, qui
+  s'arrête dès qu'il n'a plus de tâche (aucun thread ni réveil quand rien n'est
+  planifié)
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+
+
+class _Task:
+    __slots__ = ('key', 'period', 'callback', 'deadline', 'cancelled',
+                 'runs', 'overruns', 'skipped', 'errors', 'max_lateness', 'max_duration')
+
+    def __init__(self, key, period, callback, deadline):
+        self.key = key
+        self.period = period
+        self.callback = callback
+        self.deadline = deadline
+        self.cancelled = False
+        self.runs = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.errors = 0
+        self.max_lateness = 0.0
+        self.max_duration = 0.0
+
+
+class PeriodicScheduler:
+    """
+    Tâches périodiques exécutées par un thread unique
+
+    Args:
+        name: Nom du thread
+        observer: Fonction (clé, retard, durée, dépassement, périodes sautées) appelée
+            après chaque exécution (mesures); retard et durée en secondes
+        clock: Horloge monotone (secondes)
+    """
+
+    def __init__(self, name='scheduler', observer=None, clock=time.monotonic):
+        self.name = name
+        self.observer = observer
+        self.clock = clock
+        self._tasks = {}
+        self._heap = []  # (échéance, ordre d'insertion, tâche)
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def schedule(self, key, period, callback, delay=0.0):
+        """
+        Planifie (ou replanifie) une tâche
+
+        Args:
+            key: Identifiant de la tâche; remplace la tâche de même clé
+            period: Période en secondes
+            callback: Fonction sans argument
+            delay: Délai avant la première exécution (en secondes)
+        """
+        if not math.isfinite(period) or period <= 0:
+            raise ValueError(f"La période doit être un nombre positif fini: {period!r}")
+        with self._condition:
+            previous = self._tasks.get(key)
+            if previous is not None:
+                previous.cancelled = True
+            task = self._tasks[key] = _Task(key, float(period), callback, self.clock() + max(0.0, delay))
+            heapq.heappush(self._heap, (task.deadline, next(self._order), task))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def cancel(self, key):
+        """Annule une tâche; False si elle n'était pas planifiée"""
+        with self._condition:
+            task = self._tasks.pop(key, None)
+            if task is None:
+                return False
+            task.cancelled = True
+            self._condition.notify()
+            return True
+
+    def cancel_all(self):
+        with self._condition:
+            for task in self._tasks.values():
+                task.cancelled = True
+            self._tasks.clear()
+            self._heap.clear()
+            self._condition.notify()
+
+    def periods(self):
+        """Période de chaque tâche planifiée {clé: secondes}"""
+        with self._condition:
+            return {key: task.period for key, task in self._tasks.items()}
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def stats(self):
+        """Compteurs de chaque tâche planifiée"""
+        with self._condition:
+            return {
+                key: {
+                    "period": task.period,
+                    "runs": task.runs,
+                    "overruns": task.overruns,
+                    "skipped": task.skipped,
+                    "errors": task.errors,
+                    "max_lateness_ms": round(task.max_lateness * 1000, 3),
+                    "max_duration_ms": round(task.max_duration * 1000, 3),
+                }
+                for key, task in self._tasks.items()
+            }
+
+    def _next_due(self):
+        """Attend la prochaine échéance (sous le verrou); None quand plus aucune tâche n'est planifiée"""
+        while True:
+            while self._heap and self._heap[0][2].cancelled:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                self._thread = None
+                return None
+            deadline, _, task = self._heap[0]
+            delay = deadline - self.clock()
+            if delay <= 0:
+                heapq.heappop(self._heap)
+                return task
+            self._condition.wait(delay)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                task = self._next_due()
+            if task is None:
+                return
+
+            start = self.clock()
+            try:
+                task.callback()
+            except Exception as e:
+                task.errors += 1
+                print(f"Erreur de la tâche périodique {task.key}: {e}")
+            end = self.clock()
+
+            lateness = start - task.deadline
+            duration = end - start
+            next_deadline = task.deadline + task.period
+            overrun = end > next_deadline
+            skipped = int((end - next_deadline) // task.period) if overrun else 0
+
+            with self._condition:
+                task.runs += 1
+                task.max_lateness = max(task.max_lateness, lateness)
+                task.max_duration = max(task.max_duration, duration)
+                if overrun:
+                    task.overruns += 1
+                    task.skipped += skipped
+                if not task.cancelled:
+                    # Les périodes entièrement manquées sont sautées; la suivante reste sur la grille
+                    task.deadline = next_deadline + skipped * task.period
+                    heapq.heappush(self._heap, (task.deadline, next(self._order), task))
+
+            if self.observer is not None:
+                self.observer(task.key, lateness, duration, overrun, skipped)
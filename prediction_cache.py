@@ -0,0 +1,180 @@
+"""
+Cache des résultats d'analyse adressé par le contenu.
+
+La clé est un hash SHA-256 des bytes de l'image, des données patient canonicalisées
+(JSON trié) et de l'étiquette de version du modèle. Deux niveaux:
+- mémoire: LRU borné en nombre d'entrées et en octets, avec expiration (TTL)
+- disque (optionnel): base SQLite qui survit aux redémarrages
+
+Tout changement de version du modèle vide automatiquement les deux niveaux.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def canonical_json(data):
+    """Sérialisation JSON canonique (clés triées, sans espaces)"""
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def make_key(image_bytes, patient_data, model_version):
+    """Clé de cache d'une analyse"""
+    digest = hashlib.sha256()
+    digest.update(model_version.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(canonical_json(patient_data).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(image_bytes)
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """
+    Cache LRU à deux niveaux des résultats d'analyse
+
+    Args:
+        max_entries: Nombre maximal d'entrées en mémoire
+        max_bytes: Taille maximale (JSON sérialisé) des entrées en mémoire
+        ttl: Durée de vie d'une entrée en secondes (None: pas d'expiration)
+        disk_path: Chemin de la base SQLite du niveau disque (None: désactivé)
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=3600, disk_path=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_path = disk_path
+
+        self._entries = OrderedDict()  # clé -> (expiration, JSON sérialisé)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._version = None
+        self._db = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS predictions ('
+                'key TEXT PRIMARY KEY, model_version TEXT NOT NULL, expires REAL, value TEXT NOT NULL)'
+            )
+            self._db.commit()
+
+    def ensure_version(self, version):
+        """Invalide le cache si la version du modèle a changé"""
+        if version == self._version:
+            return
+
+        with self._lock:
+            if version == self._version:
+                return
+            if self._version is not None:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute('DELETE FROM predictions WHERE model_version != ?', (version,))
+                self._db.commit()
+            self._version = version
+
+    def get(self, key):
+        """Retourne le résultat en cache (copie) ou None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(value)
+                self._remove(key)
+                self.expirations += 1
+
+            if self._db is not None:
+                row = self._db.execute('SELECT expires, value FROM predictions WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    expires, value = row
+                    if expires is None or expires > now:
+                        self._store(key, expires, value)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return json.loads(value)
+                    self._db.execute('DELETE FROM predictions WHERE key = ?', (key,))
+                    self._db.commit()
+                    self.expirations += 1
+
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        """Ajoute un résultat (dictionnaire sérialisable en JSON) au cache"""
+        value = json.dumps(result, ensure_ascii=False)
+        expires = time.time() + self.ttl if self.ttl else None
+
+        with self._lock:
+            self._store(key, expires, value)
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO predictions (key, model_version, expires, value) VALUES (?, ?, ?, ?)',
+                    (key, self._version or '', expires, value)
+                )
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute('DELETE FROM predictions')
+                self._db.commit()
+
+    def stats(self):
+        """Compteurs du cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "disk_enabled": self._db is not None,
+                "model_version": self._version
+            }
+
+    def _store(self, key, expires, value):
+        if key in self._entries:
+            self._remove(key)
+        size = len(value)
+        if size > self.max_bytes:
+            return
+
+        self._entries[key] = (expires, value)
+        self._bytes += size
+
+        # Éviction LRU jusqu'à respecter les limites d'entrées et d'octets
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
@@ -0,0 +1,419 @@
+"""
+File de tâches à priorités avec contrôle d'admission.
+
+Complète background_jobs.py pour les tâches soumises en rafale (analyses ECG):
+- priorités: une tâche est prise par le premier worker libre dans l'ordre des
+  priorités, puis de l'échéance la plus proche; quelques workers sont réservés
+  à la priorité la plus haute, qui n'attend donc jamais derrière une rafale
+  de tâches ordinaires déjà en cours
+- admission: au-delà de max_per_client tâches en attente ou en cours pour un
+  même client, la soumission est refusée (429); au-delà de shed_depth tâches en
+  attente, seules les tâches de priorité la plus haute sont encore acceptées,
+  et plus aucune au-delà de max_depth (503). Une tâche dont l'attente estimée
+  dépasse déjà l'échéance est refusée d'emblée (503). Chaque refus indique le
+  délai avant de réessayer (Retry-After), estimé à partir de la durée moyenne
+  d'exécution
+- échéances: une tâche encore en attente à son échéance n'est jamais exécutée
+  (état 'expired'), le client ayant cessé d'attendre le résultat
+- coût: une tâche regroupant plusieurs éléments (lot d'analyses) compte pour
+  cost éléments dans la profondeur de la file et la limite du client
+- résultats asynchrones: si la fonction d'une tâche retourne un Future (ex:
+  prédictions en micro-batch), le worker est libéré aussitôt et la tâche se
+  termine à la résolution du Future; la durée d'exécution mesurée est le temps
+  d'occupation du worker
+
+États d'une tâche: 'pending' -> 'running' -> 'completed' ou 'failed';
+'pending' -> 'expired' ou 'cancelled'. Les tâches terminées sont oubliées
+après retention_seconds.
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+FINISHED = ('completed', 'failed', 'expired', 'cancelled')
+
+
+class AdmissionError(Exception):
+    """
+    Soumission refusée
+
+    Attributes:
+        status: Code HTTP (429: limite du client, 503: file saturée ou échéance intenable)
+        reason: 'client_limit', 'queue_full' ou 'deadline'
+        retry_after: Délai conseillé avant une nouvelle soumission (en secondes)
+    """
+
+    def __init__(self, message, status, reason, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class PriorityJobQueue:
+    """
+    Exécute des tâches par ordre de priorité dans un pool de threads borné
+
+    Args:
+        workers: Nombre de tâches exécutées simultanément
+        priorities: Noms des priorités, de la plus haute à la plus basse
+        reserved_workers: Workers (parmi workers) réservés à la priorité la plus haute
+        max_depth: Tâches en attente au-delà desquelles toute soumission est refusée
+        shed_depth: Tâches en attente au-delà desquelles seule la priorité la plus haute est acceptée
+        max_per_client: Tâches en attente ou en cours par client (None: sans limite)
+        deadline: Échéance par défaut d'une tâche en attente (en secondes)
+        retention_seconds: Durée de conservation des tâches terminées
+        name: Préfixe des noms de threads
+        observer: Fonction (tâche) appelée à chaque fin de tâche (mesures)
+    """
+
+    def __init__(self, workers=8, priorities=('urgent', 'routine'), reserved_workers=1, max_depth=256,
+                 shed_depth=64, max_per_client=None, deadline=60.0, retention_seconds=3600, name='job',
+                 observer=None):
+        self.priorities = tuple(priorities)
+        self.workers = max(1, int(workers))
+        self.reserved_workers = min(max(0, int(reserved_workers)), self.workers - 1)
+        self.max_depth = max_depth
+        self.shed_depth = min(shed_depth, max_depth)
+        self.max_per_client = max_per_client
+        self.deadline = deadline
+        self.retention_seconds = retention_seconds
+        self.name = name
+        self.observer = observer
+
+        self._heaps = [[] for _ in self.priorities]  # (échéance monotone, ordre, id) par priorité
+        self._depth = [0] * len(self.priorities)  # coût des tâches en attente par priorité
+        self._jobs = OrderedDict()  # id -> (état, instant de fin monotone ou None), dans l'ordre de création
+        self._finished = OrderedDict()  # id -> instant de fin monotone, dans l'ordre de fin
+        self._private = {}  # id -> (fonction, arguments, échéance monotone, client, coût)
+        self._inflight = {}  # client -> coût des tâches en attente ou en cours
+        self._running = 0
+        self._awaiting = 0  # tâches dont le worker attend un résultat asynchrone
+        self._service_time = None  # durée moyenne d'exécution par unité de coût (moyenne mobile)
+        self._sequence = itertools.count()
+        # Un seul verrou; les workers (réservés ou non) et les attentes de résultat ont chacun leur condition
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._ready = threading.Condition(self._lock)
+        self._ready_reserved = threading.Condition(self._lock)
+        self._threads = []
+        self._closed = False
+        self.rejected = dict.fromkeys(('client_limit', 'queue_full', 'deadline'), 0)
+
+    def submit(self, job_type, fn, *args, priority=None, client=None, deadline=None, cost=1, **details):
+        """
+        Crée une tâche exécutant fn(*args)
+
+        fn peut retourner un Future: la tâche se termine alors à sa résolution.
+
+        Args:
+            job_type: Type de la tâche (ex: 'analysis')
+            priority: Nom de la priorité (par défaut la plus basse)
+            client: Identifiant du client (limite de tâches simultanées)
+            deadline: Échéance de la tâche en attente (en secondes, par défaut celle de la file)
+            cost: Nombre d'éléments traités par la tâche (profondeur de la file et limite du client)
+            details: Champs ajoutés à l'état de la tâche
+
+        Returns:
+            Copie de l'état de la tâche
+
+        Raises:
+            ValueError: Priorité inconnue
+            AdmissionError: Soumission refusée (limite du client, file saturée ou échéance intenable)
+        """
+        priority = self.priorities[-1] if priority is None else priority
+        if priority not in self.priorities:
+            raise ValueError(f"Priorité inconnue: {priority} ({', '.join(self.priorities)})")
+        level = self.priorities.index(priority)
+        timeout = self.deadline if deadline is None else float(deadline)
+        if not timeout > 0:
+            raise ValueError("L'échéance doit être positive")
+        cost = int(cost)
+        if cost < 1:
+            raise ValueError("Le coût d'une tâche doit être au moins 1")
+
+        with self._condition:
+            self._ensure_workers()
+            self._expire()
+            now = time.monotonic()
+            self._admit(level, client, timeout, now, cost)
+
+            job = {
+                'id': uuid.uuid4().hex,
+                'type': job_type,
+                'status': 'pending',
+                'priority': priority,
+                'createdAt': datetime.now().isoformat(),
+                'deadline': (datetime.now() + timedelta(seconds=timeout)).isoformat(),
+                'cost': cost,
+                **details
+            }
+            if client is not None:
+                job['client'] = client
+                self._inflight[client] = self._inflight.get(client, 0) + cost
+            self._jobs[job['id']] = (job, None)
+            self._private[job['id']] = (fn, args, now + timeout, client, cost)
+            heapq.heappush(self._heaps[level], (now + timeout, next(self._sequence), job['id']))
+            self._depth[level] += cost
+            if level == 0:
+                self._ready_reserved.notify()
+            self._ready.notify()
+            return dict(job)
+
+    def _admit(self, level, client, timeout, now, cost=1):
+        """
+        Vérifie l'admission d'une tâche (sous le verrou); lève AdmissionError sinon
+
+        Une tâche dont le coût dépasse à lui seul une limite n'est admise que si
+        rien d'autre n'est en attente (pour la file) ou en cours (pour le client).
+        """
+        inflight = self._inflight.get(client, 0) if client is not None else 0
+        if self.max_per_client is not None and inflight and inflight + cost > self.max_per_client:
+            self._reject('client_limit', 429, f"Trop de tâches en cours pour ce client ({self.max_per_client} au plus)",
+                         self._service_estimate() * cost)
+
+        limit = self.max_depth if level == 0 else self.shed_depth
+        if sum(self._depth) + cost > limit:
+            # Les tâches échues ne comptent pas: elles ne seront jamais exécutées
+            self._drop_expired(now)
+        waiting = sum(self._depth)
+        if waiting and waiting + cost > limit:
+            self._reject('queue_full', 503, f"File saturée ({waiting} tâches en attente)",
+                         self._wait_estimate(level, waiting + cost - limit))
+
+        wait = self._wait_estimate(level)
+        if wait > timeout:
+            self._reject('deadline', 503, f"Attente estimée ({wait:.1f} s) supérieure à l'échéance ({timeout:.1f} s)",
+                         wait - timeout)
+
+    def _reject(self, reason, status, message, retry_after):
+        self.rejected[reason] += 1
+        raise AdmissionError(message, status, reason, max(1, math.ceil(retry_after)))
+
+    def _service_estimate(self):
+        return self._service_time if self._service_time is not None else 1.0
+
+    def _wait_estimate(self, level, extra=0):
+        """Attente estimée d'une nouvelle tâche de ce niveau: coût des tâches devant elle / workers disponibles"""
+        ahead = sum(self._depth[:level + 1]) + extra
+        if self._service_time is None or not ahead:
+            return 0.0
+        workers = self.workers if level == 0 else self.workers - self.reserved_workers
+        return math.ceil(ahead / workers) * self._service_time
+
+    def get(self, job_id):
+        """Copie de l'état d'une tâche (None si inconnue ou expirée)"""
+        with self._condition:
+            self._expire()
+            entry = self._jobs.get(job_id)
+            return dict(entry[0]) if entry else None
+
+    def wait(self, job_id, timeout=None):
+        """
+        Attend la fin d'une tâche
+
+        Returns:
+            Copie de l'état de la tâche à sa fin, ou à l'expiration du délai (None si inconnue)
+        """
+        until = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                entry = self._jobs.get(job_id)
+                if entry is None or entry[0]['status'] in FINISHED:
+                    return dict(entry[0]) if entry else None
+                if entry[0]['status'] == 'pending' and self._private[job_id][2] <= time.monotonic():
+                    # Échéance passée sans worker libre pour le constater
+                    self._finish(job_id, {'status': 'expired'})
+                    continue
+                remaining = None if until is None else until - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return dict(entry[0])
+                deadline_in = self._private[job_id][2] - time.monotonic() if entry[0]['status'] == 'pending' else None
+                self._condition.wait(min(value for value in (remaining, deadline_in, 1.0) if value is not None))
+
+    def cancel(self, job_id):
+        """Annule une tâche en attente; retourne False si elle est inconnue ou déjà commencée"""
+        with self._condition:
+            entry = self._jobs.get(job_id)
+            if entry is None or entry[0]['status'] != 'pending':
+                return False
+            self._finish(job_id, {'status': 'cancelled'})
+            return True
+
+    def pending_ids(self):
+        """Identifiants des tâches en attente"""
+        with self._condition:
+            return [job_id for job_id, (job, _) in self._jobs.items() if job['status'] == 'pending']
+
+    def counts(self):
+        """Nombre de tâches conservées par état"""
+        with self._condition:
+            self._expire()
+            counts = dict.fromkeys(('pending', 'running') + FINISHED, 0)
+            for job, _ in self._jobs.values():
+                counts[job['status']] += 1
+            return counts
+
+    def stats(self):
+        """Profondeur de la file par priorité, tâches en cours, refus et durée moyenne d'exécution"""
+        with self._condition:
+            return {
+                "depth": dict(zip(self.priorities, self._depth)),
+                "running": self._running,
+                "awaiting": self._awaiting,
+                "workers": self.workers,
+                "reservedWorkers": self.reserved_workers,
+                "rejected": dict(self.rejected),
+                "serviceSeconds": round(self._service_time, 4) if self._service_time is not None else None,
+            }
+
+    def retry_after(self, priority=None):
+        """Délai conseillé (en secondes) avant de soumettre à nouveau une tâche de cette priorité"""
+        level = len(self.priorities) - 1 if priority is None else self.priorities.index(priority)
+        with self._condition:
+            return max(1, math.ceil(self._wait_estimate(level)))
+
+    def depth(self):
+        with self._condition:
+            return sum(self._depth)
+
+    def shutdown(self):
+        """Arrête les workers après leur tâche en cours; les tâches en attente ne sont pas exécutées"""
+        with self._condition:
+            self._closed = True
+            self._ready.notify_all()
+            self._ready_reserved.notify_all()
+
+    def _ensure_workers(self):
+        if self._threads:
+            return
+        for index in range(self.workers):
+            reserved = index < self.reserved_workers
+            thread = threading.Thread(
+                target=self._worker, args=(1 if reserved else len(self.priorities), reserved),
+                name=f"{self.name}-{'reserved-' if reserved else ''}{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _pop(self, levels):
+        """Prochaine tâche exécutable parmi les levels premières priorités (sous le verrou)"""
+        now = time.monotonic()
+        for heap in self._heaps[:levels]:
+            while heap:
+                deadline, _, job_id = heapq.heappop(heap)
+                entry = self._jobs.get(job_id)
+                if entry is None or entry[0]['status'] != 'pending':
+                    continue  # annulée ou échue pendant l'attente
+                if deadline <= now:
+                    self._finish(job_id, {'status': 'expired'})
+                    continue
+                return job_id
+        return None
+
+    def _worker(self, levels, reserved):
+        ready = self._ready_reserved if reserved else self._ready
+        while True:
+            with self._condition:
+                job_id = self._pop(levels)
+                while job_id is None:
+                    if self._closed:
+                        return
+                    ready.wait()
+                    job_id = self._pop(levels)
+                job = self._jobs[job_id][0]
+                fn, args, _, _, cost = self._private[job_id]
+                self._depth[self.priorities.index(job['priority'])] -= cost
+                self._running += 1
+                job['status'] = 'running'
+                job['startedAt'] = datetime.now().isoformat()
+
+            started = time.monotonic()
+            result = update = None
+            try:
+                result = fn(*args)
+                if not isinstance(result, Future):
+                    update = {'status': 'completed', 'result': result}
+            except Exception as e:
+                update = {'status': 'failed', 'error': str(e)}
+            duration = (time.monotonic() - started) / cost
+
+            with self._condition:
+                self._running -= 1
+                self._service_time = duration if self._service_time is None \
+                    else 0.9 * self._service_time + 0.1 * duration
+                if update is not None:
+                    self._finish(job_id, update)
+                else:
+                    self._awaiting += 1
+
+            if update is None:
+                # Résultat asynchrone: le worker passe à la tâche suivante sans l'attendre
+                result.add_done_callback(lambda future, job_id=job_id: self._resolve(job_id, future))
+
+    def _resolve(self, job_id, future):
+        """Termine une tâche à la résolution de son Future"""
+        error = future.exception()
+        if error is not None:
+            update = {'status': 'failed', 'error': str(error)}
+        else:
+            update = {'status': 'completed', 'result': future.result()}
+        with self._condition:
+            self._awaiting -= 1
+            self._finish(job_id, update)
+
+    def _finish(self, job_id, update):
+        """Termine une tâche (sous le verrou) et réveille les attentes"""
+        job = self._jobs[job_id][0]
+        _, _, _, client, cost = self._private.pop(job_id)
+        if job['status'] == 'pending':
+            self._depth[self.priorities.index(job['priority'])] -= cost
+        job.update(update)
+        job['finishedAt'] = datetime.now().isoformat()
+        finished = time.monotonic()
+        self._jobs[job_id] = (job, finished)
+        self._finished[job_id] = finished
+        if client is not None:
+            self._inflight[client] -= cost
+            if not self._inflight[client]:
+                del self._inflight[client]
+        self._condition.notify_all()
+        if self.observer is not None:
+            self.observer(dict(job))
+
+    def _drop_expired(self, now):
+        """Retire de la file les tâches échues (sous le verrou)"""
+        for level, heap in enumerate(self._heaps):
+            kept = []
+            for item in heap:
+                entry = self._jobs.get(item[2])
+                if entry is None or entry[0]['status'] != 'pending':
+                    continue
+                if item[0] <= now:
+                    self._finish(item[2], {'status': 'expired'})
+                else:
+                    kept.append(item)
+            heapq.heapify(kept)
+            self._heaps[level] = kept
+
+    def _expire(self):
+        """
+        Oublie les tâches terminées depuis plus de retention_seconds (les plus anciennes d'abord)
+
+        Seules les tâches terminées sont parcourues, dans l'ordre de fin: une tâche en cours
+        (ou dont le Future ne se résout jamais) ne retient pas l'expiration des suivantes.
+        """
+        cutoff = time.monotonic() - self.retention_seconds
+        while self._finished:
+            job_id, finished = next(iter(self._finished.items()))
+            if finished > cutoff:
+                break
+            del self._finished[job_id]
+            del self._jobs[job_id]
@@ -0,0 +1,346 @@
+"""
+Recherche dans la base de connaissances questions / réponses (CardioAI_QnA_v1.json).
+
+L'index est construit une fois, au chargement du fichier:
+- tokenisation du français sans accents (« Hémorragie » et « hemorragie » se
+  confondent), élisions (l', d', qu') et mots vides retirés, pluriels simples
+  ramenés au singulier
+- index inversé stocké comme une matrice creuse termes x entrées en NumPy
+  (format CSR: pour chaque terme, entrées et fréquences contiguës), pondéré par
+  BM25; les questions comptent double par rapport aux réponses
+- tags et publics (metadata.tags / metadata.audience) en bitsets (un bit par
+  entrée), combinés par ET pour filtrer les résultats
+
+Une recherche ne lit que les listes des termes de la requête: son coût dépend du
+nombre d'entrées contenant ces termes, pas de la taille de la base. Les
+résultats des requêtes fréquentes sont mis en cache. Le fichier est relu quand
+il change (date de modification), sans interrompre les recherches en cours.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+# Paramètres BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Au-delà de len(entrées) / DENSE_SCORING_RATIO entrées candidates, les scores sont
+# accumulés dans un tableau dense plutôt qu'en triant les candidates
+DENSE_SCORING_RATIO = 16
+
+# Poids des champs d'une entrée dans les fréquences de termes
+FIELD_WEIGHTS = (('questions', 2), ('shortAnswer', 1), ('answer', 1), ('tags', 1))
+
+STOPWORDS = frozenset("""
+a ai au aux avec c ce ces cet cette d dans de des du elle en est et etre il ils j je l la le les leur lui m
+ma mais me mes moi mon n ne nos notre nous on ou par pas pour qu que quel quelle quelles quels qui s sa sans
+se ses si son sont sur t ta te tes toi ton tu un une vos votre vous y
+""".split())
+
+# Mots: suites de lettres et de chiffres (les apostrophes et tirets séparent les mots)
+_WORD_PATTERN = re.compile(r"[^\W_]+")
+
+
+def fold(text):
+    """Minuscules sans accents (NFKD puis suppression des diacritiques)"""
+    decomposed = unicodedata.normalize('NFKD', text.lower().replace('œ', 'oe').replace('æ', 'ae'))
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def words(text):
+    """Mots d'un texte, en minuscules (accents conservés)"""
+    return _WORD_PATTERN.findall(unicodedata.normalize('NFC', text).lower())
+
+
+@lru_cache(maxsize=1 << 16)
+def normalize_token(word):
+    """Terme indexé d'un mot (sans accents, pluriel simple retiré), ou None pour un mot vide"""
+    term = fold(word)
+    if len(term) < 2 or term in STOPWORDS:
+        return None
+    # Pluriels réguliers: « douleurs » -> « douleur »
+    if len(term) > 4 and term.endswith('s') and not term.endswith('ss'):
+        return term[:-1]
+    return term
+
+
+def tokenize(text):
+    """Termes indexés d'un texte (les élisions sont séparées: « l'infarctus » -> « infarctus »)"""
+    terms = [normalize_token(word) for word in words(text)]
+    return [term for term in terms if term is not None]
+
+
+def split_labels(value):
+    """Étiquettes d'un champ « a;b » ou d'une liste, sans accents ni casse"""
+    if not value:
+        return []
+    values = value if isinstance(value, (list, tuple)) else str(value).split(';')
+    return [fold(label).strip() for label in values if str(label).strip()]
+
+
+class QnAIndex:
+    """
+    Index immuable d'une liste d'entrées QnA
+
+    Args:
+        entries: Entrées {'id', 'questions', 'answer', 'shortAnswer', 'metadata'}
+        version: Identifiant de la version indexée (ex: date de modification du fichier)
+    """
+
+    def __init__(self, entries, version=None):
+        self.entries = list(entries)
+        self.version = version
+
+        vocabulary = {}
+        rows, columns, counts = [], [], []
+        lengths = np.zeros(len(self.entries), dtype=np.float64)
+        for column, entry in enumerate(self.entries):
+            frequencies = Counter()
+            for field, weight in FIELD_WEIGHTS:
+                value = entry.get(field)
+                if field == 'tags':
+                    value = (entry.get('metadata') or {}).get('tags')
+                if isinstance(value, (list, tuple)):
+                    value = ' '.join(str(item) for item in value)
+                # Mots comptés avant normalisation: chaque mot distinct n'est normalisé qu'une fois
+                for word, occurrences in Counter(words(str(value or ''))).items():
+                    term = normalize_token(word)
+                    if term is not None:
+                        frequencies[term] += occurrences * weight
+            lengths[column] = sum(frequencies.values())
+            for token, count in frequencies.items():
+                rows.append(vocabulary.setdefault(token, len(vocabulary)))
+                columns.append(column)
+                counts.append(count)
+
+        # Matrice creuse CSR termes x entrées: les entrées du terme t sont docs[offsets[t]:offsets[t + 1]]
+        rows = np.asarray(rows, dtype=np.int64)
+        order = np.argsort(rows, kind='stable')
+        self.vocabulary = vocabulary
+        self.docs = np.asarray(columns, dtype=np.int64)[order]
+        frequencies = np.asarray(counts, dtype=np.float64)[order]
+        self.offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(vocabulary)), out=self.offsets[1:])
+
+        # Poids BM25 précalculés: idf(t) * tf * (k1 + 1) / (tf + k1 * (1 - b + b * longueur / longueur moyenne))
+        count = len(self.entries)
+        document_frequency = np.diff(self.offsets).astype(np.float64)
+        idf = np.log(1.0 + (count - document_frequency + 0.5) / (document_frequency + 0.5))
+        average_length = lengths.mean() if count else 1.0
+        norms = BM25_K1 * (1.0 - BM25_B + BM25_B * lengths[self.docs] / max(average_length, 1e-9))
+        term_of_posting = np.repeat(np.arange(len(vocabulary)), np.diff(self.offsets))
+        self.weights = idf[term_of_posting] * frequencies * (BM25_K1 + 1.0) / (frequencies + norms)
+
+        self.tags = self._bitsets(lambda entry: split_labels((entry.get('metadata') or {}).get('tags')))
+        self.audiences = self._bitsets(lambda entry: split_labels((entry.get('metadata') or {}).get('audience')))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _bitsets(self, labels_of):
+        """Bitset (tableau d'octets, un bit par entrée) de chaque étiquette"""
+        members = {}
+        for column, entry in enumerate(self.entries):
+            for label in labels_of(entry):
+                members.setdefault(label, []).append(column)
+        bitsets = {}
+        for label, columns in members.items():
+            mask = np.zeros(len(self.entries), dtype=bool)
+            mask[columns] = True
+            bitsets[label] = np.packbits(mask)
+        return bitsets
+
+    def filter_bits(self, tags=(), audiences=()):
+        """
+        Bitset des entrées portant tous les tags et l'un des publics demandés
+
+        Returns:
+            Bitset, ou None si aucun filtre n'est demandé
+        """
+        bits = None
+        empty = np.zeros((len(self.entries) + 7) // 8, dtype=np.uint8)
+        for tag in tags:
+            tag_bits = self.tags.get(tag, empty)
+            bits = tag_bits if bits is None else bits & tag_bits
+        if audiences:
+            audience_bits = empty
+            for audience in audiences:
+                audience_bits = audience_bits | self.audiences.get(audience, empty)
+            bits = audience_bits if bits is None else bits & audience_bits
+        return bits
+
+    def search(self, query, tags=(), audiences=(), limit=5):
+        """
+        Entrées les plus pertinentes pour une requête
+
+        Args:
+            query: Texte de la requête (vide: entrées filtrées, dans l'ordre du fichier)
+            tags: Tags obligatoires (sans accents, en minuscules)
+            audiences: Publics acceptés
+            limit: Nombre maximal de résultats
+
+        Returns:
+            Tuple (liste de (indice de l'entrée, score), nombre total d'entrées correspondantes)
+        """
+        bits = self.filter_bits(tags, audiences)
+        terms = [self.vocabulary[token] for token in set(tokenize(query)) if token in self.vocabulary]
+
+        if not terms:
+            if query.strip() and tokenize(query):
+                return [], 0
+            # Sans terme de recherche: simple filtrage
+            if bits is None:
+                candidates = np.arange(len(self.entries))
+            else:
+                candidates = np.flatnonzero(np.unpackbits(bits, count=len(self.entries)))
+            return [(int(column), 0.0) for column in candidates[:limit]], len(candidates)
+
+        # Somme des poids BM25 des termes, sur les seules entrées contenant au moins un terme
+        docs = np.concatenate([self.docs[self.offsets[term]:self.offsets[term + 1]] for term in terms])
+        weights = np.concatenate([self.weights[self.offsets[term]:self.offsets[term + 1]] for term in terms])
+        if len(docs) * DENSE_SCORING_RATIO > len(self.entries):
+            # Termes fréquents: accumulation dans un tableau de toutes les entrées (sans tri)
+            scores = np.bincount(docs, weights=weights, minlength=len(self.entries))
+            candidates = np.flatnonzero(scores)
+            scores = scores[candidates]
+        else:
+            candidates, inverse = np.unique(docs, return_inverse=True)
+            scores = np.bincount(inverse, weights=weights)
+
+        if bits is not None:
+            keep = (bits[candidates >> 3] >> (7 - (candidates & 7))) & 1 == 1
+            candidates, scores = candidates[keep], scores[keep]
+
+        total = len(candidates)
+        if total > limit:
+            top = np.argpartition(-scores, limit)[:limit]
+            candidates, scores = candidates[top], scores[top]
+        order = np.lexsort((candidates, -scores))
+        return [(int(candidates[i]), float(scores[i])) for i in order], total
+
+
+class QnASearchEngine:
+    """
+    Recherche QnA sur un fichier JSON ({"qnaList": [...]}) rechargé quand il change
+
+    Args:
+        path: Chemin du fichier
+        cache_entries: Nombre de résultats de requêtes gardés en cache
+        reload_interval: Délai minimal entre deux vérifications de la date du fichier (en secondes)
+    """
+
+    def __init__(self, path, cache_entries=1024, reload_interval=2.0):
+        self.path = path
+        self.cache_entries = cache_entries
+        self.reload_interval = reload_interval
+        self.index = None
+        self.error = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reload(force=True)
+
+    def _file_version(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self, force=False):
+        """
+        Reconstruit l'index si le fichier a changé
+
+        Un fichier illisible ou invalide laisse l'index précédent en place (error décrit le problème).
+
+        Returns:
+            True si un nouvel index a été construit
+        """
+        with self._lock:
+            return self._reload_locked(force)
+
+    def _reload_locked(self, force=False):
+        self._checked_at = time.monotonic()
+        try:
+            version = self._file_version()
+            if not force and self.index is not None and self.index.version == version:
+                return False
+            with open(self.path, encoding='utf-8') as source:
+                entries = json.load(source)['qnaList']
+            index = QnAIndex(entries, version=version)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.error = f"Base de connaissances illisible ({self.path}): {e}"
+            return False
+
+        self.index = index
+        self.error = None
+        with self._cache_lock:
+            self._cache.clear()
+        return True
+
+    def current_index(self):
+        """
+        Index à jour (date du fichier vérifiée au plus toutes les reload_interval secondes)
+
+        Pendant la reconstruction de l'index par une requête, les autres requêtes
+        utilisent l'index précédent au lieu d'attendre.
+        """
+        if time.monotonic() - self._checked_at >= self.reload_interval and self._lock.acquire(blocking=False):
+            try:
+                self._reload_locked()
+            finally:
+                self._lock.release()
+        return self.index
+
+    def search(self, query, tags=(), audiences=(), limit=5):
+        """
+        Recherche mise en cache par (version de l'index, requête normalisée, filtres, limite)
+
+        Returns:
+            Dictionnaire {'results': [(entrée, score)], 'total', 'cached'}, ou None si aucun index n'est chargé
+        """
+        index = self.current_index()
+        if index is None:
+            return None
+
+        tags = tuple(sorted(set(split_labels(tags))))
+        audiences = tuple(sorted(set(split_labels(audiences))))
+        key = (index.version, ' '.join(sorted(set(tokenize(query)))) or fold(query).strip(), tags, audiences, limit)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return dict(cached, cached=True)
+            self.misses += 1
+
+        matches, total = index.search(query, tags, audiences, limit)
+        result = {
+            "results": [(index.entries[column], score) for column, score in matches],
+            "total": total,
+            "cached": False,
+        }
+        with self._cache_lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+        return result
+
+    def stats(self):
+        index = self.index
+        return {
+            "entries": len(index) if index is not None else 0,
+            "terms": len(index.vocabulary) if index is not None else 0,
+            "cache_entries": len(self._cache),
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "error": self.error,
+        }
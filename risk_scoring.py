@@ -0,0 +1,180 @@
+"""
+Score de risque clinique vectorisé.
+
+Évalue une matrice de caractéristiques (N, 10) en float32 avec uniquement des
+opérations NumPy vectorisées: les règles cliniques sont compilées une fois en une
+table de colonnes / opérateurs / seuils / poids, puis appliquées à toutes les lignes
+en même temps. Permet de réévaluer hors ligne des cohortes de centaines de milliers
+de patients.
+
+Utilisation hors ligne:
+    python risk_scoring.py cohorte.csv resultats.npz
+"""
+
+import sys
+import time
+
+import numpy as np
+
+# Ordre des colonnes produit par preprocess_clinical_data
+FEATURE_COLUMNS = ['age', 'trestbps', 'chol', 'thalach', 'oldpeak', 'ca', 'slope', 'restecg', 'cp', 'thal']
+
+# Règles de risque: (colonne, opérateur, seuil, poids)
+RISK_RULES = [
+    ('age', '>', 60, 2),
+    ('trestbps', '>', 140, 2),
+    ('chol', '>', 240, 2),
+    ('thalach', '<', 120, 2),
+    ('oldpeak', '>', 2, 3),
+    ('ca', '>', 1, 3),
+    ('cp', '==', 0, 2),
+    ('restecg', '>', 0, 1),
+    ('slope', '==', 0, 2),
+    ('thal', '!=', 3, 2),
+]
+
+# Normalisation du score en probabilité: min(BASE + score / SCALE, MAX)
+CONFIDENCE_BASE = 0.5
+CONFIDENCE_SCALE = 20.0
+CONFIDENCE_MAX = 0.95
+
+# Bandes de diagnostic: une confiance strictement supérieure à BAND_EDGES[i] atteint la bande i + 1
+BAND_EDGES = np.array([0.5, 0.7, 0.85])
+DIAGNOSES = ["Normal", "Maladie cardiaque détectée"]
+DETAILS = [
+    "Aucune anomalie significative détectée.",
+    "Signes légers évocateurs d'une pathologie cardiaque.",
+    "Signes modérément évocateurs d'une pathologie cardiaque.",
+    "Signes fortement évocateurs d'une pathologie cardiaque sévère.",
+]
+
+_OPERATORS = ['>', '<', '==', '!=']
+
+
+def compile_rules(rules):
+    """
+    Compile une liste de règles en table de tableaux NumPy
+
+    Args:
+        rules: Liste de tuples (colonne, opérateur, seuil, poids)
+
+    Returns:
+        Dictionnaire de tableaux: colonnes, masques par opérateur, seuils et poids
+    """
+    columns = np.array([FEATURE_COLUMNS.index(column) for column, _, _, _ in rules], dtype=np.intp)
+    operators = np.array([_OPERATORS.index(op) for _, op, _, _ in rules], dtype=np.int8)
+
+    return {
+        'columns': columns,
+        'is_gt': operators == 0,
+        'is_lt': operators == 1,
+        'is_eq': operators == 2,
+        'is_ne': operators == 3,
+        'thresholds': np.array([threshold for _, _, threshold, _ in rules], dtype=np.float32),
+        'weights': np.array([weight for _, _, _, weight in rules], dtype=np.float32),
+    }
+
+
+RULE_TABLE = compile_rules(RISK_RULES)
+
+
+def risk_scores(features, table=RULE_TABLE):
+    """
+    Calcule le score de risque de chaque ligne
+
+    Args:
+        features: Matrice (N, 10) des caractéristiques cliniques
+        table: Table de règles compilée par compile_rules
+
+    Returns:
+        Tableau (N,) float32 des scores de risque
+    """
+    features = np.asarray(features, dtype=np.float32)
+    if features.ndim == 1:
+        features = features.reshape(1, -1)
+
+    # (N, R): la valeur de chaque colonne concernée par une règle
+    values = features[:, table['columns']]
+    thresholds = table['thresholds']
+
+    hits = (
+        ((values > thresholds) & table['is_gt']) |
+        ((values < thresholds) & table['is_lt']) |
+        ((values == thresholds) & table['is_eq']) |
+        ((values != thresholds) & table['is_ne'])
+    )
+
+    return hits.astype(np.float32) @ table['weights']
+
+
+def confidences_from_scores(scores):
+    """Normalise les scores de risque en probabilités entre 0 et 1"""
+    # En float64 pour que les confiances tombent exactement sur les bornes des bandes
+    return np.minimum(CONFIDENCE_BASE + np.asarray(scores, dtype=np.float64) / CONFIDENCE_SCALE, CONFIDENCE_MAX)
+
+
+def diagnosis_bands(confidences):
+    """
+    Retourne l'indice de bande de chaque confiance (0: normal, 1: léger, 2: modéré, 3: sévère)
+    """
+    return np.searchsorted(BAND_EDGES, np.asarray(confidences, dtype=np.float64), side='left').astype(np.int8)
+
+
+def score_features(features, table=RULE_TABLE):
+    """
+    Évalue une matrice de caractéristiques cliniques
+
+    Args:
+        features: Matrice (N, 10) des caractéristiques cliniques
+        table: Table de règles compilée par compile_rules
+
+    Returns:
+        Tuple (confidences, diagnosis_index, details_index) indexant respectivement
+        DIAGNOSES et DETAILS
+    """
+    confidences = confidences_from_scores(risk_scores(features, table))
+    details_index = diagnosis_bands(confidences)
+    diagnosis_index = (details_index > 0).astype(np.int8)
+    return confidences, diagnosis_index, details_index
+
+
+def score_cohort(features, chunk_size=1_000_000, table=RULE_TABLE):
+    """
+    Évalue une cohorte par blocs pour borner la mémoire temporaire
+
+    Returns:
+        Tuple (confidences, bands) pour toutes les lignes, bands indexant DETAILS
+    """
+    confidences = np.empty(len(features), dtype=np.float64)
+    bands = np.empty(len(features), dtype=np.int8)
+
+    for start in range(0, len(features), chunk_size):
+        stop = start + chunk_size
+        confidences[start:stop], _, bands[start:stop] = score_features(features[start:stop], table)
+
+    return confidences, bands
+
+
+def load_cohort(path):
+    """Charge une cohorte depuis un fichier .npy ou .csv (en-tête optionnel, colonnes dans l'ordre FEATURE_COLUMNS)"""
+    if path.endswith('.npy'):
+        return np.load(path, mmap_mode='r')
+
+    with open(path, encoding='utf-8') as f:
+        first_line = f.readline()
+    skip_header = 1 if any(column in first_line for column in FEATURE_COLUMNS) else 0
+    return np.loadtxt(path, delimiter=',', dtype=np.float32, skiprows=skip_header, ndmin=2)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Utilisation: python risk_scoring.py <cohorte.csv|cohorte.npy> <resultats.npz>")
+        sys.exit(1)
+
+    cohort = load_cohort(sys.argv[1])
+    start = time.perf_counter()
+    confidences, bands = score_cohort(cohort)
+    elapsed = time.perf_counter() - start
+
+    np.savez(sys.argv[2], confidence=confidences, band=bands)
+    print(f"{len(cohort)} patients évalués en {elapsed:.3f} s, résultats écrits dans {sys.argv[2]}")
@@ -0,0 +1,315 @@
+"""
+Ingestion des mesures envoyées par les capteurs IoT.
+
+Formats acceptés par POST /api/iot/sensors/data:
+- JSON: une mesure, une liste de mesures ou {"readings": [...]}
+  {"deviceId": "...", "seq": 42, "timestamp": 1718000000000,
+   "sensors": {"heartRate": 72, "systolic": 120, "diastolic": 80,
+               "temperature": 36.6, "spO2": 98, "respiratoryRate": 16}}
+- MessagePack (application/msgpack), même structure que le JSON, si msgpack est installé
+- Trame binaire compacte (application/octet-stream) pour les ESP32:
+  en-tête '<2sBB' (b'CA', version 1, longueur de deviceId), deviceId en UTF-8,
+  puis des enregistrements fixes de 36 octets '<Iq6f':
+  seq, horodatage epoch en ms, heartRate, systolic, diastolic, temperature,
+  oxygenSaturation, respiratoryRate (NaN: valeur absente)
+
+Les mesures sont validées, dédupliquées par numéro de séquence (les renvois ne
+créent pas de doublons) puis regroupées en tableaux colonnes par appareil pour
+être ajoutées en bloc à l'historique.
+"""
+
+import json
+import struct
+import time
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Colonnes d'une mesure, dans l'ordre de la trame binaire
+FIELDS = ('heartRate', 'systolic', 'diastolic', 'temperature', 'oxygenSaturation', 'respiratoryRate')
+FIELD_ALIASES = {'spO2': 'oxygenSaturation', 'spo2': 'oxygenSaturation'}
+
+# Plages physiologiquement plausibles; hors de ces bornes la mesure est rejetée
+VALID_RANGES = {
+    'heartRate': (20, 250),
+    'systolic': (50, 260),
+    'diastolic': (20, 160),
+    'temperature': (30.0, 44.0),
+    'oxygenSaturation': (50, 100),
+    'respiratoryRate': (2, 60),
+}
+
+# Correspondance colonne -> (type de capteur, canal dans l'historique)
+FIELD_CHANNELS = {
+    'heartRate': ('heartRate', 0),
+    'systolic': ('bloodPressure', 0),
+    'diastolic': ('bloodPressure', 1),
+    'temperature': ('temperature', 0),
+    'oxygenSaturation': ('oxygenSaturation', 0),
+    'respiratoryRate': ('respiratoryRate', 0),
+}
+
+BINARY_MAGIC = b'CA'
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct('<2sBB')
+BINARY_RECORD = np.dtype([('seq', '<u4'), ('timestamp', '<i8'), ('values', '<f4', (len(FIELDS),))])
+
+# Horodatages inférieurs à ce seuil (ex: millis() d'un ESP32) remplacés par l'heure de réception
+MIN_EPOCH_MS = 10 ** 11
+MAX_CLOCK_SKEW_MS = 5 * 60 * 1000
+MAX_READINGS_PER_REQUEST = 10000
+
+
+class IngestionError(ValueError):
+    """Requête d'ingestion invalide dans son ensemble"""
+
+
+class SequenceWindow:
+    """
+    Numéros de séquence récemment reçus d'un appareil
+
+    Garde le plus grand numéro vu et l'ensemble des numéros dans une fenêtre
+    glissante: une mesure déjà reçue est un doublon. Un numéro qui recule de plus
+    que la fenêtre signale un compteur remis à zéro (redémarrage de l'appareil):
+    les numéros connus sont oubliés au lieu de rejeter toutes les nouvelles mesures.
+    """
+
+    def __init__(self, window=4096):
+        self.window = window
+        self.highest = -1
+        self._seen = set()
+
+    def filter_new(self, sequences):
+        """
+        Retourne le masque des numéros jamais reçus, sans les enregistrer
+
+        Un numéro répété dans le même lot n'est retenu qu'une fois. Les numéros
+        des mesures effectivement acceptées sont ensuite enregistrés par record:
+        le renvoi d'une mesure refusée (ex: arrivée en retard) n'est pas un doublon.
+
+        Args:
+            sequences: Tableau int64 de numéros de séquence (-1: pas de numéro)
+        """
+        fresh = np.ones(len(sequences), dtype=bool)
+        batch = set()
+        seen = self._seen
+        for index, seq in enumerate(sequences.tolist()):
+            if seq < 0:
+                continue
+            if self.is_reset(seq):
+                # Compteur remis à zéro: seuls les numéros répétés dans ce lot sont des doublons
+                seen = set()
+            if seq in seen or seq in batch:
+                fresh[index] = False
+                continue
+            batch.add(seq)
+        return fresh
+
+    def is_reset(self, seq):
+        """Vrai si seq recule de plus que la fenêtre (redémarrage de l'appareil)"""
+        return seq <= self.highest - self.window
+
+    def record(self, sequences):
+        """Enregistre les numéros des mesures acceptées"""
+        for seq in sequences.tolist():
+            if seq < 0:
+                continue
+            if self.is_reset(seq):
+                self._seen.clear()
+                self.highest = -1
+            self._seen.add(seq)
+            if seq > self.highest:
+                self.highest = seq
+
+        # Oublier les numéros sortis de la fenêtre
+        if len(self._seen) > 2 * self.window:
+            floor = self.highest - self.window
+            self._seen = {seq for seq in self._seen if seq > floor}
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+def _parse_timestamp(value, received_ms):
+    """Horodatage epoch en ms; l'heure de réception si absent ou non absolu"""
+    if value is None:
+        return received_ms
+    if isinstance(value, str):
+        try:
+            return int(datetime.fromisoformat(value).timestamp() * 1000)
+        except ValueError:
+            raise ValueError(f"Horodatage invalide: {value}")
+    value = int(value)
+    return value if value >= MIN_EPOCH_MS else received_ms
+
+
+def _reading_row(reading, received_ms):
+    """Convertit une mesure JSON/MessagePack en (deviceId, seq, horodatage, valeurs)"""
+    if not isinstance(reading, dict):
+        raise ValueError("Mesure invalide: objet attendu")
+
+    sensors = reading.get('sensors', reading)
+    if not isinstance(sensors, dict):
+        raise ValueError("Champ 'sensors' invalide")
+
+    values = [np.nan] * len(FIELDS)
+    found = False
+    for name, value in sensors.items():
+        name = FIELD_ALIASES.get(name, name)
+        if name in FIELD_CHANNELS and value is not None:
+            values[FIELDS.index(name)] = float(value)
+            found = True
+    if not found:
+        raise ValueError("Aucune valeur de capteur dans la mesure")
+
+    seq = reading.get('seq')
+    return (
+        reading.get('deviceId'),
+        -1 if seq is None else int(seq),
+        _parse_timestamp(reading.get('timestamp'), received_ms),
+        values
+    )
+
+
+def parse_structured(payload, default_device_id, received_ms=None):
+    """
+    Convertit un contenu JSON ou MessagePack décodé en lots par appareil
+
+    Returns:
+        Tuple (lots {deviceId: (seq, horodatages, valeurs)}, erreurs [(index, message)])
+    """
+    received_ms = received_ms or now_ms()
+
+    if isinstance(payload, dict) and 'readings' in payload:
+        default_device_id = payload.get('deviceId') or default_device_id
+        payload = payload['readings']
+    readings = payload if isinstance(payload, list) else [payload]
+
+    if len(readings) > MAX_READINGS_PER_REQUEST:
+        raise IngestionError(f"Trop de mesures dans une requête (max {MAX_READINGS_PER_REQUEST})")
+
+    rows = {}
+    errors = []
+    for index, reading in enumerate(readings):
+        try:
+            device_id, seq, timestamp, values = _reading_row(reading, received_ms)
+        except (TypeError, ValueError) as e:
+            errors.append((index, str(e)))
+            continue
+        rows.setdefault(str(device_id or default_device_id), []).append((seq, timestamp, values))
+
+    batches = {}
+    for device_id, device_rows in rows.items():
+        batches[device_id] = (
+            np.array([row[0] for row in device_rows], dtype=np.int64),
+            np.array([row[1] for row in device_rows], dtype=np.int64),
+            np.array([row[2] for row in device_rows], dtype=np.float32).reshape(-1, len(FIELDS))
+        )
+
+    return batches, errors
+
+
+def parse_binary(body, received_ms=None):
+    """
+    Décode une trame binaire sans copie des enregistrements
+
+    Returns:
+        Tuple (lots {deviceId: (seq, horodatages, valeurs)}, erreurs)
+    """
+    received_ms = received_ms or now_ms()
+
+    if len(body) < BINARY_HEADER.size:
+        raise IngestionError("Trame binaire trop courte")
+    magic, version, id_length = BINARY_HEADER.unpack_from(body)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise IngestionError("En-tête de trame binaire invalide")
+
+    offset = BINARY_HEADER.size + id_length
+    if len(body) < offset:
+        raise IngestionError("Trame binaire tronquée (deviceId incomplet)")
+    try:
+        device_id = bytes(body[BINARY_HEADER.size:offset]).decode('utf-8')
+    except UnicodeDecodeError:
+        raise IngestionError("deviceId invalide (UTF-8 attendu)")
+    if (len(body) - offset) % BINARY_RECORD.itemsize:
+        raise IngestionError(f"Taille des enregistrements invalide (multiple de {BINARY_RECORD.itemsize} octets attendu)")
+
+    records = np.frombuffer(body, dtype=BINARY_RECORD, offset=offset)
+    if len(records) > MAX_READINGS_PER_REQUEST:
+        raise IngestionError(f"Trop de mesures dans une requête (max {MAX_READINGS_PER_REQUEST})")
+
+    timestamps = records['timestamp'].astype(np.int64)
+    timestamps[timestamps < MIN_EPOCH_MS] = received_ms
+
+    return {device_id: (records['seq'].astype(np.int64), timestamps, records['values'])}, []
+
+
+def encode_binary(device_id, sequences, timestamps_ms, values):
+    """Encode des mesures en trame binaire (utilisé par les simulateurs et benchmarks)"""
+    device_bytes = device_id.encode('utf-8')
+    records = np.empty(len(sequences), dtype=BINARY_RECORD)
+    records['seq'] = sequences
+    records['timestamp'] = timestamps_ms
+    records['values'] = values
+    return BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(device_bytes)) + device_bytes + records.tobytes()
+
+
+def parse_request_body(body, content_type, default_device_id):
+    """
+    Décode le corps d'une requête d'ingestion selon son Content-Type
+
+    Returns:
+        Tuple (lots par appareil, erreurs)
+    """
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    received_ms = now_ms()
+
+    if content_type == 'application/octet-stream':
+        return parse_binary(body, received_ms)
+
+    if content_type in ('application/msgpack', 'application/x-msgpack'):
+        if msgpack is None:
+            raise IngestionError("Le format MessagePack nécessite le paquet msgpack (pip install msgpack)")
+        try:
+            payload = msgpack.unpackb(body, raw=False)
+        except Exception as e:
+            raise IngestionError(f"MessagePack invalide: {e}")
+        return parse_structured(payload, default_device_id, received_ms)
+
+    try:
+        payload = json.loads(body)
+    except ValueError as e:
+        raise IngestionError(f"JSON invalide: {e}")
+    return parse_structured(payload, default_device_id, received_ms)
+
+
+def validate(timestamps_ms, values, received_ms=None):
+    """
+    Masque vectorisé des mesures valides
+
+    Une valeur hors plage est remplacée par NaN; une mesure sans aucune valeur
+    valide, ou horodatée dans le futur, est rejetée.
+
+    Returns:
+        Tuple (masque des mesures valides, valeurs nettoyées)
+    """
+    received_ms = received_ms or now_ms()
+    values = np.array(values, dtype=np.float32, copy=True)
+
+    low = np.array([VALID_RANGES[field][0] for field in FIELDS], dtype=np.float32)
+    high = np.array([VALID_RANGES[field][1] for field in FIELDS], dtype=np.float32)
+    with np.errstate(invalid='ignore'):
+        values[(values < low) | (values > high)] = np.nan
+
+    # La tension n'a de sens qu'avec ses deux composantes
+    partial_bp = np.isnan(values[:, 1]) != np.isnan(values[:, 2])
+    values[partial_bp, 1:3] = np.nan
+
+    valid = ~np.all(np.isnan(values), axis=1) & (timestamps_ms <= received_ms + MAX_CLOCK_SKEW_MS)
+    return valid, values
@@ -0,0 +1,271 @@
+"""
+Simulateur vectorisé de capteurs pour le monitoring et les tests de charge.
+
+Les mesures de N patients virtuels x M grandeurs (colonnes de
+sensor_ingestion.FIELDS) avancent d'un pas en une seule opération NumPy:
+marche aléatoire bornée par des limites physiologiques, éventuellement tirée
+vers les valeurs cibles d'un scénario d'anomalie (tachycardie, désaturation, ...).
+
+Le générateur est initialisé par une graine: deux exécutions avec la même
+graine produisent les mêmes mesures.
+
+Utilisation (charge sur le chemin réel d'ingestion et d'alertes):
+    python sensor_simulator.py --devices 10000 --rate 1 --duration 30 --scenario tachycardia:0.05
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from sensor_ingestion import FIELDS, encode_binary, now_ms
+
+# Valeurs initiales, amplitude maximale d'un pas et bornes de la marche aléatoire (ordre de FIELDS)
+INITIAL_VALUES = np.array([72, 120, 80, 36.5, 98, 16], dtype=np.float64)
+STEP_SIZES = np.array([5, 3, 2, 0.2, 1, 1], dtype=np.float64)
+LOWER_BOUNDS = np.array([50, 80, 50, 35.0, 85, 8], dtype=np.float64)
+UPPER_BOUNDS = np.array([120, 180, 110, 39.0, 100, 30], dtype=np.float64)
+
+# Précision des mesures produites (température au dixième, le reste à l'unité)
+ROUNDING_SCALE = np.array([1, 1, 1, 10, 1, 1], dtype=np.float64)
+
+# Scénarios d'anomalie: valeurs cibles par grandeur
+SCENARIOS = {
+    'tachycardia': {'heartRate': 150},
+    'bradycardia': {'heartRate': 40},
+    'desaturation': {'oxygenSaturation': 84, 'respiratoryRate': 26},
+    'hypertension': {'systolic': 175, 'diastolic': 105},
+    'hypotension': {'systolic': 82, 'diastolic': 50},
+    'fever': {'temperature': 39.4, 'heartRate': 108},
+}
+SCENARIO_PULL = 0.2  # Fraction de l'écart à la cible rattrapée à chaque pas
+
+
+def scenario_targets(scenario):
+    """Ligne des cibles d'un scénario (NaN pour les grandeurs non concernées)"""
+    if scenario not in SCENARIOS:
+        raise ValueError(f"Scénario inconnu: {scenario}")
+    targets = np.full(len(FIELDS), np.nan)
+    for field, target in SCENARIOS[scenario].items():
+        targets[FIELDS.index(field)] = target
+    return targets
+
+
+def random_walk_step(values, rng, targets=None, columns=None):
+    """
+    Avance toutes les mesures d'un pas
+
+    Args:
+        values: Tableau (n, len(FIELDS)) des valeurs courantes
+        rng: numpy.random.Generator
+        targets: Cibles de scénario de même forme (NaN: pas de scénario), ou None
+        columns: Indices dans FIELDS des colonnes de values (None: toutes les grandeurs)
+
+    Returns:
+        Nouveau tableau borné, de même forme que values
+    """
+    step_sizes, lower_bounds, upper_bounds = STEP_SIZES, LOWER_BOUNDS, UPPER_BOUNDS
+    if columns is not None:
+        step_sizes, lower_bounds, upper_bounds = STEP_SIZES[columns], LOWER_BOUNDS[columns], UPPER_BOUNDS[columns]
+
+    new_values = values + rng.uniform(-1.0, 1.0, size=values.shape) * step_sizes
+    low = lower_bounds
+    high = upper_bounds
+
+    if targets is not None:
+        active = ~np.isnan(targets)
+        if active.any():
+            pulled = np.where(active, targets, values)
+            new_values += SCENARIO_PULL * (pulled - values)
+            # Les bornes s'élargissent jusqu'aux cibles des scénarios actifs
+            low = np.where(active, np.fmin(lower_bounds, targets), lower_bounds)
+            high = np.where(active, np.fmax(upper_bounds, targets), upper_bounds)
+
+    return np.clip(new_values, low, high, out=new_values)
+
+
+def round_readings(values, columns=None):
+    """Arrondit les mesures à la précision des capteurs (columns: indices dans FIELDS des colonnes de values)"""
+    scale = ROUNDING_SCALE if columns is None else ROUNDING_SCALE[columns]
+    return np.round(values * scale) / scale
+
+
+class SensorSimulator:
+    """
+    Population de patients virtuels
+
+    Args:
+        devices: Nombre d'appareils simulés
+        seed: Graine du générateur (None: non reproductible)
+        prefix: Préfixe des identifiants d'appareils
+    """
+
+    def __init__(self, devices, seed=None, prefix='sim'):
+        self.rng = np.random.default_rng(seed)
+        self.device_ids = [f"{prefix}-{index}" for index in range(devices)]
+        self.values = np.tile(INITIAL_VALUES, (devices, 1))
+        self.targets = np.full((devices, len(FIELDS)), np.nan)
+        self.remaining = np.zeros(devices, dtype=np.int64)  # Pas restants des scénarios (-1: sans fin)
+        self.sequence = 0
+
+    def inject(self, scenario, fraction=None, devices=None, steps=-1):
+        """
+        Démarre un scénario d'anomalie
+
+        Args:
+            scenario: Nom du scénario (SCENARIOS)
+            fraction: Part des appareils concernés, tirés au hasard
+            devices: Indices des appareils concernés (prioritaire sur fraction)
+            steps: Durée en pas (-1: jusqu'à clear)
+
+        Returns:
+            Indices des appareils concernés
+        """
+        targets = scenario_targets(scenario)
+        if devices is None:
+            count = int(round(len(self.device_ids) * (1.0 if fraction is None else fraction)))
+            devices = self.rng.choice(len(self.device_ids), size=count, replace=False)
+        devices = np.asarray(devices, dtype=np.int64)
+
+        self.targets[devices] = targets
+        self.remaining[devices] = steps
+        return devices
+
+    def clear(self, devices=None):
+        """Arrête les scénarios (de tous les appareils si devices est None)"""
+        devices = slice(None) if devices is None else np.asarray(devices, dtype=np.int64)
+        self.targets[devices] = np.nan
+        self.remaining[devices] = 0
+
+    def step(self):
+        """
+        Avance tous les appareils d'un pas
+
+        Returns:
+            Mesures arrondies (n, len(FIELDS)) en float32
+        """
+        self.values = random_walk_step(self.values, self.rng, self.targets)
+
+        # Fin des scénarios à durée limitée
+        limited = self.remaining > 0
+        self.remaining[limited] -= 1
+        ended = limited & (self.remaining == 0)
+        if ended.any():
+            self.targets[ended] = np.nan
+
+        self.sequence += 1
+        return round_readings(self.values).astype(np.float32)
+
+
+def drive(simulator, ingest, rate_hz=1.0, duration=10.0, flush_every=1):
+    """
+    Envoie les mesures simulées vers le chemin d'ingestion à cadence fixe
+
+    Args:
+        simulator: SensorSimulator
+        ingest: Fonction (device_id, seq int64, horodatages int64, valeurs) appelée par appareil et par envoi
+        rate_hz: Mesures par seconde et par appareil
+        duration: Durée en secondes
+        flush_every: Nombre de mesures regroupées par envoi (tampon côté appareil)
+
+    Returns:
+        Statistiques de l'exécution
+    """
+    interval = 1.0 / rate_hz
+    pending_timestamps = []
+    pending_values = []
+    readings = 0
+    sends = 0
+    late_ticks = 0
+    start = time.monotonic()
+    next_tick = start
+
+    while next_tick - start < duration:
+        delay = next_tick - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        elif delay < -interval:
+            late_ticks += 1
+
+        pending_timestamps.append(now_ms())
+        pending_values.append(simulator.step())
+
+        if len(pending_values) >= flush_every:
+            timestamps = np.array(pending_timestamps, dtype=np.int64)
+            # (pas, appareils, grandeurs) -> mesures de chaque appareil dans l'ordre chronologique
+            values = np.stack(pending_values, axis=1)
+            first_seq = simulator.sequence - len(pending_values)
+            sequences = np.arange(first_seq, simulator.sequence, dtype=np.int64)
+            for index, device_id in enumerate(simulator.device_ids):
+                ingest(device_id, sequences, timestamps, values[index])
+            readings += values.shape[0] * values.shape[1]
+            sends += len(simulator.device_ids)
+            pending_timestamps = []
+            pending_values = []
+
+        next_tick += interval
+
+    elapsed = time.monotonic() - start
+    return {
+        "devices": len(simulator.device_ids),
+        "rate_hz": rate_hz,
+        "flush_every": flush_every,
+        "readings": readings,
+        "sends": sends,
+        "readings_per_sec": round(readings / elapsed, 1),
+        "target_readings_per_sec": round(len(simulator.device_ids) * rate_hz, 1),
+        "late_ticks": late_ticks,
+    }
+
+
+def make_ingest(transport, url=None):
+    """Fonction d'envoi: 'direct' (ingest_readings), 'client' (client de test Flask) ou 'http'"""
+    if transport == 'http':
+        import urllib.request
+
+        def ingest(device_id, sequences, timestamps, values):
+            request = urllib.request.Request(
+                f"{url}/api/iot/sensors/data",
+                data=encode_binary(device_id, sequences, timestamps, values),
+                headers={'Content-Type': 'application/octet-stream'}
+            )
+            urllib.request.urlopen(request, timeout=30).read()
+        return ingest
+
+    import model_integration
+
+    if transport == 'direct':
+        return model_integration.ingest_readings
+
+    client = model_integration.app.test_client()
+
+    def ingest(device_id, sequences, timestamps, values):
+        client.post(
+            '/api/iot/sensors/data',
+            data=encode_binary(device_id, sequences, timestamps, values),
+            content_type='application/octet-stream'
+        )
+    return ingest
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Simulation de charge de capteurs IoT")
+    parser.add_argument('--devices', type=int, default=10000)
+    parser.add_argument('--rate', type=float, default=1.0, help="Mesures par seconde et par appareil")
+    parser.add_argument('--duration', type=float, default=10.0, help="Durée en secondes")
+    parser.add_argument('--flush-every', type=int, default=1, help="Mesures regroupées par envoi")
+    parser.add_argument('--scenario', action='append', default=[],
+                        help="Scénario d'anomalie nom:fraction (ex: tachycardia:0.05), répétable")
+    parser.add_argument('--transport', choices=['direct', 'client', 'http'], default='direct')
+    parser.add_argument('--url', default='http://localhost:5000', help="Serveur cible (transport http)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    simulator = SensorSimulator(args.devices, seed=args.seed)
+    for entry in args.scenario:
+        name, _, fraction = entry.partition(':')
+        simulator.inject(name, fraction=float(fraction or 1.0))
+
+    result = drive(simulator, make_ingest(args.transport, args.url), args.rate, args.duration, args.flush_every)
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,189 @@
+"""
+Sérialisation et optimisation des réponses de l'API.
+
+- Encodeur JSON interchangeable: orjson s'il est installé (plusieurs fois plus
+  rapide que le module json), sinon l'encodeur standard de Flask.
+- Compression négociée via Accept-Encoding: brotli (si le paquet brotli est
+  installé) ou gzip, au-delà de COMPRESSION_MIN_BYTES. Les corps compressés des
+  réponses versionnées (avec ETag) sont mis en cache, indexés par l'empreinte
+  du corps: un ETag faible ne couvre pas les champs volatils (horodatage...).
+- Requêtes conditionnelles: une réponse portant un ETag est remplacée par
+  304 Not Modified si le client envoie le même ETag dans If-None-Match.
+- Sélection de champs (?fields=value,status) pour alléger les réponses.
+
+Les réponses en flux (Server-Sent Events) ne sont jamais modifiées.
+"""
+
+import gzip
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_BYTES = 1024
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/plain', 'text/csv', 'text/html')
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+# Distingue les ETags de deux processus successifs (les versions repartent de 1 au redémarrage)
+_ETAG_SALT = uuid.uuid4().hex
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Fournisseur JSON de Flask utilisant orjson, avec repli sur l'encodeur standard"""
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(
+                obj, default=self.default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            ).decode('utf-8')
+        except TypeError:
+            # Types non pris en charge par orjson (ex: entiers de plus de 64 bits)
+            return super().dumps(obj)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps(obj), mimetype=self.mimetype)
+
+
+def make_etag(*parts):
+    """ETag déterministe d'une ressource versionnée"""
+    digest = hashlib.sha1(_ETAG_SALT.encode('ascii'))
+    for part in parts:
+        digest.update(b'\0')
+        digest.update(str(part).encode('utf-8'))
+    return digest.hexdigest()[:24]
+
+
+def requested_fields():
+    """Champs demandés par ?fields=a,b (tuple trié), ou None pour tous les champs"""
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return tuple(sorted({field.strip() for field in fields.split(',') if field.strip()}))
+
+
+def select_fields(item, fields):
+    """Copie d'un dictionnaire réduite aux champs demandés (l'original si fields est None)"""
+    if fields is None:
+        return item
+    return {key: value for key, value in item.items() if key in fields}
+
+
+def negotiate_encoding(accept_encoding):
+    """Meilleur encodage accepté par le client parmi ceux disponibles (None: pas de compression)"""
+    if brotli is not None and accept_encoding['br']:
+        return 'br'
+    if accept_encoding['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressedBodyCache:
+    """Corps compressés des réponses versionnées, indexés par (empreinte du corps, encodage)"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def optimize_response(response, cache=None):
+    """
+    Requête conditionnelle et compression d'une réponse (hook after_request)
+
+    Args:
+        response: Réponse Flask
+        cache: CompressedBodyCache des réponses portant un ETag (optionnel)
+    """
+    if response.is_streamed or response.direct_passthrough:
+        return response
+
+    etag, _ = response.get_etag()
+    if etag:
+        response.make_conditional(request)
+        if response.status_code == 304:
+            return response
+
+    if (response.status_code != 200 or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(request.accept_encodings)
+    if encoding is None or response.content_length is None or response.content_length < COMPRESSION_MIN_BYTES:
+        return response
+
+    data = response.get_data()
+    key = None
+    if etag and cache is not None:
+        # Le corps exact sert de clé (hachage bien plus rapide que la compression)
+        key = (hashlib.blake2b(data, digest_size=16).digest(), encoding)
+    body = cache.get(key) if key else None
+    if body is None:
+        body = compress(data, encoding)
+        if key:
+            cache.put(key, body)
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_app(app, json_encoder='auto', compression=True, cache_entries=1024):
+    """
+    Installe la couche de sérialisation sur l'application
+
+    Args:
+        json_encoder: 'auto' (orjson si disponible), 'orjson' ou 'std'
+        compression: Compression et requêtes conditionnelles des réponses
+        cache_entries: Nombre de corps compressés mis en cache
+    """
+    if json_encoder == 'orjson' and orjson is None:
+        raise ImportError("L'encodeur orjson nécessite le paquet orjson (pip install orjson)")
+    if json_encoder in ('auto', 'orjson') and orjson is not None:
+        app.json = FastJSONProvider(app)
+
+    if compression:
+        cache = CompressedBodyCache(cache_entries)
+        app.after_request(lambda response: optimize_response(response, cache))
@@ -0,0 +1,277 @@
+"""
+Lanceur de production du backend CardioAI.
+
+Remplace le serveur de développement Flask (app.run(debug=True)), qui traite
+mal les requêtes longues et concurrentes. Serveurs disponibles:
+- waitress: serveur WSGI multi-thread de production. Nécessite waitress.
+- threaded: serveur Werkzeug multi-thread, sans dépendance supplémentaire.
+- asgi: boucle asyncio (uvicorn); l'application Flask est adaptée par
+  WsgiAdapter, chaque requête est exécutée dans un pool de --threads threads et
+  ne bloque jamais la boucle d'événements. Nécessite uvicorn. Seul serveur
+  acceptant plusieurs processus (--workers).
+- auto (par défaut): waitress s'il est installé, sinon threaded.
+
+Plusieurs processus (--workers, serveur asgi): chaque worker importe et
+initialise l'application; l'état commun passe par STATE_BACKEND_URL
+(sqlite:// ou redis://, memory:// est refusé). Préférences, appareils surveillés
+et leader du monitoring y sont relus périodiquement. Toute modification de
+l'état d'un appareil (mesures reçues ou simulées par le leader, alertes lues,
+calibrations, scénarios) est ajoutée au journal des appareils, que chaque
+worker applique dans le même ordre: une requête peut être servie par n'importe
+quel worker (uvicorn ne permet pas de router un appareil vers un worker), avec
+au plus DEVICE_LOG_INTERVAL secondes de retard pour les écritures des autres.
+
+Utilisation:
+    python serve.py --server auto --port 5000 --threads 32
+    python serve.py --server asgi --workers 4
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+import model_integration
+
+SERVERS = ('auto', 'asgi', 'waitress', 'threaded')
+
+logger = logging.getLogger(__name__)
+
+# Taille au-delà de laquelle le corps d'une requête ASGI est écrit sur disque
+BODY_SPOOL_BYTES = 1024 * 1024
+
+
+def asgi_available():
+    try:
+        import uvicorn  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def waitress_available():
+    try:
+        import waitress  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def build_environ(scope, body, length):
+    """Environnement WSGI (PEP 3333) d'une requête ASGI http"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': str(client[0]),
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(length),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue  # Remplacé par la taille réelle du corps reçu
+        key = name if name == 'CONTENT_TYPE' else f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class WsgiAdapter:
+    """
+    Application ASGI exécutant une application WSGI dans un pool de threads dimensionné
+
+    Chaque requête occupe un thread du pool pendant toute sa durée (flux SSE
+    compris): threads est le nombre de requêtes traitées simultanément. Les
+    flux sont limités à la moitié des threads (voir limit_streams). Les
+    morceaux de la réponse sont transmis à la boucle au fur et à mesure; une
+    déconnexion du client arrête l'itération de la réponse.
+    """
+
+    def __init__(self, wsgi_app, threads):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='request')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"Type de connexion ASGI non pris en charge: {scope['type']}")
+
+        body = SpooledTemporaryFile(max_size=BODY_SPOOL_BYTES)
+        try:
+            length = 0
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                chunk = message.get('body', b'')
+                body.write(chunk)
+                length += len(chunk)
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+
+            loop = asyncio.get_running_loop()
+            disconnected = threading.Event()
+            watcher = loop.create_task(self.watch_disconnect(receive, disconnected))
+            try:
+                await loop.run_in_executor(
+                    self.executor, self.run, build_environ(scope, body, length), send, loop, disconnected
+                )
+            finally:
+                watcher.cancel()
+        finally:
+            body.close()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def watch_disconnect(receive, disconnected):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    def run(self, environ, send, loop, disconnected):
+        """Exécute la requête WSGI (dans un thread du pool) et transmet la réponse à la boucle"""
+        response = {}
+
+        def emit(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info is not None and response.get('started'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['start'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+            }
+            return write
+
+        def write(data):
+            if not response.get('started'):
+                emit(response['start'])
+                response['started'] = True
+            if data:
+                emit({'type': 'http.response.body', 'body': bytes(data), 'more_body': True})
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in result:
+                if disconnected.is_set():
+                    return
+                write(chunk)
+            if not disconnected.is_set():
+                write(b'')
+                emit({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+
+def limit_streams(threads):
+    """
+    Borne les flux SSE ouverts à la moitié des threads du serveur
+
+    Un flux occupe un thread tant que le client reste connecté: sans cette limite,
+    threads tableaux de bord ouverts bloqueraient toutes les autres requêtes.
+    """
+    slots = model_integration.stream_slots
+    slots.limit = min(model_integration.STREAM_MAX_CLIENTS, max(1, threads // 2))
+
+
+def create_asgi_app(threads):
+    """Application ASGI servant l'application Flask avec threads requêtes simultanées"""
+    limit_streams(threads)
+    return WsgiAdapter(model_integration.app, threads)
+
+
+def create_worker_app():
+    """Application d'un worker (uvicorn --workers): chaque processus s'initialise lui-même"""
+    model_integration.configure_logging()
+    model_integration.prepare_server()
+    return create_asgi_app(int(os.environ.get('CARDIOAI_THREADS', 32)))
+
+
+def resolve_server(server):
+    if server != 'auto':
+        return server
+    if waitress_available():
+        return 'waitress'
+    return 'threaded'
+
+
+def serve(server='auto', host='0.0.0.0', port=model_integration.PORT, threads=32, workers=1):
+    """Démarre le serveur choisi (bloquant)"""
+    server = resolve_server(server)
+    if workers > 1:
+        if server != 'asgi':
+            raise SystemExit("Plusieurs workers nécessitent le serveur asgi (--server asgi)")
+        if model_integration.STATE_BACKEND_URL == 'memory://':
+            raise SystemExit("Plusieurs workers nécessitent un état partagé (STATE_BACKEND_URL sqlite:// ou redis://)")
+    else:
+        model_integration.prepare_server()
+    logger.info("Démarrage du serveur (%s, %d worker(s) x %d threads) sur le port %d...",
+                server, workers, threads, port)
+
+    if server == 'asgi':
+        if not asgi_available():
+            raise SystemExit("Le serveur asgi nécessite uvicorn (pip install uvicorn)")
+        import uvicorn
+        if workers > 1:
+            os.environ['CARDIOAI_THREADS'] = str(threads)
+            uvicorn.run('serve:create_worker_app', factory=True, workers=workers, host=host, port=port,
+                        lifespan='on', log_level='warning')
+        else:
+            uvicorn.run(create_asgi_app(threads), host=host, port=port, lifespan='on', log_level='warning')
+
+    elif server == 'waitress':
+        if not waitress_available():
+            raise SystemExit("Le serveur waitress nécessite waitress (pip install waitress)")
+        import waitress
+        limit_streams(threads)
+        waitress.serve(model_integration.app, host=host, port=port, threads=threads)
+
+    else:
+        from werkzeug.serving import run_simple
+        run_simple(host, port, model_integration.app, threaded=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Lanceur de production du backend CardioAI")
+    parser.add_argument('--server', choices=SERVERS, default='auto')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=model_integration.PORT)
+    parser.add_argument('--threads', type=int, default=32, help="Requêtes traitées simultanément (par worker)")
+    parser.add_argument('--workers', type=int, default=1, help="Processus servant les requêtes (serveur asgi)")
+    args = parser.parse_args()
+
+    model_integration.configure_logging()
+    serve(args.server, args.host, args.port, args.threads, args.workers)
@@ -0,0 +1,226 @@
+"""
+Stockage persistant des sessions de monitoring.
+
+Les sessions sont conservées dans une base SQLite (mode WAL):
+- index primaire sur l'identifiant: lecture et suppression en temps constant
+  quel que soit le nombre de sessions
+- index sur (savedAt, id): historique paginé par curseur (keyset), sans OFFSET,
+  donc aussi rapide à la millionième session qu'à la première
+- le nombre total de sessions est tenu à jour par des triggers (pas de COUNT(*))
+
+Les écritures sont regroupées: une sauvegarde est mise en attente et les
+sessions en attente sont écrites dans une seule transaction, au plus tard après
+flush_interval secondes ou dès max_batch sessions. Toute lecture écrit d'abord
+les sessions en attente, si bien qu'une session sauvegardée est immédiatement visible.
+
+La base n'est ouverte (et créée) qu'à la première lecture ou écriture: importer
+l'application ne crée aucun fichier.
+"""
+
+import base64
+import json
+import sqlite3
+import threading
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS sessions ('
+    'id TEXT PRIMARY KEY, saved_at TEXT NOT NULL, data TEXT NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS sessions_saved_at ON sessions (saved_at, id)',
+    'CREATE TABLE IF NOT EXISTS session_count (total INTEGER NOT NULL)',
+    'INSERT INTO session_count SELECT COUNT(*) FROM sessions WHERE NOT EXISTS (SELECT 1 FROM session_count)',
+    'CREATE TRIGGER IF NOT EXISTS sessions_insert AFTER INSERT ON sessions '
+    'BEGIN UPDATE session_count SET total = total + 1; END',
+    'CREATE TRIGGER IF NOT EXISTS sessions_delete AFTER DELETE ON sessions '
+    'BEGIN UPDATE session_count SET total = total - 1; END',
+)
+
+
+def encode_cursor(saved_at, session_id):
+    """Curseur opaque désignant la dernière session d'une page"""
+    return base64.urlsafe_b64encode(json.dumps([saved_at, session_id]).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        saved_at, session_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(saved_at), str(session_id)
+    except (ValueError, TypeError):
+        raise ValueError("Curseur de pagination invalide")
+
+
+class SessionStore:
+    """
+    Sessions de monitoring persistées dans SQLite
+
+    Args:
+        path: Chemin de la base SQLite (':memory:' pour un stockage non persistant)
+        flush_interval: Délai maximal avant écriture des sessions en attente (en secondes)
+        max_batch: Nombre de sessions en attente déclenchant une écriture immédiate
+        on_change: Appelée après chaque transaction qui modifie la base (écriture ou suppression),
+            sous le verrou du stockage: elle ne doit pas relire le stockage
+    """
+
+    def __init__(self, path, flush_interval=0.05, max_batch=500, on_change=None):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.on_change = on_change
+
+        self._db = None
+        self._lock = threading.Lock()
+        self._pending = {}  # id -> (savedAt, JSON sérialisé)
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._writer = None
+        self.version = 0  # Incrémentée à chaque sauvegarde ou suppression (ETag de l'historique)
+
+    def _database(self):
+        """Connexion SQLite, ouverte et initialisée à la première utilisation (sous le verrou)"""
+        if self._db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                db.execute(statement)
+            db.commit()
+            self._db = db
+        return self._db
+
+    def save(self, session):
+        """Met en attente l'écriture d'une session (remplace la session de même id)"""
+        row = (session['savedAt'], json.dumps(session, ensure_ascii=False))
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Stockage des sessions fermé")
+            self._pending[str(session['id'])] = row
+            self.version += 1
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name='session-store-writer', daemon=True)
+                self._writer.start()
+            if len(self._pending) >= self.max_batch:
+                self._wakeup.set()
+
+    @property
+    def pending_writes(self):
+        """Nombre de sessions en attente d'écriture"""
+        return len(self._pending)
+
+    def flush(self):
+        """Écrit les sessions en attente dans une seule transaction"""
+        with self._lock:
+            self._flush_locked()
+
+    def get(self, session_id):
+        with self._lock:
+            self._flush_locked()
+            row = self._database().execute('SELECT data FROM sessions WHERE id = ?', (session_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, session_id):
+        """Supprime une session; retourne False si elle n'existe pas"""
+        with self._lock:
+            self._flush_locked()
+            db = self._database()
+            deleted = db.execute('DELETE FROM sessions WHERE id = ?', (session_id,)).rowcount
+            db.commit()
+            if deleted:
+                self.version += 1
+                self._changed()
+        return deleted > 0
+
+    def history(self, limit=10, cursor=None):
+        """
+        Sessions de la plus récente à la plus ancienne
+
+        Args:
+            limit: Nombre de sessions de la page
+            cursor: Curseur retourné par la page précédente (None: première page)
+
+        Returns:
+            Tuple (sessions, curseur de la page suivante ou None)
+
+        Raises:
+            ValueError: Curseur invalide
+        """
+        limit = max(0, int(limit))
+        query = 'SELECT saved_at, id, data FROM sessions'
+        params = []
+        if cursor:
+            saved_at, session_id = decode_cursor(cursor)
+            query += ' WHERE saved_at < ? OR (saved_at = ? AND id < ?)'
+            params = [saved_at, saved_at, session_id]
+        query += ' ORDER BY saved_at DESC, id DESC LIMIT ?'
+        # Une session de plus indique s'il existe une page suivante
+        params.append(limit + 1)
+
+        with self._lock:
+            self._flush_locked()
+            rows = self._database().execute(query, params).fetchall()
+
+        next_cursor = encode_cursor(rows[limit - 1][0], rows[limit - 1][1]) if len(rows) > limit > 0 else None
+        return [json.loads(row[2]) for row in rows[:limit]], next_cursor
+
+    def changes(self, after=None, limit=1000):
+        """
+        Sessions dans l'ordre de sauvegarde, à partir d'une position (exports incrémentaux)
+
+        Args:
+            after: (savedAt, id) de la dernière session déjà lue (None: depuis le début)
+            limit: Nombre maximal de sessions
+
+        Returns:
+            Liste de tuples (savedAt, id, JSON de la session)
+        """
+        query = 'SELECT saved_at, id, data FROM sessions'
+        params = []
+        if after:
+            query += ' WHERE saved_at > ? OR (saved_at = ? AND id > ?)'
+            params = [after[0], after[0], after[1]]
+        query += ' ORDER BY saved_at, id LIMIT ?'
+        params.append(max(0, int(limit)))
+
+        with self._lock:
+            self._flush_locked()
+            return self._database().execute(query, params).fetchall()
+
+    def count(self):
+        with self._lock:
+            self._flush_locked()
+            return self._database().execute('SELECT total FROM session_count').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_locked()
+            self._closed = True
+            if self._db is not None:
+                self._db.close()
+        self._wakeup.set()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        rows = [(session_id, saved_at, data) for session_id, (saved_at, data) in self._pending.items()]
+        self._pending.clear()
+        db = self._database()
+        with db:
+            db.executemany(
+                'INSERT INTO sessions (id, saved_at, data) VALUES (?, ?, ?) '
+                'ON CONFLICT(id) DO UPDATE SET saved_at = excluded.saved_at, data = excluded.data',
+                rows
+            )
+        self._changed()
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            with self._lock:
+                if self._closed:
+                    return
+                self._flush_locked()
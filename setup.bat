@@ -70,7 +70,7 @@ echo ========================================
 echo.
 echo To run the application:
 echo 1. Open two command prompt windows
-echo 2. In the first window, run: python model_integration.py
+echo 2. In the first window, run: python serve.py
 echo 3. In the second window, run: npm run dev
 echo 4. Open your browser to: http://localhost:5174
 echo.
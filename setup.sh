@@ -70,7 +70,7 @@ echo "========================================"
 echo
 echo "To run the application:"
 echo "1. Open two terminal windows"
-echo "2. In the first terminal, run: $PYTHON_CMD model_integration.py"
+echo "2. In the first terminal, run: $PYTHON_CMD serve.py"
 echo "3. In the second terminal, run: npm run dev"
 echo "4. Open your browser to: http://localhost:5174"
 echo
@@ -100,18 +100,18 @@ function IoTMonitoring() {
     const seconds = Math.floor((uptimeMs % (1000 * 60)) / 1000);
     const uptime = `${hours.toString().padStart(2, '0')}:${minutes.toString().padStart(2, '0')}:${seconds.toString().padStart(2, '0')}`;
 
-    // Calculer le nombre de capteurs connectés
+    // Calculer le nombre de capteurs connectés: le flux temps réel n'envoie que les changements,
+    // un capteur stable reste connecté tant que le flux est ouvert
     const sensorData = globalState.sensorData || {};
-    const connectedSensors = Object.keys(sensorData).filter(key => {
-      const sensor = sensorData[key];
-      return sensor && sensor.lastUpdate &&
-             (currentTime - new Date(sensor.lastUpdate)) < 10000; // Connecté si mis à jour dans les 10 dernières secondes
-    }).length;
+    const streamOpen = globalState.streamStatus === 'open';
+    const connectedSensors = streamOpen ? Object.keys(sensorData).filter(key => sensorData[key]?.lastUpdate).length : 0;
 
     // Calculer la qualité du signal basée sur la fréquence des mises à jour
     let signalQuality = 'Inconnue';
     if (globalState.isMonitoring) {
-      if (connectedSensors >= 3) {
+      if (!streamOpen) {
+        signalQuality = 'Reconnexion...';
+      } else if (connectedSensors >= 3) {
         signalQuality = 'Excellente';
       } else if (connectedSensors >= 2) {
         signalQuality = 'Bonne';
@@ -144,7 +144,7 @@ function IoTMonitoring() {
     }, 1000);
 
     return () => clearInterval(interval);
-  }, [globalState.isMonitoring, globalState.startTime, globalState.sensorData]);
+  }, [globalState.isMonitoring, globalState.startTime, globalState.sensorData, globalState.streamStatus]);
 
   // Gestion du monitoring via le service global
   const handleMonitoringToggle = async () => {
@@ -3,6 +3,9 @@ import sessionService from './sessionService';
 import globalNotificationService from './globalNotificationService';
 import emergencyService from './emergencyService';
 
+// Points d'historique récent conservés par capteur (comme HISTORY_PREVIEW_POINTS côté serveur)
+const HISTORY_PREVIEW_POINTS = 50;
+
 /**
  * Service global pour gérer l'état du monitoring IoT
  * qui persiste entre les changements de page
@@ -11,8 +14,8 @@ class GlobalMonitoringService {
   constructor() {
     this.isMonitoring = false;
     this.currentSession = null;
-    this.monitoringInterval = null;
-    this.alertInterval = null;
+    this.unsubscribeStream = null;
+    this.streamStatus = 'closed';
     this.sensorData = {
       heartRate: { value: 72, unit: 'bpm', status: 'normal', history: [] },
       bloodPressure: { systolic: 120, diastolic: 80, unit: 'mmHg', status: 'normal', history: [] },
@@ -48,7 +51,8 @@ class GlobalMonitoringService {
           sensorData: this.sensorData,
           alerts: this.alerts,
           lastUpdate: this.lastUpdate,
-          currentSession: this.currentSession
+          currentSession: this.currentSession,
+          streamStatus: this.streamStatus
         });
       } catch (error) {
         console.error('Erreur dans le listener:', error);
@@ -120,7 +124,7 @@ class GlobalMonitoringService {
       // Démarrer le monitoring sur le backend
       await iotService.startMonitoring();
 
-      // Démarrer les intervalles de collecte de données
+      // S'abonner au flux temps réel des changements
       this.startDataCollection();
 
       this.isMonitoring = true;
@@ -142,7 +146,7 @@ class GlobalMonitoringService {
       // Vérifier que le backend est toujours en monitoring
       await iotService.startMonitoring();
       
-      // Redémarrer les intervalles
+      // Rouvrir le flux temps réel
       this.startDataCollection();
       
       this.notifyListeners();
@@ -166,7 +170,7 @@ class GlobalMonitoringService {
     }
 
     try {
-      // Arrêter les intervalles
+      // Fermer le flux temps réel
       this.stopDataCollection();
 
       // Arrêter le monitoring sur le backend
@@ -190,77 +194,114 @@ class GlobalMonitoringService {
   }
 
   /**
-   * Démarre la collecte de données
+   * Démarre la collecte de données via le flux temps réel
+   * Les valeurs et les historiques complets ne sont lus qu'à la connexion et aux resynchronisations
+   * (événement 'snapshot'); ensuite seuls les changements et les nouvelles alertes sont reçus
    */
   startDataCollection() {
-    // Arrêter les intervalles existants
+    // Fermer le flux existant
     this.stopDataCollection();
 
-    const updateInterval = this.preferences?.displaySettings?.updateInterval || 2000;
-
-    // Intervalle pour les données des capteurs
-    this.monitoringInterval = setInterval(async () => {
-      try {
-        const response = await iotService.getCurrentSensorData();
-        if (response.status === 'success') {
-          this.sensorData = this.filterSensorDataByPreferences(response.data);
-          this.lastUpdate = new Date();
-          this.saveState();
-          this.notifyListeners();
-        }
-      } catch (error) {
-        console.error('Erreur lors de la récupération des données:', error);
-        // Fallback vers la simulation locale
-        const simulatedData = iotService.simulateSensorData();
-        this.sensorData = this.filterSensorDataByPreferences(simulatedData.sensors);
-        this.lastUpdate = new Date();
-        this.saveState();
+    this.unsubscribeStream = iotService.subscribeToStream({
+      onSnapshot: () => this.resynchronize(),
+      onSensor: (update) => this.applySensorUpdate(update),
+      onAlert: (alert) => this.addAlert(alert),
+      onStatus: (status) => {
+        this.streamStatus = status;
         this.notifyListeners();
       }
-    }, updateInterval);
+    });
+  }
 
-    // Intervalle pour les alertes
-    this.alertInterval = setInterval(async () => {
-      try {
-        const alertResponse = await iotService.getActiveAlerts();
-        if (alertResponse.status === 'success') {
-          const newAlerts = alertResponse.alerts;
-
-          // Détecter les nouvelles alertes et les ajouter aux notifications
-          newAlerts.forEach(alert => {
-            const isNewAlert = !this.alerts.find(existingAlert => existingAlert.id === alert.id);
-            if (isNewAlert) {
-              globalNotificationService.addIoTAlert(alert);
-
-              // Vérifier si un appel d'urgence doit être déclenché
-              emergencyService.triggerEmergency(alert).catch(error => {
-                console.error('Erreur lors du déclenchement d\'urgence:', error);
-              });
-            }
-          });
-
-          this.alerts = newAlerts;
-          this.saveState();
-          this.notifyListeners();
-        }
-      } catch (error) {
-        console.error('Erreur lors de la récupération des alertes:', error);
+  /**
+   * Relit l'état complet (valeurs, historiques récents et alertes) après un snapshot du flux
+   */
+  async resynchronize() {
+    try {
+      const [response, alertResponse] = await Promise.all([
+        iotService.getCurrentSensorData(),
+        iotService.getActiveAlerts()
+      ]);
+      if (response.status === 'success') {
+        this.sensorData = this.filterSensorDataByPreferences(response.data);
+      }
+      if (alertResponse.status === 'success') {
+        alertResponse.alerts.forEach(alert => {
+          if (!this.alerts.find(existingAlert => existingAlert.id === alert.id)) {
+            this.notifyAlert(alert);
+          }
+        });
+        this.alerts = alertResponse.alerts;
       }
-    }, 5000);
+      this.lastUpdate = new Date();
+      this.saveState();
+      this.notifyListeners();
+    } catch (error) {
+      console.error('Erreur lors de la resynchronisation des données:', error);
+    }
+  }
+
+  /**
+   * Applique un événement 'sensor' du flux (nouvelle valeur ou nouveau statut d'un capteur)
+   */
+  applySensorUpdate(update) {
+    const { sensor } = update;
+    const current = { ...update };
+    delete current.deviceId;
+    delete current.sensor;
+    if (this.preferences?.enabledSensors && !this.preferences.enabledSensors[sensor]) return;
+
+    const previous = this.sensorData[sensor] || {};
+    const timestamp = new Date(current.lastUpdate || Date.now());
+    const point = {
+      timestamp: timestamp.toISOString(),
+      time: timestamp.toLocaleTimeString('fr-FR', { hour12: false }),
+      value: sensor === 'bloodPressure' ? `${current.systolic}/${current.diastolic}` : current.value
+    };
+    if (sensor === 'bloodPressure') {
+      point.systolic = current.systolic;
+      point.diastolic = current.diastolic;
+    }
+
+    // Historique récent tenu à jour localement (mêmes entrées que /sensors/current)
+    const history = [...(previous.history || []), point].slice(-HISTORY_PREVIEW_POINTS);
+    this.sensorData = { ...this.sensorData, [sensor]: { ...previous, ...current, history } };
+    this.lastUpdate = new Date();
+    this.saveState();
+    this.notifyListeners();
+  }
+
+  /**
+   * Ajoute une alerte reçue par le flux
+   */
+  addAlert(alert) {
+    if (this.alerts.find(existingAlert => existingAlert.id === alert.id)) return;
+    this.notifyAlert(alert);
+    this.alerts = [alert, ...this.alerts];
+    this.saveState();
+    this.notifyListeners();
+  }
+
+  /**
+   * Notifie une nouvelle alerte et déclenche si nécessaire un appel d'urgence
+   */
+  notifyAlert(alert) {
+    globalNotificationService.addIoTAlert(alert);
+
+    emergencyService.triggerEmergency(alert).catch(error => {
+      console.error('Erreur lors du déclenchement d\'urgence:', error);
+    });
   }
 
   /**
    * Arrête la collecte de données
    */
   stopDataCollection() {
-    if (this.monitoringInterval) {
-      clearInterval(this.monitoringInterval);
-      this.monitoringInterval = null;
-    }
-    if (this.alertInterval) {
-      clearInterval(this.alertInterval);
-      this.alertInterval = null;
+    if (this.unsubscribeStream) {
+      this.unsubscribeStream();
+      this.unsubscribeStream = null;
     }
+    this.streamStatus = 'closed';
   }
 
   /**
@@ -358,7 +399,8 @@ class GlobalMonitoringService {
       sensorData: this.sensorData,
       alerts: this.alerts,
       lastUpdate: this.lastUpdate,
-      currentSession: this.currentSession
+      currentSession: this.currentSession,
+      streamStatus: this.streamStatus
     };
   }
 
@@ -53,12 +53,13 @@ const iotService = {
    * Récupère l'historique des données d'un capteur spécifique
    * @param {string} sensorType - Type de capteur (heartRate, bloodPressure, etc.)
    * @param {number} hours - Nombre d'heures d'historique à récupérer
+   * @param {number} [maxPoints] - Nombre maximal de points (agrégats min/max/moyenne ou LTTB)
    * @returns {Promise} - Promesse contenant l'historique des données
    */
-  getSensorHistory: async (sensorType, hours = 24) => {
+  getSensorHistory: async (sensorType, hours = 24, maxPoints = undefined) => {
     try {
       const response = await axios.get(`${IOT_API_URL}/sensors/${sensorType}/history`, {
-        params: { hours }
+        params: { hours, maxPoints }
       });
       return response.data;
     } catch (error) {
@@ -130,19 +131,92 @@ const iotService = {
 
   /**
    * Calibre un capteur spécifique
+   * La calibration s'exécute en tâche de fond côté serveur: son état est consulté jusqu'à la fin
    * @param {string} sensorType - Type de capteur à calibrer
    * @returns {Promise} - Promesse contenant le résultat de calibration
    */
   calibrateSensor: async (sensorType) => {
     try {
       const response = await axios.post(`${IOT_API_URL}/sensors/${sensorType}/calibrate`);
-      return response.data;
+      let job = response.data.job;
+
+      while (job.status === 'pending' || job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, 500));
+        const status = await axios.get(`${IOT_API_URL}/calibrations/${job.id}`);
+        job = status.data.job;
+      }
+
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Échec de la calibration');
+      }
+      return { status: 'success', ...job.result, timestamp: job.finishedAt };
     } catch (error) {
       console.error('Erreur lors de la calibration:', error);
       throw error;
     }
   },
 
+  /**
+   * S'abonne au flux temps réel (Server-Sent Events) des changements de capteurs et des nouvelles alertes
+   * Le navigateur se reconnecte seul en renvoyant Last-Event-ID; si le flux est fermé (erreur serveur),
+   * il est rouvert après un délai croissant avec le dernier jeton reçu (lastEventId): les événements
+   * manqués sont rejoués, ou un nouveau 'snapshot' est envoyé s'ils ne sont plus disponibles
+   * @param {Object} handlers - onSnapshot, onSensor, onAlert (données JSON de l'événement), onStatus ('open' | 'closed')
+   * @param {Object} [options] - sensors (liste des capteurs suivis), alerts (false: sans alertes), deviceId,
+   *   apiUrl (URL de l'API IoT, IOT_API_URL par défaut)
+   * @returns {Function} - Fonction de désabonnement
+   */
+  subscribeToStream: (handlers, options = {}) => {
+    let source = null;
+    let lastEventId = null;
+    let retryTimer = null;
+    let retryDelay = 1000;
+    let closed = false;
+
+    const listen = (type, handler) => {
+      source.addEventListener(type, (event) => {
+        lastEventId = event.lastEventId || lastEventId;
+        if (handler) {
+          try {
+            handler(JSON.parse(event.data));
+          } catch (error) {
+            console.error(`Erreur dans le traitement de l'événement ${type}:`, error);
+          }
+        }
+      });
+    };
+
+    const connect = () => {
+      const params = new URLSearchParams();
+      if (options.deviceId) params.set('deviceId', options.deviceId);
+      if (options.sensors) params.set('sensors', options.sensors.join(','));
+      if (options.alerts === false) params.set('alerts', 'false');
+      if (lastEventId) params.set('lastEventId', lastEventId);
+
+      source = new EventSource(`${options.apiUrl || IOT_API_URL}/stream?${params}`);
+      source.onopen = () => {
+        retryDelay = 1000;
+        handlers.onStatus?.('open');
+      };
+      source.onerror = () => {
+        if (source.readyState !== EventSource.CLOSED || closed) return;
+        handlers.onStatus?.('closed');
+        retryTimer = setTimeout(connect, retryDelay);
+        retryDelay = Math.min(retryDelay * 2, 30000);
+      };
+      listen('snapshot', handlers.onSnapshot);
+      listen('sensor', handlers.onSensor);
+      listen('alert', handlers.onAlert);
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      source?.close();
+    };
+  },
+
   /**
    * Exporte les données vers un fichier CSV
    * @param {string} startDate - Date de début (ISO string)
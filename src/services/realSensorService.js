@@ -1,3 +1,5 @@
+import iotService from './iotService';
+
 /**
  * Service d'intégration de capteurs réels
  * Supporte BLE, WebSocket, API REST, et Web APIs
@@ -138,24 +140,25 @@ class RealSensorService {
   }
 
   /**
-   * Méthode 3: API REST (polling)
+   * Méthode 3: API REST, flux Server-Sent Events des changements (sans polling)
+   * Le flux se reconnecte seul et reprend au dernier événement reçu
    */
-  async connectAPI(baseUrl = 'http://192.168.1.100:8080', interval = 1000) {
+  async connectAPI(baseUrl = 'http://localhost:5000', options = {}) {
     try {
       console.log('🔗 Connexion API REST capteurs...');
       
       this.apiUrl = baseUrl;
-      this.pollingInterval = setInterval(async () => {
-        try {
-          const response = await fetch(`${this.apiUrl}/api/sensors`);
-          if (response.ok) {
-            const data = await response.json();
-            this.processSensorData(data);
-          }
-        } catch (error) {
-          console.error('Erreur polling API:', error);
+      this.unsubscribeStream = iotService.subscribeToStream({
+        onSensor: (update) => {
+          const value = update.sensor === 'bloodPressure'
+            ? { systolic: update.systolic, diastolic: update.diastolic }
+            : update.value;
+          this.processSensorData({ [update.sensor]: value });
+        },
+        onStatus: (status) => {
+          this.isConnected = status === 'open';
         }
-      }, interval);
+      }, { ...options, alerts: false, apiUrl: `${this.apiUrl}/api/iot` });
       
       this.connectionType = 'API';
       this.isConnected = true;
@@ -296,8 +299,9 @@ class RealSensorService {
       this.websocket.close();
     }
     
-    if (this.pollingInterval) {
-      clearInterval(this.pollingInterval);
+    if (this.unsubscribeStream) {
+      this.unsubscribeStream();
+      this.unsubscribeStream = null;
     }
     
     this.isConnected = false;
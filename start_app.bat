@@ -5,7 +5,7 @@ echo ========================================
 echo.
 
 echo Starting backend server...
-start "Backend Server" cmd /k "python model_integration.py"
+start "Backend Server" cmd /k "python serve.py"
 
 echo Waiting for backend to start...
 timeout /t 3 /nobreak >nul
@@ -13,7 +13,7 @@ else
 fi
 
 echo "Starting backend server..."
-$PYTHON_CMD model_integration.py &
+$PYTHON_CMD serve.py &
 BACKEND_PID=$!
 
 echo "Waiting for backend to start..."
@@ -0,0 +1,778 @@
+"""
+État partagé entre les processus du backend et élection du processus leader.
+
+Plusieurs processus (workers d'un serveur, machines derrière un répartiteur)
+doivent voir les mêmes préférences et les mêmes appareils surveillés, et un seul
+d'entre eux doit exécuter les tâches de fond uniques (boucle de monitoring,
+exports périodiques). Trois implémentations de la même interface:
+- memory://: dans le processus (un seul worker, comportement historique)
+- sqlite:///chemin.db: base SQLite en mode WAL partagée par les processus d'une machine
+- redis://hôte:port/base: serveur parlant le protocole Redis (RESP), pour
+  plusieurs machines; client intégré, sans dépendance. Un serveur de
+  substitution en mémoire permet de l'essayer sans Redis:
+      python state_backend.py standin --port 6399
+
+Valeurs: documents JSON versionnés (chaque écriture incrémente la version, que
+les processus relisent périodiquement pour détecter un changement).
+Ensembles: membres ajoutés / retirés individuellement (appareils surveillés).
+Journaux: entrées JSON en ajout seul, numérotées 1, 2, 3... dans l'ordre d'ajout
+(le même pour tous les lecteurs); seules les max_entries dernières entrées
+(jusqu'au double) sont conservées.
+Baux: un seul propriétaire à la fois, jusqu'à expiration; le propriétaire le
+renouvelle avant l'échéance. LeaderElection s'appuie sur un bail: un processus
+qui ne parvient plus à le renouveler cesse d'être leader avant que le bail ne
+puisse être attribué à un autre.
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class StateBackendError(RuntimeError):
+    """Backend d'état injoignable ou réponse invalide"""
+
+
+def _json_default(value):
+    """Tableaux numpy (ou tout objet ayant tolist) dans les entrées de journal"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"Type non sérialisable en JSON: {type(value).__name__}")
+
+
+def encode_entry(entry):
+    return json.dumps(entry, default=_json_default)
+
+
+class MemoryBackend:
+    """État dans le processus courant"""
+
+    name = 'memory'
+    shared = False
+
+    def __init__(self):
+        self._values = {}  # clé -> (version, valeur)
+        self._sets = {}
+        self._leases = {}  # nom -> (propriétaire, échéance time.monotonic())
+        self._logs = {}  # clé -> [numéro de la première entrée conservée, entrées]
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._values.get(key)
+        return None if entry is None else json.loads(entry[1])
+
+    def version(self, key):
+        with self._lock:
+            entry = self._values.get(key)
+        return 0 if entry is None else entry[0]
+
+    def set(self, key, value):
+        """Enregistre une valeur JSON; retourne sa nouvelle version"""
+        data = json.dumps(value)
+        with self._lock:
+            version = self._values.get(key, (0, None))[0] + 1
+            self._values[key] = (version, data)
+        return version
+
+    def add_member(self, key, member):
+        with self._lock:
+            self._sets.setdefault(key, set()).add(member)
+
+    def remove_member(self, key, member):
+        with self._lock:
+            self._sets.get(key, set()).discard(member)
+
+    def members(self, key):
+        with self._lock:
+            return set(self._sets.get(key, ()))
+
+    def append_log(self, key, entry, max_entries=None):
+        """Ajoute une entrée JSON à un journal; retourne son numéro"""
+        data = encode_entry(entry)
+        with self._lock:
+            log = self._logs.setdefault(key, [1, []])
+            log[1].append(data)
+            position = log[0] + len(log[1]) - 1
+            if max_entries and len(log[1]) > 2 * max_entries:
+                removed = len(log[1]) - max_entries
+                del log[1][:removed]
+                log[0] += removed
+        return position
+
+    def read_log(self, key, after, limit):
+        """
+        Entrées d'un journal postérieures au numéro after
+
+        Returns:
+            Tuple (liste de (numéro, entrée), numéro de la première entrée conservée)
+        """
+        with self._lock:
+            first, entries = self._logs.get(key, (1, []))
+            start = max(after + 1, first)
+            selected = entries[start - first:start - first + limit]
+        return [(start + index, json.loads(data)) for index, data in enumerate(selected)], first
+
+    def acquire_lease(self, name, owner, ttl):
+        """Prend ou renouvelle un bail de ttl secondes; False s'il appartient à un autre propriétaire"""
+        now = time.monotonic()
+        with self._lock:
+            current = self._leases.get(name)
+            if current is not None and current[0] != owner and current[1] > now:
+                return False
+            self._leases[name] = (owner, now + ttl)
+            return True
+
+    def release_lease(self, name, owner):
+        with self._lock:
+            current = self._leases.get(name)
+            if current is not None and current[0] == owner:
+                del self._leases[name]
+
+    def lease_owner(self, name):
+        with self._lock:
+            current = self._leases.get(name)
+        return current[0] if current is not None and current[1] > time.monotonic() else None
+
+    def close(self):
+        pass
+
+
+class SQLiteBackend:
+    """
+    État partagé par les processus d'une machine (SQLite en mode WAL)
+
+    Les baux sont datés par l'horloge murale (time.time()), commune aux processus.
+    """
+
+    name = 'sqlite'
+    shared = True
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS state_values (key TEXT PRIMARY KEY, version INTEGER NOT NULL, value TEXT NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS state_members (key TEXT NOT NULL, member TEXT NOT NULL, PRIMARY KEY (key, member))',
+        'CREATE TABLE IF NOT EXISTS state_leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS state_log (key TEXT NOT NULL, position INTEGER NOT NULL, value TEXT NOT NULL, '
+        'PRIMARY KEY (key, position))',
+    )
+
+    def __init__(self, path, timeout=5.0):
+        self.path = path
+        self._db = sqlite3.connect(path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        for statement in self.SCHEMA:
+            self._db.execute(statement)
+        self._lock = threading.Lock()
+
+    def _execute(self, query, params=()):
+        with self._lock:
+            try:
+                return self._db.execute(query, params).fetchall()
+            except sqlite3.Error as e:
+                raise StateBackendError(f"Backend SQLite {self.path}: {e}")
+
+    def get(self, key):
+        rows = self._execute('SELECT value FROM state_values WHERE key = ?', (key,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def version(self, key):
+        rows = self._execute('SELECT version FROM state_values WHERE key = ?', (key,))
+        return rows[0][0] if rows else 0
+
+    def set(self, key, value):
+        rows = self._execute(
+            'INSERT INTO state_values (key, version, value) VALUES (?, 1, ?) '
+            'ON CONFLICT(key) DO UPDATE SET version = version + 1, value = excluded.value RETURNING version',
+            (key, json.dumps(value))
+        )
+        return rows[0][0]
+
+    def add_member(self, key, member):
+        self._execute('INSERT OR IGNORE INTO state_members (key, member) VALUES (?, ?)', (key, member))
+
+    def remove_member(self, key, member):
+        self._execute('DELETE FROM state_members WHERE key = ? AND member = ?', (key, member))
+
+    def members(self, key):
+        return {row[0] for row in self._execute('SELECT member FROM state_members WHERE key = ?', (key,))}
+
+    def append_log(self, key, entry, max_entries=None):
+        # Numéro calculé et entrée insérée dans une seule instruction (les écritures SQLite sont sérialisées)
+        position = self._execute(
+            'INSERT INTO state_log (key, position, value) '
+            'SELECT ?, COALESCE(MAX(position), 0) + 1, ? FROM state_log WHERE key = ? RETURNING position',
+            (key, encode_entry(entry), key)
+        )[0][0]
+        if max_entries and position % max_entries == 0:
+            self._execute('DELETE FROM state_log WHERE key = ? AND position <= ?', (key, position - max_entries))
+        return position
+
+    def read_log(self, key, after, limit):
+        rows = self._execute(
+            'SELECT position, value FROM state_log WHERE key = ? AND position > ? ORDER BY position LIMIT ?',
+            (key, after, limit)
+        )
+        first = self._execute('SELECT MIN(position) FROM state_log WHERE key = ?', (key,))[0][0]
+        return [(position, json.loads(value)) for position, value in rows], first or 1
+
+    def acquire_lease(self, name, owner, ttl):
+        now = time.time()
+        # Insertion, ou mise à jour seulement si le bail est à nous ou expiré (une seule instruction: atomique)
+        rows = self._execute(
+            'INSERT INTO state_leases (name, owner, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires = excluded.expires '
+            'WHERE state_leases.owner = excluded.owner OR state_leases.expires < ? RETURNING owner',
+            (name, owner, now + ttl, now)
+        )
+        return bool(rows)
+
+    def release_lease(self, name, owner):
+        self._execute('DELETE FROM state_leases WHERE name = ? AND owner = ?', (name, owner))
+
+    def lease_owner(self, name):
+        rows = self._execute('SELECT owner FROM state_leases WHERE name = ? AND expires >= ?', (name, time.time()))
+        return rows[0][0] if rows else None
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# ============================================================================
+# PROTOCOLE REDIS (RESP)
+# ============================================================================
+
+class RespError(StateBackendError):
+    """Erreur renvoyée par le serveur (réponse '-ERR ...')"""
+
+
+def encode_command(*args):
+    """Commande RESP: tableau de chaînes binaires"""
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+        parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+    return b''.join(parts)
+
+
+def read_reply(stream):
+    """Lit une réponse RESP (chaîne, entier, chaîne binaire, tableau ou None)"""
+    line = stream.readline()
+    if not line.endswith(b'\r\n'):
+        raise StateBackendError("Connexion fermée par le serveur")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b'+':
+        return payload.decode('utf-8')
+    if kind == b'-':
+        raise RespError(payload.decode('utf-8'))
+    if kind == b':':
+        return int(payload)
+    if kind == b'$':
+        length = int(payload)
+        if length < 0:
+            return None
+        data = stream.read(length + 2)
+        return data[:-2]
+    if kind == b'*':
+        length = int(payload)
+        if length < 0:
+            return None
+        items = []
+        for _ in range(length):
+            try:
+                items.append(read_reply(stream))
+            except RespError as e:
+                # Erreur d'une commande d'une transaction: renvoyée à sa place
+                items.append(e)
+        return items
+    raise StateBackendError(f"Réponse RESP invalide: {line!r}")
+
+
+class RedisBackend:
+    """
+    État partagé via un serveur Redis (ou compatible RESP)
+
+    Une connexion par backend, utilisée sous verrou; reconnexion automatique à
+    la commande suivante après une erreur réseau. Les opérations conditionnelles
+    (renouvellement et libération d'un bail) utilisent WATCH / MULTI / EXEC.
+
+    Args:
+        host, port, db: Adresse du serveur et numéro de base
+        prefix: Préfixe des clés (plusieurs déploiements sur un même serveur)
+        timeout: Délai maximal d'une commande (en secondes)
+    """
+
+    name = 'redis'
+    shared = True
+
+    def __init__(self, host='localhost', port=6379, db=0, prefix='cardioai:', timeout=2.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.prefix = prefix
+        self.timeout = timeout
+        self._socket = None
+        self._stream = None
+        self._lock = threading.Lock()
+        self._trimmed = {}  # journal -> dernier nombre d'entrées retirées connu
+
+    def _connect(self):
+        self._socket = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._stream = self._socket.makefile('rb')
+        if self.db:
+            self._send(('SELECT', self.db))
+
+    def _disconnect(self):
+        if self._socket is not None:
+            try:
+                self._stream.close()
+                self._socket.close()
+            except OSError:
+                pass
+        self._socket = self._stream = None
+
+    def _send(self, *commands):
+        self._socket.sendall(b''.join(encode_command(*command) for command in commands))
+        return [read_reply(self._stream) for _ in commands]
+
+    def pipeline(self, *commands):
+        """Envoie plusieurs commandes en un aller-retour; retourne leurs réponses"""
+        with self._lock:
+            try:
+                if self._socket is None:
+                    self._connect()
+                return self._send(*commands)
+            except RespError:
+                raise
+            except (OSError, ValueError, StateBackendError) as e:
+                self._disconnect()
+                raise StateBackendError(f"Backend Redis {self.host}:{self.port}: {e}")
+
+    def command(self, *args):
+        return self.pipeline(args)[0]
+
+    def _key(self, key):
+        return self.prefix + key
+
+    def get(self, key):
+        value = self.command('GET', self._key(key))
+        return None if value is None else json.loads(value)
+
+    def version(self, key):
+        value = self.command('GET', self._key(key) + ':version')
+        return int(value) if value is not None else 0
+
+    def set(self, key, value):
+        replies = self.pipeline(
+            ('MULTI',),
+            ('SET', self._key(key), json.dumps(value)),
+            ('INCR', self._key(key) + ':version'),
+            ('EXEC',)
+        )
+        return int(replies[-1][1])
+
+    def add_member(self, key, member):
+        self.command('SADD', self._key(key), member)
+
+    def remove_member(self, key, member):
+        self.command('SREM', self._key(key), member)
+
+    def members(self, key):
+        return {member.decode('utf-8') for member in self.command('SMEMBERS', self._key(key))}
+
+    def append_log(self, key, entry, max_entries=None):
+        # Journal: liste des entrées et nombre d'entrées retirées en tête (numéro = retirées + rang)
+        log, trimmed = self._key(key), self._key(key) + ':trimmed'
+        length, removed = self.pipeline(
+            ('MULTI',), ('RPUSH', log, encode_entry(entry)), ('GET', trimmed), ('EXEC',)
+        )[-1]
+        if max_entries and length == 2 * max_entries + 1:
+            # Un seul ajout atteint exactement cette longueur: un seul processus tronque
+            self.pipeline(
+                ('MULTI',), ('LTRIM', log, length - max_entries, -1), ('INCRBY', trimmed, length - max_entries),
+                ('EXEC',)
+            )
+        return int(removed or 0) + length
+
+    def read_log(self, key, after, limit):
+        log, trimmed_key = self._key(key), self._key(key) + ':trimmed'
+        trimmed = self._trimmed.get(key, 0)
+        while True:
+            start = max(after - trimmed, 0)
+            removed, values = self.pipeline(
+                ('MULTI',), ('GET', trimmed_key), ('LRANGE', log, start, start + limit - 1), ('EXEC',)
+            )[-1]
+            removed = int(removed or 0)
+            if removed == trimmed:
+                break
+            trimmed = removed  # Tronqué entre-temps: relire avec le bon décalage
+        self._trimmed[key] = trimmed
+        return [(trimmed + start + index + 1, json.loads(value)) for index, value in enumerate(values)], trimmed + 1
+
+    def _if_owner(self, name, owner, command):
+        """Exécute command si le bail appartient à owner (transaction optimiste)"""
+        key = self._key('lease:' + name)
+        with self._lock:
+            try:
+                if self._socket is None:
+                    self._connect()
+                _, current = self._send(('WATCH', key), ('GET', key))
+                if current is None or current.decode('utf-8') != owner:
+                    self._send(('UNWATCH',))
+                    return False
+                # EXEC renvoie None si le bail a changé depuis WATCH
+                return self._send(('MULTI',), command(key), ('EXEC',))[-1] is not None
+            except RespError:
+                raise
+            except (OSError, ValueError, StateBackendError) as e:
+                self._disconnect()
+                raise StateBackendError(f"Backend Redis {self.host}:{self.port}: {e}")
+
+    def acquire_lease(self, name, owner, ttl):
+        ttl_ms = max(1, int(ttl * 1000))
+        if self.command('SET', self._key('lease:' + name), owner, 'NX', 'PX', ttl_ms) is not None:
+            return True
+        return self._if_owner(name, owner, lambda key: ('PEXPIRE', key, ttl_ms))
+
+    def release_lease(self, name, owner):
+        self._if_owner(name, owner, lambda key: ('DEL', key))
+
+    def lease_owner(self, name):
+        owner = self.command('GET', self._key('lease:' + name))
+        return owner.decode('utf-8') if owner is not None else None
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+
+
+def open_backend(url):
+    """
+    Backend d'état désigné par une URL
+
+    Args:
+        url: 'memory://', 'sqlite:///chemin/absolu.db', 'sqlite://relatif.db' ou 'redis://hôte:port/base'
+
+    Raises:
+        ValueError: URL invalide
+    """
+    parsed = urlparse(url or 'memory://')
+    if parsed.scheme == 'memory':
+        return MemoryBackend()
+    if parsed.scheme == 'sqlite':
+        path = (parsed.netloc + parsed.path) if parsed.netloc else parsed.path
+        if not path:
+            raise ValueError(f"Chemin de base SQLite manquant: {url}")
+        return SQLiteBackend(path)
+    if parsed.scheme == 'redis':
+        db = parsed.path.strip('/')
+        return RedisBackend(parsed.hostname or 'localhost', parsed.port or 6379, int(db) if db else 0)
+    raise ValueError(f"Backend d'état inconnu: {url} (memory://, sqlite:///..., redis://...)")
+
+
+class LeaderElection:
+    """
+    Élection d'un leader par bail
+
+    renew() est appelé périodiquement (bien plus souvent que ttl): il prend ou
+    prolonge le bail. Un leader qui n'a pas pu renouveler son bail depuis ttl
+    secondes (backend injoignable, processus suspendu) ne se considère plus
+    comme leader, avant que le bail ne puisse être pris par un autre processus.
+
+    Args:
+        backend: Backend d'état
+        name: Nom du bail
+        owner: Identifiant unique du processus
+        ttl: Durée du bail (en secondes)
+        on_change: Fonction (leader: bool) appelée à chaque changement de rôle
+    """
+
+    def __init__(self, backend, name, owner, ttl=10.0, on_change=None):
+        self.backend = backend
+        self.name = name
+        self.owner = owner
+        self.ttl = ttl
+        self.on_change = on_change
+        self.error = None
+        self._leader = False
+        self._valid_until = 0.0
+
+    @property
+    def is_leader(self):
+        return self._leader and time.monotonic() < self._valid_until
+
+    def renew(self):
+        """Prend ou prolonge le bail; retourne True si ce processus est leader"""
+        was_leader = self.is_leader
+        started = time.monotonic()
+        try:
+            acquired = self.backend.acquire_lease(self.name, self.owner, self.ttl)
+            self.error = None
+        except StateBackendError as e:
+            acquired = False
+            self.error = str(e)
+        if acquired:
+            # Validité comptée depuis l'envoi de la demande: jamais au-delà de l'échéance vue par le backend
+            self._valid_until = started + self.ttl
+        self._leader = acquired or (self._leader and time.monotonic() < self._valid_until and self.error is not None)
+        if self.is_leader != was_leader and self.on_change is not None:
+            self.on_change(self.is_leader)
+        return self.is_leader
+
+    def release(self):
+        """Abandonne le bail (arrêt du processus): un autre processus peut le prendre aussitôt"""
+        if not self._leader:
+            return
+        self._leader = False
+        try:
+            self.backend.release_lease(self.name, self.owner)
+        except StateBackendError:
+            pass
+        if self.on_change is not None:
+            self.on_change(False)
+
+    def status(self):
+        try:
+            owner = self.backend.lease_owner(self.name)
+        except StateBackendError as e:
+            owner = None
+            self.error = str(e)
+        return {"name": self.name, "owner": self.owner, "leader": self.is_leader, "current_leader": owner,
+                "ttl": self.ttl, "error": self.error}
+
+
+# ============================================================================
+# SERVEUR DE SUBSTITUTION (sous-ensemble du protocole Redis, en mémoire)
+# ============================================================================
+
+WRONGTYPE = 'WRONGTYPE Operation against a key holding the wrong kind of value'
+
+
+class RespStandInServer(socketserver.ThreadingTCPServer):
+    """
+    Serveur RESP en mémoire pour le développement et les essais multi-processus
+
+    Commandes: PING, SELECT, GET, SET (NX, XX, PX, EX), DEL, INCR, INCRBY, PEXPIRE,
+    SADD, SREM, SMEMBERS, RPUSH, LRANGE, LTRIM, FLUSHDB, WATCH, UNWATCH, MULTI,
+    EXEC, DISCARD. Une seule base; les commandes sont exécutées sous un verrou
+    global (atomiques).
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, _RespStandInHandler)
+        self.data = {}  # clé -> valeur (bytes, set ou list)
+        self.expires = {}  # clé -> échéance time.monotonic()
+        self.versions = {}  # clé -> nombre de modifications (WATCH)
+        self.lock = threading.Lock()
+
+    def _alive(self, key):
+        expires = self.expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self._delete(key)
+        return key in self.data
+
+    def _touch(self, key):
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def _delete(self, key):
+        self.data.pop(key, None)
+        self.expires.pop(key, None)
+        self._touch(key)
+
+    def execute(self, command, args):
+        """Exécute une commande (sous le verrou); retourne la réponse ou une RespError"""
+        if command == 'PING':
+            return 'PONG'
+        if command == 'SELECT':
+            return 'OK'
+        if command == 'FLUSHDB':
+            for key in list(self.data):
+                self._delete(key)
+            return 'OK'
+        if command == 'GET':
+            value = self.data.get(args[0]) if self._alive(args[0]) else None
+            if isinstance(value, (set, list)):
+                return RespError(WRONGTYPE)
+            return value
+        if command == 'SET':
+            key, value, options = args[0], args[1], [arg.upper() for arg in args[2:]]
+            exists = self._alive(key)
+            if (b'NX' in options and exists) or (b'XX' in options and not exists):
+                return None
+            self.data[key] = value
+            self.expires.pop(key, None)
+            for unit, scale in ((b'PX', 0.001), (b'EX', 1.0)):
+                if unit in options:
+                    self.expires[key] = time.monotonic() + int(args[2 + options.index(unit) + 1]) * scale
+            self._touch(key)
+            return 'OK'
+        if command == 'DEL':
+            removed = 0
+            for key in args:
+                if self._alive(key):
+                    self._delete(key)
+                    removed += 1
+            return removed
+        if command in ('INCR', 'INCRBY'):
+            increment = int(args[1]) if command == 'INCRBY' else 1
+            value = int(self.data.get(args[0], b'0')) + increment if self._alive(args[0]) else increment
+            self.data[args[0]] = str(value).encode('ascii')
+            self._touch(args[0])
+            return value
+        if command == 'PEXPIRE':
+            if not self._alive(args[0]):
+                return 0
+            self.expires[args[0]] = time.monotonic() + int(args[1]) / 1000
+            self._touch(args[0])
+            return 1
+        if command in ('SADD', 'SREM', 'SMEMBERS'):
+            members = self.data.get(args[0]) if self._alive(args[0]) else None
+            if members is not None and not isinstance(members, set):
+                return RespError(WRONGTYPE)
+            if command == 'SMEMBERS':
+                return sorted(members or ())
+            members = self.data.setdefault(args[0], set())
+            before = len(members)
+            if command == 'SADD':
+                members.update(args[1:])
+            else:
+                members.difference_update(args[1:])
+            if not members:
+                self._delete(args[0])
+            else:
+                self._touch(args[0])
+            return abs(len(members) - before)
+        if command in ('RPUSH', 'LRANGE', 'LTRIM'):
+            items = self.data.get(args[0]) if self._alive(args[0]) else None
+            if items is not None and not isinstance(items, list):
+                return RespError(WRONGTYPE)
+            if command == 'RPUSH':
+                items = self.data.setdefault(args[0], [])
+                items.extend(args[1:])
+                self._touch(args[0])
+                return len(items)
+            start, stop = int(args[1]), int(args[2])
+            selected = _list_range(items or [], start, stop)
+            if command == 'LRANGE':
+                return selected
+            if items:
+                if selected:
+                    items[:] = selected
+                    self._touch(args[0])
+                else:
+                    self._delete(args[0])
+            return 'OK'
+        return RespError(f"ERR unknown command '{command}'")
+
+
+class _RespStandInHandler(socketserver.StreamRequestHandler):
+    def _write(self, reply):
+        self.wfile.write(_encode_reply(reply))
+
+    def handle(self):
+        server = self.server
+        watched = {}  # clé -> version lors du WATCH
+        queued = None  # commandes en attente entre MULTI et EXEC
+        while True:
+            try:
+                request = read_reply(self.rfile)
+            except (StateBackendError, ValueError, OSError):
+                return
+            if not isinstance(request, list) or not request:
+                self._write(RespError('ERR invalid request'))
+                continue
+            command, args = request[0].decode('ascii', 'replace').upper(), request[1:]
+
+            if command == 'QUIT':
+                self._write('OK')
+                return
+            if command == 'MULTI':
+                queued = []
+                self._write('OK')
+            elif command == 'DISCARD':
+                queued = None
+                watched = {}
+                self._write('OK')
+            elif command == 'EXEC':
+                with server.lock:
+                    if queued is None:
+                        reply = RespError('ERR EXEC without MULTI')
+                    elif any(server.versions.get(key, 0) != version for key, version in watched.items()):
+                        reply = None
+                    else:
+                        reply = [server.execute(name, arguments) for name, arguments in queued]
+                queued = None
+                watched = {}
+                self._write(reply)
+            elif queued is not None:
+                queued.append((command, args))
+                self._write('QUEUED')
+            elif command == 'WATCH':
+                with server.lock:
+                    for key in args:
+                        server._alive(key)
+                        watched[key] = server.versions.get(key, 0)
+                self._write('OK')
+            elif command == 'UNWATCH':
+                watched = {}
+                self._write('OK')
+            else:
+                with server.lock:
+                    reply = server.execute(command, args)
+                self._write(reply)
+
+
+def _list_range(items, start, stop):
+    """Éléments start..stop inclus, indices négatifs comptés depuis la fin (LRANGE / LTRIM)"""
+    length = len(items)
+    start = max(start + length if start < 0 else start, 0)
+    stop = stop + length if stop < 0 else stop
+    return items[start:stop + 1]
+
+
+def _encode_reply(reply):
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, RespError):
+        return b'-%s\r\n' % str(reply).encode('utf-8')
+    if isinstance(reply, str):
+        return b'+%s\r\n' % reply.encode('utf-8')
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, bytes):
+        return b'$%d\r\n%s\r\n' % (len(reply), reply)
+    return b'*%d\r\n' % len(reply) + b''.join(_encode_reply(item) for item in reply)
+
+
+def start_standin(host='127.0.0.1', port=0):
+    """Démarre un serveur de substitution dans un thread; retourne le serveur (server_address: adresse réelle)"""
+    server = RespStandInServer((host, port))
+    threading.Thread(target=server.serve_forever, name='resp-standin', daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Backend d'état partagé")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    standin_parser = subparsers.add_parser('standin', help="Serveur RESP de substitution en mémoire")
+    standin_parser.add_argument('--host', default='127.0.0.1')
+    standin_parser.add_argument('--port', type=int, default=6379)
+    args = parser.parse_args()
+
+    server = RespStandInServer((args.host, args.port))
+    print(f"Serveur RESP de substitution sur {args.host}:{args.port} (pid {os.getpid()})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
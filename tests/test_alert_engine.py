@@ -0,0 +1,121 @@
+import threading
+
+import numpy as np
+
+from alert_engine import AlertEngine, DeviceAlerts
+from monitoring_state import DeviceState
+
+HOUR_MS = 3600 * 1000
+
+
+def make_alert(alert_id):
+    return {'id': alert_id, 'read': False}
+
+
+def make_device():
+    return DeviceState('d', threading.Lock(), retention_seconds=60, sample_rate_hz=1)
+
+
+def test_late_alert_stays_sorted():
+    alerts = DeviceAlerts()
+    alerts.add(make_alert('a'), 10_000)
+    alerts.add(make_alert('b'), 20_000)
+    alerts.add(make_alert('late'), 5_000)
+    view = alerts.view()
+    assert list(view.timestamps[view.start:view.end]) == [10_000, 20_000, 20_000]
+    assert [alert['id'] for alert in view] == ['a', 'b', 'late']
+
+
+def test_snapshot_includes_late_alert():
+    device = make_device()
+    device.alerts.add(make_alert('a'), 5 * HOUR_MS + 10)
+    device.alerts.add(make_alert('late'), 4 * HOUR_MS)
+    snapshot = device.publish()
+    assert [alert['id'] for alert in snapshot.alerts_since(5 * HOUR_MS)] == ['a', 'late']
+
+
+def test_publish_shares_the_alert_log():
+    device = make_device()
+    device.alerts.add(make_alert('a'), 1_000)
+    first = device.publish()
+    device.alerts.add(make_alert('b'), 2_000)
+    second = device.publish()
+    assert second.alerts.alerts is first.alerts.alerts
+    assert [alert['id'] for alert in first.alerts] == ['a']
+    assert [alert['id'] for alert in second.alerts] == ['a', 'b']
+
+
+def test_mark_read_does_not_change_older_snapshots():
+    device = make_device()
+    device.alerts.add(make_alert('a'), 1_000)
+    before = device.publish()
+    assert device.alerts.mark_read('a')['read'] is True
+    after = device.publish()
+    assert [alert['read'] for alert in before.alerts] == [False]
+    assert [alert['read'] for alert in after.alerts] == [True]
+    assert (before.unread_alerts, after.unread_alerts) == (1, 0)
+    assert device.alerts.mark_read('missing') is None
+
+
+def test_expired_alerts_leave_the_log():
+    alerts = DeviceAlerts(retention_seconds=10)
+    for index in range(600):
+        alerts.add(make_alert(str(index)), index * 1_000)
+    alerts.mark_read('595')
+    assert len(alerts) == len(alerts.view()) == 11
+    assert alerts.unread == 10
+    assert alerts.get('0') is None
+    assert len(alerts._alerts) < 600
+
+
+def evaluate_all(engine, alerts, sensor_type, values, step_ms=1_000):
+    results = []
+    for index, value in enumerate(values):
+        results.append(engine.evaluate(alerts, 'd', sensor_type, value, index * step_ms))
+    return results
+
+
+def test_hysteresis_keeps_the_state_until_the_margin():
+    engine = AlertEngine({'heartRate': {'min': 60, 'max': 100, 'hysteresis': 5}}, dedupe_seconds=0)
+    alerts = DeviceAlerts()
+    results = evaluate_all(engine, alerts, 'heartRate', [101, 99, 96, 95, 101])
+    assert [status for status, _ in results] == ['high', 'high', 'high', 'normal', 'high']
+    # Une alerte par mesure anormale (pas de délai anti-doublon ici)
+    assert [len(created) for _, created in results] == [1, 1, 1, 0, 1]
+
+
+def test_repeated_alerts_are_deduplicated():
+    engine = AlertEngine(dedupe_seconds=60)
+    alerts = DeviceAlerts()
+    results = evaluate_all(engine, alerts, 'heartRate', [120, 125, 130])
+    assert sum(len(created) for _, created in results) == 1
+    assert engine.evaluate(alerts, 'd', 'heartRate', 130, 61_000)[1]
+
+
+def test_rate_of_change_alert_within_the_window():
+    engine = AlertEngine({'heartRate': {'min': 40, 'max': 180, 'maxDelta': 20, 'deltaWindow': 10}}, dedupe_seconds=0)
+    alerts = DeviceAlerts()
+    _, created = engine.evaluate(alerts, 'd', 'heartRate', 70, 0)
+    assert created == []
+    status, created = engine.evaluate(alerts, 'd', 'heartRate', 95, 5_000)
+    assert status == 'normal'
+    assert [alert['type'] for alert in created] == ['rate']
+
+    # Le minimum est sorti de la fenêtre: plus de variation rapide
+    _, created = engine.evaluate(alerts, 'd', 'heartRate', 96, 16_000)
+    assert created == []
+
+
+def test_evaluate_many_matches_evaluate():
+    thresholds = {'heartRate': {'min': 60, 'max': 100, 'maxDelta': 15}}
+    values = [70, 72, 105, 99, 97, 80, 60, 55]
+    timestamps = np.arange(len(values), dtype=np.int64) * 1_000
+
+    one_by_one = DeviceAlerts()
+    expected = evaluate_all(AlertEngine(thresholds, dedupe_seconds=0), one_by_one, 'heartRate', values)
+    batched = DeviceAlerts()
+    status, created = AlertEngine(thresholds, dedupe_seconds=0).evaluate_many(
+        batched, 'd', 'heartRate', timestamps, np.array(values, dtype=np.float32)[:, None]
+    )
+    assert status == expected[-1][0]
+    assert [alert['id'] for alert in created] == [alert['id'] for _, alerts in expected for alert in alerts]
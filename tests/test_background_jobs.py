@@ -0,0 +1,36 @@
+import threading
+import time
+
+from background_jobs import JobRegistry
+
+
+def wait_status(registry, job_id, status, timeout=2):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = registry.get(job_id)
+        if job is None or job['status'] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"{job_id} n'a pas atteint l'état {status}")
+
+
+def test_running_job_does_not_hold_back_expiry():
+    registry = JobRegistry(max_workers=2, retention_seconds=0.05)
+    release = threading.Event()
+    try:
+        blocker = registry.submit('long', release.wait)
+        done = [registry.submit('short', lambda n=n: n) for n in range(3)]
+        for job in done:
+            wait_status(registry, job['id'], 'completed')
+
+        time.sleep(0.1)
+        assert [registry.get(job['id']) for job in done] == [None, None, None]
+        assert registry.get(blocker['id'])['status'] == 'running'
+
+        release.set()
+        wait_status(registry, blocker['id'], 'completed')
+        time.sleep(0.1)
+        assert registry.get(blocker['id']) is None
+    finally:
+        release.set()
+        registry.shutdown()
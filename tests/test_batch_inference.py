@@ -0,0 +1,84 @@
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+from batch_inference import MicroBatcher
+
+
+def test_concurrent_submissions_share_one_model_call():
+    calls = []
+
+    def predict(images, clinical):
+        calls.append(len(images))
+        return images.reshape(len(images), -1).sum(axis=1) + clinical.sum(axis=1)
+
+    batcher = MicroBatcher(predict, max_batch_size=8, max_wait_ms=200)
+    futures = batcher.submit_many([np.full((2, 2), index, dtype=float) for index in range(5)], np.ones((5, 3)))
+    assert [future.result(timeout=2) for future in futures] == [3, 7, 11, 15, 19]
+    assert calls == [5]
+    assert (batcher.batches_processed, batcher.samples_processed) == (1, 5)
+
+
+def test_batches_are_split_by_size_and_shape():
+    calls = []
+    release = threading.Event()
+
+    def predict(images, clinical):
+        release.wait(2)
+        calls.append(images.shape)
+        return np.zeros(len(images))
+
+    batcher = MicroBatcher(predict, max_batch_size=2, max_wait_ms=100)
+    futures = [batcher.submit(np.zeros((4, 4)), np.zeros(2)) for _ in range(3)]
+    futures.append(batcher.submit(np.zeros((4, 4, 3)), np.zeros(2)))
+    release.set()
+    for future in futures:
+        future.result(timeout=2)
+    assert all(shape[0] <= 2 for shape in calls)
+    assert sum(shape[0] for shape in calls) == 4
+    assert (1, 4, 4, 3) in calls
+
+
+def test_model_errors_reach_every_caller():
+    def predict(images, clinical):
+        raise RuntimeError('modèle indisponible')
+
+    batcher = MicroBatcher(predict, max_wait_ms=50)
+    futures = batcher.submit_many([np.zeros(2)] * 2, [np.zeros(1)] * 2)
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=2)
+
+
+def test_asynchronous_model_result():
+    pending = Future()
+    batcher = MicroBatcher(lambda images, clinical: pending, max_wait_ms=0)
+    future = batcher.submit(np.zeros(2), np.zeros(1))
+    pending.set_result(np.array([[0.9]]))
+    assert future.result(timeout=2).tolist() == [0.9]
+
+    # Nombre de prédictions différent du nombre d'échantillons
+    batcher = MicroBatcher(lambda images, clinical: np.zeros(3), max_wait_ms=0)
+    with pytest.raises(ValueError):
+        batcher.submit(np.zeros(2), np.zeros(1)).result(timeout=2)
+
+
+@pytest.mark.parametrize('asynchronous', [False, True])
+def test_scalar_model_output_fails_the_batch_and_keeps_the_batcher(asynchronous):
+    outputs = iter([np.float32(0.5), np.array([0.7])])
+
+    def predict(images, clinical):
+        output = next(outputs)
+        if not asynchronous:
+            return output
+        future = Future()
+        future.set_result(output)
+        return future
+
+    batcher = MicroBatcher(predict, max_wait_ms=0)
+    with pytest.raises(ValueError):
+        batcher.submit(np.zeros(2), np.zeros(1)).result(timeout=2)
+    # Le thread du batcher traite toujours les soumissions suivantes
+    assert batcher.submit(np.zeros(2), np.zeros(1)).result(timeout=2) == 0.7
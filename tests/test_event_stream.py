@@ -0,0 +1,72 @@
+import model_integration
+from event_stream import EventBus, StreamSlots, sse_stream
+
+
+def test_stream_of_unknown_device_is_not_found():
+    devices = len(model_integration.device_registry.devices())
+    response = model_integration.app.test_client().get('/api/iot/stream?deviceId=inconnu')
+
+    assert response.status_code == 404
+    assert model_integration.device_registry.get('inconnu') is None
+    assert len(model_integration.device_registry.devices()) == devices
+
+
+def test_streams_beyond_the_limit_get_503(monkeypatch):
+    slots = StreamSlots(1)
+    monkeypatch.setattr(model_integration, 'stream_slots', slots)
+    client = model_integration.app.test_client()
+
+    first = client.get('/api/iot/stream?deviceId=*')
+    assert first.status_code == 200
+    refused = client.get('/api/iot/stream?deviceId=*')
+    assert refused.status_code == 503
+    assert refused.headers['Retry-After'] == str(model_integration.STREAM_RETRY_AFTER)
+
+    # La fermeture du premier flux libère sa place
+    first.close()
+    assert slots.open == 0
+    second = client.get('/api/iot/stream?deviceId=*')
+    assert second.status_code == 200
+    second.close()
+    assert slots.rejected == 1
+
+
+def publish_readings(bus, device_id, count):
+    return [bus.publish('sensor', device_id, 'heartRate', {'value': 60 + index}) for index in range(count)]
+
+
+def test_resume_token_replays_the_missed_events_of_the_device():
+    bus = EventBus()
+    first = publish_readings(bus, 'p1', 1)[0]
+    publish_readings(bus, 'p2', 1)
+    missed = publish_readings(bus, 'p1', 2)
+
+    _, replay = bus.subscribe('p1', last_event_id=bus.parse_token(bus.token(first.id)))
+    assert [event.id for event in replay] == [event.id for event in missed]
+
+
+def test_unusable_resume_token_falls_back_to_a_snapshot():
+    bus = EventBus(replay_size=2)
+    first = publish_readings(bus, 'p1', 5)[0]
+
+    # Événement sorti du tampon de rejeu, jeton d'un autre bus, jeton invalide
+    assert bus.subscribe('p1', last_event_id=bus.parse_token(bus.token(first.id)))[1] is None
+    assert bus.parse_token(EventBus().token(first.id)) is None
+    assert bus.parse_token('inconnu') is None
+
+
+def test_slow_subscriber_is_resynchronised_with_a_snapshot():
+    bus = EventBus(max_pending=2)
+    subscription, replay = bus.subscribe('p1')
+    stream = sse_stream(bus, subscription, replay, lambda: {'state': bus.last_event_id}, keepalive=0.01)
+    assert next(stream).startswith(f"id: {bus.token(0)}\nevent: snapshot\n")
+
+    publish_readings(bus, 'p1', 3)
+    assert subscription.dropped == 2
+    # Le snapshot couvre les événements déjà publiés; seuls les suivants sont envoyés ensuite
+    assert next(stream) == f"id: {bus.token(3)}\nevent: snapshot\ndata: {{\"state\": 3}}\n\n"
+    later = publish_readings(bus, 'p1', 1)[0]
+    assert next(stream).startswith(f"id: {bus.token(later.id)}\nevent: sensor\n")
+
+    stream.close()
+    assert bus.stats()['subscribers'] == 0
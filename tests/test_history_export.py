@@ -0,0 +1,94 @@
+import os
+
+import numpy as np
+import pytest
+
+from history_export import DAY_MS, HistoryArchive, parse_time_ms, replay
+from session_store import SessionStore
+
+# 2026-01-01T00:00:00Z
+DAY_START = 1767225600000
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return HistoryArchive(str(tmp_path / 'archive'))
+
+
+def test_points_are_partitioned_by_day_and_read_back(archive):
+    timestamps = np.array([DAY_START + DAY_MS - 2000, DAY_START + DAY_MS - 1000, DAY_START + DAY_MS + 500])
+    assert archive.append('p1', 'bloodPressure', timestamps, [[120, 80], [125, 82], [130, 85]]) == 3
+
+    assert archive.partitions('p1', 'bloodPressure') == ['2026-01-01', '2026-01-02']
+    read_timestamps, values = archive.read('p1', 'bloodPressure')
+    np.testing.assert_array_equal(read_timestamps, timestamps)
+    np.testing.assert_array_equal(values, np.array([[120, 80], [125, 82], [130, 85]], dtype=np.float32))
+
+    # Intervalle ]since, until]
+    read_timestamps, _ = archive.read('p1', 'bloodPressure', since_ms=timestamps[0], until_ms=timestamps[1])
+    np.testing.assert_array_equal(read_timestamps, timestamps[1:2])
+
+
+def test_exports_only_write_points_after_the_last_archived_one(archive):
+    archive.append('p1', 'heartRate', [DAY_START + 1000, DAY_START + 2000], [70, 72])
+    assert archive.append('p1', 'heartRate', [DAY_START + 1000, DAY_START + 2000, DAY_START + 3000], [70, 72, 75]) == 1
+
+    # Un nouveau processus reprend après le dernier point archivé sur disque
+    restarted = HistoryArchive(archive.root)
+    assert restarted.last_exported('p1', 'heartRate') == DAY_START + 3000
+    assert restarted.append('p1', 'heartRate', [DAY_START + 3000], [75]) == 0
+    timestamps, values = restarted.read('p1', 'heartRate')
+    assert timestamps.tolist() == [DAY_START + 1000, DAY_START + 2000, DAY_START + 3000]
+    assert values[:, 0].tolist() == [70, 72, 75]
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_compaction_merges_fragments_without_changing_the_contents(archive, compress):
+    for index in range(3):
+        archive.append('p1', 'heartRate', [DAY_START + index * 1000], [60 + index])
+    before = archive.read('p1', 'heartRate')
+
+    assert archive.compact('p1', 'heartRate', '2026-01-01', compress=compress) == 3
+    day_dir = os.path.join(archive._sensor_dir('p1', 'heartRate'), '2026-01-01')
+    assert len(os.listdir(day_dir)) == (1 if compress else 2)
+    after = archive.read('p1', 'heartRate')
+    np.testing.assert_array_equal(after[0], before[0])
+    np.testing.assert_array_equal(after[1], before[1])
+    assert archive.compact('p1', 'heartRate', '2026-01-01', compress=compress) == 0
+
+
+def test_sessions_are_exported_incrementally_with_their_latest_version(archive):
+    store = SessionStore(':memory:')
+    try:
+        store.save({'id': 's1', 'savedAt': '2026-01-01T10:00:00', 'score': 1})
+        store.save({'id': 's2', 'savedAt': '2026-01-02T10:00:00', 'score': 2})
+        assert archive.export_sessions(store) == 2
+        assert archive.export_sessions(store) == 0
+
+        store.save({'id': 's1', 'savedAt': '2026-01-03T10:00:00', 'score': 3})
+        assert archive.export_sessions(store) == 1
+    finally:
+        store.close()
+
+    sessions = archive.read_sessions()
+    assert {session_id: session['score'] for session_id, session in sessions.items()} == {'s1': 3, 's2': 2}
+    assert set(archive.read_sessions(until_day='2026-01-02')) == {'s1', 's2'}
+    assert archive.read_sessions(until_day='2026-01-02')['s1']['score'] == 1
+
+
+def test_replay_runs_archived_points_through_the_alert_engine(archive):
+    archive.append('p1', 'heartRate', [DAY_START + 1000, DAY_START + 2000, DAY_START + 3000], [70, 160, 165])
+
+    result = replay(archive, 'p1')
+    assert result['points'] == 3
+    assert result['recordedSeconds'] == 2.0
+    assert result['alertCount'] >= 1
+    assert set(result['alertsBySensor']) == {'heartRate'}
+    assert all(alert['sensor'] == 'heartRate' for alert in result['alerts'])
+
+
+def test_time_parameters_accept_milliseconds_and_iso_dates():
+    assert parse_time_ms('1767225600000') == DAY_START
+    assert parse_time_ms('2026-01-01T00:00:00') == DAY_START
+    assert parse_time_ms('2026-01-01T01:00:00+01:00') == DAY_START
+    assert parse_time_ms('') is None
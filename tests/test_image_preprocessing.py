@@ -0,0 +1,62 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import image_preprocessing
+from image_preprocessing import IMAGE_SIZE, preprocess_pages
+
+
+def encode(images, fmt, **options):
+    buffer = io.BytesIO()
+    images[0].save(buffer, fmt, save_all=len(images) > 1, append_images=images[1:], **options)
+    return buffer.getvalue()
+
+
+def test_jpeg_is_decoded_to_the_model_size():
+    image = Image.new('RGB', (1600, 1200), (255, 128, 0))
+    pages, stats = preprocess_pages(encode([image], 'JPEG', quality=95))
+
+    assert pages.shape == (1, IMAGE_SIZE[1], IMAGE_SIZE[0], 3)
+    assert pages.dtype == np.float32
+    np.testing.assert_allclose(pages[0, 100, 100], [1.0, 128 / 255, 0.0], atol=0.02)
+    assert stats['pages'] == 1
+    assert stats['buffer_mb'] == round(pages.nbytes / (1024 * 1024), 3)
+
+
+def test_color_modes_are_normalized():
+    transparent = Image.new('RGBA', (300, 300), (0, 0, 0, 0))
+    palette = Image.new('RGB', (300, 300), (0, 0, 255)).convert('P')
+    sixteen_bits = Image.fromarray(np.full((300, 300), 1000, dtype=np.uint16))
+
+    # La transparence est aplatie sur fond blanc, les 16 bits ramenés à leur plage réelle
+    assert preprocess_pages(encode([transparent], 'PNG'))[0].min() == 1.0
+    np.testing.assert_allclose(preprocess_pages(encode([palette], 'PNG'))[0][0, 0, 0], [0, 0, 1])
+    gray, _ = preprocess_pages(encode([sixteen_bits], 'PNG'), channels=1)
+    assert gray.shape[-1] == 1
+    assert gray.min() == 1.0
+
+
+def test_multipage_tiff_is_opened_once_and_capped(monkeypatch):
+    images = [Image.new('L', (400, 400), value) for value in (0, 51, 102, 153)]
+    data = encode(images, 'TIFF')
+    opened = []
+    original_open = image_preprocessing.Image.open
+    monkeypatch.setattr(image_preprocessing.Image, 'open', lambda *args: opened.append(1) or original_open(*args))
+
+    pages, stats = preprocess_pages(data, max_pages=3)
+
+    assert len(opened) == 1
+    assert stats['pages'] == 3
+    np.testing.assert_allclose(pages[:, 0, 0, 0], [0, 0.2, 0.4], atol=1e-6)
+
+
+def test_pages_are_written_into_the_given_buffer():
+    out = np.zeros((2, IMAGE_SIZE[1], IMAGE_SIZE[0], 3), dtype=np.float32)
+    pages, _ = preprocess_pages(encode([Image.new('RGB', (224, 224), 'white')], 'PNG'), out=out)
+    assert np.shares_memory(pages, out)
+    assert out[0].min() == 1.0
+
+    with pytest.raises(ValueError):
+        preprocess_pages(encode([Image.new('L', (224, 224))] * 3, 'TIFF'), out=out)
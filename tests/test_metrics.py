@@ -0,0 +1,92 @@
+import pytest
+from flask import Flask
+
+import metrics
+
+
+def test_counters_are_kept_per_label_set_and_rendered():
+    registry = metrics.MetricsRegistry(prefix='test_')
+    counter = registry.counter('alerts_total', "Alertes", ('sensor',))
+    counter.inc(sensor='heartRate')
+    counter.inc(2, sensor='heartRate')
+    counter.inc(sensor='temperature')
+
+    assert counter.value(sensor='heartRate') == 3
+    assert counter.value(sensor='oxygenSaturation') == 0
+    assert registry.get('alerts_total') is counter
+    assert registry.render().splitlines() == [
+        '# HELP test_alerts_total Alertes',
+        '# TYPE test_alerts_total counter',
+        'test_alerts_total{sensor="heartRate"} 3',
+        'test_alerts_total{sensor="temperature"} 1',
+    ]
+
+
+def test_labels_must_match_the_declared_names():
+    counter = metrics.Counter('requests_total', "Requêtes", ('status',))
+    with pytest.raises(ValueError):
+        counter.inc()
+    with pytest.raises(ValueError):
+        counter.inc(status=200, method='GET')
+
+
+def test_metric_names_are_registered_once():
+    registry = metrics.MetricsRegistry()
+    registry.counter('jobs_total', "Tâches")
+    with pytest.raises(ValueError):
+        registry.gauge('jobs_total', "Tâches")
+
+
+def test_collected_gauge_is_read_at_render_time():
+    depth = [3]
+    gauge = metrics.Gauge('queue_depth', "Profondeur", collect=lambda: depth[0])
+    assert gauge.render()[-1] == 'queue_depth 3'
+    depth[0] = 5
+    assert gauge.render()[-1] == 'queue_depth 5'
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram('duration_seconds', "Durée", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value)
+
+    assert histogram.count() == 4
+    assert histogram.render()[2:] == [
+        'duration_seconds_bucket{le="0.1"} 1',
+        'duration_seconds_bucket{le="1"} 3',
+        'duration_seconds_bucket{le="+Inf"} 4',
+        'duration_seconds_sum 4.25',
+        'duration_seconds_count 4',
+    ]
+
+
+def test_instrumented_app_counts_requests_by_route_and_status():
+    app = Flask(__name__)
+    registry = metrics.MetricsRegistry()
+    created = metrics.instrument_app(app, registry)
+
+    @app.route('/items/<item_id>')
+    def item(item_id):
+        return {'id': item_id}
+
+    @app.route('/fail')
+    def fail():
+        raise RuntimeError("échec")
+
+    @app.route('/metrics')
+    def scrape():
+        return registry.render()
+
+    client = app.test_client()
+    client.get('/items/1')
+    client.get('/items/2')
+    assert client.get('/fail').status_code == 500
+    client.get('/metrics')
+
+    requests_total = created['requests_total']
+    assert requests_total.value(method='GET', endpoint='/items/<item_id>', status=200) == 2
+    assert requests_total.value(method='GET', endpoint='/fail', status=500) == 1
+    assert requests_total.value(method='GET', endpoint='/metrics', status=200) == 0
+    assert created['errors_total'].value(method='GET', endpoint='/fail') == 1
+    assert created['latency'].count(method='GET', endpoint='/items/<item_id>') == 2
+    assert created['in_flight'].value() == 0
@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+
+import model_runtime
+from model_runtime import ModelRuntime, SimulatedModel, StandInModel, create_standin_model
+
+
+def inputs(rows=3):
+    rng = np.random.default_rng(0)
+    images = rng.random((rows, 8, 8, 3), dtype=np.float32)
+    clinical = rng.random((rows, 10), dtype=np.float32) * 100
+    return images, clinical
+
+
+def test_missing_file_uses_simulation(tmp_path):
+    runtime = ModelRuntime(str(tmp_path / 'missing.keras'))
+    images, clinical = inputs()
+
+    prediction = runtime.predict(images, clinical)
+
+    assert prediction.shape == (3, 1)
+    assert runtime.description == SimulatedModel.description
+    np.testing.assert_allclose(prediction, SimulatedModel().predict([images, clinical]))
+
+
+def test_standin_model_is_loaded_lazily(tmp_path):
+    path = create_standin_model(str(tmp_path / 'standin.npz'))
+    runtime = ModelRuntime(path, load_mode='lazy')
+    assert not runtime.loaded
+
+    prediction = runtime.submit(*inputs()).result()
+
+    assert runtime.loaded
+    assert runtime.description == StandInModel.description
+    assert prediction.shape == (3, 1)
+    assert np.all((prediction > 0) & (prediction < 1))
+
+
+def test_two_runtimes_load_their_own_model(tmp_path):
+    image_path = create_standin_model(str(tmp_path / 'image.npz'), seed=1)
+    image_runtime = ModelRuntime(image_path)
+    waveform_runtime = ModelRuntime(str(tmp_path / 'missing_wave.keras'))
+    images, clinical = inputs()
+
+    image_prediction = image_runtime.predict(images, clinical)
+    waveform_prediction = waveform_runtime.predict(images, clinical)
+
+    np.testing.assert_allclose(image_prediction, StandInModel(image_path).predict([images, clinical]))
+    np.testing.assert_allclose(waveform_prediction, SimulatedModel().predict([images, clinical]))
+    assert isinstance(model_runtime._get_process_model(image_path), StandInModel)
+    assert isinstance(model_runtime._get_process_model(waveform_runtime.model_path), SimulatedModel)
+
+
+def test_version_changes_with_file(tmp_path):
+    path = str(tmp_path / 'standin.npz')
+    missing = ModelRuntime(path).version
+    create_standin_model(path)
+    assert ModelRuntime(path).version != missing
+
+
+def rewrite_model(path, seed):
+    """Réécrit le modèle avec d'autres poids et avance son mtime (même taille de fichier)"""
+    mtime_ns = os.stat(path).st_mtime_ns
+    create_standin_model(path, seed=seed)
+    os.utime(path, ns=(mtime_ns + 1_000_000_000, mtime_ns + 1_000_000_000))
+
+
+def test_rewritten_model_is_reloaded(tmp_path):
+    path = create_standin_model(str(tmp_path / 'standin.npz'), seed=1)
+    runtime = ModelRuntime(path)
+    images, clinical = inputs()
+    before, version = runtime.predict(images, clinical), runtime.version
+
+    rewrite_model(path, seed=2)
+
+    after = runtime.predict(images, clinical)
+    assert runtime.version != version
+    assert not np.allclose(after, before)
+    np.testing.assert_allclose(after, StandInModel(path).predict([images, clinical]))
+
+
+def test_pool_workers_reload_a_rewritten_model(tmp_path):
+    path = create_standin_model(str(tmp_path / 'standin.npz'), seed=1)
+    runtime = ModelRuntime(path, load_mode='eager', workers=1)
+    images, clinical = inputs()
+    try:
+        runtime.start()
+        before = runtime.submit(images, clinical).result(timeout=60)
+
+        rewrite_model(path, seed=2)
+
+        after = runtime.submit(images, clinical).result(timeout=60)
+    finally:
+        runtime.shutdown()
+    assert not np.allclose(after, before)
+    np.testing.assert_allclose(after, StandInModel(path).predict([images, clinical]))
@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+import model_integration
+from periodic_scheduler import PeriodicScheduler
+
+
+@pytest.mark.parametrize('period', [0, -1, float('nan'), float('inf')])
+def test_invalid_periods_are_rejected_before_anything_is_scheduled(period):
+    scheduler = PeriodicScheduler()
+    with pytest.raises(ValueError):
+        scheduler.schedule('task', period, lambda: None)
+    assert scheduler.periods() == {}
+    assert not scheduler.running
+
+
+def test_tasks_run_until_cancelled_and_the_thread_stops():
+    scheduler = PeriodicScheduler()
+    ran = threading.Event()
+    runs = []
+
+    def task():
+        runs.append(1)
+        if len(runs) == 3:
+            ran.set()
+
+    scheduler.schedule('task', 0.01, task)
+    assert ran.wait(5)
+    thread = scheduler._thread
+    scheduler.cancel_all()
+    thread.join(5)
+    assert not scheduler.running
+    assert scheduler.periods() == {}
+
+
+def test_rescheduling_a_key_replaces_its_period():
+    scheduler = PeriodicScheduler()
+    scheduler.schedule('task', 10, lambda: None, delay=10)
+    scheduler.schedule('task', 5, lambda: None, delay=10)
+    assert scheduler.periods() == {'task': 5.0}
+    assert scheduler.cancel('task')
+    assert not scheduler.cancel('task')
+
+
+@pytest.mark.parametrize('value, seconds', [(2000, 2.0), (100, 0.1), (0.5, 0.5), (5, 5.0)])
+def test_update_interval_accepts_milliseconds_and_seconds(value, seconds):
+    assert model_integration.update_interval_seconds(value) == seconds
+
+
+@pytest.mark.parametrize('value', [0, -2000, True, '2000', None, float('nan'), float('inf')])
+def test_update_interval_rejects_invalid_values(value):
+    with pytest.raises(ValueError):
+        model_integration.update_interval_seconds(value)
+
+
+def test_monitoring_intervals_are_bounded_by_the_history_sample_rate():
+    intervals = model_integration.monitoring_intervals({
+        'displaySettings': {'updateInterval': 2000},
+        'sensorIntervals': {'heartRate': 0.2},
+        'enabledSensors': {'oxygenSaturation': False},
+    })
+    assert intervals['heartRate'] == 1.0 / model_integration.HISTORY_SAMPLE_RATE_HZ
+    assert intervals['temperature'] == model_integration.SENSOR_UPDATE_INTERVALS['temperature']
+    assert intervals['bloodPressure'] == 2.0
+    assert 'oxygenSaturation' not in intervals
+
+    with pytest.raises(ValueError):
+        model_integration.monitoring_intervals({'sensorIntervals': {'inconnu': 1}})
+
+
+@pytest.mark.parametrize('preferences', [
+    {'displaySettings': {'updateInterval': -1}},
+    {'sensorIntervals': {'heartRate': 'vite'}},
+    {'sensorIntervals': {'inconnu': 1}},
+])
+def test_invalid_intervals_leave_the_preferences_unchanged(preferences):
+    before = dict(model_integration.user_preferences)
+    response = model_integration.app.test_client().post('/api/preferences/save', json=preferences)
+
+    assert response.status_code == 400
+    assert model_integration.user_preferences == before
+
@@ -0,0 +1,105 @@
+import json
+
+import prediction_cache
+from prediction_cache import PredictionCache, make_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_ignores_patient_field_order_and_depends_on_the_model_version():
+    key = make_key(b'scan', {'age': 60, 'sex': 1}, 'v1')
+    assert make_key(b'scan', {'sex': 1, 'age': 60}, 'v1') == key
+    assert make_key(b'scan', {'age': 60, 'sex': 1}, 'v2') != key
+    assert make_key(b'other', {'age': 60, 'sex': 1}, 'v1') != key
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = PredictionCache(max_entries=2, ttl=None)
+    cache.put('a', {'score': 1})
+    cache.put('b', {'score': 2})
+    assert cache.get('a') == {'score': 1}
+    cache.put('c', {'score': 3})
+
+    assert cache.get('b') is None
+    assert cache.get('a') == {'score': 1}
+    assert cache.get('c') == {'score': 3}
+    assert cache.stats()['evictions'] == 1
+
+
+def test_byte_budget_evicts_and_oversized_results_are_not_kept():
+    value = {'interpretation': 'x' * 40}
+    size = len(json.dumps(value))
+    cache = PredictionCache(max_entries=100, max_bytes=2 * size, ttl=None)
+    for key in 'abc':
+        cache.put(key, value)
+
+    assert cache.stats()['entries'] == 2
+    assert cache.stats()['bytes'] == 2 * size
+    assert cache.get('a') is None
+
+    cache.put('huge', {'interpretation': 'x' * (3 * size)})
+    assert cache.get('huge') is None
+    assert cache.stats()['bytes'] == 2 * size
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prediction_cache.time, 'time', clock)
+    cache = PredictionCache(ttl=10)
+    cache.put('a', {'score': 1})
+
+    clock.now += 9
+    assert cache.get('a') == {'score': 1}
+    clock.now += 2
+    assert cache.get('a') is None
+    stats = cache.stats()
+    assert stats['expirations'] == 1
+    assert stats['entries'] == 0
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = PredictionCache(disk_path=path)
+    cache.ensure_version('v1')
+    cache.put('a', {'score': 0.75, 'label': 'normal'})
+
+    restarted = PredictionCache(disk_path=path)
+    restarted.ensure_version('v1')
+    assert restarted.get('a') == {'score': 0.75, 'label': 'normal'}
+    assert restarted.stats()['disk_hits'] == 1
+    # Remontée en mémoire: la lecture suivante ne passe plus par le disque
+    assert restarted.get('a') == {'score': 0.75, 'label': 'normal'}
+    assert restarted.stats()['disk_hits'] == 1
+
+
+def test_expired_disk_entries_are_deleted(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prediction_cache.time, 'time', clock)
+    path = str(tmp_path / 'cache.db')
+    cache = PredictionCache(ttl=10, disk_path=path)
+    cache.put('a', {'score': 1})
+
+    clock.now += 11
+    restarted = PredictionCache(ttl=10, disk_path=path)
+    assert restarted.get('a') is None
+    assert restarted._db.execute('SELECT COUNT(*) FROM predictions').fetchone()[0] == 0
+
+
+def test_model_version_change_empties_both_tiers(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = PredictionCache(disk_path=path)
+    cache.ensure_version('v1')
+    cache.put('a', {'score': 1})
+    cache.ensure_version('v2')
+
+    assert cache.get('a') is None
+    assert cache.stats()['invalidations'] == 1
+    restarted = PredictionCache(disk_path=path)
+    restarted.ensure_version('v2')
+    assert restarted.get('a') is None
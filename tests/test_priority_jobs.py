@@ -0,0 +1,118 @@
+import io
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+import model_integration
+from priority_jobs import AdmissionError, PriorityJobQueue
+
+
+def test_future_result_frees_the_worker():
+    queue = PriorityJobQueue(workers=1, reserved_workers=0)
+    pending = Future()
+    first = queue.submit('job', lambda: pending)
+    second = queue.submit('job', lambda: 'done')
+
+    # Le seul worker n'attend pas le Future de la première tâche
+    assert queue.wait(second['id'], timeout=2)['result'] == 'done'
+    assert queue.get(first['id'])['status'] == 'running'
+    assert queue.stats()['awaiting'] == 1
+
+    pending.set_result(42)
+    job = queue.wait(first['id'], timeout=2)
+    assert (job['status'], job['result']) == ('completed', 42)
+    assert queue.stats()['awaiting'] == 0
+    queue.shutdown()
+
+
+def test_failed_future_fails_the_job():
+    queue = PriorityJobQueue(workers=1, reserved_workers=0)
+    pending = Future()
+    job = queue.submit('job', lambda: pending)
+    pending.set_exception(ValueError('boom'))
+    job = queue.wait(job['id'], timeout=2)
+    assert (job['status'], job['error']) == ('failed', 'boom')
+    queue.shutdown()
+
+
+def test_cost_counts_toward_client_limit_and_depth():
+    release = threading.Event()
+    queue = PriorityJobQueue(workers=1, reserved_workers=0, max_depth=10, shed_depth=10, max_per_client=4)
+    started = threading.Event()
+    blocker = queue.submit('job', lambda: started.set() or release.wait(), client='other')
+    assert started.wait(2)
+
+    # Un lot plus grand que la limite est admis si le client n'a rien en cours
+    big = queue.submit('job', lambda: None, client='a', cost=6)
+    assert big['cost'] == 6
+    with pytest.raises(AdmissionError) as error:
+        queue.submit('job', lambda: None, client='a')
+    assert error.value.status == 429
+
+    # La file compte le coût: 6 en attente, il reste 4 places
+    queue.submit('job', lambda: None, client='b', cost=4)
+    with pytest.raises(AdmissionError) as error:
+        queue.submit('job', lambda: None, client='c')
+    assert (error.value.status, error.value.reason) == (503, 'queue_full')
+
+    release.set()
+    assert queue.wait(big['id'], timeout=2)['status'] == 'completed'
+    assert queue.wait(blocker['id'], timeout=2)['status'] == 'completed'
+    queue.shutdown()
+
+
+def test_overload_answers_429_and_503_with_retry_after(monkeypatch):
+    release = threading.Event()
+    started = threading.Event()
+    queue = PriorityJobQueue(workers=1, reserved_workers=0, max_depth=2, shed_depth=1, max_per_client=1)
+    monkeypatch.setattr(model_integration, 'analysis_jobs', queue)
+    queue.submit('job', lambda: started.set() or release.wait(), client='other')
+    assert started.wait(2)
+    client = model_integration.app.test_client()
+
+    def post(client_id, priority='routine'):
+        return client.post(
+            f'/api/analyze/jobs?priority={priority}',
+            data={'ecgImage': (io.BytesIO(b'image'), 'ecg.png'), 'patientData': '{}'},
+            headers={'X-Client-ID': client_id}
+        )
+
+    assert post('a').status_code == 202
+
+    response = post('a')
+    assert response.status_code == 429
+    assert response.get_json()['reason'] == 'client_limit'
+    assert float(response.headers['Retry-After']) >= 0
+
+    # File d'attente au seuil de délestage: seules les analyses urgentes sont admises
+    response = post('b')
+    assert (response.status_code, response.get_json()['reason']) == (503, 'queue_full')
+    assert 'Retry-After' in response.headers
+    assert post('c', priority='urgent').status_code == 202
+
+    release.set()
+    queue.shutdown()
+
+
+def test_unresolved_future_does_not_hold_back_expiry():
+    queue = PriorityJobQueue(workers=1, reserved_workers=0, retention_seconds=0.05)
+    never = Future()
+    stuck = queue.submit('job', lambda: never)
+    done = [queue.submit('job', lambda n=n: n) for n in range(3)]
+    for job in done:
+        assert queue.wait(job['id'], timeout=2)['status'] == 'completed'
+
+    time.sleep(0.1)
+    assert [queue.get(job['id']) for job in done] == [None, None, None]
+    assert queue.get(stuck['id'])['status'] == 'running'
+    queue.shutdown()
+
+
+@pytest.mark.parametrize('patient_data', ['[]', '"texte"', '{"oldpeak": [3]}'])
+def test_malformed_patient_data_is_a_client_error(patient_data):
+    response = model_integration.app.test_client().post(
+        '/api/analyze/jobs', data={'ecgImage': (io.BytesIO(b'image'), 'ecg.png'), 'patientData': patient_data}
+    )
+    assert response.status_code == 400
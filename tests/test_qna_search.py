@@ -0,0 +1,106 @@
+import json
+import os
+
+import pytest
+
+import qna_search
+from qna_search import QnAIndex, QnASearchEngine, tokenize
+
+ENTRIES = [
+    {'id': 'q1', 'questions': ["Qu'est-ce qu'un infarctus ?"], 'answer': "Obstruction d'une artère coronaire.",
+     'metadata': {'tags': 'infarctus;urgence', 'audience': 'patient'}},
+    {'id': 'q2', 'questions': ["Comment mesurer la tension ?"],
+     'answer': "Au repos. Une tension élevée augmente le risque d'infarctus.",
+     'metadata': {'tags': ['tension'], 'audience': 'patient;soignant'}},
+    {'id': 'q3', 'questions': ["Quelles douleurs thoraciques doivent alerter ?"],
+     'answer': "Une douleur thoracique intense peut révéler un infarctus: appelez le 15.",
+     'metadata': {'tags': 'urgence;douleur', 'audience': 'soignant'}},
+    {'id': 'q4', 'questions': ["Que faire en cas de palpitations ?"], 'answer': "Notez la fréquence cardiaque.",
+     'metadata': {'tags': 'rythme', 'audience': 'patient'}},
+]
+
+
+def ids(index, query, **filters):
+    matches, _ = index.search(query, **filters)
+    return [index.entries[column]['id'] for column, _ in matches]
+
+
+def test_tokens_ignore_accents_elisions_stopwords_and_plurals():
+    assert tokenize("L'Hémorragie et les douleurs") == ['hemorragie', 'douleur']
+    assert tokenize("hemorragies") == tokenize("Hémorragie")
+
+
+def test_question_match_ranks_above_answer_match():
+    index = QnAIndex(ENTRIES)
+    ranking = ids(index, "infarctus")
+    assert ranking[0] == 'q1'
+    assert set(ranking) == {'q1', 'q2', 'q3'}
+
+
+def test_rare_terms_outweigh_common_ones():
+    index = QnAIndex(ENTRIES)
+    assert ids(index, "infarctus palpitations")[0] == 'q4'
+    assert ids(index, "douleurs thoraciques")[0] == 'q3'
+
+
+def test_dense_and_sparse_scoring_agree(monkeypatch):
+    index = QnAIndex(ENTRIES)
+    monkeypatch.setattr(qna_search, 'DENSE_SCORING_RATIO', 0)
+    sparse = index.search("infarctus tension", limit=10)
+    monkeypatch.setattr(qna_search, 'DENSE_SCORING_RATIO', 10 ** 6)
+    dense = index.search("infarctus tension", limit=10)
+
+    assert [column for column, _ in dense[0]] == [column for column, _ in sparse[0]]
+    assert [score for _, score in dense[0]] == pytest.approx([score for _, score in sparse[0]])
+    assert dense[1] == sparse[1] == 3
+
+
+def test_limit_keeps_the_best_results_and_reports_the_total():
+    index = QnAIndex(ENTRIES)
+    matches, total = index.search("infarctus", limit=1)
+    assert total == 3
+    assert [index.entries[column]['id'] for column, _ in matches] == ['q1']
+
+
+def test_filters_combine_tags_and_audiences():
+    index = QnAIndex(ENTRIES)
+    assert ids(index, "infarctus", tags=('urgence',)) == ['q1', 'q3']
+    assert ids(index, "infarctus", tags=('urgence',), audiences=('soignant',)) == ['q3']
+    assert ids(index, "", audiences=('patient',)) == ['q1', 'q2', 'q4']
+    assert ids(index, "infarctus", tags=('inconnu',)) == []
+    assert ids(index, "motinconnu") == []
+
+
+def write_base(path, entries):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'qnaList': entries}, f)
+
+
+def test_engine_caches_results_and_reloads_a_changed_file(tmp_path):
+    path = str(tmp_path / 'qna.json')
+    write_base(path, ENTRIES[:2])
+    engine = QnASearchEngine(path, reload_interval=0)
+
+    assert engine.search("Infarctus")['total'] == 2
+    assert engine.search("infarctus")['cached']
+
+    write_base(path, ENTRIES)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    result = engine.search("infarctus")
+    assert not result['cached']
+    assert result['total'] == 3
+
+
+def test_invalid_file_keeps_the_last_good_index(tmp_path):
+    path = str(tmp_path / 'qna.json')
+    write_base(path, ENTRIES)
+    engine = QnASearchEngine(path, reload_interval=0)
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"qnaList": [')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    assert engine.search("infarctus")['total'] == 3
+    assert engine.error
@@ -0,0 +1,75 @@
+import operator
+
+import numpy as np
+
+from risk_scoring import (
+    FEATURE_COLUMNS, RISK_RULES, compile_rules, diagnosis_bands, load_cohort, risk_scores, score_cohort, score_features
+)
+
+OPERATORS = {'>': operator.gt, '<': operator.lt, '==': operator.eq, '!=': operator.ne}
+
+
+def reference_score(row):
+    """Application règle par règle, comme avant la compilation de la table"""
+    return sum(
+        weight for column, op, threshold, weight in RISK_RULES
+        if OPERATORS[op](row[FEATURE_COLUMNS.index(column)], threshold)
+    )
+
+
+def cohort(rows=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    features = np.column_stack([
+        rng.integers(20, 90, rows),
+        rng.integers(90, 200, rows),
+        rng.integers(120, 400, rows),
+        rng.integers(80, 200, rows),
+        rng.integers(0, 5, rows),
+        rng.integers(0, 4, rows),
+        rng.integers(0, 3, rows),
+        rng.integers(0, 3, rows),
+        rng.integers(0, 4, rows),
+        rng.integers(1, 4, rows),
+    ])
+    return features.astype(np.float32)
+
+
+def test_compiled_table_matches_the_rules():
+    table = compile_rules(RISK_RULES)
+    assert [FEATURE_COLUMNS[column] for column in table['columns']] == [rule[0] for rule in RISK_RULES]
+    assert table['weights'].tolist() == [rule[3] for rule in RISK_RULES]
+    assert not (table['is_gt'] & table['is_lt']).any()
+
+    features = cohort()
+    np.testing.assert_array_equal(risk_scores(features, table), [reference_score(row) for row in features])
+
+
+def test_single_rule_table_and_one_dimensional_input():
+    table = compile_rules([('chol', '>', 240, 5)])
+    row = np.zeros(len(FEATURE_COLUMNS), dtype=np.float32)
+    row[FEATURE_COLUMNS.index('chol')] = 241
+    assert risk_scores(row, table).tolist() == [5]
+
+
+def test_bands_use_strict_edges():
+    # Confiances 0.5, 0.7, 0.85 et 0.95 (plafond): une borne reste dans la bande inférieure
+    assert diagnosis_bands([0.5, 0.55, 0.7, 0.75, 0.85, 0.95]).tolist() == [0, 1, 1, 2, 2, 3]
+
+    confidences, diagnoses, details = score_features(np.array([[0, 0, 0, 200, 0, 0, 1, 0, 1, 3]]))
+    assert (confidences.tolist(), diagnoses.tolist(), details.tolist()) == ([0.5], [0], [0])
+
+
+def test_cohort_chunks_match_a_single_call():
+    features = cohort(rows=2501, seed=1)
+    confidences, _, bands = score_features(features)
+
+    chunked_confidences, chunked_bands = score_cohort(features, chunk_size=1000)
+    np.testing.assert_array_equal(chunked_confidences, confidences)
+    np.testing.assert_array_equal(chunked_bands, bands)
+
+
+def test_csv_cohort_with_header(tmp_path):
+    features = cohort(rows=5)
+    path = tmp_path / 'cohorte.csv'
+    np.savetxt(path, features, delimiter=',', header=','.join(FEATURE_COLUMNS), comments='')
+    np.testing.assert_array_equal(load_cohort(str(path)), features)
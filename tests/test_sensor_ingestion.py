@@ -0,0 +1,65 @@
+import struct
+
+import numpy as np
+
+import model_integration
+import sensor_ingestion
+from sensor_ingestion import SequenceWindow
+
+
+def test_sequences_are_recorded_only_when_accepted():
+    window = SequenceWindow()
+    assert window.filter_new(np.array([1, 2, 2, -1, -1])).tolist() == [True, True, False, True, True]
+    assert window.filter_new(np.array([1])).tolist() == [True]
+    window.record(np.array([1]))
+    assert window.filter_new(np.array([1, 2])).tolist() == [False, True]
+
+
+def test_invalid_device_id_is_a_client_error():
+    body = struct.pack('<2sBB', b'CA', 1, 2) + b'\xff\xfe'
+    response = model_integration.app.test_client().post(
+        '/api/iot/sensors/data', data=body, content_type='application/octet-stream'
+    )
+    assert response.status_code == 400
+
+
+def test_retried_late_reading_is_late_not_duplicate():
+    now = sensor_ingestion.now_ms()
+    values = np.full((1, len(sensor_ingestion.FIELDS)), np.nan)
+    values[0, 0] = 70
+    device_id = 'test-late-retry'
+    accepted = model_integration.ingest_readings(device_id, np.array([2]), np.array([now]), values)
+    assert accepted['accepted'] == 1
+
+    for _ in range(2):
+        counts = model_integration.ingest_readings(device_id, np.array([1]), np.array([now - 1000]), values)
+        assert (counts['late'], counts['duplicates']) == (1, 0)
+
+    counts = model_integration.ingest_readings(device_id, np.array([2]), np.array([now]), values)
+    assert counts['duplicates'] == 1
+
+
+def test_counter_reset_after_reboot_is_accepted():
+    window = SequenceWindow(window=100)
+    window.record(np.arange(5000, 5200))
+    assert window.filter_new(np.array([5150, 5199])).tolist() == [False, False]
+
+    # Après un redémarrage le compteur repart de 0: ce n'est pas un renvoi
+    rebooted = np.array([0, 1, 1, 2])
+    assert window.filter_new(rebooted).tolist() == [True, True, False, True]
+    window.record(np.array([0, 1, 2]))
+    assert window.highest == 2
+    assert window.filter_new(np.array([1, 3])).tolist() == [False, True]
+
+
+def test_rebooted_device_readings_are_stored():
+    now = sensor_ingestion.now_ms()
+    values = np.full((2, len(sensor_ingestion.FIELDS)), np.nan)
+    values[:, 0] = [70, 72]
+    device_id = 'test-reboot'
+    timestamps = np.array([now - 2000, now - 1000])
+    counts = model_integration.ingest_readings(device_id, np.array([90000, 90001]), timestamps, values)
+    assert counts['accepted'] == 2
+
+    counts = model_integration.ingest_readings(device_id, np.array([0, 1]), np.array([now - 500, now]), values)
+    assert (counts['accepted'], counts['duplicates']) == (2, 0)
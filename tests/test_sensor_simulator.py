@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from sensor_ingestion import FIELDS
+from sensor_simulator import LOWER_BOUNDS, UPPER_BOUNDS, SensorSimulator, drive, scenario_targets
+
+
+def run(seed, steps=20):
+    simulator = SensorSimulator(50, seed=seed)
+    simulator.inject('tachycardia', fraction=0.2, steps=5)
+    return simulator, np.stack([simulator.step() for _ in range(steps)])
+
+
+def test_same_seed_produces_the_same_readings_and_scenario_devices():
+    first, readings = run(7)
+    second, replayed = run(7)
+    np.testing.assert_array_equal(readings, replayed)
+    np.testing.assert_array_equal(first.values, second.values)
+
+    _, other = run(8)
+    assert not np.array_equal(readings, other)
+
+
+def test_readings_stay_within_physiological_bounds():
+    simulator = SensorSimulator(50, seed=3)
+    readings = np.stack([simulator.step() for _ in range(200)])
+    assert (readings >= LOWER_BOUNDS.astype(np.float32)).all()
+    assert (readings <= UPPER_BOUNDS.astype(np.float32)).all()
+
+
+def test_scenario_pulls_towards_its_target_and_ends_after_its_steps():
+    simulator = SensorSimulator(4, seed=1)
+    simulator.inject('tachycardia', devices=[0], steps=30)
+    heart_rate = FIELDS.index('heartRate')
+    for _ in range(29):
+        readings = simulator.step()
+
+    assert readings[0, heart_rate] > 130
+    assert (readings[1:, heart_rate] <= UPPER_BOUNDS[heart_rate]).all()
+    assert not np.isnan(simulator.targets[0]).all()
+    simulator.step()
+    assert np.isnan(simulator.targets).all()
+
+
+def test_unknown_scenario_is_rejected():
+    with pytest.raises(ValueError):
+        scenario_targets('inconnu')
+
+
+def test_drive_sends_consecutive_sequences_per_device():
+    sent = []
+    simulator = SensorSimulator(3, seed=5)
+    stats = drive(simulator, lambda *args: sent.append(args), rate_hz=200, duration=0.05, flush_every=2)
+
+    assert stats['sends'] == len(sent)
+    assert stats['readings'] == sum(len(values) for _, _, _, values in sent)
+    first_batch = [sequences.tolist() for _, sequences, _, _ in sent[:3]]
+    assert first_batch == [[0, 1]] * 3
+    assert [device_id for device_id, _, _, _ in sent[:3]] == simulator.device_ids
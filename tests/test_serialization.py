@@ -0,0 +1,37 @@
+import gzip
+
+from flask import Flask, Response
+
+import serialization
+
+
+def make_app():
+    app = Flask(__name__)
+    serialization.init_app(app, json_encoder='std')
+    state = {'body': 'a' * 2048}
+
+    @app.route('/resource')
+    def resource():
+        response = Response(state['body'], mimetype='application/json')
+        response.set_etag('v1', weak=True)
+        return response
+
+    return app, state
+
+
+def test_compressed_cache_follows_the_body_not_the_etag():
+    app, state = make_app()
+    client = app.test_client()
+    first = client.get('/resource', headers={'Accept-Encoding': 'gzip'})
+    assert gzip.decompress(first.data).decode() == 'a' * 2048
+
+    # Même ETag, corps différent (ex: horodatage de la réponse)
+    state['body'] = 'b' * 2048
+    second = client.get('/resource', headers={'Accept-Encoding': 'gzip'})
+    assert gzip.decompress(second.data).decode() == 'b' * 2048
+
+
+def test_matching_etag_returns_304():
+    app, _ = make_app()
+    response = app.test_client().get('/resource', headers={'If-None-Match': 'W/"v1"'})
+    assert response.status_code == 304
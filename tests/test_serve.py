@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+from flask import Flask, request
+
+from serve import WsgiAdapter
+
+
+def make_app():
+    app = Flask(__name__)
+
+    @app.route('/slow')
+    def slow():
+        time.sleep(0.3)
+        return 'ok'
+
+    @app.route('/echo', methods=['POST'])
+    def echo():
+        return {'body': request.get_data(as_text=True), 'agent': request.headers.get('User-Agent'),
+                'query': request.args.get('q')}
+
+    return app
+
+
+async def call(adapter, method, path, body=b'', query=b''):
+    scope = {
+        'type': 'http', 'method': method, 'path': path, 'query_string': query, 'http_version': '1.1',
+        'headers': [(b'user-agent', b'test'), (b'content-type', b'text/plain')],
+    }
+    chunks = [body[:3], body[3:]]
+    messages = []
+    disconnected = asyncio.Event()
+
+    async def receive():
+        if chunks:
+            chunk = chunks.pop(0)
+            return {'type': 'http.request', 'body': chunk, 'more_body': bool(chunks)}
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        messages.append(message)
+
+    await adapter(scope, receive, send)
+    disconnected.set()
+    status = messages[0]['status']
+    return status, b''.join(message.get('body', b'') for message in messages[1:])
+
+
+def test_requests_run_in_parallel_on_the_sized_pool():
+    adapter = WsgiAdapter(make_app(), threads=4)
+
+    async def main():
+        started = time.perf_counter()
+        results = await asyncio.gather(*(call(adapter, 'GET', '/slow') for _ in range(4)))
+        return time.perf_counter() - started, results
+
+    elapsed, results = asyncio.run(main())
+    assert results == [(200, b'ok')] * 4
+    assert elapsed < 0.9
+
+
+def test_body_headers_and_query_reach_the_wsgi_app():
+    adapter = WsgiAdapter(make_app(), threads=2)
+    status, body = asyncio.run(call(adapter, 'POST', '/echo', b'hello world', b'q=1'))
+    assert status == 200
+    assert body == b'{"agent":"test","body":"hello world","query":"1"}\n'
+
+
+def test_client_disconnect_stops_a_streamed_response():
+    closed = []
+
+    def stream_app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/event-stream')])
+
+        def events():
+            try:
+                while True:
+                    time.sleep(0.05)
+                    yield b'data: tick\n\n'
+            finally:
+                closed.append(True)
+        return events()
+
+    adapter = WsgiAdapter(stream_app, threads=1)
+    sent = []
+
+    async def main():
+        requested = []
+
+        async def receive():
+            if not requested:
+                requested.append(True)
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await asyncio.sleep(0.2)
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': 'GET', 'path': '/events', 'headers': []}
+        await asyncio.wait_for(adapter(scope, receive, send), 2)
+
+    asyncio.run(main())
+    assert closed == [True]
+    assert sent[0]['status'] == 200
+    assert 1 <= len(sent) - 1 <= 6
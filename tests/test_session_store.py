@@ -0,0 +1,65 @@
+import pytest
+
+from session_store import SessionStore
+
+
+@pytest.fixture
+def store():
+    store = SessionStore(':memory:')
+    yield store
+    store.close()
+
+
+def save_sessions(store, count, saved_at='2026-01-01T10:00:00'):
+    for index in range(count):
+        store.save({'id': f'session_{index:02d}', 'savedAt': saved_at})
+
+
+def test_keyset_pages_cover_every_session_once(store):
+    # Même savedAt pour toutes les sessions: l'ordre est départagé par l'identifiant
+    save_sessions(store, 7)
+    seen, cursor = [], None
+    while True:
+        sessions, cursor = store.history(3, cursor)
+        seen.extend(session['id'] for session in sessions)
+        if cursor is None:
+            break
+    assert seen == [f'session_{index:02d}' for index in reversed(range(7))]
+
+
+def test_cursor_is_stable_when_sessions_are_added(store):
+    save_sessions(store, 4)
+    first_page, cursor = store.history(2)
+    store.save({'id': 'newer', 'savedAt': '2026-01-02T10:00:00'})
+    second_page, cursor = store.history(2, cursor)
+    assert [session['id'] for session in second_page] == ['session_01', 'session_00']
+    assert cursor is None
+    assert store.history(1)[0][0]['id'] == 'newer'
+
+
+def test_invalid_cursor_is_rejected(store):
+    with pytest.raises(ValueError):
+        store.history(2, 'pas-un-curseur')
+
+
+def test_changes_notify_after_commit(store):
+    changes = []
+    store.on_change = lambda: changes.append(store.pending_writes)
+    save_sessions(store, 2)
+    store.flush()
+    assert changes == [0]
+    assert store.delete('session_00')
+    assert not store.delete('session_00')
+    assert changes == [0, 0]
+
+
+def test_database_is_created_on_first_use(tmp_path):
+    path = tmp_path / 'sessions.db'
+    store = SessionStore(str(path))
+    assert not path.exists()
+
+    save_sessions(store, 2)
+    assert store.count() == 2
+    assert path.exists()
+    store.close()
+    assert SessionStore(str(path)).count() == 2
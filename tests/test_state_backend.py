@@ -0,0 +1,161 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from state_backend import (
+    LeaderElection, MemoryBackend, RedisBackend, SQLiteBackend, StateBackendError, start_standin
+)
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'resp'])
+def backend(request, tmp_path):
+    if request.param == 'memory':
+        backend = MemoryBackend()
+    elif request.param == 'sqlite':
+        backend = SQLiteBackend(str(tmp_path / 'state.db'))
+    else:
+        server = start_standin()
+        request.addfinalizer(server.shutdown)
+        backend = RedisBackend(*server.server_address[:2])
+    yield backend
+    backend.close()
+
+
+def test_log_positions_follow_append_order(backend):
+    positions = [backend.append_log('log', {'n': n}) for n in range(5)]
+    assert positions == [1, 2, 3, 4, 5]
+
+    entries, first = backend.read_log('log', 2, 2)
+    assert first == 1
+    assert entries == [(3, {'n': 2}), (4, {'n': 3})]
+    assert backend.read_log('log', 5, 10)[0] == []
+
+
+def test_log_keeps_the_last_entries(backend):
+    for n in range(10):
+        backend.append_log('log', {'n': n}, max_entries=2)
+
+    entries, first = backend.read_log('log', 0, 100)
+    assert first > 1
+    assert entries[0][0] == first
+    assert entries[-1] == (10, {'n': 9})
+    assert len(entries) >= 2
+
+
+def test_lease_has_a_single_owner_until_it_expires(backend):
+    assert backend.acquire_lease('leader', 'a', 0.3)
+    assert not backend.acquire_lease('leader', 'b', 0.3)
+    assert backend.acquire_lease('leader', 'a', 0.3)
+    assert backend.lease_owner('leader') == 'a'
+
+    time.sleep(0.4)
+    assert backend.lease_owner('leader') is None
+    assert backend.acquire_lease('leader', 'b', 0.3)
+
+    backend.release_lease('leader', 'a')
+    assert backend.lease_owner('leader') == 'b'
+    backend.release_lease('leader', 'b')
+    assert backend.acquire_lease('leader', 'a', 0.3)
+
+
+def test_leader_election_hands_over_on_release(backend):
+    changes = []
+    first = LeaderElection(backend, 'monitoring', 'a', ttl=5, on_change=changes.append)
+    second = LeaderElection(backend, 'monitoring', 'b', ttl=5)
+    assert first.renew() and not second.renew()
+    assert changes == [True]
+
+    first.release()
+    assert changes == [True, False]
+    assert second.renew() and not first.renew()
+    assert second.status()['current_leader'] == 'b'
+
+
+class UnreachableBackend(MemoryBackend):
+    def acquire_lease(self, name, owner, ttl):
+        if self.down:
+            raise StateBackendError('injoignable')
+        return super().acquire_lease(name, owner, ttl)
+
+
+def test_leader_steps_down_when_it_cannot_renew():
+    backend = UnreachableBackend()
+    backend.down = False
+    election = LeaderElection(backend, 'monitoring', 'a', ttl=0.3)
+    assert election.renew()
+
+    # Backend injoignable: le leader le reste jusqu'à l'échéance de son dernier bail, pas au-delà
+    backend.down = True
+    assert election.renew()
+    assert election.error == 'injoignable'
+    time.sleep(0.35)
+    assert not election.renew()
+    assert not election.is_leader
+
+
+REPLICA = """
+import json, sys
+import numpy as np
+import model_integration, sensor_ingestion
+from state_backend import SQLiteBackend
+
+model_integration.state_backend = SQLiteBackend(sys.argv[1])
+if sys.argv[2] == 'write':
+    now = sensor_ingestion.now_ms()
+    values = np.full((3, len(sensor_ingestion.FIELDS)), np.nan)
+    values[:, 0] = [70, 150, 160]
+    model_integration.ingest_readings('replica', np.array([1, 2, 3]), np.array([now - 2000, now - 1000, now]), values)
+    alert = next(iter(model_integration.device_registry.get('replica').snapshot.alerts))
+    model_integration.record_device_event('read', device='replica', alert=alert['id'])
+else:
+    model_integration.apply_device_log()
+snapshot = model_integration.device_registry.get('replica').snapshot
+print(json.dumps({
+    'alerts': list(snapshot.alerts),
+    'unread': snapshot.unread_alerts,
+    'sensor': snapshot.sensor_data['heartRate'],
+}, default=str))
+"""
+
+
+def test_processes_rebuild_the_same_device_state_from_the_log(tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    database = str(tmp_path / 'state.db')
+
+    def run(mode):
+        output = subprocess.run(
+            [sys.executable, '-c', REPLICA, database, mode], cwd=root, check=True, capture_output=True, text=True
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    written = run('write')
+    replayed = run('replay')
+    assert written['alerts']
+    assert written['unread'] == len(written['alerts']) - 1
+    assert replayed == written
+
+
+def test_skipped_device_log_entries_are_logged_and_counted(monkeypatch, caplog):
+    import model_integration
+
+    backend = MemoryBackend()
+    monkeypatch.setattr(model_integration, 'state_backend', backend)
+    monkeypatch.setattr(model_integration, 'device_log_position', 0)
+    skipped = model_integration.device_log_skipped_total
+    before = {reason: skipped.value(reason=reason) for reason in ('trimmed', 'invalid')}
+
+    for _ in range(3):
+        backend.append_log(model_integration.DEVICE_LOG_KEY, {'op': 'unknown'}, max_entries=1)
+    with caplog.at_level('WARNING', logger=model_integration.logger.name):
+        model_integration.apply_device_log()
+
+    assert model_integration.device_log_position == 3
+    assert skipped.value(reason='trimmed') == before['trimmed'] + 2
+    assert skipped.value(reason='invalid') == before['invalid'] + 1
+    messages = [record.getMessage() for record in caplog.records]
+    assert "Entrées 1 à 2 du journal des appareils retirées avant d'être appliquées (DEVICE_LOG_MAX_ENTRIES)" in messages
+    assert "Entrée 3 du journal des appareils ignorée: 'unknown'" in messages
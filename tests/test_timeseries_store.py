@@ -0,0 +1,71 @@
+import numpy as np
+
+from timeseries_store import RingBuffer, RollupTiers, SensorHistoryStore, lttb_indices
+
+
+def test_ring_buffer_keeps_the_last_points_in_order():
+    buffer = RingBuffer(capacity=5, initial_capacity=2)
+    for timestamp in range(1, 4):
+        buffer.append(timestamp, [timestamp * 10])
+    buffer.append_many(np.arange(4, 9), np.arange(40, 90, 10))
+
+    timestamps, values = buffer.range()
+    assert buffer.full and len(buffer) == 5
+    assert timestamps.tolist() == [4, 5, 6, 7, 8]
+    assert values[:, 0].tolist() == [40, 50, 60, 70, 80]
+    assert (buffer.first_timestamp, buffer.last_timestamp) == (4, 8)
+
+
+def test_ring_buffer_range_and_last_across_the_wrap():
+    buffer = RingBuffer(capacity=4, initial_capacity=4)
+    buffer.append_many(np.arange(1, 7), np.arange(1, 7))
+
+    # ]since, until]
+    assert buffer.range(4, 6)[0].tolist() == [5, 6]
+    assert buffer.count(3, 5) == 2
+    assert buffer.last(3)[0].tolist() == [4, 5, 6]
+    assert buffer.last(2, until_ms=5)[0].tolist() == [4, 5]
+
+
+def test_rollups_aggregate_and_cascade():
+    rollups = RollupTiers(tiers=((10, 3600), (60, 3600)))
+    timestamps = np.arange(0, 70_000, 1_000)
+    rollups.append_many(timestamps, np.arange(len(timestamps), dtype=float))
+
+    starts, minimums, maximums, means, counts = rollups.query(0)
+    assert starts.tolist() == list(range(0, 70_000, 10_000))
+    assert (minimums[0, 0], maximums[0, 0], means[0, 0], counts[0]) == (0, 9, 4.5, 10)
+
+    # L'intervalle d'une minute terminé, puis l'intervalle en cours complété par le niveau plus fin
+    starts, minimums, maximums, means, counts = rollups.query(1)
+    assert starts.tolist() == [0, 60_000]
+    assert counts.tolist() == [60, 10]
+    assert (minimums[0, 0], maximums[0, 0], means[0, 0]) == (0, 59, 29.5)
+    assert rollups.count(1) == 2
+
+
+def test_lttb_keeps_the_ends_and_the_peak():
+    timestamps = np.arange(100)
+    values = np.zeros((100, 1))
+    values[37] = 50
+
+    indices = lttb_indices(timestamps, values, 10)
+    assert len(indices) == 10
+    assert (indices[0], indices[-1]) == (0, 99)
+    assert 37 in indices
+    assert np.all(np.diff(indices) > 0)
+    assert lttb_indices(timestamps, values, 200).tolist() == list(range(100))
+
+
+def test_downsample_picks_the_finest_level_within_budget():
+    store = SensorHistoryStore(retention_seconds=3600, sample_rate_hz=1.0)
+    timestamps = np.arange(0, 600_000, 1_000)
+    store.append_many('heartRate', timestamps, np.full(len(timestamps), 70.0))
+
+    assert store.downsample('heartRate', max_points=1000)['method'] == 'raw'
+    reduced = store.downsample('heartRate', max_points=100)
+    assert (reduced['method'], reduced['resolution']) == ('rollup', 10)
+    assert len(reduced['timestamps']) == 60
+
+    forced = store.downsample('heartRate', max_points=100, method='lttb')
+    assert (forced['method'], len(forced['timestamps'])) == ('lttb', 100)
@@ -0,0 +1,21 @@
+import numpy as np
+
+from vitals_analytics import ChannelStats
+
+
+def test_single_first_reading_sets_last_value():
+    stats = ChannelStats()
+    stats.update_many(np.array([1000]), np.array([72.0]))
+    assert stats.summary()['last'] == 72.0
+
+
+def test_batch_matches_reading_by_reading_updates():
+    timestamps = np.arange(0, 60_000, 1000)
+    values = 70 + np.sin(np.arange(60))
+    one_by_one, batched = ChannelStats(), ChannelStats()
+    for timestamp, value in zip(timestamps, values):
+        one_by_one.update(float(timestamp), float(value))
+    batched.update_many(timestamps[:1], values[:1])
+    batched.update_many(timestamps[1:], values[1:])
+    for key, value in one_by_one.summary().items():
+        assert batched.summary()[key] == value
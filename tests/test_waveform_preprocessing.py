@@ -0,0 +1,90 @@
+import json
+
+import numpy as np
+
+import model_integration
+import waveform_preprocessing
+from waveform_preprocessing import preprocess_waveform, read_raw, resample_filter, window_starts
+
+
+def sine(frequency, seconds, rate, leads=1):
+    t = np.arange(int(seconds * rate)) / rate
+    return np.repeat(np.sin(2 * np.pi * frequency * t)[:, np.newaxis], leads, axis=1).astype(np.float32)
+
+
+def amplitude(signal, frequency, rate):
+    """Amplitude de la composante à frequency (projection sur un sinus et un cosinus)"""
+    t = np.arange(len(signal)) / rate
+    return 2 * abs(np.mean(signal * np.exp(-2j * np.pi * frequency * t)))
+
+
+def test_raw_layouts_and_int16_gain():
+    samples = np.arange(12, dtype=np.int16).reshape(4, 3) * 100
+    interleaved = read_raw(samples.tobytes(), 500, leads=3, dtype='int16', gain=1000)
+    planar = read_raw(samples.T.copy().tobytes(), 500, leads=3, dtype='int16', gain=1000, layout='planar')
+
+    np.testing.assert_allclose(interleaved.signal, samples / 1000)
+    np.testing.assert_array_equal(planar.signal, interleaved.signal)
+    assert interleaved.duration == 4 / 500
+    assert read_raw(samples.tobytes(), 500, leads=3, dtype='int16', max_seconds=0.004).signal.shape == (2, 3)
+
+
+def test_resampling_keeps_the_band_and_removes_the_rest():
+    rate = 250
+    signal = sine(10, 20, rate) + 2 * sine(0.05, 20, rate) + sine(100, 20, rate)
+
+    filtered = resample_filter(signal, rate, target_rate=500, band=(0.5, 40.0))[:, 0]
+
+    assert len(filtered) == 20 * 500
+    assert abs(amplitude(filtered, 10, 500) - 1) < 0.05
+    assert amplitude(filtered, 100, 500) < 0.01
+    # Ligne de base (0.05 Hz) retirée
+    assert amplitude(filtered, 0.05, 500) < 0.2
+
+
+def test_windows_end_on_the_last_sample():
+    assert window_starts(2500, 1000).tolist() == [0, 1000, 1500]
+    assert window_starts(800, 1000).tolist() == [0]
+
+
+def test_preprocessing_pads_missing_leads_and_short_records():
+    waveform = read_raw(sine(10, 25, 500, leads=2).tobytes(), 500, leads=2)
+    windows, stats = preprocess_waveform(waveform, window_seconds=10, leads=3, max_windows=2)
+    assert windows.shape == (2, 5000, 3)
+    assert not windows[:, :, 2].any()
+    assert (stats['windows'], stats['leads'], stats['analyzed_s']) == (2, 2, 20.0)
+
+    short = read_raw(sine(10, 4, 500).tobytes(), 500, leads=1)
+    windows, _ = preprocess_waveform(short, window_seconds=10, leads=1)
+    assert windows.shape == (1, 5000, 1)
+    assert not windows[0, 2000:].any()
+
+
+def test_repeated_upload_is_served_from_the_cache_before_preprocessing(monkeypatch):
+    calls = []
+    original = waveform_preprocessing.preprocess_waveform
+
+    def counted(*args, **kwargs):
+        calls.append(1)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(waveform_preprocessing, 'preprocess_waveform', counted)
+    model_integration.prediction_cache.clear()
+    client = model_integration.app.test_client()
+    body = sine(8, 12, 250, leads=12).tobytes()
+    query = {'patientData': json.dumps({'age': 65}), 'format': 'raw', 'sampleRate': 250, 'leads': 12}
+
+    def post(**overrides):
+        return client.post('/api/analyze/waveform', data=body, content_type='application/octet-stream',
+                           query_string={**query, **overrides})
+
+    first = post()
+    assert first.status_code == 200, first.get_json()
+    assert first.get_json()['cached'] is False
+    second = post()
+    assert second.get_json()['cached'] is True
+    assert len(calls) == 1
+
+    # D'autres paramètres de lecture donnent un autre signal: pas de résultat en cache
+    assert post(sampleRate=500).get_json()['cached'] is False
+    assert len(calls) == 2
@@ -0,0 +1,570 @@
+"""
+Stockage compact des séries temporelles des capteurs.
+
+Chaque capteur est un buffer circulaire de capacité fixe: horodatages en
+millisecondes epoch (int64) et valeurs float32, un canal par grandeur (la tension
+artérielle a deux canaux: systolique et diastolique). Les requêtes par intervalle
+utilisent une recherche dichotomique; le JSON n'est construit qu'au niveau de l'API.
+
+Les buffers démarrent petits et doublent jusqu'à leur capacité maximale: la mémoire
+utilisée reste proportionnelle aux données réellement reçues et bornée par
+capacité x (8 + 4 x canaux) octets par capteur.
+
+Des agrégats (min, max, moyenne, nombre de points) par intervalles de 10 s,
+1 min et 10 min sont tenus à jour à chaque ajout, avec une rétention plus longue
+que les points bruts. downsample() choisit le niveau le plus fin qui respecte un
+budget de points, ou réduit la série par LTTB (Largest-Triangle-Three-Buckets):
+un graphique de 24 h ou 7 jours coûte quelques centaines de points quelle que
+soit la fréquence d'échantillonnage.
+"""
+
+import threading
+
+import numpy as np
+
+# Canaux stockés pour chaque type de capteur
+SENSOR_CHANNELS = {
+    'heartRate': ('value',),
+    'bloodPressure': ('systolic', 'diastolic'),
+    'temperature': ('value',),
+    'oxygenSaturation': ('value',),
+    'respiratoryRate': ('value',),
+}
+
+# Niveaux d'agrégation: (durée d'un intervalle, rétention), en secondes
+ROLLUP_TIERS = (
+    (10, 24 * 3600),
+    (60, 7 * 24 * 3600),
+    (600, 30 * 24 * 3600),
+)
+
+
+def lttb_indices(timestamps_ms, values, threshold):
+    """
+    Indices des points retenus par l'algorithme Largest-Triangle-Three-Buckets
+
+    Le premier et le dernier point sont conservés; dans chaque intervalle, le point
+    retenu forme le plus grand triangle avec le point précédemment retenu et la
+    moyenne de l'intervalle suivant (aires additionnées sur les canaux).
+
+    Args:
+        timestamps_ms: Horodatages croissants (n,)
+        values: Valeurs (n, canaux)
+        threshold: Nombre de points souhaité
+
+    Returns:
+        Indices croissants (int64)
+    """
+    count = len(timestamps_ms)
+    if threshold >= count:
+        return np.arange(count)
+    if threshold < 3:
+        return np.array([0, count - 1][:max(threshold, 0)], dtype=np.int64)
+
+    x = np.asarray(timestamps_ms, dtype=np.float64)
+    y = np.asarray(values, dtype=np.float64).reshape(count, -1)
+
+    # threshold - 2 intervalles pour les points intermédiaires, puis le dernier point seul
+    edges = np.linspace(1, count - 1, threshold - 1).astype(np.int64)
+    starts = np.append(edges[:-1], count - 1)
+    sizes = np.diff(np.append(starts, count))
+    average_x = np.add.reduceat(x, starts) / sizes
+    average_y = np.add.reduceat(y, starts, axis=0) / sizes[:, None]
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = count - 1
+    selected = 0
+    for bucket in range(threshold - 2):
+        start, stop = starts[bucket], starts[bucket + 1]
+        next_x, next_y = average_x[bucket + 1], average_y[bucket + 1]
+        areas = np.abs(
+            (x[selected] - next_x) * (y[start:stop] - y[selected])
+            - (x[selected] - x[start:stop, None]) * (next_y - y[selected])
+        ).sum(axis=1)
+        selected = start + int(np.argmax(areas))
+        indices[bucket + 1] = selected
+    return indices
+
+
+class RingBuffer:
+    """
+    Buffer circulaire (horodatage int64, valeurs float32 x canaux)
+
+    Les horodatages doivent être ajoutés dans l'ordre croissant.
+    """
+
+    def __init__(self, capacity, channels=1, initial_capacity=256):
+        self.capacity = int(capacity)
+        self.channels = channels
+        allocated = max(1, min(self.capacity, initial_capacity))
+        self._timestamps = np.zeros(allocated, dtype=np.int64)
+        self._values = np.zeros((allocated, channels), dtype=np.float32)
+        self._head = 0  # Prochaine position d'écriture
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        return self._timestamps.nbytes + self._values.nbytes
+
+    @property
+    def full(self):
+        """Vrai si le buffer a atteint sa capacité (les points les plus anciens sont recouverts)"""
+        return self._size >= self.capacity
+
+    @property
+    def first_timestamp(self):
+        """Horodatage du point le plus ancien (None si vide)"""
+        with self._lock:
+            if not self._size:
+                return None
+            return int(self._segments()[0][0][0])
+
+    @property
+    def last_timestamp(self):
+        """Horodatage du point le plus récent (None si vide)"""
+        if not self._size:
+            return None
+        return int(self._timestamps[self._head - 1])
+
+    def append(self, timestamp_ms, values):
+        """Ajoute un point"""
+        with self._lock:
+            if self._size == len(self._timestamps) and self._size < self.capacity:
+                self._grow(self._size + 1)
+            allocated = len(self._timestamps)
+            self._timestamps[self._head] = timestamp_ms
+            self._values[self._head] = values
+            self._head = (self._head + 1) % allocated
+            self._size = min(self._size + 1, allocated)
+
+    def append_many(self, timestamps_ms, values):
+        """Ajoute plusieurs points d'un coup (horodatages croissants)"""
+        timestamps_ms = np.asarray(timestamps_ms, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float32).reshape(len(timestamps_ms), self.channels)
+
+        with self._lock:
+            if self._size + len(timestamps_ms) > len(self._timestamps) and len(self._timestamps) < self.capacity:
+                self._grow(self._size + len(timestamps_ms))
+
+            allocated = len(self._timestamps)
+            # Seuls les derniers points tiennent dans le buffer
+            if len(timestamps_ms) > allocated:
+                timestamps_ms = timestamps_ms[-allocated:]
+                values = values[-allocated:]
+
+            count = len(timestamps_ms)
+            first = min(count, allocated - self._head)
+            self._timestamps[self._head:self._head + first] = timestamps_ms[:first]
+            self._values[self._head:self._head + first] = values[:first]
+            if count > first:
+                self._timestamps[:count - first] = timestamps_ms[first:]
+                self._values[:count - first] = values[first:]
+
+            self._head = (self._head + count) % allocated
+            self._size = min(self._size + count, allocated)
+
+    def range(self, since_ms=None, until_ms=None):
+        """
+        Points dont l'horodatage est dans ]since_ms, until_ms]
+
+        Returns:
+            Tuple (horodatages int64, valeurs float32 (n, canaux)), copies dans l'ordre chronologique
+        """
+        with self._lock:
+            segments = []
+            for timestamps, values in self._segments():
+                start = 0 if since_ms is None else np.searchsorted(timestamps, since_ms, side='right')
+                stop = len(timestamps) if until_ms is None else np.searchsorted(timestamps, until_ms, side='right')
+                if start < stop:
+                    segments.append((timestamps[start:stop], values[start:stop]))
+
+            return self._concatenate(segments)
+
+    def count(self, since_ms=None, until_ms=None):
+        """Nombre de points dont l'horodatage est dans ]since_ms, until_ms], sans copie"""
+        with self._lock:
+            total = 0
+            for timestamps, _ in self._segments():
+                start = 0 if since_ms is None else np.searchsorted(timestamps, since_ms, side='right')
+                stop = len(timestamps) if until_ms is None else np.searchsorted(timestamps, until_ms, side='right')
+                total += max(0, int(stop - start))
+            return total
+
+    def last(self, count, until_ms=None):
+        """Les count derniers points (d'horodatage <= until_ms si précisé), dans l'ordre chronologique"""
+        with self._lock:
+            count = min(count, self._size)
+            segments = []
+            for timestamps, values in reversed(self._segments()):
+                if count <= 0:
+                    break
+                if until_ms is not None:
+                    stop = np.searchsorted(timestamps, until_ms, side='right')
+                    timestamps, values = timestamps[:stop], values[:stop]
+                take = min(count, len(timestamps))
+                segments.insert(0, (timestamps[len(timestamps) - take:], values[len(values) - take:]))
+                count -= take
+
+            return self._concatenate(segments)
+
+    def _segments(self):
+        """Les portions contiguës du buffer, de la plus ancienne à la plus récente"""
+        allocated = len(self._timestamps)
+        if self._size < allocated:
+            return [(self._timestamps[:self._size], self._values[:self._size])]
+        return [
+            (self._timestamps[self._head:], self._values[self._head:]),
+            (self._timestamps[:self._head], self._values[:self._head]),
+        ]
+
+    def _concatenate(self, segments):
+        if not segments:
+            return np.empty(0, dtype=np.int64), np.empty((0, self.channels), dtype=np.float32)
+        return (
+            np.concatenate([timestamps for timestamps, _ in segments]),
+            np.concatenate([values for _, values in segments]),
+        )
+
+    def _grow(self, needed):
+        """Agrandit le buffer (doublement, borné par la capacité) en le remettant dans l'ordre"""
+        allocated = len(self._timestamps)
+        new_size = allocated
+        while new_size < needed and new_size < self.capacity:
+            new_size = min(new_size * 2, self.capacity)
+
+        timestamps, values = self._concatenate(self._segments())
+        self._timestamps = np.zeros(new_size, dtype=np.int64)
+        self._values = np.zeros((new_size, self.channels), dtype=np.float32)
+        self._timestamps[:len(timestamps)] = timestamps
+        self._values[:len(values)] = values
+        self._head = len(timestamps) % new_size
+
+
+class RollupTier:
+    """
+    Agrégats (min, max, moyenne, nombre de points) d'un niveau, par intervalle de temps fixe
+
+    Les intervalles terminés sont stockés dans un buffer circulaire (canaux: minimums,
+    maximums, moyennes, nombre de points); l'intervalle en cours est agrégé à part.
+    À modifier sous le verrou de RollupTiers.
+
+    Args:
+        interval_seconds: Durée d'un intervalle
+        retention_seconds: Durée conservée
+        channels: Nombre de canaux du capteur
+    """
+
+    def __init__(self, interval_seconds, retention_seconds, channels=1):
+        self.interval_ms = int(interval_seconds * 1000)
+        self.channels = channels
+        self.buffer = RingBuffer(max(1, int(retention_seconds // interval_seconds)), 3 * channels + 1)
+        self.open = None  # Intervalle en cours: [début, minimums, maximums, sommes, nombre de points]
+
+    def add(self, timestamp_ms, minimums, maximums, sums, count):
+        """
+        Ajoute un agrégat (un point: minimums = maximums = sommes = valeurs, count = 1)
+
+        Returns:
+            L'intervalle terminé par cet ajout ([début, minimums, maximums, sommes, nombre]) ou None
+        """
+        start = timestamp_ms - timestamp_ms % self.interval_ms
+        current = self.open
+        if current is not None and current[0] == start:
+            current_minimums, current_maximums, current_sums = current[1], current[2], current[3]
+            for channel in range(self.channels):
+                if minimums[channel] < current_minimums[channel]:
+                    current_minimums[channel] = minimums[channel]
+                if maximums[channel] > current_maximums[channel]:
+                    current_maximums[channel] = maximums[channel]
+                current_sums[channel] += sums[channel]
+            current[4] += count
+            return None
+
+        self.open = [start, list(minimums), list(maximums), list(sums), count]
+        if current is not None:
+            self.buffer.append(current[0], _summary_row(current))
+        return current
+
+    def add_many(self, timestamps_ms, minimums, maximums, sums, counts):
+        """
+        Ajoute des agrégats d'horodatages croissants (regroupés par intervalle en une opération NumPy)
+
+        Returns:
+            Intervalles terminés (débuts, minimums, maximums, sommes, nombres de points) ou None
+        """
+        starts = timestamps_ms - timestamps_ms % self.interval_ms
+        first = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+        starts = starts[first]
+        minimums = np.minimum.reduceat(minimums, first, axis=0)
+        maximums = np.maximum.reduceat(maximums, first, axis=0)
+        sums = np.add.reduceat(sums, first, axis=0)
+        counts = np.add.reduceat(counts, first)
+
+        current = self.open
+        if current is not None:
+            if starts[0] == current[0]:
+                # Le premier intervalle du lot prolonge l'intervalle en cours
+                minimums[0] = np.minimum(minimums[0], current[1])
+                maximums[0] = np.maximum(maximums[0], current[2])
+                sums[0] += current[3]
+                counts[0] += current[4]
+            else:
+                starts = np.insert(starts, 0, current[0])
+                minimums = np.vstack(([current[1]], minimums))
+                maximums = np.vstack(([current[2]], maximums))
+                sums = np.vstack(([current[3]], sums))
+                counts = np.insert(counts, 0, current[4])
+
+        self.open = [int(starts[-1]), minimums[-1].tolist(), maximums[-1].tolist(), sums[-1].tolist(), int(counts[-1])]
+        if len(starts) == 1:
+            return None
+
+        closed = (starts[:-1], minimums[:-1], maximums[:-1], sums[:-1], counts[:-1])
+        self.buffer.append_many(closed[0], np.column_stack((
+            closed[1], closed[2], closed[3] / closed[4][:, None], closed[4]
+        )))
+        return closed
+
+
+def _summary_row(aggregate):
+    """Ligne stockée d'un intervalle: minimums, maximums, moyennes, nombre de points"""
+    _, minimums, maximums, sums, count = aggregate
+    return minimums + maximums + [total / count for total in sums] + [count]
+
+
+class RollupTiers:
+    """
+    Niveaux d'agrégation d'un capteur, du plus fin au plus grossier
+
+    Chaque point n'est agrégé que dans le niveau le plus fin; un intervalle terminé
+    alimente le niveau suivant. Les lectures complètent les intervalles terminés par
+    les intervalles en cours de tous les niveaux plus fins.
+
+    Args:
+        tiers: Niveaux (durée d'un intervalle, rétention), en secondes, du plus fin au plus grossier
+        channels: Nombre de canaux du capteur
+    """
+
+    def __init__(self, tiers=ROLLUP_TIERS, channels=1):
+        self.channels = channels
+        self.tiers = [RollupTier(interval, retention, channels) for interval, retention in tiers]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.tiers)
+
+    def append(self, timestamp_ms, values):
+        """Ajoute un point (valeur scalaire ou une valeur par canal)"""
+        if isinstance(values, (tuple, list, np.ndarray)):
+            values = [float(value) for value in values]
+        else:
+            values = [float(values)]
+
+        with self._lock:
+            closed = self.tiers[0].add(timestamp_ms, values, values, values, 1)
+            for tier in self.tiers[1:]:
+                if closed is None:
+                    break
+                closed = tier.add(*closed)
+
+    def append_many(self, timestamps_ms, values):
+        """Ajoute plusieurs points (horodatages croissants)"""
+        timestamps_ms = np.asarray(timestamps_ms, dtype=np.int64)
+        if not len(timestamps_ms):
+            return
+        values = np.asarray(values, dtype=np.float64).reshape(len(timestamps_ms), self.channels)
+
+        with self._lock:
+            closed = self.tiers[0].add_many(
+                timestamps_ms, values, values, values, np.ones(len(timestamps_ms), dtype=np.int64)
+            )
+            for tier in self.tiers[1:]:
+                if closed is None:
+                    break
+                closed = tier.add_many(*closed)
+
+    def covers(self, level, since_ms):
+        """Vrai si aucun intervalle du niveau postérieur à since_ms n'a été recouvert"""
+        buffer = self.tiers[level].buffer
+        if not buffer.full:
+            return True
+        return since_ms is not None and buffer.first_timestamp <= since_ms
+
+    def _pending(self, level):
+        """Intervalles en cours du niveau, complétés par ceux des niveaux plus fins (sous le verrou)"""
+        interval_ms = self.tiers[level].interval_ms
+        merged = {}
+        for tier in self.tiers[:level + 1]:
+            if tier.open is None:
+                continue
+            start, minimums, maximums, sums, count = tier.open
+            start -= start % interval_ms
+            if start not in merged:
+                merged[start] = [start, list(minimums), list(maximums), list(sums), count]
+                continue
+            current = merged[start]
+            current[1] = [min(a, b) for a, b in zip(current[1], minimums)]
+            current[2] = [max(a, b) for a, b in zip(current[2], maximums)]
+            current[3] = [a + b for a, b in zip(current[3], sums)]
+            current[4] += count
+        return [merged[start] for start in sorted(merged)]
+
+    def _in_range(self, level, start, since_ms, until_ms):
+        interval_ms = self.tiers[level].interval_ms
+        return (since_ms is None or start + interval_ms > since_ms) and (until_ms is None or start <= until_ms)
+
+    def count(self, level, since_ms=None, until_ms=None):
+        """Nombre d'intervalles du niveau qui recoupent ]since_ms, until_ms]"""
+        tier = self.tiers[level]
+        with self._lock:
+            since_start = None if since_ms is None else since_ms - tier.interval_ms
+            total = tier.buffer.count(since_start, until_ms)
+            last = tier.buffer.last_timestamp
+            for aggregate in self._pending(level):
+                if (last is None or aggregate[0] > last) and self._in_range(level, aggregate[0], since_ms, until_ms):
+                    total += 1
+            return total
+
+    def query(self, level, since_ms=None, until_ms=None):
+        """
+        Intervalles du niveau qui recoupent ]since_ms, until_ms], y compris les intervalles en cours
+
+        Returns:
+            Tuple (débuts des intervalles int64, minimums, maximums, moyennes (n, canaux), nombres de points)
+        """
+        tier = self.tiers[level]
+        with self._lock:
+            since_start = None if since_ms is None else since_ms - tier.interval_ms
+            starts, rows = tier.buffer.range(since_start, until_ms)
+            last = tier.buffer.last_timestamp
+            pending = [
+                aggregate for aggregate in self._pending(level)
+                if (last is None or aggregate[0] > last) and self._in_range(level, aggregate[0], since_ms, until_ms)
+            ]
+        if pending:
+            starts = np.append(starts, [aggregate[0] for aggregate in pending])
+            rows = np.vstack((rows, np.array([_summary_row(aggregate) for aggregate in pending], dtype=np.float32)))
+
+        channels = self.channels
+        return (
+            starts,
+            rows[:, :channels],
+            rows[:, channels:2 * channels],
+            rows[:, 2 * channels:3 * channels],
+            rows[:, 3 * channels].astype(np.int64),
+        )
+
+    def nbytes(self):
+        return sum(tier.buffer.nbytes for tier in self.tiers)
+
+
+class SensorHistoryStore:
+    """
+    Historique de tous les capteurs d'un patient
+
+    Args:
+        retention_seconds: Durée d'historique conservée
+        sample_rate_hz: Fréquence d'échantillonnage maximale attendue par capteur
+        rollup_tiers: Niveaux d'agrégation (durée d'un intervalle, rétention), en secondes
+    """
+
+    def __init__(self, retention_seconds=24 * 3600, sample_rate_hz=1.0, rollup_tiers=ROLLUP_TIERS):
+        capacity = int(retention_seconds * sample_rate_hz)
+        self.buffers = {
+            sensor_type: RingBuffer(capacity, len(channels))
+            for sensor_type, channels in SENSOR_CHANNELS.items()
+        }
+        self.rollups = {
+            sensor_type: RollupTiers(rollup_tiers, len(channels))
+            for sensor_type, channels in SENSOR_CHANNELS.items()
+        }
+
+    def __contains__(self, sensor_type):
+        return sensor_type in self.buffers
+
+    def append(self, sensor_type, timestamp_ms, values):
+        self.buffers[sensor_type].append(timestamp_ms, values)
+        self.rollups[sensor_type].append(timestamp_ms, values)
+
+    def append_many(self, sensor_type, timestamps_ms, values):
+        self.buffers[sensor_type].append_many(timestamps_ms, values)
+        self.rollups[sensor_type].append_many(timestamps_ms, values)
+
+    def query(self, sensor_type, since_ms=None, until_ms=None):
+        return self.buffers[sensor_type].range(since_ms, until_ms)
+
+    def last(self, sensor_type, count, until_ms=None):
+        return self.buffers[sensor_type].last(count, until_ms)
+
+    def downsample(self, sensor_type, since_ms=None, until_ms=None, max_points=500, method='auto'):
+        """
+        Historique d'un capteur réduit à au plus max_points points
+
+        Args:
+            method: 'auto': niveau le plus fin (points bruts, puis agrégats) qui couvre la
+                période en au plus max_points points, réduit par LTTB si aucun ne suffit;
+                'lttb': LTTB appliqué au niveau le plus fin qui couvre la période
+
+        Returns:
+            Dictionnaire {'resolution' (secondes par point, 0: points bruts), 'method',
+            'timestamps', 'values' (moyennes pour les agrégats), 'minimums', 'maximums'
+            (None pour les points bruts)}
+        """
+        if method not in ('auto', 'lttb'):
+            raise ValueError(f"Méthode de réduction inconnue: {method}")
+        buffer = self.buffers[sensor_type]
+        rollups = self.rollups[sensor_type]
+
+        # Niveaux qui couvrent la période, du plus fin au plus grossier (None: points bruts)
+        candidates = []
+        if not buffer.full or (since_ms is not None and buffer.first_timestamp <= since_ms):
+            candidates.append(None)
+        candidates.extend(level for level in range(len(rollups)) if rollups.covers(level, since_ms))
+        if not candidates:
+            candidates.append(len(rollups) - 1)
+
+        chosen = candidates[0]
+        if method == 'auto':
+            for level in candidates:
+                chosen = level
+                count = buffer.count(since_ms, until_ms) if level is None else rollups.count(level, since_ms, until_ms)
+                if count <= max_points:
+                    break
+
+        if chosen is None:
+            timestamps, values = buffer.range(since_ms, until_ms)
+            minimums = maximums = None
+        else:
+            timestamps, minimums, maximums, values, _ = rollups.query(chosen, since_ms, until_ms)
+
+        result = {
+            'resolution': 0 if chosen is None else rollups.tiers[chosen].interval_ms // 1000,
+            'method': 'raw' if chosen is None else 'rollup',
+            'timestamps': timestamps,
+            'values': values,
+            'minimums': minimums,
+            'maximums': maximums,
+        }
+        if len(timestamps) > max_points:
+            keep = lttb_indices(timestamps, values, max_points)
+            result['method'] = 'lttb'
+            for key in ('timestamps', 'values', 'minimums', 'maximums'):
+                if result[key] is not None:
+                    result[key] = result[key][keep]
+        return result
+
+    def last_timestamp(self):
+        """Horodatage du point le plus récent, tous capteurs confondus (None si vide)"""
+        timestamps = [buffer.last_timestamp for buffer in self.buffers.values()]
+        timestamps = [timestamp for timestamp in timestamps if timestamp is not None]
+        return max(timestamps) if timestamps else None
+
+    def memory_bytes(self):
+        return sum(buffer.nbytes for buffer in self.buffers.values()) + sum(
+            rollups.nbytes() for rollups in self.rollups.values()
+        )
@@ -0,0 +1,277 @@
+"""
+Analyse en continu des signes vitaux d'un patient / appareil.
+
+Chaque mesure met à jour l'état de l'appareil en temps constant, sans jamais
+relire l'historique:
+- moyenne et variance de chaque canal (algorithme de Welford; un lot de mesures
+  est fusionné d'un bloc par la formule de Chan)
+- moyennes mobiles exponentielles courte et longue, pondérées par le temps écoulé
+  (mesures irrégulières); la tendance est l'écart entre les deux
+- variabilité de la fréquence cardiaque (RMSSD, SDNN, pNN50) sur les derniers
+  intervalles RR, tenue par des sommes glissantes sur un buffer circulaire; les
+  intervalles sont déduits de la fréquence cardiaque (60000 / FC), une estimation
+  d'autant plus grossière que la fréquence de mesure est basse
+- score d'alerte précoce inspiré de NEWS2 (fréquence respiratoire, SpO2, tension
+  systolique, pouls, température; conscience et oxygénothérapie ne sont pas mesurées)
+
+Comme le reste de DeviceState, l'état est modifié sous le verrou de l'appareil.
+"""
+
+import math
+from bisect import bisect_left
+
+import numpy as np
+
+from timeseries_store import SENSOR_CHANNELS
+
+EWMA_SHORT_SECONDS = 60  # Constante de temps de la moyenne mobile courte
+EWMA_LONG_SECONDS = 900  # Constante de temps de la moyenne mobile longue
+HRV_WINDOW = 64  # Nombre d'intervalles RR de la fenêtre de variabilité
+
+# Barèmes du score d'alerte précoce: bornes supérieures incluses et points de chaque plage
+EARLY_WARNING_BANDS = {
+    ('respiratoryRate', 'value'): ((8, 11, 20, 24), (3, 1, 0, 2, 3)),
+    ('oxygenSaturation', 'value'): ((91, 93, 95), (3, 2, 1, 0)),
+    ('bloodPressure', 'systolic'): ((90, 100, 110, 219), (3, 2, 1, 0, 3)),
+    ('heartRate', 'value'): ((40, 50, 90, 110, 130), (3, 1, 0, 1, 2, 3)),
+    ('temperature', 'value'): ((35.0, 36.0, 38.0, 39.0), (3, 1, 0, 1, 2)),
+}
+MEDIUM_RISK_SCORE = 5
+HIGH_RISK_SCORE = 7
+
+
+def early_warning_score(latest):
+    """
+    Score d'alerte précoce des dernières valeurs
+
+    Args:
+        latest: Dictionnaire {(type de capteur, canal): valeur}; les paramètres absents ne comptent pas
+
+    Returns:
+        Tuple (score total, points par capteur, niveau de risque 'low', 'low-medium', 'medium' ou 'high')
+    """
+    components = {}
+    for key, (bounds, points) in EARLY_WARNING_BANDS.items():
+        value = latest.get(key)
+        if value is not None:
+            components[key[0]] = points[bisect_left(bounds, value)]
+
+    score = sum(components.values())
+    if score >= HIGH_RISK_SCORE:
+        risk = 'high'
+    elif score >= MEDIUM_RISK_SCORE:
+        risk = 'medium'
+    elif 3 in components.values():
+        # Un seul paramètre très anormal suffit à une réévaluation rapide
+        risk = 'low-medium'
+    else:
+        risk = 'low'
+    return score, components, risk
+
+
+class ChannelStats:
+    """Moyenne / variance cumulées et moyennes mobiles exponentielles d'un canal"""
+
+    __slots__ = ('count', 'mean', 'm2', 'short', 'long', 'last', 'last_ms', 'short_ms', 'long_ms')
+
+    def __init__(self, short_seconds=EWMA_SHORT_SECONDS, long_seconds=EWMA_LONG_SECONDS):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.short = None
+        self.long = None
+        self.last = None
+        self.last_ms = None
+        self.short_ms = short_seconds * 1000.0
+        self.long_ms = long_seconds * 1000.0
+
+    def update(self, timestamp_ms, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        if self.last_ms is None:
+            self.short = self.long = value
+        else:
+            elapsed = max(0.0, timestamp_ms - self.last_ms)
+            self.short += (1.0 - math.exp(-elapsed / self.short_ms)) * (value - self.short)
+            self.long += (1.0 - math.exp(-elapsed / self.long_ms)) * (value - self.long)
+        self.last = value
+        self.last_ms = timestamp_ms
+
+    def update_many(self, timestamps_ms, values):
+        """Ajoute un lot de mesures chronologiques (tableaux (n,)) sans boucle par mesure"""
+        if not len(values):
+            return
+        values = np.asarray(values, dtype=np.float64)
+        timestamps_ms = np.asarray(timestamps_ms, dtype=np.float64)
+
+        # Fusion des moments du lot avec les moments cumulés (Chan et al.)
+        count = len(values)
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        total = self.count + count
+        delta = batch_mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += batch_m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.last = float(values[-1])
+
+        if self.last_ms is None:
+            self.short = self.long = float(values[0])
+            self.last_ms = float(timestamps_ms[0])
+            timestamps_ms, values = timestamps_ms[1:], values[1:]
+        if len(values):
+            # Forme fermée de la récurrence e_i = d_i e_(i-1) + (1 - d_i) x_i, avec d_i = exp(-dt_i / tau)
+            elapsed = np.maximum(np.diff(timestamps_ms, prepend=self.last_ms), 0.0)
+            age = np.maximum(timestamps_ms[-1] - timestamps_ms, 0.0)
+            span = max(0.0, timestamps_ms[-1] - self.last_ms)
+            for name, tau in (('short', self.short_ms), ('long', self.long_ms)):
+                weights = -np.expm1(-elapsed / tau) * np.exp(-age / tau)
+                setattr(self, name, math.exp(-span / tau) * getattr(self, name) + float(weights @ values))
+            self.last_ms = float(timestamps_ms[-1])
+
+    def summary(self):
+        if not self.count:
+            return None
+        return {
+            "last": round(self.last, 2),
+            "mean": round(self.mean, 2),
+            "std": round(math.sqrt(self.m2 / (self.count - 1)), 2) if self.count > 1 else 0.0,
+            "ewma": round(self.short, 2),
+            "trend": round(self.short - self.long, 2) + 0.0,  # sans -0.0
+            "count": self.count,
+        }
+
+
+class RRWindow:
+    """
+    Variabilité des derniers intervalles RR (en ms)
+
+    Les sommes (RR, RR², différences successives au carré, différences > 50 ms)
+    sont mises à jour à l'entrée et à la sortie de chaque intervalle; elles sont
+    recalculées une fois par tour du buffer pour éliminer la dérive d'arrondi.
+    """
+
+    __slots__ = ('size', '_values', '_start', '_count', '_sum', '_sumsq', '_diffsq', '_nn50', '_pushes')
+
+    def __init__(self, size=HRV_WINDOW):
+        self.size = max(2, int(size))
+        self._values = [0.0] * self.size
+        self._start = 0
+        self._count = 0
+        self._sum = self._sumsq = self._diffsq = 0.0
+        self._nn50 = 0
+        self._pushes = 0
+
+    def push(self, rr):
+        values, size = self._values, self.size
+        if self._count == size:
+            # L'intervalle le plus ancien et sa différence avec le suivant sortent de la fenêtre
+            oldest = values[self._start]
+            following = values[(self._start + 1) % size]
+            self._sum -= oldest
+            self._sumsq -= oldest * oldest
+            self._diffsq -= (following - oldest) ** 2
+            self._nn50 -= abs(following - oldest) > 50
+            self._start = (self._start + 1) % size
+            self._count -= 1
+
+        if self._count:
+            previous = values[(self._start + self._count - 1) % size]
+            self._diffsq += (rr - previous) ** 2
+            self._nn50 += abs(rr - previous) > 50
+        values[(self._start + self._count) % size] = rr
+        self._count += 1
+        self._sum += rr
+        self._sumsq += rr * rr
+
+        self._pushes += 1
+        if self._pushes % size == 0:
+            self._recompute()
+
+    def _recompute(self):
+        window = [self._values[(self._start + index) % self.size] for index in range(self._count)]
+        diffs = [b - a for a, b in zip(window, window[1:])]
+        self._sum = sum(window)
+        self._sumsq = sum(value * value for value in window)
+        self._diffsq = sum(diff * diff for diff in diffs)
+        self._nn50 = sum(abs(diff) > 50 for diff in diffs)
+
+    def summary(self):
+        if self._count < 2:
+            return None
+        count = self._count
+        mean = self._sum / count
+        variance = max(0.0, (self._sumsq - count * mean * mean) / (count - 1))
+        return {
+            "meanRR": round(mean, 1),
+            "sdnn": round(math.sqrt(variance), 1),
+            "rmssd": round(math.sqrt(max(0.0, self._diffsq) / (count - 1)), 1),
+            "pnn50": round(100.0 * self._nn50 / (count - 1), 1),
+            "beats": count,
+        }
+
+
+class VitalsAnalytics:
+    """
+    Statistiques en continu des capteurs d'un appareil
+
+    Args:
+        short_seconds, long_seconds: Constantes de temps des moyennes mobiles
+        hrv_window: Nombre d'intervalles RR de la fenêtre de variabilité
+    """
+
+    def __init__(self, short_seconds=EWMA_SHORT_SECONDS, long_seconds=EWMA_LONG_SECONDS, hrv_window=HRV_WINDOW):
+        self.channels = {
+            (sensor_type, channel): ChannelStats(short_seconds, long_seconds)
+            for sensor_type, channels in SENSOR_CHANNELS.items()
+            for channel in channels
+        }
+        self.rr = RRWindow(hrv_window)
+
+    def update(self, sensor_type, timestamp_ms, values):
+        """
+        Ajoute une mesure
+
+        Args:
+            values: Valeurs des canaux dans l'ordre de SENSOR_CHANNELS
+        """
+        for channel, value in zip(SENSOR_CHANNELS[sensor_type], values):
+            self.channels[(sensor_type, channel)].update(timestamp_ms, float(value))
+        if sensor_type == 'heartRate' and values[0] > 0:
+            self.rr.push(60000.0 / values[0])
+
+    def update_many(self, sensor_type, timestamps_ms, values):
+        """
+        Ajoute un lot de mesures chronologiques
+
+        Args:
+            values: Tableau (n, canaux) dans l'ordre de SENSOR_CHANNELS
+        """
+        for index, channel in enumerate(SENSOR_CHANNELS[sensor_type]):
+            self.channels[(sensor_type, channel)].update_many(timestamps_ms, values[:, index])
+        if sensor_type == 'heartRate':
+            # Seuls les derniers intervalles restent dans la fenêtre
+            rates = values[-self.rr.size:, 0]
+            for rr in (60000.0 / rates[rates > 0]).tolist():
+                self.rr.push(rr)
+
+    def early_warning(self):
+        """Score d'alerte précoce des dernières valeurs reçues"""
+        latest = {key: stats.last for key, stats in self.channels.items() if stats.last is not None}
+        score, components, risk = early_warning_score(latest)
+        return {"score": score, "risk": risk, "components": components}
+
+    def summary(self):
+        """Statistiques de tous les capteurs, variabilité cardiaque et score d'alerte précoce"""
+        sensors = {}
+        for sensor_type, channels in SENSOR_CHANNELS.items():
+            if len(channels) == 1:
+                sensors[sensor_type] = self.channels[(sensor_type, channels[0])].summary()
+            else:
+                sensors[sensor_type] = {
+                    channel: self.channels[(sensor_type, channel)].summary() for channel in channels
+                }
+        return {"sensors": sensors, "hrv": self.rr.summary(), "earlyWarning": self.early_warning()}
@@ -0,0 +1,479 @@
+"""
+Prétraitement des signaux ECG numériques (échantillons multi-dérivations).
+
+Les appareils qui enregistrent déjà le signal n'ont pas à produire une image:
+les échantillons sont lus directement, sans rendu ni décodage d'image.
+
+Formats d'entrée:
+- raw: buffer binaire float32 (mV) ou int16 (unités ADC, voir gain), dérivations
+  entrelacées (échantillon par échantillon) ou à plat (dérivation par dérivation)
+- WFDB (PhysioNet): en-tête .hea et fichier de données .dat (formats 16, 61, 80, 212, 32)
+- EDF / EDF+: en-tête et enregistrements de données dans un seul fichier
+
+Les fichiers sont projetés en mémoire (np.memmap), les buffers reçus sont lus
+sans copie; seule la durée analysée (max_windows fenêtres) est décodée, si bien
+qu'un enregistrement Holter de 24 h ne coûte pas plus qu'un tracé de 10 s.
+
+Le traitement est vectorisé sur toutes les dérivations:
+- rééchantillonnage et filtre passe-bande en une seule paire de FFT (le spectre
+  est pondéré par la réponse du filtre puis tronqué ou complété à la fréquence
+  cible), après retrait de la droite joignant les extrémités (pas de
+  discontinuité au bord de la FFT)
+- découpage en fenêtres de durée fixe écrites dans un buffer float32
+  (fenêtres, échantillons, dérivations) préalloué
+"""
+
+import io
+import math
+import os
+import re
+import time
+from collections import namedtuple
+
+import numpy as np
+
+SAMPLE_RATE = 500  # Fréquence d'échantillonnage attendue par le modèle (Hz)
+WINDOW_SECONDS = 10  # Durée d'une fenêtre analysée (en secondes)
+LEADS = 12  # Nombre de dérivations attendu par le modèle
+BAND_HZ = (0.5, 40.0)  # Bande passante du filtre (ligne de base, bruit musculaire et secteur)
+MAX_WINDOWS = 12  # Nombre maximal de fenêtres analysées par enregistrement
+RAW_GAIN = 1000.0  # Unités ADC par mV d'un buffer raw int16 (1 unité = 1 µV)
+
+FORMATS = ('raw', 'wfdb', 'edf')
+RAW_DTYPES = {'float32': '<f4', 'int16': '<i2'}
+
+# Conversion des unités physiques en mV
+_UNIT_SCALES = {'mv': 1.0, 'uv': 0.001, 'µv': 0.001, 'μv': 0.001, 'v': 1000.0}
+
+# Formats WFDB pris en charge: type des échantillons stockés (212: 12 bits compactés)
+_WFDB_DTYPES = {16: '<i2', 61: '>i2', 32: '<i4', 80: 'u1', 212: None}
+_WFDB_FORMAT = re.compile(r'^(\d+)(?:x(\d+))?(?::\d+)?(?:\+(\d+))?$')
+_WFDB_GAIN = re.compile(r'^([-+\d.eE]+)(?:\(([-+\d]+)\))?(?:/(\S+))?$')
+
+Waveform = namedtuple('Waveform', ('signal', 'sample_rate', 'lead_names', 'duration'))
+Waveform.__doc__ = """
+Signal lu: signal (échantillons, dérivations) float32 en mV, fréquence (Hz),
+noms des dérivations et durée totale de l'enregistrement (en secondes)
+"""
+
+
+def open_buffer(source):
+    """
+    Octets d'une source sans copie
+
+    Args:
+        source: Chemin, objet bytes-like, flux binaire (fichier reçu par Flask) ou tableau uint8
+
+    Returns:
+        Tableau uint8 (projection en mémoire pour un fichier sur disque)
+    """
+    if isinstance(source, np.ndarray):
+        return source
+    if isinstance(source, (str, os.PathLike)):
+        return np.memmap(source, dtype=np.uint8, mode='r') if os.path.getsize(source) else np.empty(0, np.uint8)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return np.frombuffer(source, dtype=np.uint8)
+
+    # SpooledTemporaryFile (fichiers reçus par werkzeug): BytesIO en mémoire ou fichier sur disque
+    source = getattr(source, '_file', source)
+    if isinstance(source, io.BytesIO):
+        return np.frombuffer(source.getbuffer(), dtype=np.uint8)
+    try:
+        source.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return np.frombuffer(source.read(), dtype=np.uint8)
+    size = source.seek(0, os.SEEK_END)
+    source.seek(0)
+    return np.memmap(source, dtype=np.uint8, mode='r', shape=(size,)) if size else np.empty(0, np.uint8)
+
+
+def detect_format(data, header=None):
+    """Format d'un signal: 'wfdb' si un en-tête est fourni, 'edf' d'après la signature, sinon 'raw'"""
+    if header is not None:
+        return 'wfdb'
+    if len(data) >= 256 and bytes(data[:8]) == b'0       ':
+        return 'edf'
+    return 'raw'
+
+
+def _unit_scale(unit):
+    return _UNIT_SCALES.get((unit or 'mV').strip().lower(), 1.0)
+
+
+def _sample_limit(sample_rate, max_seconds):
+    return None if max_seconds is None else int(math.ceil(sample_rate * max_seconds))
+
+
+def read_raw(data, sample_rate, leads=LEADS, dtype='float32', gain=RAW_GAIN, layout='interleaved', max_seconds=None):
+    """
+    Signal d'un buffer binaire sans en-tête
+
+    Args:
+        data: Octets (voir open_buffer)
+        sample_rate: Fréquence d'échantillonnage (Hz)
+        leads: Nombre de dérivations
+        dtype: 'float32' (valeurs en mV) ou 'int16' (unités ADC)
+        gain: Unités ADC par mV (int16 uniquement)
+        layout: 'interleaved' (échantillons, dérivations) ou 'planar' (dérivations, échantillons)
+        max_seconds: Durée décodée depuis le début (None: tout l'enregistrement)
+    """
+    if dtype not in RAW_DTYPES:
+        raise ValueError(f"Type d'échantillon invalide: {dtype} (attendu: {', '.join(RAW_DTYPES)})")
+    if layout not in ('interleaved', 'planar'):
+        raise ValueError(f"Disposition invalide: {layout} (attendu: interleaved, planar)")
+    if not sample_rate:
+        raise ValueError("La fréquence d'échantillonnage (sampleRate) est nécessaire pour un signal raw")
+    if sample_rate <= 0 or leads <= 0:
+        raise ValueError("La fréquence d'échantillonnage et le nombre de dérivations doivent être positifs")
+
+    itemsize = np.dtype(RAW_DTYPES[dtype]).itemsize
+    if not len(data) or len(data) % (itemsize * leads):
+        raise ValueError(f"Taille du signal ({len(data)} octets) non multiple de {leads} dérivations {dtype}")
+    samples = open_buffer(data).view(RAW_DTYPES[dtype])
+    total = len(samples) // leads
+    count = min(total, _sample_limit(sample_rate, max_seconds) or total)
+
+    if layout == 'interleaved':
+        selected = samples[:count * leads].reshape(count, leads)
+    else:
+        selected = samples.reshape(leads, total)[:, :count].T
+    signal = selected.astype(np.float32)
+    if dtype == 'int16':
+        signal *= np.float32(1.0 / gain)
+    return Waveform(signal, float(sample_rate), [f"lead{index + 1}" for index in range(leads)], total / sample_rate)
+
+
+def parse_wfdb_header(text):
+    """
+    En-tête WFDB (.hea)
+
+    Returns:
+        Dictionnaire: fréquence, nombre d'échantillons, et pour chaque signal
+        fichier, format, décalage en octets, gain, ligne de base, unité et nom
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip() and not line.lstrip().startswith('#')]
+    if not lines:
+        raise ValueError("En-tête WFDB vide")
+
+    record = lines[0].split()
+    if '/' in record[0]:
+        raise ValueError("Les enregistrements WFDB multi-segments ne sont pas pris en charge")
+    try:
+        nsig = int(record[1])
+        sample_rate = float(re.split(r'[/(]', record[2])[0]) if len(record) > 2 else 250.0
+        nsamp = int(record[3]) if len(record) > 3 else None
+    except (IndexError, ValueError):
+        raise ValueError(f"Ligne d'enregistrement WFDB invalide: {lines[0]}")
+    if len(lines) < nsig + 1:
+        raise ValueError(f"En-tête WFDB incomplet: {nsig} signaux annoncés, {len(lines) - 1} décrits")
+
+    signals = []
+    for line in lines[1:nsig + 1]:
+        fields = line.split()
+        fmt = _WFDB_FORMAT.match(fields[1]) if len(fields) > 1 else None
+        if fmt is None:
+            raise ValueError(f"Format de signal WFDB invalide: {line}")
+        if int(fmt.group(2) or 1) > 1:
+            raise ValueError("Les signaux WFDB à plusieurs échantillons par trame ne sont pas pris en charge")
+        adc_zero = int(fields[4]) if len(fields) > 4 else 0
+        gain, baseline, unit = 200.0, adc_zero, 'mV'
+        if len(fields) > 2:
+            spec = _WFDB_GAIN.match(fields[2])
+            if spec is None:
+                raise ValueError(f"Gain de signal WFDB invalide: {line}")
+            gain = float(spec.group(1)) or 200.0
+            baseline = int(spec.group(2)) if spec.group(2) is not None else adc_zero
+            unit = spec.group(3) or unit
+        signals.append({
+            "file": fields[0],
+            "format": int(fmt.group(1)),
+            "offset": int(fmt.group(3) or 0),
+            "gain": gain,
+            "baseline": baseline,
+            "unit": unit,
+            "name": ' '.join(fields[8:]) or f"signal{len(signals) + 1}",
+        })
+
+    return {"sample_rate": sample_rate, "samples": nsamp, "signals": signals}
+
+
+def _decode_212(data, count):
+    """Échantillons au format 212 (deux échantillons de 12 bits dans trois octets)"""
+    triplets = np.asarray(data[:(count + 1) // 2 * 3]).reshape(-1, 3).astype(np.int16)
+    samples = np.empty((len(triplets), 2), dtype=np.int16)
+    samples[:, 0] = triplets[:, 0] | ((triplets[:, 1] & 0x0F) << 8)
+    samples[:, 1] = triplets[:, 2] | ((triplets[:, 1] & 0xF0) << 4)
+    samples = samples.reshape(-1)[:count]
+    # Extension du signe sur 12 bits
+    samples[samples > 2047] -= 4096
+    return samples
+
+
+def read_wfdb(header, data, max_seconds=None):
+    """
+    Signal d'un enregistrement WFDB
+
+    Args:
+        header: Texte de l'en-tête .hea
+        data: Octets du fichier .dat (voir open_buffer); tous les signaux dans ce fichier
+        max_seconds: Durée décodée depuis le début (None: tout l'enregistrement)
+    """
+    info = parse_wfdb_header(header)
+    signals = info["signals"]
+    if not signals:
+        raise ValueError("L'enregistrement WFDB ne contient aucun signal")
+    if len({signal["file"] for signal in signals}) > 1 or len({signal["format"] for signal in signals}) > 1:
+        raise ValueError("Tous les signaux WFDB doivent être dans un seul fichier, au même format")
+    fmt = signals[0]["format"]
+    if fmt not in _WFDB_DTYPES:
+        raise ValueError(f"Format WFDB non pris en charge: {fmt} (pris en charge: {', '.join(map(str, _WFDB_DTYPES))})")
+
+    nsig = len(signals)
+    data = open_buffer(data)[signals[0]["offset"]:]
+    itemsize = 1.5 if fmt == 212 else np.dtype(_WFDB_DTYPES[fmt]).itemsize
+    available = int(len(data) // (itemsize * nsig))
+    total = min(info["samples"] or available, available)
+    count = min(total, _sample_limit(info["sample_rate"], max_seconds) or total)
+    if count <= 0:
+        raise ValueError("Le fichier de données WFDB ne contient aucun échantillon")
+
+    if fmt == 212:
+        digital = _decode_212(data, count * nsig)
+    else:
+        digital = data[:count * nsig * itemsize].view(_WFDB_DTYPES[fmt])
+        if fmt == 80:
+            digital = digital.astype(np.int16) - 128
+    digital = digital.reshape(count, nsig)
+
+    baseline = np.array([signal["baseline"] for signal in signals], dtype=np.float32)
+    scale = np.array([_unit_scale(signal["unit"]) / signal["gain"] for signal in signals], dtype=np.float32)
+    signal = (digital.astype(np.float32) - baseline) * scale
+    return Waveform(signal, info["sample_rate"], [s["name"] for s in signals], total / info["sample_rate"])
+
+
+def read_edf(data, max_seconds=None):
+    """
+    Signal d'un fichier EDF / EDF+
+
+    Les signaux d'annotation sont ignorés; si les signaux n'ont pas tous la même
+    fréquence, seuls ceux de la fréquence la plus élevée sont retenus.
+    """
+    data = open_buffer(data)
+    if len(data) < 256:
+        raise ValueError("Fichier EDF tronqué")
+
+    def text(start, length):
+        return bytes(data[start:start + length]).decode('latin-1').strip()
+
+    try:
+        header_bytes = int(text(184, 8))
+        records = int(text(236, 8))
+        record_seconds = float(text(244, 8))
+        nsig = int(text(252, 4))
+    except ValueError:
+        raise ValueError("En-tête EDF invalide")
+    if len(data) < header_bytes or header_bytes != 256 * (nsig + 1) or record_seconds <= 0:
+        raise ValueError("En-tête EDF invalide")
+
+    def fields(offset, width):
+        # Champs des signaux: nsig valeurs consécutives de même largeur
+        start = 256 + offset * nsig
+        return [text(start + index * width, width) for index in range(nsig)]
+
+    labels = fields(0, 16)
+    units = fields(16 + 80, 8)
+    try:
+        physical = np.array([fields(16 + 80 + 8, 8), fields(16 + 80 + 16, 8)], dtype=np.float64)
+        digital = np.array([fields(16 + 80 + 24, 8), fields(16 + 80 + 32, 8)], dtype=np.float64)
+        per_record = np.array(fields(16 + 80 + 40 + 80, 8), dtype=np.int64)
+    except ValueError:
+        raise ValueError("Paramètres des signaux EDF invalides")
+
+    record_size = int(per_record.sum())
+    available = (len(data) - header_bytes) // (2 * record_size) if record_size else 0
+    records = available if records < 0 else min(records, available)
+
+    kept = [index for index, label in enumerate(labels) if label != 'EDF Annotations']
+    if not kept or records <= 0:
+        raise ValueError("Le fichier EDF ne contient aucun signal")
+    samples = int(per_record[kept].max())
+    kept = [index for index in kept if per_record[index] == samples]
+    sample_rate = samples / record_seconds
+
+    limit = _sample_limit(sample_rate, max_seconds)
+    read_records = records if limit is None else min(records, -(-limit // samples))
+    blocks = data[header_bytes:header_bytes + read_records * record_size * 2].view('<i2').reshape(read_records, record_size)
+
+    # Colonnes de chaque signal retenu dans un enregistrement: (signaux, échantillons)
+    starts = np.concatenate(([0], np.cumsum(per_record)[:-1]))[kept]
+    columns = starts[:, np.newaxis] + np.arange(samples)
+    digital_values = blocks[:, columns].transpose(0, 2, 1).reshape(read_records * samples, len(kept))
+
+    # Conversion linéaire des valeurs numériques en unités physiques, puis en mV
+    span = np.where(digital[1] != digital[0], digital[1] - digital[0], 1.0)
+    gain = (physical[1] - physical[0]) / span
+    unit_scale = np.array([_unit_scale(unit) for unit in units])
+    scale = (gain * unit_scale)[kept].astype(np.float32)
+    offset = ((physical[0] - digital[0] * gain) * unit_scale)[kept].astype(np.float32)
+    signal = digital_values.astype(np.float32) * scale + offset
+    if limit is not None:
+        signal = signal[:limit]
+
+    return Waveform(signal, sample_rate, [labels[index] for index in kept], records * record_seconds)
+
+
+def read_waveform(data, fmt=None, header=None, max_seconds=None, **raw_options):
+    """
+    Lit un signal dans l'un des formats pris en charge
+
+    Args:
+        data: Octets du signal (voir open_buffer)
+        fmt: 'raw', 'wfdb' ou 'edf' (None: détection automatique)
+        header: Texte de l'en-tête WFDB
+        max_seconds: Durée décodée depuis le début
+        raw_options: Paramètres de read_raw (sample_rate, leads, dtype, gain, layout)
+    """
+    data = open_buffer(data)
+    fmt = fmt or detect_format(data, header)
+    if fmt == 'wfdb':
+        if header is None:
+            raise ValueError("Un en-tête WFDB (.hea) est nécessaire pour lire un fichier .dat")
+        return read_wfdb(header, data, max_seconds=max_seconds)
+    if fmt == 'edf':
+        return read_edf(data, max_seconds=max_seconds)
+    if fmt == 'raw':
+        return read_raw(data, max_seconds=max_seconds, **raw_options)
+    raise ValueError(f"Format de signal invalide: {fmt} (attendu: {', '.join(FORMATS)})")
+
+
+def _fast_length(n):
+    """Plus petite longueur >= n de la forme 2^a 3^b 5^c (FFT rapide)"""
+    best = 1 << max(0, (n - 1).bit_length())
+    power5 = 1
+    while power5 < best:
+        power35 = power5
+        while power35 < best:
+            # Plus petite puissance de 2 telle que power35 * 2^k >= n
+            candidate = power35 << max(0, (-(-n // power35) - 1).bit_length())
+            best = min(best, candidate)
+            power35 *= 3
+        power5 *= 5
+    return best
+
+
+def _band_response(frequencies, low, high):
+    """Réponse du passe-bande: transitions en cosinus surélevé sous low et au-delà de high"""
+    response = np.ones(len(frequencies), dtype=np.float32)
+    if low > 0:
+        below = frequencies < low
+        response[below] = 0.5 - 0.5 * np.cos(np.pi * frequencies[below] / low)
+    if high:
+        width = 0.25 * high
+        above = frequencies > high
+        response[above] = 0.5 + 0.5 * np.cos(np.pi * np.minimum((frequencies[above] - high) / width, 1.0))
+    return response
+
+
+def resample_filter(signal, sample_rate, target_rate=SAMPLE_RATE, band=BAND_HZ):
+    """
+    Rééchantillonne et filtre toutes les dérivations en une paire de FFT
+
+    Args:
+        signal: Tableau (échantillons, dérivations)
+        sample_rate: Fréquence du signal (Hz)
+        target_rate: Fréquence de sortie (Hz)
+        band: (coupure basse, coupure haute) en Hz; la coupure haute est ramenée
+            sous la fréquence de Nyquist de sortie (anti-repliement)
+
+    Returns:
+        Tableau float32 (échantillons à target_rate, dérivations)
+    """
+    n = len(signal)
+    n_out = max(1, int(round(n * target_rate / sample_rate)))
+    if n < 2:
+        return np.zeros((n_out, signal.shape[1]), dtype=np.float32)
+
+    # Retrait de la droite joignant les extrémités: le signal devient continu aux bords
+    # de la FFT (et la composante très basse fréquence est retirée avec la ligne de base)
+    ramp = np.linspace(0.0, 1.0, n, dtype=np.float32)[:, np.newaxis]
+    start, end = signal[0], signal[-1]
+    detrended = signal - start - ramp * (end - start)
+
+    n_fft = _fast_length(n)
+    n_fft_out = max(2, int(round(n_fft * target_rate / sample_rate)))
+    spectrum = np.fft.rfft(detrended, n=n_fft, axis=0)
+
+    low, high = band
+    high = min(high or target_rate / 2, 0.45 * target_rate, 0.5 * sample_rate)
+    spectrum *= _band_response(np.fft.rfftfreq(n_fft, 1.0 / sample_rate), low, high)[:, np.newaxis]
+
+    # Spectre tronqué (sous-échantillonnage) ou complété par des zéros (suréchantillonnage)
+    resampled = np.fft.irfft(spectrum, n=n_fft_out, axis=0)[:n_out]
+    resampled *= n_fft_out / n_fft
+
+    if low <= 0:
+        # Sans coupure basse, la droite retirée est restituée
+        resampled += start + np.linspace(0.0, 1.0, n_out, dtype=np.float32)[:, np.newaxis] * (end - start)
+    return resampled.astype(np.float32, copy=False)
+
+
+def window_starts(samples, window):
+    """Débuts des fenêtres: consécutives, la dernière alignée sur la fin de l'enregistrement"""
+    if samples <= window:
+        return np.zeros(1, dtype=np.int64)
+    starts = np.arange(0, samples - window + 1, window)
+    if starts[-1] + window < samples:
+        starts = np.append(starts, samples - window)
+    return starts
+
+
+def preprocess_waveform(waveform, sample_rate=SAMPLE_RATE, window_seconds=WINDOW_SECONDS, leads=LEADS,
+                        band=BAND_HZ, max_windows=MAX_WINDOWS, out=None):
+    """
+    Prépare un signal pour le modèle
+
+    Args:
+        waveform: Waveform lu par read_waveform
+        sample_rate: Fréquence attendue par le modèle
+        window_seconds: Durée d'une fenêtre
+        leads: Nombre de dérivations attendu (dérivations manquantes à zéro, excédentaires ignorées)
+        band: Bande passante du filtre (Hz)
+        max_windows: Nombre maximal de fenêtres
+        out: Buffer float32 (fenêtres, échantillons, dérivations) préalloué, optionnel
+
+    Returns:
+        Tuple (tableau (fenêtres, échantillons, dérivations) float32, statistiques)
+    """
+    start = time.perf_counter()
+    window = int(round(sample_rate * window_seconds))
+    signal = waveform.signal[:int(math.ceil(max_windows * window_seconds * waveform.sample_rate)), :leads]
+
+    filtered = resample_filter(signal, waveform.sample_rate, sample_rate, band)
+    filtered_at = time.perf_counter()
+
+    starts = window_starts(len(filtered), window)[:max_windows]
+    if out is None:
+        out = np.zeros((len(starts), window, leads), dtype=np.float32)
+    elif len(out) < len(starts):
+        raise ValueError(f"Buffer trop petit: {len(out)} fenêtres pour {len(starts)} fenêtres")
+    else:
+        out[:len(starts)] = 0.0
+
+    if len(filtered) >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(filtered, window, axis=0)[starts]
+        out[:len(starts), :, :filtered.shape[1]] = windows.transpose(0, 2, 1)
+    else:
+        # Enregistrement plus court qu'une fenêtre: complété par des zéros
+        out[0, :len(filtered), :filtered.shape[1]] = filtered
+
+    stats = {
+        "windows": len(starts),
+        "leads": waveform.signal.shape[1],
+        "lead_names": list(waveform.lead_names),
+        "sample_rate_hz": waveform.sample_rate,
+        "duration_s": round(waveform.duration, 3),
+        "analyzed_s": round(min(len(filtered), starts[-1] + window) / sample_rate, 3),
+        "filter_ms": round((filtered_at - start) * 1000, 3),
+        "window_ms": round((time.perf_counter() - filtered_at) * 1000, 3),
+    }
+    return out[:len(starts)], stats